@@ -0,0 +1,204 @@
+"""
+Module 6: Headless Chart Renderer for Goal Outputs
+File: olap/chart_renderer.py
+
+The goal scripts describe each chart as a small dict (a chart spec) instead
+of drawing it with pyplot:
+
+    {
+        "file_name": "sales_by_region.png",
+        "kind": "bar",                 # or "stacked_bar"
+        "data": sales_by_region,       # the aggregate to plot
+        "x": "region", "y": "TotalSales",   # bar charts only
+        "title": "Total Sales by region",
+        "xlabel": "Region",
+        "ylabel": "Total Sales (USD)",
+        "legend_title": "Product ID",  # stacked bar charts only
+    }
+
+For a stacked bar chart, data is a pivot table: one row per bar, one
+column per stacked series.
+
+render_charts() turns a list of specs into PNG files under data/results/:
+
+- Headless: every chart is drawn on a matplotlib Figure object and saved
+  with the non-interactive Agg renderer. pyplot and its GUI backend are
+  never used, so scheduled runs on servers cannot hang on a window.
+- Incremental: each spec's content hash (aggregate values, labels and
+  chart options) is kept in data/results/chart_manifest.json. A chart
+  whose hash is unchanged and whose PNG exists is not rendered again.
+- Parallel: the charts that do need rendering are drawn in a process pool.
+- Atomic: each PNG is written to a temporary file in the same directory
+  and moved into place with os.replace(), so readers never see a partial
+  image. The manifest is replaced the same way.
+
+show_chart() draws a spec in an interactive pyplot window, for the goal
+scripts when they are run by hand.
+"""
+
+import hashlib
+import json
+import os
+import pathlib
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from matplotlib.figure import Figure
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+from utils.instrumentation import instrument  # noqa: E402
+
+# Constants
+RESULTS_OUTPUT_DIR: pathlib.Path = pathlib.Path("data").joinpath("results")
+CHART_MANIFEST_FILE: str = "chart_manifest.json"
+CHART_FIGSIZE: dict = {"bar": (10, 6), "stacked_bar": (12, 8)}
+
+# Bump when draw_chart() changes, so every chart is rendered again
+CHART_STYLE_VERSION: int = 1
+
+
+def chart_hash(spec: dict) -> str:
+    """Return a content hash of a chart spec: its aggregate, labels and options."""
+    data = spec["data"]
+    options = {key: value for key, value in spec.items() if key != "data"}
+    digest = hashlib.sha256()
+    digest.update(
+        json.dumps(
+            [CHART_STYLE_VERSION, options, [str(col) for col in data.columns], [str(t) for t in data.dtypes]],
+            sort_keys=True,
+            default=str,
+        ).encode("utf-8")
+    )
+    digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def draw_chart(spec: dict, ax) -> None:
+    """Draw a chart spec onto a matplotlib Axes."""
+    data = spec["data"]
+    if spec["kind"] == "bar":
+        ax.bar(data[spec["x"]], data[spec["y"]], color="skyblue")
+    elif spec["kind"] == "stacked_bar":
+        data.plot(kind="bar", stacked=True, colormap="tab10", ax=ax)
+        ax.legend(title=spec.get("legend_title"), bbox_to_anchor=(1.05, 1), loc="upper left")
+    else:
+        raise ValueError(f"Unknown chart kind {spec['kind']!r}; expected one of {list(CHART_FIGSIZE)}")
+
+    ax.set_title(spec["title"], fontsize=16)
+    ax.set_xlabel(spec["xlabel"], fontsize=12)
+    ax.set_ylabel(spec["ylabel"], fontsize=12)
+    ax.tick_params(axis="x", labelrotation=45)
+
+
+def write_png_atomic(figure: Figure, output_path: pathlib.Path) -> None:
+    """Save a figure as PNG through a temporary file in the same directory, then move it into place."""
+    fd, tmp_path = tempfile.mkstemp(dir=output_path.parent, prefix=f".{output_path.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        figure.savefig(tmp_path, format="png")
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def render_chart(spec: dict, output_path: pathlib.Path) -> pathlib.Path:
+    """Render one chart spec to a PNG file without pyplot (runs in a worker process)."""
+    figure = Figure(figsize=CHART_FIGSIZE[spec["kind"]])
+    draw_chart(spec, figure.subplots())
+    figure.tight_layout()
+    write_png_atomic(figure, output_path)
+    return output_path
+
+
+def read_manifest(output_dir: pathlib.Path) -> dict:
+    """Return the saved file_name -> content hash map (empty if there is none yet)."""
+    manifest_path = output_dir.joinpath(CHART_MANIFEST_FILE)
+    if not manifest_path.exists():
+        return {}
+    try:
+        return json.loads(manifest_path.read_text(encoding="utf-8"))
+    except ValueError:
+        logger.warning(f"Ignoring unreadable chart manifest {manifest_path}; all charts will be rendered.")
+        return {}
+
+
+def write_manifest(manifest: dict, output_dir: pathlib.Path) -> None:
+    """Save the file_name -> content hash map atomically."""
+    manifest_path = output_dir.joinpath(CHART_MANIFEST_FILE)
+    fd, tmp_path = tempfile.mkstemp(dir=output_dir, prefix=f".{CHART_MANIFEST_FILE}.", suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+@instrument
+def render_charts(specs: list, output_dir: pathlib.Path = RESULTS_OUTPUT_DIR, max_workers: int = None) -> dict:
+    """
+    Render chart specs to PNG files, skipping charts whose content is unchanged.
+
+    Args:
+        specs (list): Chart specs (see the module docstring).
+        output_dir (pathlib.Path): Directory for the PNG files and the manifest.
+        max_workers (int): Process pool size. Defaults to one per CPU.
+
+    Returns:
+        dict: file_name -> "rendered" or "unchanged".
+    """
+    output_dir = pathlib.Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest = read_manifest(output_dir)
+
+    status = {}
+    stale = []
+    for spec in specs:
+        file_name = spec["file_name"]
+        content_hash = chart_hash(spec)
+        if manifest.get(file_name) == content_hash and output_dir.joinpath(file_name).exists():
+            status[file_name] = "unchanged"
+        else:
+            stale.append((spec, content_hash))
+
+    try:
+        if len(stale) == 1:
+            # Not worth starting a pool for one chart
+            spec, _ = stale[0]
+            render_chart(spec, output_dir.joinpath(spec["file_name"]))
+        elif stale:
+            workers = min(len(stale), max_workers or os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(render_chart, spec, output_dir.joinpath(spec["file_name"])) for spec, _ in stale]
+                for future in futures:
+                    future.result()
+    except Exception as e:
+        logger.error(f"Error rendering charts: {e}")
+        raise
+
+    for spec, content_hash in stale:
+        manifest[spec["file_name"]] = content_hash
+        status[spec["file_name"]] = "rendered"
+    if stale:
+        write_manifest(manifest, output_dir)
+
+    logger.info(
+        f"Charts in {output_dir}: {len(stale)} rendered, {len(specs) - len(stale)} unchanged."
+    )
+    return status
+
+
+def show_chart(spec: dict) -> None:
+    """Draw a chart spec in an interactive pyplot window and wait for it to be closed."""
+    import matplotlib.pyplot as plt
+
+    figure, ax = plt.subplots(figsize=CHART_FIGSIZE[spec["kind"]])
+    draw_chart(spec, ax)
+    figure.tight_layout()
+    plt.show()
+    plt.close(figure)
@@ -0,0 +1,141 @@
+"""
+Module 6: OLAP Cube Cache
+File: olap/cube_cache.py
+
+This script keeps built OLAP cubes on disk so the cubing scripts do not
+recompute a cube when the data warehouse has not changed.
+
+Cache key:
+
+- The warehouse data version from utils/dw_version.py
+  (the ETL version counter and generation token plus per-table row counts).
+- A hash of the cube definition: its name, dimensions, metrics and filters.
+
+Behavior:
+
+- Hit: the cached cube is loaded and returned immediately.
+- Miss: the cube is built, stored, and returned.
+- Invalidation: entries built from an older version of the same warehouse
+  are deleted as soon as a newer version is seen, so a new ETL load
+  automatically retires them.
+- Eviction: when the cache grows past its size budget, the least recently
+  used entries are deleted first.
+"""
+
+import hashlib
+import json
+import os
+import pathlib
+import sys
+
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+from utils.dw_version import get_warehouse_version  # noqa: E402
+
+# Constants
+CACHE_DIR: pathlib.Path = pathlib.Path("data").joinpath("olap_cache")
+CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+
+
+def cube_definition_hash(definition: dict) -> str:
+    """Return a stable hash of a cube definition (name, dimensions, metrics, filters)."""
+    text = json.dumps(definition, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+class CubeCache:
+    """A size-bounded, version-keyed cache of built cubes."""
+
+    def __init__(self, cache_dir: pathlib.Path = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _entry_path(self, db_path: pathlib.Path, version: str, definition: dict) -> pathlib.Path:
+        """Return the file that holds one cube: <warehouse>--<version>--<definition>.pkl"""
+        name = f"{pathlib.Path(db_path).stem}--{version}--{cube_definition_hash(definition)}.pkl"
+        return self.cache_dir.joinpath(name)
+
+    def invalidate_stale(self, db_path: pathlib.Path, version: str) -> int:
+        """Delete entries built from any other version of this warehouse."""
+        removed = 0
+        prefix = f"{pathlib.Path(db_path).stem}--"
+        for entry in self.cache_dir.glob(f"{prefix}*.pkl"):
+            if not entry.name.startswith(f"{prefix}{version}--"):
+                entry.unlink(missing_ok=True)
+                removed += 1
+        if removed:
+            logger.info(f"Removed {removed} stale cube(s) from the cache (warehouse now at {version}).")
+        return removed
+
+    def evict(self) -> int:
+        """Delete least recently used entries until the cache fits its size budget."""
+        entries = []
+        for entry in self.cache_dir.glob("*.pkl"):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue  # Deleted by another process since the glob
+            entries.append((stat.st_mtime, stat.st_size, entry))
+        entries.sort(key=lambda item: item[0])
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        while entries and total > self.max_bytes:
+            _, size, entry = entries.pop(0)
+            total -= size
+            entry.unlink(missing_ok=True)
+            removed += 1
+        if removed:
+            logger.info(f"Evicted {removed} cube(s) to keep the cache under {self.max_bytes} bytes.")
+        return removed
+
+    def get(self, db_path: pathlib.Path, definition: dict, version: str = None) -> pd.DataFrame:
+        """Return the cached cube, or None on a miss."""
+        version = version or get_warehouse_version(db_path)
+        entry = self._entry_path(db_path, version, definition)
+        try:
+            # Touch the entry so eviction treats it as recently used
+            os.utime(entry)
+            return pd.read_pickle(entry)
+        except FileNotFoundError:
+            return None  # Never built, or evicted by another process
+
+    def put(self, db_path: pathlib.Path, definition: dict, cube, version: str = None) -> None:
+        """Store a cube (or a dict of cubes), then drop stale versions and enforce the size budget."""
+        version = version or get_warehouse_version(db_path)
+        entry = self._entry_path(db_path, version, definition)
+        temp = entry.with_suffix(".tmp")
+        pd.to_pickle(cube, temp)
+        os.replace(temp, entry)
+        self.invalidate_stale(db_path, version)
+        self.evict()
+
+    def get_or_build(self, db_path: pathlib.Path, definition: dict, build) -> pd.DataFrame:
+        """
+        Return the cached cube for this warehouse version, building it on a miss.
+
+        Args:
+            db_path (pathlib.Path): Path to the SQLite data warehouse the cube reads.
+            definition (dict): Cube definition: name, dimensions, metrics and filters.
+            build (callable): Zero-argument function that builds the cube
+                (a DataFrame, or a dict of DataFrames for multi-level builds).
+
+        Returns:
+            pd.DataFrame: The cube (or dict of cubes) returned by build.
+        """
+        version = get_warehouse_version(db_path)
+        cube = self.get(db_path, definition, version)
+        if cube is not None:
+            logger.info(f"Cube cache hit for {definition.get('name')} (warehouse {version}).")
+            return cube
+
+        logger.info(f"Cube cache miss for {definition.get('name')} (warehouse {version}); building.")
+        cube = build()
+        self.put(db_path, definition, cube, version)
+        return cube
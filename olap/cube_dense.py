@@ -0,0 +1,205 @@
+"""
+Module 6: Dense OLAP Cube Backend
+File: olap/cube_dense.py
+
+This script stores an OLAP cube as dense NumPy arrays instead of a
+long-format groupby result. It is meant for low-cardinality dimensions
+such as DayOfWeek (7), Month (12), region, category and payment_method,
+where every combination of values fits easily in memory.
+
+How it works:
+
+- Each dimension is encoded to integer codes (sorted, like groupby).
+- The codes are combined into one flat cell number per fact row.
+- Metrics are accumulated into the cells with scatter-add kernels
+  (np.bincount for sums and counts, np.minimum.at / np.maximum.at for min and max).
+- A roll-up is an axis reduction over the dimensions that are dropped.
+
+Means are never stored; they are derived from the sum and count arrays,
+so they stay correct after any roll-up. A min or max over a cell whose
+metric values are all missing is NaN, like in the groupby.
+
+The cells, counts, min and max match create_olap_cube(). Sums (and the
+means derived from them) do not always match to the last bit: np.bincount
+adds the values in plain row order, while pandas uses compensated
+summation, so the two can differ in the last floating-point digit.
+
+The long-format output of to_frame() uses the same column names as
+create_olap_cube(), e.g.:
+DayOfWeek,payment_method,sale_amount_usd_sum,sale_amount_usd_mean,sale_id_count
+Friday,Cash,312.80,156.40,2
+etc.
+"""
+
+import pathlib
+import sys
+
+import numpy as np
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+
+# Aggregations the dense backend can compute
+DENSE_AGGREGATIONS: tuple = ("sum", "mean", "count", "min", "max")
+
+
+def _as_list(agg_funcs) -> list:
+    """Return the aggregation functions for one metric as a list."""
+    return agg_funcs if isinstance(agg_funcs, list) else [agg_funcs]
+
+
+class DenseCube:
+    """A cube held as one dense ndarray per metric, with one axis per dimension."""
+
+    def __init__(self, dimensions: list, levels: dict, metrics: dict, arrays: dict):
+        """
+        Args:
+            dimensions (list): Dimension names, one per array axis.
+            levels (dict): Sorted distinct values of each dimension (axis labels).
+            metrics (dict): Metrics in create_olap_cube() form, e.g. {"sale_amount_usd": ["sum", "mean"]}.
+            arrays (dict): Accumulators keyed by (column, "sum" | "count" | "min" | "max"),
+                plus the "rows" key holding the number of fact rows per cell.
+        """
+        self.dimensions = list(dimensions)
+        self.levels = levels
+        self.metrics = metrics
+        self.arrays = arrays
+
+    @property
+    def shape(self) -> tuple:
+        """Number of values along each dimension."""
+        return tuple(len(self.levels[dim]) for dim in self.dimensions)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the metric arrays."""
+        return sum(array.nbytes for array in self.arrays.values())
+
+    @classmethod
+    def build(cls, sales_df: pd.DataFrame, dimensions: list, metrics: dict) -> "DenseCube":
+        """
+        Build a dense cube from fact rows.
+
+        Args:
+            sales_df (pd.DataFrame): The sales data.
+            dimensions (list): List of column names to group by.
+            metrics (dict): Dictionary of aggregation functions for metrics.
+
+        Returns:
+            DenseCube: The dense cube.
+        """
+        try:
+            for column, agg_funcs in metrics.items():
+                unsupported = [f for f in _as_list(agg_funcs) if f not in DENSE_AGGREGATIONS]
+                if unsupported:
+                    raise ValueError(f"Dense cubes do not support {unsupported} for {column}")
+
+            # Encode each dimension and fold the codes into one flat cell number
+            levels = {}
+            flat = np.zeros(len(sales_df), dtype=np.int64)
+            valid = np.ones(len(sales_df), dtype=bool)
+            for dim in dimensions:
+                codes, uniques = pd.factorize(sales_df[dim], sort=True)
+                levels[dim] = pd.Index(uniques, name=dim)
+                valid &= codes >= 0
+                flat = flat * len(uniques) + codes
+            flat = flat[valid]
+            shape = tuple(len(levels[dim]) for dim in dimensions)
+            size = int(np.prod(shape, dtype=np.int64))
+
+            # Scatter-add every needed accumulator into the flat cells
+            arrays = {"rows": np.bincount(flat, minlength=size).reshape(shape)}
+            for column, agg_funcs in metrics.items():
+                funcs = _as_list(agg_funcs)
+                values = sales_df[column].to_numpy()[valid]
+                present = ~pd.isna(values)
+                cells = flat[present]
+                if any(f in ("sum", "mean") for f in funcs):
+                    weights = values[present].astype("float64")
+                    arrays[(column, "sum")] = np.bincount(cells, weights=weights, minlength=size).reshape(shape)
+                # min and max need the count too, to mark cells with no values as NaN
+                if any(f in ("count", "mean", "min", "max") for f in funcs):
+                    arrays[(column, "count")] = np.bincount(cells, minlength=size).reshape(shape)
+                if "min" in funcs:
+                    out = np.full(size, np.inf)
+                    np.minimum.at(out, cells, values[present].astype("float64"))
+                    arrays[(column, "min")] = out.reshape(shape)
+                if "max" in funcs:
+                    out = np.full(size, -np.inf)
+                    np.maximum.at(out, cells, values[present].astype("float64"))
+                    arrays[(column, "max")] = out.reshape(shape)
+
+            cube = cls(dimensions, levels, metrics, arrays)
+            logger.info(f"Dense OLAP cube created with dimensions: {dimensions} and shape {shape}")
+            return cube
+        except Exception as e:
+            logger.error(f"Error creating dense OLAP cube: {e}")
+            raise
+
+    def rollup(self, dims: list) -> "DenseCube":
+        """
+        Aggregate away every dimension that is not in dims.
+
+        Args:
+            dims (list): Dimensions to keep, in the order they should appear.
+
+        Returns:
+            DenseCube: The rolled-up cube.
+        """
+        unknown = [dim for dim in dims if dim not in self.dimensions]
+        if unknown:
+            raise KeyError(f"Unknown cube dimensions: {unknown}")
+
+        axes = tuple(i for i, dim in enumerate(self.dimensions) if dim not in dims)
+        kept = [dim for dim in self.dimensions if dim in dims]
+        order = [kept.index(dim) for dim in dims]
+
+        arrays = {}
+        for key, array in self.arrays.items():
+            kind = key if key == "rows" else key[1]
+            if kind == "min":
+                reduced = array.min(axis=axes)
+            elif kind == "max":
+                reduced = array.max(axis=axes)
+            else:
+                reduced = array.sum(axis=axes)
+            arrays[key] = np.transpose(reduced, order)
+
+        levels = {dim: self.levels[dim] for dim in dims}
+        return DenseCube(dims, levels, self.metrics, arrays)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Convert the non-empty cells to the long format written by create_olap_cube().
+
+        Returns:
+            pd.DataFrame: One row per non-empty cell, sorted like groupby().
+        """
+        cells = np.flatnonzero(self.arrays["rows"].ravel())
+        coords = np.unravel_index(cells, self.shape) if self.dimensions else ()
+
+        data = {}
+        for dim, codes in zip(self.dimensions, coords):
+            data[dim] = self.levels[dim].take(codes)
+        for column, agg_funcs in self.metrics.items():
+            for func in _as_list(agg_funcs):
+                if func == "mean":
+                    with np.errstate(divide="ignore", invalid="ignore"):
+                        values = (
+                            self.arrays[(column, "sum")].ravel()[cells]
+                            / self.arrays[(column, "count")].ravel()[cells]
+                        )
+                elif func in ("min", "max"):
+                    # Cells without any present value still hold the +inf/-inf start value
+                    present = self.arrays[(column, "count")].ravel()[cells] > 0
+                    values = np.where(present, self.arrays[(column, func)].ravel()[cells], np.nan)
+                else:
+                    values = self.arrays[(column, func)].ravel()[cells]
+                data[f"{column}_{func}".rstrip("_")] = values
+
+        return pd.DataFrame(data)
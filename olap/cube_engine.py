@@ -0,0 +1,531 @@
+"""
+Module 6: OLAP Cube Engine
+File: olap/cube_engine.py
+
+This script decides how each cuboid (one combination of dimensions) is built.
+
+- Sparse backend: the long-format pandas groupby in create_olap_cube().
+  Good for high-cardinality dimensions such as customer_id, where most
+  combinations of values never occur.
+- Dense backend: DenseCube in cube_dense.py.
+  Good for low-cardinality dimensions such as DayOfWeek, Month, region,
+  category and payment_method, where the full grid of combinations is small.
+- SQL backend: create_olap_cube_sql() in cube_sql.py.
+  Runs the GROUP BY inside the SQLite data warehouse, so the fact rows are
+  never read into pandas. Used when the facts are not loaded in memory.
+
+The engine estimates the number of cells in the full grid (the product of
+the dimension cardinalities) and picks the dense backend when that grid
+fits under DENSE_CELL_LIMIT and is not mostly empty compared to the
+number of fact rows.
+
+Every backend returns the same columns, including the sale_ids
+traceability column, so every standard cube is built through build_cuboid().
+The cells and counts are the same too. Sketch metrics ("hll" distinct
+counts and "kll" quantiles from cube_sketches.py) are built by the sparse
+backend only, so the automatic choice never picks the dense backend for them. The dense and SQL backends do not
+use pandas' compensated summation, so their sums and means can differ from
+the sparse backend in the last floating-point digit.
+
+Standard cube build (build_cube):
+
+The standard cubing scripts (olap_cubing.py, olap_cubing_month.py and
+olap_cubing_region.py) differ only in their cube definition and fact query.
+They all build their cube with build_cube() below, which adds the time-based
+dimensions and applies one shared set of build settings, CUBE_BUILD_SETTINGS
+(backend, worker processes, iceberg threshold, memory budget and whether to
+materialize the cube in the data warehouse). With a memory budget, build_cube()
+streams the fact rows and writes the cube straight to its CSV file with
+create_olap_cube_external() from cube_external.py.
+
+Parallel build (create_olap_cube_parallel):
+
+- Map: the fact table is split into partitions, either by a hash of the
+  dimension key (partition_by="key") or by sale_date range (partition_by="date"),
+  and each partition is aggregated in a process pool.
+- Reduce: the partial cubes are merged with an associative combine step
+  (sums and counts add, min/max reduce, sale_ids lists concatenate,
+  HLL/KLL sketches merge, means are recomputed from sum and count).
+
+With partition_by="key" every cell is computed entirely inside one partition,
+from the same rows in the same order as the serial path, so the output is
+byte-identical to create_olap_cube(). Date-range partitions can split a cell
+across partitions; their merged sums can then differ from the serial sums in
+the last floating-point digit, and their merged KLL sketches from the serial
+sketches (within the same rank error; HLL merges are exact).
+"""
+
+import functools
+import itertools
+import json
+import os
+import pathlib
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+from utils.instrumentation import instrument  # noqa: E402
+from olap.cube_dense import DenseCube, DENSE_AGGREGATIONS  # noqa: E402
+from olap.cube_iceberg import create_iceberg_cube  # noqa: E402
+from olap.cube_external import create_olap_cube_external  # noqa: E402
+from olap.cube_sql import POPULATION_JOINS, create_olap_cube_sql  # noqa: E402
+from olap.cube_sketches import create_sketch_cube, merge_sketches, split_sketch_metrics  # noqa: E402
+
+# Largest full grid (product of cardinalities) that is stored densely
+DENSE_CELL_LIMIT: int = 1_000_000
+
+# Grids up to this size are always dense; larger ones need enough fact rows to fill them
+DENSE_SMALL_GRID: int = 4096
+DENSE_CELLS_PER_FACT_ROW: int = 4
+
+# Backends understood by build_cuboid()
+CUBE_BACKENDS: tuple = ("auto", "dense", "sparse", "sql")
+
+# Ways to split the fact table for a parallel build
+PARTITION_SCHEMES: tuple = ("key", "date")
+
+# Aggregations that can be merged across date-range partitions (sketches merge too)
+COMBINABLE_AGGREGATIONS: tuple = ("sum", "mean", "count", "min", "max", "hll", "kll")
+
+# How merge_accumulators() combines each kind of accumulator column
+ACCUMULATOR_MERGES: dict = {
+    "sum": "sum",
+    "count": "sum",
+    "min": "min",
+    "max": "max",
+    "hll": merge_sketches,
+    "kll": merge_sketches,
+}
+
+# How build_cube() builds the standard cubes (one copy, shared by the cubing scripts)
+CUBE_BUILD_SETTINGS: dict = {
+    # Cube backend (see CUBE_BACKENDS): "auto" picks dense NumPy arrays for small
+    # grids of low-cardinality dimensions and the pandas groupby otherwise;
+    # "sql" aggregates inside the data warehouse without reading the facts into pandas
+    "backend": "auto",
+    # Worker processes for sparse cuboids (None builds them serially). When set,
+    # the facts are hash-partitioned by cell and aggregated in a process pool by
+    # create_olap_cube_parallel(); the cube is byte-identical to the serial build.
+    "workers": None,
+    # Iceberg threshold: keep only cells with at least this many sales (None keeps every cell).
+    # Pruned sales are collected in one "Other" row so cube totals are preserved.
+    "min_sale_count": None,
+    # Memory budget in bytes for a spill-to-disk build (None builds the cube in memory).
+    # When set, fact rows are streamed from the data warehouse and the cube is
+    # written straight to its CSV file by cube_external.py.
+    "memory_budget_bytes": None,
+    # Also store the cube as an indexed table (cube_<dimensions>) in the data warehouse
+    "materialize_in_dw": False,
+}
+
+
+def estimate_cuboid_cells(sales_df: pd.DataFrame, dimensions: list) -> int:
+    """Return the number of cells in the full grid of the given dimensions."""
+    cardinalities = [sales_df[dim].nunique() for dim in dimensions]
+    return int(np.prod(cardinalities, dtype=np.int64))
+
+
+def choose_cube_backend(
+    sales_df: pd.DataFrame,
+    dimensions: list,
+    metrics: dict,
+    max_dense_cells: int = DENSE_CELL_LIMIT,
+) -> str:
+    """
+    Choose "dense", "sparse" or "sql" for one cuboid.
+
+    Args:
+        sales_df (pd.DataFrame): The sales data, or None when the facts are
+            still in the data warehouse.
+        dimensions (list): List of column names to group by.
+        metrics (dict): Dictionary of aggregation functions for metrics.
+        max_dense_cells (int): Largest grid that is stored densely.
+
+    Returns:
+        str: "dense", "sparse" or "sql".
+    """
+    if sales_df is None:
+        return "sql"
+    for agg_funcs in metrics.values():
+        funcs = agg_funcs if isinstance(agg_funcs, list) else [agg_funcs]
+        if any(func not in DENSE_AGGREGATIONS for func in funcs):
+            return "sparse"
+    cells = estimate_cuboid_cells(sales_df, dimensions)
+    if cells > max_dense_cells:
+        return "sparse"
+    if cells > max(DENSE_SMALL_GRID, DENSE_CELLS_PER_FACT_ROW * len(sales_df)):
+        return "sparse"
+    return "dense"
+
+
+def cell_sale_ids(sales_df: pd.DataFrame, dimensions: list) -> list:
+    """
+    Return the sale_id list of every non-empty cell, in groupby order.
+
+    The rows are sorted by cell number with a stable sort, so each list keeps
+    the original row order, like grouped["sale_id"].apply(list).
+    """
+    flat = np.zeros(len(sales_df), dtype=np.int64)
+    valid = np.ones(len(sales_df), dtype=bool)
+    for dim in dimensions:
+        codes, uniques = pd.factorize(sales_df[dim], sort=True)
+        valid &= codes >= 0
+        flat = flat * len(uniques) + codes
+    flat = flat[valid]
+    sale_ids = sales_df["sale_id"].to_numpy()[valid]
+    order = np.argsort(flat, kind="stable")
+    starts = np.flatnonzero(np.diff(flat[order], prepend=-1))
+    return [ids.tolist() for ids in np.split(sale_ids[order], starts[1:])] if len(flat) else []
+
+
+def build_cuboid(
+    sales_df: pd.DataFrame,
+    dimensions: list,
+    metrics: dict,
+    backend: str = "auto",
+    sparse_builder=None,
+    db_path: pathlib.Path = None,
+    joins: list = None,
+) -> pd.DataFrame:
+    """
+    Build one cuboid with the dense, sparse or SQL backend.
+
+    Args:
+        sales_df (pd.DataFrame): The sales data (None to aggregate in the data warehouse).
+        dimensions (list): List of column names to group by.
+        metrics (dict): Dictionary of aggregation functions for metrics.
+        backend (str): "auto", "dense", "sparse" or "sql".
+        sparse_builder (callable): Function that builds a sparse cuboid.
+            Defaults to create_olap_cube() from olap_cubing.py.
+        db_path (pathlib.Path): Data warehouse for the SQL backend
+            (defaults to DB_PATH in cube_sql.py).
+        joins (list): Dimension tables the SQL backend inner-joins to the
+            sale table (see POPULATION_JOINS in cube_sql.py).
+
+    Returns:
+        pd.DataFrame: The cuboid in long format, with the sale_ids column.
+    """
+    if backend not in CUBE_BACKENDS:
+        raise ValueError(f"Unknown cube backend {backend!r}; expected one of {CUBE_BACKENDS}")
+    if backend == "auto":
+        backend = choose_cube_backend(sales_df, dimensions, metrics)
+    logger.info(f"Building cuboid {dimensions} with the {backend} backend.")
+
+    if backend == "sql":
+        sql_options = {"db_path": db_path} if db_path is not None else {}
+        cube = create_olap_cube_sql(dimensions, metrics, joins=joins, **sql_options)
+        # SQLite returns sale_ids as text; the other backends hold lists
+        cube["sale_ids"] = cube["sale_ids"].map(json.loads)
+        return cube
+    if backend == "dense":
+        cube = DenseCube.build(sales_df, dimensions, metrics).to_frame()
+        cube["sale_ids"] = cell_sale_ids(sales_df, dimensions)
+        return cube
+    if sparse_builder is None:
+        # Imported here because olap_cubing.py imports this module for its own builds
+        from olap.olap_cubing import create_olap_cube as sparse_builder
+    return sparse_builder(sales_df, dimensions, metrics)
+
+
+def partition_fact_rows(
+    sales_df: pd.DataFrame,
+    dimensions: list,
+    n_partitions: int,
+    partition_by: str = "key",
+    date_column: str = "sale_date",
+) -> list:
+    """
+    Split the fact table into partitions, keeping the original row order inside each one.
+
+    Args:
+        sales_df (pd.DataFrame): The sales data.
+        dimensions (list): Dimension columns (hashed when partition_by is "key").
+        n_partitions (int): Number of partitions to produce.
+        partition_by (str): "key" (hash of the dimension values) or "date" (sale_date ranges).
+        date_column (str): Date column used when partition_by is "date".
+
+    Returns:
+        list: Non-empty DataFrame partitions.
+    """
+    if partition_by not in PARTITION_SCHEMES:
+        raise ValueError(f"Unknown partition scheme {partition_by!r}; expected one of {PARTITION_SCHEMES}")
+    if sales_df.empty:
+        return []
+
+    if partition_by == "key":
+        hashes = pd.util.hash_pandas_object(sales_df[dimensions], index=False).to_numpy()
+        part = (hashes % np.uint64(n_partitions)).astype(np.int64)
+    else:
+        dates = pd.to_datetime(sales_df[date_column]).to_numpy()
+        bounds = np.quantile(dates.astype("int64"), np.linspace(0, 1, n_partitions + 1)[1:-1])
+        part = np.searchsorted(bounds, dates.astype("int64"), side="right")
+
+    # A stable sort keeps each partition's rows in their original order
+    order = np.argsort(part, kind="stable")
+    edges = np.searchsorted(part[order], np.arange(n_partitions + 1))
+    return [
+        sales_df.iloc[order[edges[i]:edges[i + 1]]]
+        for i in range(n_partitions)
+        if edges[i + 1] > edges[i]
+    ]
+
+
+def _partial_key_cube(args: tuple) -> pd.DataFrame:
+    """Map step for key partitions: each partition holds whole cells."""
+    from olap.olap_cubing import create_olap_cube
+
+    partition, dimensions, metrics = args
+    return create_olap_cube(partition, dimensions, metrics)
+
+
+def compute_accumulators(sales_df: pd.DataFrame, dimensions: list, metrics: dict) -> pd.DataFrame:
+    """
+    Aggregate fact rows into mergeable accumulators instead of final metrics.
+
+    Each metric becomes "<column>__sum", "<column>__count", "<column>__min" or
+    "<column>__max" columns (a mean needs both sum and count), plus the sale_ids
+    list. Sketch metrics become "<column>__hll" or "<column>__kll" columns of
+    sketch objects. Accumulators can be merged again with merge_accumulators()
+    and turned into cube metrics with finalize_accumulators().
+
+    Args:
+        sales_df (pd.DataFrame): The sales data.
+        dimensions (list): List of column names to group by.
+        metrics (dict): Dictionary of aggregation functions for metrics.
+
+    Returns:
+        pd.DataFrame: One row per cell with the dimension and accumulator columns.
+    """
+    plain_metrics, sketch_metrics = split_sketch_metrics(metrics)
+    grouped = sales_df.groupby(dimensions)
+    accumulators = {}
+    for column, agg_funcs in plain_metrics.items():
+        funcs = agg_funcs if isinstance(agg_funcs, list) else [agg_funcs]
+        needed = set()
+        for func in funcs:
+            needed.update(("sum", "count") if func == "mean" else (func,))
+        accumulators[column] = sorted(needed)
+    partial = grouped.agg(accumulators) if accumulators else grouped.size().to_frame()[[]]
+    partial.columns = [f"{column}__{func}" for column, func in partial.columns]
+    partial["sale_ids"] = grouped["sale_id"].apply(list)
+    if sketch_metrics:
+        # The sketch cube has the same sorted cells as the groupby
+        sketches = create_sketch_cube(sales_df, dimensions, sketch_metrics)
+        for sketch_column in sketches.columns[len(dimensions):]:
+            column, kind = sketch_column.rsplit("_", 1)
+            partial[f"{column}__{kind}"] = sketches[sketch_column].to_numpy()
+    return partial.reset_index()
+
+
+def merge_accumulators(accumulators: pd.DataFrame, dimensions: list) -> pd.DataFrame:
+    """Merge accumulator rows that share the same values of dimensions (sums add, min/max reduce, sketches merge)."""
+    grouped = accumulators.groupby(dimensions)
+    combine = {}
+    for column in accumulators.columns:
+        if "__" in column:
+            combine[column] = ACCUMULATOR_MERGES[column.rsplit("__", 1)[1]]
+    merged = grouped.agg(combine)
+    merged["sale_ids"] = grouped["sale_ids"].agg(lambda lists: list(itertools.chain.from_iterable(lists)))
+    return merged.reset_index()
+
+
+def finalize_accumulators(accumulators: pd.DataFrame, dimensions: list, metrics: dict) -> pd.DataFrame:
+    """Turn accumulator columns into the metric columns written by create_olap_cube()."""
+    from olap.olap_cubing import generate_column_names
+
+    cube = accumulators[dimensions].copy()
+    for column, agg_funcs in metrics.items():
+        funcs = agg_funcs if isinstance(agg_funcs, list) else [agg_funcs]
+        for func in funcs:
+            if func == "mean":
+                values = accumulators[f"{column}__sum"] / accumulators[f"{column}__count"]
+            else:
+                values = accumulators[f"{column}__{func}"]
+            cube[f"{column}_{func}"] = values
+    cube["sale_ids"] = accumulators["sale_ids"]
+    cube.columns = generate_column_names(dimensions, metrics) + ["sale_ids"]
+    return cube
+
+
+def _partial_date_cube(args: tuple) -> pd.DataFrame:
+    """Map step for date partitions: compute mergeable sum/count/min/max accumulators."""
+    partition, dimensions, metrics = args
+    return compute_accumulators(partition, dimensions, metrics)
+
+
+def combine_partial_cubes(partials: list, dimensions: list, metrics: dict) -> pd.DataFrame:
+    """
+    Reduce step: merge partial cubes from date-range partitions into one cube.
+
+    Args:
+        partials (list): Outputs of the map step, in partition order.
+        dimensions (list): List of column names to group by.
+        metrics (dict): Dictionary of aggregation functions for metrics.
+
+    Returns:
+        pd.DataFrame: The merged cube, with the same columns as create_olap_cube().
+    """
+    merged = merge_accumulators(pd.concat(partials, ignore_index=True), dimensions)
+    return finalize_accumulators(merged, dimensions, metrics)
+
+
+def create_olap_cube_parallel(
+    sales_df: pd.DataFrame,
+    dimensions: list,
+    metrics: dict,
+    max_workers: int = None,
+    n_partitions: int = None,
+    partition_by: str = "key",
+) -> pd.DataFrame:
+    """
+    Build the same cube as create_olap_cube(), aggregating partitions in a process pool.
+
+    Args:
+        sales_df (pd.DataFrame): The sales data.
+        dimensions (list): List of column names to group by.
+        metrics (dict): Dictionary of aggregation functions for metrics.
+        max_workers (int): Worker processes. Defaults to the number of CPU cores.
+        n_partitions (int): Partitions to split the facts into. Defaults to max_workers.
+        partition_by (str): "key" (byte-identical to the serial path) or "date".
+
+    Returns:
+        pd.DataFrame: The multidimensional OLAP cube.
+    """
+    try:
+        max_workers = max_workers or os.cpu_count() or 1
+        n_partitions = n_partitions or max_workers
+
+        if partition_by == "date":
+            for column, agg_funcs in metrics.items():
+                funcs = agg_funcs if isinstance(agg_funcs, list) else [agg_funcs]
+                unsupported = [f for f in funcs if f not in COMBINABLE_AGGREGATIONS]
+                if unsupported:
+                    raise ValueError(f"Cannot merge {unsupported} for {column} across date partitions")
+
+        partitions = partition_fact_rows(sales_df, dimensions, n_partitions, partition_by)
+        map_step = _partial_key_cube if partition_by == "key" else _partial_date_cube
+        tasks = [(partition, dimensions, metrics) for partition in partitions]
+
+        if max_workers == 1 or len(tasks) <= 1:
+            partials = [map_step(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=min(max_workers, len(tasks))) as executor:
+                partials = list(executor.map(map_step, tasks))
+
+        if not partials:
+            # No fact rows: the serial path gives the empty cube with the right columns
+            cube = _partial_key_cube((sales_df, dimensions, metrics))
+        elif partition_by == "key":
+            # Cells never span key partitions, so merging is a sorted concatenation
+            cube = pd.concat(partials, ignore_index=True)
+            cube = cube.sort_values(list(cube.columns[: len(dimensions)]), kind="mergesort")
+            cube = cube.reset_index(drop=True)
+        else:
+            cube = combine_partial_cubes(partials, dimensions, metrics)
+
+        logger.info(
+            f"OLAP cube created in parallel with dimensions: {dimensions} "
+            f"({len(partitions)} {partition_by} partitions, {max_workers} workers)"
+        )
+        return cube
+    except Exception as e:
+        logger.error(f"Error creating OLAP cube in parallel: {e}")
+        raise
+
+
+def add_time_dimensions(sales_df: pd.DataFrame) -> pd.DataFrame:
+    """Add additional columns for time-based dimensions."""
+    sales_df["sale_date"] = pd.to_datetime(sales_df["sale_date"])
+    sales_df["DayOfWeek"] = sales_df["sale_date"].dt.day_name()
+    sales_df["Month"] = sales_df["sale_date"].dt.month
+    sales_df["Year"] = sales_df["sale_date"].dt.year
+    return sales_df
+
+
+@instrument
+def build_cube(
+    dimensions: list,
+    metrics: dict,
+    sales_df: pd.DataFrame = None,
+    ingest=None,
+    settings: dict = None,
+    fact_chunks=None,
+    output_path: pathlib.Path = None,
+    db_path: pathlib.Path = None,
+    population: str = "sale",
+) -> pd.DataFrame:
+    """
+    Ingest sales data (unless given), add time-based dimensions, and create the OLAP cube.
+
+    When the settings have a memory budget and fact_chunks and output_path are
+    given (and sales_df is not), the fact rows are streamed from fact_chunks()
+    and the cube is written straight to output_path without being held in
+    memory. With the "sql" backend and no sales_df, the cube is aggregated
+    inside the data warehouse at db_path from the given fact population, and
+    no facts are read into pandas (sales_df that is already loaded is built
+    with the "auto" choice instead). The iceberg threshold does not apply to
+    either build.
+
+    Args:
+        dimensions (list): List of column names to group by.
+        metrics (dict): Dictionary of aggregation functions for metrics.
+        sales_df (pd.DataFrame): The sales data. Read with ingest() when None.
+        ingest (callable): Function that reads the sales data from the data warehouse.
+        settings (dict): Build settings. Defaults to CUBE_BUILD_SETTINGS.
+        fact_chunks (callable): Function that returns an iterator of sales data
+            chunks, e.g. from iter_fact_chunks() in cube_external.py.
+        output_path (pathlib.Path): CSV file for a build under a memory budget.
+        db_path (pathlib.Path): Data warehouse for the "sql" backend.
+        population (str): Fact population for the "sql" backend (see POPULATION_JOINS in cube_sql.py).
+
+    Returns:
+        pd.DataFrame: The multidimensional OLAP cube, or None when it was written to output_path.
+    """
+    settings = CUBE_BUILD_SETTINGS if settings is None else settings
+
+    # With a memory budget, stream the facts and write the cube without holding it in memory
+    if settings["memory_budget_bytes"] and sales_df is None and fact_chunks is not None and output_path is not None:
+        if settings["min_sale_count"]:
+            logger.warning("The iceberg threshold is not applied to a cube built under a memory budget.")
+        create_olap_cube_external(
+            (add_time_dimensions(chunk) for chunk in fact_chunks()),
+            dimensions, metrics, output_path,
+            memory_budget=settings["memory_budget_bytes"],
+        )
+        return None
+
+    # Aggregate inside the data warehouse without reading the facts into pandas
+    backend = settings["backend"]
+    if backend == "sql" and sales_df is None:
+        if settings["min_sale_count"]:
+            logger.warning("The iceberg threshold is not applied to a cube built with the sql backend.")
+        return build_cuboid(None, dimensions, metrics, backend="sql", db_path=db_path, joins=POPULATION_JOINS[population])
+    if backend == "sql":
+        backend = "auto"
+
+    # Ingest sales data
+    if sales_df is None:
+        sales_df = ingest()
+
+    # Add additional columns for time-based dimensions
+    sales_df = add_time_dimensions(sales_df)
+
+    # Create the cube with the chosen backend (an iceberg cube when a minimum sale count is set)
+    sparse_builder = None
+    if settings["workers"]:
+        sparse_builder = functools.partial(create_olap_cube_parallel, max_workers=settings["workers"])
+    cube_builder = functools.partial(build_cuboid, backend=backend, sparse_builder=sparse_builder)
+    if settings["min_sale_count"]:
+        return create_iceberg_cube(
+            sales_df, dimensions, metrics,
+            min_count=settings["min_sale_count"], other_bucket=True, cube_builder=cube_builder,
+        )
+    return cube_builder(sales_df, dimensions, metrics)
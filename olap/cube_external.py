@@ -0,0 +1,269 @@
+"""
+Module 6: External (Spill-to-Disk) OLAP Cube Build
+File: olap/cube_external.py
+
+create_olap_cube() needs the whole fact table and the whole table of groups
+in memory at once. For a high-cardinality cube such as
+DayOfWeek x product_id x customer_id at production volume, that may not fit.
+This script builds the same cube in bounded memory:
+
+1. Stream: fact rows are read from the data warehouse in chunks
+   (iter_fact_chunks), never as one DataFrame.
+2. Spill: chunks are buffered until the memory budget is exceeded. The
+   buffer is then hash-partitioned on the dimension key into on-disk runs,
+   so all rows of one cell land in the same partition.
+3. Aggregate: each partition is aggregated on its own. A partition that is
+   still larger than the budget is partitioned again with a different hash
+   (up to SPILL_MAX_DEPTH levels), so skewed keys do not break the bound.
+4. Merge: every aggregated partition is stored as a sorted run, and the runs
+   are merged in dimension order and streamed to the output CSV in batches.
+   The merge reads one batch from each run it merges, so it never merges
+   more than MERGE_FAN_IN runs at once: when there are more runs, groups of
+   MERGE_FAN_IN runs are first merged into longer runs on disk (several
+   passes if needed), and memory stays bounded however many runs there are.
+
+Rows keep their original order inside each partition, so every cell is
+computed from the same rows in the same order as create_olap_cube(), and the
+output file is byte-identical to writing that cube with to_csv().
+When the facts fit in the budget nothing is spilled.
+"""
+
+import heapq
+import os
+import pathlib
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+from olap.cube_sketches import serialize_sketch_cube  # noqa: E402
+
+# Default memory budget for buffered fact rows, in bytes
+SPILL_MEMORY_BUDGET: int = 256 * 1024 * 1024
+
+# Number of hash partitions created each time the buffer spills
+SPILL_PARTITIONS: int = 16
+
+# Re-partitioning levels before an oversized partition is aggregated anyway
+SPILL_MAX_DEPTH: int = 4
+
+# Fact rows read from the data warehouse per chunk
+FACT_CHUNK_ROWS: int = 50_000
+
+# Cube rows per sorted-run file and per write to the output CSV
+MERGE_BATCH_ROWS: int = 10_000
+
+# Largest number of sorted runs merged at once (one batch of each is in memory)
+MERGE_FAN_IN: int = 16
+
+
+def iter_fact_chunks(db_path: pathlib.Path, query: str, chunk_rows: int = FACT_CHUNK_ROWS, prepare=None):
+    """
+    Yield the result of a data warehouse query as DataFrame chunks.
+
+    Args:
+        db_path (pathlib.Path): Path to the SQLite data warehouse.
+        query (str): SQL query that returns the fact rows.
+        chunk_rows (int): Rows per chunk.
+        prepare (callable): Optional function applied to each chunk
+            (e.g. to add DayOfWeek and other time-based dimensions).
+
+    Yields:
+        pd.DataFrame: One chunk of fact rows.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        for chunk in pd.read_sql_query(query, conn, chunksize=chunk_rows):
+            yield prepare(chunk) if prepare else chunk
+    finally:
+        conn.close()
+
+
+def _partition_ids(frame: pd.DataFrame, dimensions: list, n_partitions: int, depth: int):
+    """Return the partition of every row, hashing the dimension key with a per-level salt."""
+    hashes = pd.util.hash_pandas_object(frame[dimensions], index=False, hash_key=f"olapspilllevel{depth:02d}")
+    return (hashes % n_partitions).to_numpy()
+
+
+def _spill(frame: pd.DataFrame, dimensions: list, n_partitions: int, depth: int, work_dir: pathlib.Path, run: int) -> None:
+    """Append the buffered rows to the on-disk runs of their hash partitions."""
+    partition = _partition_ids(frame, dimensions, n_partitions, depth)
+    for part, rows in frame.groupby(partition, sort=False):
+        part_dir = work_dir.joinpath(f"part-{part:03d}")
+        part_dir.mkdir(exist_ok=True)
+        rows.to_pickle(part_dir.joinpath(f"run-{run:05d}.pkl"))
+
+
+def _read_runs(part_dir: pathlib.Path):
+    """Yield the spilled runs of one partition in the order they were written."""
+    for run_path in sorted(part_dir.glob("run-*.pkl")):
+        yield pd.read_pickle(run_path)
+
+
+def _write_sorted_run(cube: pd.DataFrame, runs_dir: pathlib.Path) -> pathlib.Path:
+    """Store one aggregated (and therefore sorted) cube as a run of batch files."""
+    run_dir = pathlib.Path(tempfile.mkdtemp(prefix="sorted-", dir=runs_dir))
+    for start in range(0, len(cube), MERGE_BATCH_ROWS):
+        cube.iloc[start : start + MERGE_BATCH_ROWS].to_pickle(run_dir.joinpath(f"batch-{start // MERGE_BATCH_ROWS:06d}.pkl"))
+    return run_dir
+
+
+def _iter_sorted_run(run_dir: pathlib.Path):
+    """Yield the rows of one sorted run as tuples, one batch in memory at a time."""
+    for batch_path in sorted(run_dir.glob("batch-*.pkl")):
+        yield from pd.read_pickle(batch_path).itertuples(index=False, name=None)
+
+
+def _merge_sorted_runs(run_dirs: list, dimensions: list):
+    """Yield the rows of several sorted runs as tuples, merged in dimension order."""
+    return heapq.merge(
+        *(_iter_sorted_run(run_dir) for run_dir in run_dirs),
+        key=lambda row: row[: len(dimensions)],
+    )
+
+
+def _reduce_sorted_runs(sorted_runs: list, dimensions: list, columns: list, runs_dir: pathlib.Path, fan_in: int) -> list:
+    """Merge groups of fan_in runs into longer runs on disk until at most fan_in runs are left."""
+    passes = 0
+    while len(sorted_runs) > fan_in:
+        merged_runs = []
+        for start in range(0, len(sorted_runs), fan_in):
+            group = sorted_runs[start : start + fan_in]
+            if len(group) == 1:
+                merged_runs += group
+                continue
+            run_dir = pathlib.Path(tempfile.mkdtemp(prefix="merged-", dir=runs_dir))
+            batch, batches = [], 0
+            for row in _merge_sorted_runs(group, dimensions):
+                batch.append(row)
+                if len(batch) == MERGE_BATCH_ROWS:
+                    pd.DataFrame(batch, columns=columns).to_pickle(run_dir.joinpath(f"batch-{batches:06d}.pkl"))
+                    batch, batches = [], batches + 1
+            if batch:
+                pd.DataFrame(batch, columns=columns).to_pickle(run_dir.joinpath(f"batch-{batches:06d}.pkl"))
+            for merged in group:
+                shutil.rmtree(merged)
+            merged_runs.append(run_dir)
+        sorted_runs = merged_runs
+        passes += 1
+    if passes:
+        logger.info(f"Merged sorted runs down to {len(sorted_runs)} in {passes} intermediate passes.")
+    return sorted_runs
+
+
+def _aggregate_stream(chunks, dimensions: list, metrics: dict, memory_budget: int, n_partitions: int,
+                      work_dir: pathlib.Path, runs_dir: pathlib.Path, depth: int, cube_builder) -> list:
+    """Aggregate a stream of fact chunks, spilling to hash partitions when over budget."""
+    buffer, buffered_bytes, spilled_runs = [], 0, 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered_bytes += int(chunk.memory_usage(deep=True).sum())
+        if buffered_bytes > memory_budget and depth < SPILL_MAX_DEPTH:
+            _spill(pd.concat(buffer, ignore_index=True), dimensions, n_partitions, depth, work_dir, spilled_runs)
+            buffer, buffered_bytes, spilled_runs = [], 0, spilled_runs + 1
+
+    if not spilled_runs:
+        # Everything fits in memory (or re-partitioning is exhausted): aggregate directly
+        if depth >= SPILL_MAX_DEPTH and buffered_bytes > memory_budget:
+            logger.warning(f"Spill partition still holds {buffered_bytes} bytes after {depth} levels; aggregating anyway.")
+        if not buffer:
+            return []
+        cube = cube_builder(pd.concat(buffer, ignore_index=True), dimensions, metrics)
+        return [_write_sorted_run(cube, runs_dir)]
+
+    if buffer:
+        _spill(pd.concat(buffer, ignore_index=True), dimensions, n_partitions, depth, work_dir, spilled_runs)
+    buffer = None
+    logger.info(f"Spilled fact rows into {n_partitions} partitions at level {depth}.")
+
+    sorted_runs = []
+    for part_dir in sorted(work_dir.glob("part-*")):
+        sub_dir = part_dir.joinpath("sub")
+        sub_dir.mkdir()
+        sorted_runs += _aggregate_stream(
+            _read_runs(part_dir), dimensions, metrics, memory_budget, n_partitions,
+            sub_dir, runs_dir, depth + 1, cube_builder,
+        )
+        shutil.rmtree(part_dir)
+    return sorted_runs
+
+
+def _append_csv_batch(batch: list, columns: list, output_path: pathlib.Path) -> None:
+    """Append rows of the merged cube to the CSV file, with sketch metrics as base64 text."""
+    serialize_sketch_cube(pd.DataFrame(batch, columns=columns)).to_csv(output_path, mode="a", header=False, index=False)
+
+
+def create_olap_cube_external(
+    fact_chunks,
+    dimensions: list,
+    metrics: dict,
+    output_path: pathlib.Path,
+    memory_budget: int = SPILL_MEMORY_BUDGET,
+    n_partitions: int = SPILL_PARTITIONS,
+    spill_dir: pathlib.Path = None,
+    merge_fan_in: int = MERGE_FAN_IN,
+) -> int:
+    """
+    Build an OLAP cube in bounded memory and stream it to a CSV file.
+
+    Args:
+        fact_chunks (iterable): DataFrame chunks of fact rows, e.g. from iter_fact_chunks().
+        dimensions (list): List of column names to group by.
+        metrics (dict): Dictionary of aggregation functions for metrics.
+        output_path (pathlib.Path): CSV file to write the cube to.
+        memory_budget (int): Bytes of fact rows to buffer before spilling to disk.
+        n_partitions (int): Number of hash partitions per spill level.
+        spill_dir (pathlib.Path): Directory for temporary runs (defaults to the system temp directory).
+        merge_fan_in (int): Largest number of sorted runs merged at once (at least 2).
+
+    Returns:
+        int: Number of cells written.
+    """
+    # Imported here because olap_cubing.py imports this module for its own builds
+    from olap.olap_cubing import create_olap_cube, generate_column_names
+
+    output_path = pathlib.Path(output_path)
+    try:
+        with tempfile.TemporaryDirectory(prefix="olap-spill-", dir=spill_dir) as temp:
+            work_dir = pathlib.Path(temp).joinpath("partitions")
+            runs_dir = pathlib.Path(temp).joinpath("sorted")
+            work_dir.mkdir()
+            runs_dir.mkdir()
+            sorted_runs = _aggregate_stream(
+                iter(fact_chunks), dimensions, metrics, memory_budget, n_partitions,
+                work_dir, runs_dir, 0, create_olap_cube,
+            )
+
+            # Merge the sorted runs in dimension order and stream them to the CSV
+            columns = generate_column_names(dimensions, metrics) + ["sale_ids"]
+            sorted_runs = _reduce_sorted_runs(sorted_runs, dimensions, columns, runs_dir, max(2, merge_fan_in))
+            merged = _merge_sorted_runs(sorted_runs, dimensions)
+            temp_output = output_path.with_suffix(".tmp")
+            pd.DataFrame(columns=columns).to_csv(temp_output, index=False)
+            cells, batch = 0, []
+            for row in merged:
+                batch.append(row)
+                if len(batch) == MERGE_BATCH_ROWS:
+                    _append_csv_batch(batch, columns, temp_output)
+                    cells, batch = cells + len(batch), []
+            if batch:
+                _append_csv_batch(batch, columns, temp_output)
+                cells += len(batch)
+            os.replace(temp_output, output_path)
+
+        logger.info(
+            f"External OLAP cube created with dimensions: {dimensions} "
+            f"({cells} cells from {len(sorted_runs)} sorted runs) and saved to {output_path}."
+        )
+        return cells
+    except Exception as e:
+        logger.error(f"Error creating external OLAP cube: {e}")
+        raise
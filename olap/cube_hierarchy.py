@@ -0,0 +1,175 @@
+"""
+Module 6: Hierarchy Cubes with Sorted Level Indexes
+File: olap/cube_hierarchy.py
+
+A HierarchyCube aggregates facts along one declared hierarchy, e.g.
+
+    category > sub_category > product_id
+    country > region > state > city > postal_code
+
+and keeps every level in memory with precomputed indexes, so an
+interactive dashboard can drill and rank without re-aggregating the facts
+on each click.
+
+Build (one pass over the facts):
+
+- Level columns are dictionary-encoded (pandas categoricals), so repeated
+  strings are stored once and grouping works on small integer codes.
+- The facts are aggregated once at the finest level. Each coarser level is
+  derived from the level just below it (all measures are sums).
+
+Indexes (per level):
+
+- A hash index from a full path, e.g. ("Furniture", "Chairs"), to its row,
+  and from a member value, e.g. "Chairs", to every full path that ends in it.
+- For every measure, an order array that sorts the level by parent, then by
+  the measure descending, plus the start offset of each parent's block.
+  top_n() and bottom_n() inside any parent are then slices of that array.
+- For every measure, an order array over the whole level, for rankings
+  across all parents (parent=None).
+
+Level frames hold the path columns, one "<measure>_sum" column per measure
+and line_count.
+"""
+
+import pathlib
+import sys
+
+import numpy as np
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+
+
+class HierarchyCube:
+    """All levels of one hierarchy, with path lookups and per-parent sorted measure indexes."""
+
+    def __init__(self, hierarchy: list, measures: list, levels: dict):
+        self.hierarchy = list(hierarchy)
+        self.measures = list(measures)
+        self.levels = levels
+        self._paths = {}
+        self._members = {}
+        self._parents = {}
+        self._orders = {}
+        for depth, level in enumerate(self.hierarchy):
+            self._index_level(depth, level)
+
+    @classmethod
+    def build(cls, facts: pd.DataFrame, hierarchy: list, measures: list) -> "HierarchyCube":
+        """
+        Aggregate the facts at every level of the hierarchy in one pass.
+
+        Args:
+            facts (pd.DataFrame): Fact rows with one column per hierarchy level.
+            hierarchy (list): Level columns from coarsest to finest.
+            measures (list): Numeric columns to sum at every level.
+
+        Returns:
+            HierarchyCube: The cube with all levels indexed.
+        """
+        try:
+            # Dictionary-encode the level columns once
+            encoded = facts[hierarchy + measures].astype({level: "category" for level in hierarchy})
+
+            finest = encoded.groupby(hierarchy, observed=True, sort=True)
+            current = finest[measures].sum().add_suffix("_sum")
+            current["line_count"] = finest.size()
+            current = current.reset_index()
+
+            levels = {hierarchy[-1]: current}
+            for depth in range(len(hierarchy) - 2, -1, -1):
+                # Derive each coarser level from the level below it
+                current = current.groupby(hierarchy[: depth + 1], observed=True, sort=True).sum(numeric_only=True).reset_index()
+                levels[hierarchy[depth]] = current
+
+            cube = cls(hierarchy, measures, {level: levels[level] for level in hierarchy})
+            logger.info(
+                "Hierarchy cube created: "
+                + " > ".join(f"{level} ({len(cube.levels[level])})" for level in hierarchy)
+            )
+            return cube
+        except Exception as e:
+            logger.error(f"Error creating hierarchy cube: {e}")
+            raise
+
+    def _index_level(self, depth: int, level: str) -> None:
+        """Build the path lookup and the per-parent sorted orders for one level."""
+        frame = self.levels[level]
+        path_columns = self.hierarchy[: depth + 1]
+        self._paths[level] = {
+            path: position
+            for position, path in enumerate(zip(*(frame[col].tolist() for col in path_columns)))
+        }
+        members = {}
+        for path in self._paths[level]:
+            members.setdefault(path[-1], []).append(path)
+        self._members[level] = members
+
+        parent_columns = self.hierarchy[:depth]
+        if parent_columns:
+            parent_codes, parent_keys = pd.MultiIndex.from_frame(frame[parent_columns]).factorize()
+            parents = {tuple(key): code for code, key in enumerate(parent_keys)}
+        else:
+            parent_codes = np.zeros(len(frame), dtype=np.int64)
+            parents = {(): 0}
+        self._parents[level] = parents
+
+        for measure in self.measure_columns:
+            values = frame[measure].to_numpy(dtype="float64")
+            self._orders[level, measure, None] = np.argsort(-values, kind="stable")
+            # Sort by parent, then by the measure descending (lexsort uses the last key first)
+            order = np.lexsort((-values, parent_codes))
+            bounds = np.searchsorted(parent_codes[order], np.arange(len(parents) + 1))
+            self._orders[level, measure] = (order, bounds)
+
+    @property
+    def measure_columns(self) -> list:
+        """Columns that can be ranked: every <measure>_sum plus line_count."""
+        return [f"{measure}_sum" for measure in self.measures] + ["line_count"]
+
+    def _block(self, level: str, measure: str, parent: tuple = None) -> np.ndarray:
+        """Return the row positions of one parent's children (or the whole level), sorted by measure descending."""
+        if level not in self.levels:
+            raise KeyError(f"Unknown level {level!r}; expected one of {self.hierarchy}")
+        if (level, measure) not in self._orders:
+            raise KeyError(f"Unknown measure {measure!r}; expected one of {self.measure_columns}")
+        if parent is None:
+            return self._orders[level, measure, None]
+        parent = tuple(parent)
+        depth = self.hierarchy.index(level)
+        if len(parent) != depth:
+            raise ValueError(f"Level {level!r} needs a parent path of {depth} values: {self.hierarchy[:depth]}")
+        code = self._parents[level].get(parent)
+        if code is None:
+            return np.array([], dtype=np.int64)
+        order, bounds = self._orders[level, measure]
+        return order[bounds[code] : bounds[code + 1]]
+
+    def lookup(self, *path) -> pd.Series:
+        """Return one cell by its full path, e.g. lookup("Furniture", "Chairs")."""
+        level = self.hierarchy[len(path) - 1]
+        return self.levels[level].iloc[self._paths[level][tuple(path)]]
+
+    def paths(self, level: str, value) -> list:
+        """Return every full path of a level member, e.g. paths("state", "Texas")."""
+        return self._members[level].get(value, [])
+
+    def children(self, *parent, measure: str = None) -> pd.DataFrame:
+        """Drill down: every child of a parent path (all top-level cells for no path)."""
+        level = self.hierarchy[len(parent)]
+        measure = measure or self.measure_columns[0]
+        return self.levels[level].iloc[self._block(level, measure, parent)]
+
+    def top_n(self, level: str, measure: str, n: int = 10, parent: tuple = None) -> pd.DataFrame:
+        """Return the n largest cells of a level inside a parent path (or across the level), by a measure."""
+        return self.levels[level].iloc[self._block(level, measure, parent)[:n]]
+
+    def bottom_n(self, level: str, measure: str, n: int = 10, parent: tuple = None) -> pd.DataFrame:
+        """Return the n smallest cells of a level inside a parent path (or across the level), by a measure."""
+        return self.levels[level].iloc[self._block(level, measure, parent)[::-1][:n]]
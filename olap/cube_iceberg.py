@@ -0,0 +1,149 @@
+"""
+Module 6: Iceberg OLAP Cubes
+File: olap/cube_iceberg.py
+
+The cubes in olap_cubing*.py include customer_id as a dimension, so almost
+every cell holds a single sale (sale_id_count == 1). An iceberg cube keeps
+only the cells that reach a minimum support: a minimum number of sales
+(min_count) and/or a minimum total of a metric (min_sum).
+
+Pruning happens while the cube is computed, bottom-up (BUC style):
+
+1. Group the fact rows by the first dimension only.
+2. Drop every row whose group is below the threshold.
+3. Add the next dimension and repeat with the surviving rows.
+
+Count, and sum over non-negative values, are anti-monotone: a cell can
+never have more support than the coarser cell that contains it. A row
+dropped at a coarse level can therefore never reach the threshold at a
+finer level, so only surviving rows reach the final aggregation.
+Dimensions are processed from highest to lowest cardinality, which
+splits rows into small groups (and prunes them) as early as possible.
+
+With other_bucket=True the pruned rows are aggregated into one extra
+row whose dimension values are all OTHER_LABEL, so cube totals match the
+full cube from create_olap_cube(). Like its groupby, create_iceberg_cube()
+drops fact rows with a missing dimension value before pruning, so those
+rows are in neither the cells nor the "Other" row.
+"""
+
+import pathlib
+import sys
+
+import numpy as np
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+
+# Dimension value used for the row that collects every pruned cell
+OTHER_LABEL: str = "Other"
+
+
+def iceberg_row_mask(
+    sales_df: pd.DataFrame,
+    dimensions: list,
+    min_count: int = None,
+    min_sum: dict = None,
+) -> np.ndarray:
+    """
+    Return a boolean mask of the fact rows whose cell reaches the minimum support.
+
+    Args:
+        sales_df (pd.DataFrame): The sales data.
+        dimensions (list): List of column names to group by.
+        min_count (int): Minimum number of fact rows per cell.
+        min_sum (dict): Minimum total per cell for each metric column, e.g. {"sale_amount_usd": 1000}.
+
+    Returns:
+        np.ndarray: True for rows that belong to a surviving cell.
+    """
+    if len(sales_df) == 0:
+        return np.zeros(0, dtype=bool)
+
+    min_sum = min_sum or {}
+    for column in min_sum:
+        if (sales_df[column] < 0).any():
+            raise ValueError(f"min_sum on {column} needs non-negative values to prune safely")
+
+    codes = {}
+    keep = np.ones(len(sales_df), dtype=bool)
+    for dim in dimensions:
+        codes[dim], _ = pd.factorize(sales_df[dim])
+        keep &= codes[dim] >= 0
+
+    # Highest cardinality first prunes the most rows at the earliest level
+    order = sorted(dimensions, key=lambda dim: codes[dim].max(initial=-1), reverse=True)
+    weights = {column: sales_df[column].fillna(0).to_numpy(dtype="float64") for column in min_sum}
+
+    rows = np.flatnonzero(keep)
+    group = np.zeros(len(rows), dtype=np.int64)
+    for level, dim in enumerate(order, start=1):
+        # Refine the surviving rows' groups by one more dimension
+        _, group = np.unique(group * (codes[dim].max() + 1) + codes[dim][rows], return_inverse=True)
+        survives = np.ones(group.max(initial=-1) + 1, dtype=bool)
+        if min_count:
+            survives &= np.bincount(group) >= min_count
+        for column, threshold in min_sum.items():
+            survives &= np.bincount(group, weights=weights[column][rows]) >= threshold
+        alive = survives[group]
+        rows, group = rows[alive], group[alive]
+        logger.info(f"Iceberg level {level} ({dim}): {len(rows)} rows in {survives.sum()} cells survive.")
+
+    mask = np.zeros(len(sales_df), dtype=bool)
+    mask[rows] = True
+    return mask
+
+
+def create_iceberg_cube(
+    sales_df: pd.DataFrame,
+    dimensions: list,
+    metrics: dict,
+    min_count: int = None,
+    min_sum: dict = None,
+    other_bucket: bool = False,
+    cube_builder=None,
+) -> pd.DataFrame:
+    """
+    Create an OLAP cube that keeps only cells with enough support.
+
+    Args:
+        sales_df (pd.DataFrame): The sales data.
+        dimensions (list): List of column names to group by.
+        metrics (dict): Dictionary of aggregation functions for metrics.
+        min_count (int): Minimum number of fact rows per cell.
+        min_sum (dict): Minimum total per cell for each metric column.
+        other_bucket (bool): Add one OTHER_LABEL row that aggregates every pruned row.
+        cube_builder (callable): Function that aggregates the surviving rows.
+            Defaults to create_olap_cube() from olap_cubing.py.
+
+    Returns:
+        pd.DataFrame: The iceberg cube.
+    """
+    try:
+        if cube_builder is None:
+            # Imported here because olap_cubing.py imports this module for its own builds
+            from olap.olap_cubing import create_olap_cube as cube_builder
+
+        # Rows with a missing dimension value are not in any cell of the full cube either
+        sales_df = sales_df.dropna(subset=dimensions)
+        mask = iceberg_row_mask(sales_df, dimensions, min_count, min_sum)
+        cube = cube_builder(sales_df[mask], dimensions, metrics)
+
+        pruned = sales_df[~mask]
+        if other_bucket and len(pruned):
+            other = cube_builder(pruned.assign(**{dim: OTHER_LABEL for dim in dimensions}), dimensions, metrics)
+            cube = pd.concat([cube, other], ignore_index=True)
+
+        logger.info(
+            f"Iceberg cube created with dimensions: {dimensions} "
+            f"({len(cube)} cells, {len(pruned)} of {len(sales_df)} rows pruned)"
+        )
+        return cube
+    except Exception as e:
+        logger.error(f"Error creating iceberg cube: {e}")
+        raise
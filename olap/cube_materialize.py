@@ -0,0 +1,239 @@
+"""
+Module 6: Materialized Cube Tables
+File: olap/cube_materialize.py
+
+Cubes are written as CSV files under data/olap_cubing_outputs, so every
+consumer reloads a whole file and SQL users cannot query them. This script
+also stores each cuboid as a table inside the data warehouse, e.g.
+
+    cube_month_product_category_customer
+
+Each table gets:
+
+- One composite index per dimension, led by that dimension and followed by
+  the others, so a point or range query on any single dimension (and on any
+  leading prefix of dimensions) is an index lookup.
+- A row in the cube_catalog table with its dimensions, metrics, fact
+  population (see POPULATION_JOINS in cube_sql.py) and the warehouse
+  version it was built from.
+
+Refresh is atomic: the new contents are written to a staging table first,
+then one transaction drops the old table, renames the staging table and
+rebuilds the indexes. Readers see either the old cube or the new one.
+
+Several cube stages of scripts/run_pipeline.py can materialize into the
+same warehouse at once. SQLite allows one writer at a time, so each
+connection waits up to MATERIALIZE_TIMEOUT_SECONDS for the others
+instead of failing with "database is locked".
+
+Cube tables (and cube_catalog) are excluded from the warehouse version in
+utils/dw_version.py, so materializing a cube does not invalidate the cube cache.
+"""
+
+import datetime
+import json
+import pathlib
+import sqlite3
+import sys
+
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+from utils.dw_version import CUBE_TABLE_PREFIX, get_warehouse_version  # noqa: E402
+from olap.cube_sketches import serialize_sketch_cube  # noqa: E402
+
+# Table that lists every materialized cube
+CATALOG_TABLE: str = f"{CUBE_TABLE_PREFIX}catalog"
+
+# Columns of cube_catalog (population was added later; older catalogs are migrated)
+CATALOG_COLUMNS: list = ["table_name", "dimensions", "metrics", "row_count", "dw_version", "refreshed_at", "population"]
+
+# Suffix of the table that receives new contents before the swap
+STAGING_SUFFIX: str = "__staging"
+
+# How long a materialization waits for another writer to finish
+MATERIALIZE_TIMEOUT_SECONDS: float = 60.0
+
+
+def cube_table_name(dimensions: list) -> str:
+    """Return the table name for a cuboid, e.g. ["Month", "product_id", "category"] -> cube_month_product_category."""
+    parts = [dim.lower().removesuffix("_id") for dim in dimensions]
+    return CUBE_TABLE_PREFIX + "_".join(parts)
+
+
+def ensure_catalog_table(cursor: sqlite3.Cursor) -> None:
+    """Create the cube_catalog table if it does not exist."""
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {CATALOG_TABLE} (
+            table_name TEXT PRIMARY KEY,
+            dimensions TEXT NOT NULL,
+            metrics TEXT NOT NULL,
+            row_count INTEGER NOT NULL,
+            dw_version TEXT NOT NULL,
+            refreshed_at TEXT NOT NULL,
+            population TEXT
+        )
+    """)
+    # Catalogs created before the population column was added
+    columns = [row[1] for row in cursor.execute(f"PRAGMA table_info({CATALOG_TABLE})")]
+    if "population" not in columns:
+        cursor.execute(f"ALTER TABLE {CATALOG_TABLE} ADD COLUMN population TEXT")
+
+
+def _create_indexes(cursor: sqlite3.Cursor, table_name: str, dimensions: list) -> None:
+    """Create one composite index led by each dimension."""
+    for position, leading in enumerate(dimensions):
+        columns = [leading] + [dim for dim in dimensions if dim != leading]
+        column_list = ", ".join(f'"{col}"' for col in columns)
+        cursor.execute(f'CREATE INDEX "idx_{table_name}_{position}" ON "{table_name}" ({column_list})')
+
+
+def materialize_cube(
+    cube: pd.DataFrame,
+    dimensions: list,
+    db_path: pathlib.Path,
+    table_name: str = None,
+    population: str = None,
+) -> str:
+    """
+    Write a cube to an indexed table in the data warehouse, replacing the old contents atomically.
+
+    Args:
+        cube (pd.DataFrame): The OLAP cube (dimension, metric and sale_ids columns).
+        dimensions (list): The cube's dimension columns.
+        db_path (pathlib.Path): Path to the SQLite data warehouse.
+        table_name (str): Table to write (defaults to cube_table_name(dimensions)).
+        population (str): The fact population the cube aggregates, e.g. "sale"
+            (None if unknown; the goal planner then never uses the table).
+
+    Returns:
+        str: The table name.
+    """
+    table_name = table_name or cube_table_name(dimensions)
+    if not table_name.startswith(CUBE_TABLE_PREFIX):
+        raise ValueError(f"Cube table names must start with {CUBE_TABLE_PREFIX!r}: {table_name}")
+    staging = f"{table_name}{STAGING_SUFFIX}"
+
+    # Sketch metrics are stored as base64 text (see cube_sketches.py)
+    rows = serialize_sketch_cube(cube)
+    if "sale_ids" in rows.columns:
+        # Stored as JSON text, e.g. "[550, 553]"
+        rows["sale_ids"] = rows["sale_ids"].map(lambda ids: json.dumps(ids, default=int))
+    metrics = [col for col in rows.columns if col not in dimensions and col != "sale_ids"]
+
+    conn = sqlite3.connect(db_path, isolation_level=None, timeout=MATERIALIZE_TIMEOUT_SECONDS)
+    try:
+        version = get_warehouse_version(db_path, conn)
+        cursor = conn.cursor()
+
+        # Step 1: Write the new contents to the staging table (outside the swap)
+        cursor.execute(f'DROP TABLE IF EXISTS "{staging}"')
+        rows.to_sql(staging, conn, index=False)
+
+        # Step 2: Swap the staging table in and rebuild the indexes in one transaction
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+            cursor.execute(f'ALTER TABLE "{staging}" RENAME TO "{table_name}"')
+            _create_indexes(cursor, table_name, dimensions)
+            ensure_catalog_table(cursor)
+            now = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")
+            cursor.execute(
+                f"INSERT OR REPLACE INTO {CATALOG_TABLE} "
+                "(table_name, dimensions, metrics, row_count, dw_version, refreshed_at, population) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (table_name, json.dumps(dimensions), json.dumps(metrics), len(rows), version, now, population),
+            )
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+
+        logger.info(f"Cube materialized as {table_name} ({len(rows)} rows, {len(dimensions)} indexes).")
+        return table_name
+    except Exception as e:
+        logger.error(f"Error materializing cube table {table_name}: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+def list_cube_tables(db_path: pathlib.Path, conn: sqlite3.Connection = None) -> pd.DataFrame:
+    """
+    Return the cube_catalog rows (an empty DataFrame if no cube is materialized).
+
+    Pass an open connection as conn to reuse it (db_path is then ignored).
+    """
+    own_conn = conn is None
+    conn = sqlite3.connect(db_path) if own_conn else conn
+    try:
+        cursor = conn.cursor()
+        exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (CATALOG_TABLE,)
+        ).fetchone()
+        if not exists:
+            return pd.DataFrame(columns=CATALOG_COLUMNS)
+        catalog = pd.read_sql_query(f"SELECT * FROM {CATALOG_TABLE} ORDER BY table_name", conn)
+        if "population" not in catalog.columns:
+            catalog["population"] = None
+        catalog["dimensions"] = catalog["dimensions"].map(json.loads)
+        catalog["metrics"] = catalog["metrics"].map(json.loads)
+        return catalog
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def query_cube_table(
+    table_name: str,
+    db_path: pathlib.Path,
+    where: dict = None,
+    columns: list = None,
+    order_by: list = None,
+) -> pd.DataFrame:
+    """
+    Run an indexed point or range query against a materialized cube.
+
+    Args:
+        table_name (str): The cube table, e.g. "cube_month_product_category_customer".
+        db_path (pathlib.Path): Path to the SQLite data warehouse.
+        where (dict): Filters by column. A scalar is a point query (=), a list is an
+            IN query, and a (low, high) tuple is an inclusive range query (BETWEEN).
+        columns (list): Columns to return (defaults to all).
+        order_by (list): Columns to sort by.
+
+    Returns:
+        pd.DataFrame: The matching cells, with sale_ids parsed back into lists.
+    """
+    clauses, params = [], []
+    for column, value in (where or {}).items():
+        if isinstance(value, tuple):
+            clauses.append(f'"{column}" BETWEEN ? AND ?')
+            params.extend(value)
+        elif isinstance(value, list):
+            clauses.append(f'"{column}" IN ({", ".join("?" for _ in value)})')
+            params.extend(value)
+        else:
+            clauses.append(f'"{column}" = ?')
+            params.append(value)
+
+    select = ", ".join(f'"{col}"' for col in columns) if columns else "*"
+    sql = f'SELECT {select} FROM "{table_name}"'
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    if order_by:
+        sql += " ORDER BY " + ", ".join(f'"{col}"' for col in order_by)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        cube = pd.read_sql_query(sql, conn, params=params)
+    finally:
+        conn.close()
+    if "sale_ids" in cube.columns:
+        cube["sale_ids"] = cube["sale_ids"].map(json.loads)
+    return cube
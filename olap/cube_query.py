@@ -0,0 +1,238 @@
+"""
+Module 6: OLAP Cube Query Script
+File: olap/cube_query.py
+
+This script provides an in-memory query object for precomputed OLAP cubes.
+The cube is loaded once and each dimension is indexed from value to row
+positions, so slicing, dicing, drill-down and roll-up do not have to
+re-group the whole cube on every question.
+
+Supported operations:
+
+- Slice: e.g., cube.slice(region="East") keeps only the East cells.
+- Dice: e.g., cube.dice({"product_id": [101, 102], "DayOfWeek": ["Friday"]})
+- Roll-up: e.g., cube.rollup(["DayOfWeek"]) sums the metrics up to DayOfWeek.
+- Drill-down: e.g., cube.slice(region="East").drilldown("DayOfWeek")
+  aggregates sales by DayOfWeek within the East region.
+
+Slices and dices are answered by intersecting the row positions stored in
+the per-dimension indexes. Roll-ups encode the requested dimensions as
+integer codes and reduce every metric with a single vectorized
+np.bincount call.
+
+This example assumes a cube data set with the following column names (yours will differ).
+DayOfWeek,product_id,customer_id,sale_amount_usd_sum,sale_amount_usd_mean,sale_id_count,sale_ids
+Friday,101,1001,6344.96,6344.96,1,[582]
+etc.
+"""
+
+import pathlib
+import sys
+
+import numpy as np
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+
+# Metric column suffixes written by create_olap_cube()
+METRIC_SUFFIXES: tuple = ("_sum", "_mean", "_count", "_min", "_max")
+
+# Traceability columns that are carried in the cube but never aggregated
+TRACE_COLUMNS: tuple = ("sale_ids",)
+
+
+class CubeQuery:
+    """Answer slice, dice, roll-up and drill-down queries against a loaded cube."""
+
+    def __init__(self, cube_df: pd.DataFrame, dimensions: list = None):
+        """
+        Index a precomputed OLAP cube for interactive querying.
+
+        Args:
+            cube_df (pd.DataFrame): The cube, as written by create_olap_cube().
+            dimensions (list): Dimension columns. Defaults to every column that
+                is neither a metric nor a traceability column.
+        """
+        self.cube = cube_df.reset_index(drop=True)
+        if dimensions is None:
+            dimensions = [
+                col for col in self.cube.columns
+                if not col.endswith(METRIC_SUFFIXES) and col not in TRACE_COLUMNS
+            ]
+        self.dimensions = list(dimensions)
+        self.metrics = [
+            col for col in self.cube.columns
+            if col.endswith(METRIC_SUFFIXES) and col not in self.dimensions
+        ]
+
+        # Integer codes (sorted like groupby) and value -> row positions per dimension
+        self._codes = {}
+        self._uniques = {}
+        self._index = {}
+        for dim in self.dimensions:
+            codes, uniques = pd.factorize(self.cube[dim], sort=True)
+            self._codes[dim] = codes
+            self._uniques[dim] = uniques
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            self._index[dim] = {
+                value: order[bounds[i]:bounds[i + 1]] for i, value in enumerate(uniques)
+            }
+
+        self._values = {
+            col: self.cube[col].to_numpy(dtype="float64") for col in self.metrics
+        }
+
+        # Current selection: None means every row of the cube
+        self._rows = None
+        self.levels = []
+
+    @classmethod
+    def from_csv(cls, file_path: pathlib.Path, dimensions: list = None) -> "CubeQuery":
+        """Load a cube CSV file and index it."""
+        try:
+            cube_df = pd.read_csv(file_path)
+            logger.info(f"OLAP cube data successfully loaded from {file_path}.")
+            return cls(cube_df, dimensions)
+        except Exception as e:
+            logger.error(f"Error loading OLAP cube data: {e}")
+            raise
+
+    @property
+    def row_positions(self) -> np.ndarray:
+        """Row positions of the cube that are in the current selection."""
+        if self._rows is None:
+            return np.arange(len(self.cube))
+        return self._rows
+
+    def _narrow(self, rows: np.ndarray, dims: list) -> "CubeQuery":
+        """Return a view of this query restricted to the given rows."""
+        view = object.__new__(CubeQuery)
+        view.__dict__.update(self.__dict__)
+        if self._rows is not None:
+            rows = np.intersect1d(self._rows, rows, assume_unique=True)
+        view._rows = rows
+        view.levels = self.levels + [dim for dim in dims if dim not in self.levels]
+        return view
+
+    def _positions(self, dim: str, values: list) -> np.ndarray:
+        """Return the sorted row positions where dim takes any of the values."""
+        if dim not in self._index:
+            raise KeyError(f"Unknown cube dimension: {dim}")
+        empty = np.empty(0, dtype=np.intp)
+        parts = [self._index[dim].get(value, empty) for value in values]
+        if len(parts) == 1:
+            return parts[0]
+        return np.sort(np.concatenate(parts))
+
+    def slice(self, **criteria) -> "CubeQuery":
+        """
+        Fix one value per dimension, e.g. slice(region="East").
+
+        Returns:
+            CubeQuery: A narrowed query that shares this cube's indexes.
+        """
+        rows = None
+        for dim, value in criteria.items():
+            positions = self._positions(dim, [value])
+            rows = positions if rows is None else np.intersect1d(rows, positions, assume_unique=True)
+        if rows is None:
+            return self
+        return self._narrow(rows, list(criteria))
+
+    def dice(self, criteria: dict) -> "CubeQuery":
+        """
+        Keep a list of values per dimension, e.g. dice({"product_id": [101, 102]}).
+
+        Returns:
+            CubeQuery: A narrowed query that shares this cube's indexes.
+        """
+        rows = None
+        for dim, values in criteria.items():
+            if not isinstance(values, (list, tuple, set, np.ndarray, pd.Index)):
+                values = [values]
+            positions = self._positions(dim, list(values))
+            rows = positions if rows is None else np.intersect1d(rows, positions, assume_unique=True)
+        if rows is None:
+            return self
+        return self._narrow(rows, list(criteria))
+
+    def rollup(self, dims: list = None) -> pd.DataFrame:
+        """
+        Aggregate the current selection up to the given dimensions.
+
+        Sums and counts are added, minimums and maximums are reduced, and
+        means are recomputed from the matching sum and count columns.
+
+        Args:
+            dims (list): Dimensions to keep. An empty list gives the grand total.
+
+        Returns:
+            pd.DataFrame: One row per combination of dims, sorted like groupby().
+        """
+        dims = list(dims or [])
+        for dim in dims:
+            if dim not in self._codes:
+                raise KeyError(f"Unknown cube dimension: {dim}")
+
+        rows = self.row_positions
+
+        # Mixed-radix group key from the dimension codes (rows with missing keys are dropped)
+        keys = np.zeros(len(rows), dtype=np.int64)
+        valid = np.ones(len(rows), dtype=bool)
+        for dim in dims:
+            codes = self._codes[dim][rows]
+            valid &= codes >= 0
+            keys = keys * len(self._uniques[dim]) + codes
+        rows, keys = rows[valid], keys[valid]
+
+        group_keys, inverse = np.unique(keys, return_inverse=True)
+        n_groups = len(group_keys)
+
+        result = {}
+        remainder = group_keys
+        for dim in reversed(dims):
+            cardinality = len(self._uniques[dim])
+            remainder, codes = np.divmod(remainder, cardinality)
+            result[dim] = self._uniques[dim].take(codes)
+        result = {dim: result[dim] for dim in dims}
+
+        count_col = next((col for col in self.metrics if col.endswith("_count")), None)
+        for col in self.metrics:
+            values = self._values[col][rows]
+            if col.endswith(("_sum", "_count")):
+                result[col] = np.bincount(inverse, weights=values, minlength=n_groups)
+            elif col.endswith("_min"):
+                out = np.full(n_groups, np.inf)
+                np.minimum.at(out, inverse, values)
+                result[col] = out
+            elif col.endswith("_max"):
+                out = np.full(n_groups, -np.inf)
+                np.maximum.at(out, inverse, values)
+                result[col] = out
+
+        for col in self.metrics:
+            sum_col = col[: -len("_mean")] + "_sum"
+            if col.endswith("_mean") and sum_col in result and count_col in result:
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    result[col] = result[sum_col] / result[count_col]
+
+        if count_col in result:
+            result[count_col] = result[count_col].astype(np.int64)
+
+        ordered = dims + [col for col in self.metrics if col in result]
+        return pd.DataFrame({col: result[col] for col in ordered})
+
+    def drilldown(self, dim: str) -> pd.DataFrame:
+        """
+        Aggregate by one more dimension within the current slice or dice.
+
+        For example, cube.slice(region="East").drilldown("DayOfWeek") returns
+        sales by region and DayOfWeek for the East region only.
+        """
+        return self.rollup(self.levels + [dim])
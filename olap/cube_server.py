@@ -0,0 +1,326 @@
+"""
+Module 6: Local Cube Query Server
+File: olap/cube_server.py
+
+A small HTTP server with a JSON API for slice, dice, roll-up and top-N
+queries. It keeps cubes and warehouse connections in memory between
+requests, so a question costs one query, not an interpreter start, a
+pandas import and a cube load.
+
+- Local only: the server binds to a loopback address (127.0.0.1 by
+  default) and refuses any other host.
+- Worker pool: connections are handled by a fixed pool of worker threads.
+- Resident state: one GoalPlanner (goal_planner.py) holds the loaded cubes,
+  one open warehouse connection per worker thread, and the warehouse
+  version and cube table catalog, which are read again only every
+  WAREHOUSE_CHECK_SECONDS (or at once on POST /reload).
+- Hot reload: each request checks its cube file's version (a stat, plus a
+  content hash when the file changed) and reloads the cube if a cubing
+  script has rewritten it.
+- Latency: the last LATENCY_WINDOW request times of each endpoint are kept,
+  and GET /stats reports their count, p50 and p99 in milliseconds.
+
+Endpoints (POST bodies and responses are JSON):
+
+    GET  /health   {"status": "ok"}
+    GET  /cubes    cube files with their dimensions, metrics and row counts
+    GET  /stats    per-endpoint request count and p50/p99 latency
+    POST /slice    {"cube": "multidimensional_olap_cube.csv", "criteria": {"DayOfWeek": "Friday"}, "dims": ["product_id"]}
+    POST /dice     {"cube": ..., "criteria": {"product_id": [101, 102]}, "dims": ["DayOfWeek"]}
+    POST /rollup   {"cube": ..., "dims": ["DayOfWeek"]}
+    POST /topn     {"cube": ..., "group_by": ["DayOfWeek"], "by": ["product_id"],
+                    "value": "sale_amount_usd_sum", "n": 3, "ties": false, "bottom": false}
+    POST /query    a goal query, answered by the planner from the smallest
+                   covering cube or by SQL pushdown:
+                   {"measures": ["sale_amount_usd_sum"], "group_by": ["region"], "filters": {...}}
+    POST /reload   reread the warehouse version and cube table catalog now
+                   (after an ETL load or a new materialized cube): {"warehouse_version": ...}
+
+Query responses look like {"columns": [...], "rows": [{...}, ...], "row_count": 7}.
+/query also returns "plan" with the chosen source and the reason.
+
+Run:
+    python olap/cube_server.py          # http://127.0.0.1:8765
+    python olap/cube_server.py 9000
+
+Example:
+    curl -s -X POST localhost:8765/rollup -d '{"cube": "multidimensional_olap_cube.csv", "dims": ["DayOfWeek"]}'
+"""
+
+import collections
+import ipaddress
+import json
+import pathlib
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import numpy as np
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+from olap.cube_query import CubeQuery  # noqa: E402
+from olap.cube_topn import top_n_per_group  # noqa: E402
+from olap.goal_planner import GoalPlanner, csv_shape, split_columns  # noqa: E402
+
+# Constants
+SERVER_HOST: str = "127.0.0.1"
+SERVER_PORT: int = 8765
+SERVER_WORKERS: int = 8
+LATENCY_WINDOW: int = 10000
+MAX_BODY_BYTES: int = 1024 * 1024
+
+
+class QueryError(Exception):
+    """A request the service cannot answer, with the HTTP status to return."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def frame_response(df: pd.DataFrame) -> dict:
+    """Return a query result as JSON-ready columns and rows."""
+    return {
+        "columns": [str(col) for col in df.columns],
+        "rows": json.loads(df.to_json(orient="records")),
+        "row_count": len(df),
+    }
+
+
+def with_levels(view: CubeQuery, dims: list) -> list:
+    """Return a view's sliced/diced dimensions followed by any other requested dims."""
+    return view.levels + [dim for dim in dims if dim not in view.levels]
+
+
+class CubeQueryService:
+    """The server's resident state and endpoint handlers, independent of HTTP."""
+
+    def __init__(self, planner: GoalPlanner = None):
+        self.planner = planner if planner is not None else GoalPlanner()
+        self._latencies = collections.defaultdict(lambda: collections.deque(maxlen=LATENCY_WINDOW))
+        self._latency_lock = threading.Lock()
+        self.get_endpoints = {"/health": self.health, "/cubes": self.cubes, "/stats": self.stats}
+        self.post_endpoints = {
+            "/slice": self.slice,
+            "/dice": self.dice,
+            "/rollup": self.rollup,
+            "/topn": self.topn,
+            "/query": self.query,
+            "/reload": self.reload,
+        }
+
+    def cube(self, name: str) -> CubeQuery:
+        """Return a resident cube by file name, reloading it if the file changed."""
+        if not name or pathlib.Path(name).name != name:
+            raise QueryError(400, f"Cube must be a file name in {self.planner.cube_dir}, got {name!r}")
+        file_path = self.planner.cube_dir.joinpath(name)
+        if not file_path.exists():
+            raise QueryError(404, f"Unknown cube {name!r}")
+        return self.planner.load_cube(file_path)
+
+    def record_latency(self, endpoint: str, seconds: float) -> None:
+        """Add one request time to an endpoint's latency window."""
+        with self._latency_lock:
+            self._latencies[endpoint].append(seconds)
+
+    def health(self, body: dict = None) -> dict:
+        return {"status": "ok"}
+
+    def cubes(self, body: dict = None) -> dict:
+        """List the cube files that can be queried."""
+        cubes = []
+        for file_path in sorted(self.planner.cube_dir.glob("*.csv")):
+            columns, rows = csv_shape(file_path)
+            dimensions, metrics = split_columns(columns)
+            cubes.append({"cube": file_path.name, "dimensions": dimensions, "metrics": metrics, "rows": rows})
+        return {"cubes": cubes}
+
+    def stats(self, body: dict = None) -> dict:
+        """Return request count, p50 and p99 latency (ms) per endpoint."""
+        with self._latency_lock:
+            windows = {endpoint: np.array(times) for endpoint, times in self._latencies.items()}
+        endpoints = {}
+        for endpoint, times in sorted(windows.items()):
+            p50, p99 = np.percentile(times, [50, 99]) * 1000
+            endpoints[endpoint] = {"count": len(times), "p50_ms": round(p50, 3), "p99_ms": round(p99, 3)}
+        return {"endpoints": endpoints, "latency_window": LATENCY_WINDOW}
+
+    def slice(self, body: dict) -> dict:
+        """Fix one value per dimension, then roll up to the sliced dims plus any requested dims."""
+        view = self.cube(body.get("cube")).slice(**body.get("criteria", {}))
+        return frame_response(view.rollup(with_levels(view, body.get("dims", []))))
+
+    def dice(self, body: dict) -> dict:
+        """Keep lists of values per dimension, then roll up to the diced dims plus any requested dims."""
+        view = self.cube(body.get("cube")).dice(body.get("criteria", {}))
+        return frame_response(view.rollup(with_levels(view, body.get("dims", []))))
+
+    def rollup(self, body: dict) -> dict:
+        """Aggregate a cube (optionally diced by filters) up to the requested dims."""
+        cube = self.cube(body.get("cube"))
+        if body.get("filters"):
+            cube = cube.dice(body["filters"])
+        return frame_response(cube.rollup(body.get("dims", [])))
+
+    def topn(self, body: dict) -> dict:
+        """Roll up to group_by + by, then keep the top (or bottom) n rows of each group."""
+        cube = self.cube(body.get("cube"))
+        if body.get("filters"):
+            cube = cube.dice(body["filters"])
+        group_by = list(body.get("group_by", []))
+        if not group_by:
+            raise QueryError(400, "topn needs at least one group_by dimension")
+        if "value" not in body:
+            raise QueryError(400, "topn needs a value column to rank by")
+        rolled = cube.rollup(group_by + list(body.get("by", [])))
+        result = top_n_per_group(
+            rolled,
+            group_by,
+            body["value"],
+            n=int(body.get("n", 1)),
+            ties=bool(body.get("ties", False)),
+            bottom=bool(body.get("bottom", False)),
+        )
+        return frame_response(result)
+
+    def query(self, body: dict) -> dict:
+        """Answer a goal query from the smallest covering cube, or by SQL pushdown."""
+        if not body.get("measures"):
+            raise QueryError(400, "query needs a list of measures")
+        plan = self.planner.plan(body)
+        response = frame_response(self.planner.answer(body, plan))
+        response["plan"] = {"source": plan["source"], "name": plan["name"], "reason": plan["reason"]}
+        return response
+
+    def reload(self, body: dict = None) -> dict:
+        """Reread the warehouse version and cube table catalog."""
+        return {"warehouse_version": self.planner.refresh()}
+
+    def handle(self, method: str, path: str, body: dict = None) -> tuple:
+        """
+        Run one request and record its latency.
+
+        Returns:
+            tuple: (HTTP status, JSON-ready response).
+        """
+        endpoints = self.get_endpoints if method == "GET" else self.post_endpoints
+        handler = endpoints.get(path)
+        if handler is None:
+            return 404, {"error": f"Unknown endpoint {method} {path}"}
+        start = time.perf_counter()
+        try:
+            return 200, handler(body or {})
+        except QueryError as e:
+            return e.status, {"error": str(e)}
+        except (KeyError, ValueError, TypeError) as e:
+            return 400, {"error": f"{type(e).__name__}: {e}"}
+        except Exception as e:
+            logger.error(f"Error handling {method} {path}: {e}")
+            return 500, {"error": str(e)}
+        finally:
+            self.record_latency(path, time.perf_counter() - start)
+
+
+class CubeRequestHandler(BaseHTTPRequestHandler):
+    """Translate HTTP requests to CubeQueryService calls and JSON responses."""
+
+    server_version = "CubeServer/1.0"
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        status, payload = self.server.service.handle("GET", self.path.split("?", 1)[0])
+        self._send_json(status, payload)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self._send_json(413, {"error": f"Request body over {MAX_BODY_BYTES} bytes"})
+            return
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as e:
+            self._send_json(400, {"error": f"Invalid JSON body: {e}"})
+            return
+        if not isinstance(body, dict):
+            self._send_json(400, {"error": "The JSON body must be an object"})
+            return
+        status, payload = self.server.service.handle("POST", self.path.split("?", 1)[0], body)
+        self._send_json(status, payload)
+
+    def log_message(self, format, *args):
+        # Request lines go to the debug log instead of stderr
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+class PooledHTTPServer(HTTPServer):
+    """An HTTPServer that handles each connection on a fixed pool of worker threads."""
+
+    def __init__(self, address: tuple, service: CubeQueryService, workers: int = SERVER_WORKERS):
+        super().__init__(address, CubeRequestHandler)
+        self.service = service
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cube-server")
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process_in_worker, request, client_address)
+
+    def _process_in_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+def create_server(
+    host: str = SERVER_HOST,
+    port: int = SERVER_PORT,
+    workers: int = SERVER_WORKERS,
+    service: CubeQueryService = None,
+) -> PooledHTTPServer:
+    """
+    Create the query server on a loopback address (port 0 picks a free port).
+
+    Raises:
+        ValueError: If host is not a loopback address.
+    """
+    if not ipaddress.ip_address(socket.gethostbyname(host)).is_loopback:
+        raise ValueError(f"The cube server only listens on localhost, not {host!r}")
+    return PooledHTTPServer((host, port), service or CubeQueryService(), workers)
+
+
+def main():
+    """Main function for running the local cube query server."""
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else SERVER_PORT
+    server = create_server(port=port)
+    logger.info(f"Cube query server listening on http://{SERVER_HOST}:{server.server_address[1]} ({SERVER_WORKERS} workers).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Cube query server stopping...")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
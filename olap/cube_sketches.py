@@ -0,0 +1,455 @@
+"""
+Module 6: Sketch Metrics for OLAP Cubes
+File: olap/cube_sketches.py
+
+The cubes only support pandas aggregations such as sum, mean and count.
+Questions like "distinct customers per region and month" or
+"median / p90 sale amount per product" would need every raw value per cell.
+Instead, each cell stores a small mergeable sketch:
+
+- HyperLogLog (HLL) estimates distinct counts.
+  A full sketch keeps 2**precision one-byte registers (1 KB at precision 10,
+  about 3% standard error). Most cells of a high-cardinality cube hold only
+  a few values, so a sketch stays sparse (only its non-zero registers, as
+  index and rank arrays) until a third of the registers are set.
+  Merging two sketches takes the register-wise max.
+- KLL estimates quantiles.
+  Each cell keeps a few hundred sampled values in weighted levels.
+  Merging two sketches concatenates their levels and compacts them again.
+  While a cell has fewer than k values the sketch is exact.
+
+Both sketches merge, so a roll-up (e.g. region x Month -> region) and an
+incremental refresh (old cube + cube of new sales) never need the raw values:
+
+- HLL merges are lossless: the merged registers are exactly the registers
+  of one sketch built over all the values, so the estimates are identical.
+- KLL merges are not: compaction keeps a different subset of items
+  depending on how the values were split, so a merged sketch usually
+  differs from one built over all the values. Only the rank-error bound
+  carries over to the merged sketch.
+
+The sketches are also metric types of the cube engine: a metric such as
+{"customer_id": "hll"} or {"sale_amount_usd": ["sum", "kll"]} can be given
+to create_olap_cube(), build_cuboid(), create_olap_cube_parallel() and the
+cubing scripts' CUBE_METRICS. The cube then holds one "<column>_hll" or
+"<column>_kll" column of sketch objects next to the usual metrics, and
+serialize_sketch_cube() encodes them when the cube is written to CSV.
+
+Values are hashed by their text, after integral floats are converted to
+integers, so customer_id 1001 and 1001.0 (e.g. from a column that held a
+NaN) count as the same customer.
+
+Example:
+
+    cube = create_sketch_cube(sales_df, ["region", "Month"],
+                              {"customer_id": "hll", "sale_amount_usd": "kll"})
+    by_region = rollup_sketch_cube(cube, ["region"])
+    summarize_sketch_cube(by_region, quantiles=(0.5, 0.9))
+
+region,customer_id_distinct,sale_amount_usd_p50,sale_amount_usd_p90
+East,4,1586.24,6344.96
+etc.
+"""
+
+import base64
+import pathlib
+import sys
+
+import numpy as np
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+
+# Default sketch sizes
+HLL_PRECISION: int = 10
+KLL_K: int = 200
+
+
+def normalize_keys(values) -> np.ndarray:
+    """Return values as an object array, with integral floats converted to int (1001.0 -> 1001)."""
+    values = np.asarray(values)
+    if values.dtype.kind == "f":
+        keys = values.astype(object)
+        integral = np.isfinite(values) & (values == np.floor(values))
+        keys[integral] = values[integral].astype(np.int64).astype(object)
+        return keys
+    if values.dtype.kind == "O":
+        return np.array(
+            [int(v) if isinstance(v, float) and v.is_integer() else v for v in values], dtype=object
+        )
+    return values.astype(object)
+
+
+def hash_values(values) -> np.ndarray:
+    """Return a 64-bit hash for each value (equal values always hash the same)."""
+    return pd.util.hash_array(normalize_keys(values).astype(str))
+
+
+def _leading_zeros(words: np.ndarray) -> np.ndarray:
+    """Count leading zero bits of uint64 words, vectorized."""
+    words = words.copy()
+    zeros = np.zeros(len(words), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        empty = words < (np.uint64(1) << np.uint64(64 - shift))
+        zeros[empty] += shift
+        words[empty] <<= np.uint64(shift)
+    zeros[words == 0] = 64
+    return zeros
+
+
+def hll_positions(hashes: np.ndarray, precision: int) -> tuple:
+    """Split hashes into HLL register indexes and ranks (leading zeros + 1)."""
+    p = np.uint64(precision)
+    index = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+    rank = np.minimum(_leading_zeros(hashes << p) + 1, 64 - precision + 1)
+    return index, rank.astype(np.uint8)
+
+
+def max_rank_per_key(keys: np.ndarray, rank: np.ndarray) -> tuple:
+    """Keep the highest rank for each key; returns (sorted unique keys, their ranks)."""
+    order = np.lexsort((rank, keys))
+    keys, rank = keys[order], rank[order]
+    last = np.append(keys[1:] != keys[:-1], True) if len(keys) else np.zeros(0, dtype=bool)
+    return keys[last], rank[last]
+
+
+class HyperLogLog:
+    """
+    Mergeable distinct-count sketch.
+
+    Sparse sketches hold only their non-zero registers (sorted index and rank
+    arrays); they switch to a dense array of 2**precision registers once
+    sparse storage would no longer be smaller.
+    """
+
+    def __init__(self, precision: int = HLL_PRECISION, registers: np.ndarray = None,
+                 sparse: tuple = None):
+        self.precision = precision
+        self.dense = registers
+        self.sparse = None
+        if registers is None:
+            index, rank = sparse if sparse is not None else (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint8))
+            self._set_pairs(index, rank)
+
+    def _set_pairs(self, index: np.ndarray, rank: np.ndarray) -> None:
+        """Store register (index, rank) pairs, densifying when a third of the registers are set."""
+        index, rank = max_rank_per_key(index.astype(np.int64), rank.astype(np.uint8))
+        if len(index) * 3 < (1 << self.precision):
+            self.sparse, self.dense = (index, rank), None
+        else:
+            self.dense = np.zeros(1 << self.precision, dtype=np.uint8)
+            self.dense[index] = rank
+            self.sparse = None
+
+    @property
+    def registers(self) -> np.ndarray:
+        """All 2**precision registers as a dense array."""
+        if self.dense is not None:
+            return self.dense
+        registers = np.zeros(1 << self.precision, dtype=np.uint8)
+        registers[self.sparse[0]] = self.sparse[1]
+        return registers
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the registers."""
+        if self.dense is not None:
+            return self.dense.nbytes
+        return self.sparse[0].nbytes + self.sparse[1].nbytes
+
+    @classmethod
+    def from_values(cls, values, precision: int = HLL_PRECISION) -> "HyperLogLog":
+        sketch = cls(precision)
+        sketch.update(values)
+        return sketch
+
+    def update(self, values) -> None:
+        """Add values to the sketch."""
+        index, rank = hll_positions(hash_values(values), self.precision)
+        if self.dense is not None:
+            np.maximum.at(self.dense, index, rank)
+        else:
+            self._set_pairs(np.concatenate([self.sparse[0], index]), np.concatenate([self.sparse[1], rank]))
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """Return the sketch of the union of both inputs."""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        if self.sparse is not None and other.sparse is not None:
+            index = np.concatenate([self.sparse[0], other.sparse[0]])
+            rank = np.concatenate([self.sparse[1], other.sparse[1]])
+            return HyperLogLog(self.precision, sparse=(index, rank))
+        return HyperLogLog(self.precision, np.maximum(self.registers, other.registers))
+
+    def estimate(self) -> float:
+        """Estimated number of distinct values."""
+        m = 1 << self.precision
+        if self.dense is not None:
+            ranks = self.dense[self.dense > 0]
+        else:
+            ranks = self.sparse[1]
+        empty = m - len(ranks)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        # Every empty register contributes 2**0 = 1 to the harmonic sum
+        raw = alpha * m * m / (empty + np.sum(np.ldexp(1.0, -ranks.astype(np.int64))))
+        if raw <= 2.5 * m and empty:
+            # Small-range correction (linear counting)
+            return float(m * np.log(m / empty))
+        return float(raw)
+
+    def to_bytes(self) -> bytes:
+        """Serialize compactly: only the non-zero registers when the sketch is sparse."""
+        if self.sparse is not None:
+            index, rank = self.sparse
+        else:
+            index = np.flatnonzero(self.dense)
+            rank = self.dense[index]
+        if len(index) * 3 < (1 << self.precision):
+            return b"S" + bytes([self.precision]) + index.astype("<u2").tobytes() + rank.tobytes()
+        return b"D" + bytes([self.precision]) + self.registers.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        kind, precision, body = data[:1], data[1], data[2:]
+        if kind == b"S":
+            n = len(body) // 3
+            index = np.frombuffer(body[: 2 * n], dtype="<u2").astype(np.int64)
+            rank = np.frombuffer(body[2 * n:], dtype=np.uint8).copy()
+            return cls(precision, sparse=(index, rank))
+        return cls(precision, np.frombuffer(body, dtype=np.uint8).copy())
+
+
+class KLLSketch:
+    """Mergeable quantile sketch (KLL). Level h holds items of weight 2**h."""
+
+    def __init__(self, k: int = KLL_K, levels: list = None):
+        self.k = k
+        self.levels = levels if levels is not None else [np.empty(0)]
+
+    @classmethod
+    def from_values(cls, values, k: int = KLL_K) -> "KLLSketch":
+        sketch = cls(k)
+        sketch.update(values)
+        return sketch
+
+    @property
+    def count(self) -> int:
+        """Number of values summarized by the sketch."""
+        return int(sum(len(items) << h for h, items in enumerate(self.levels)))
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def _compact(self) -> None:
+        """Halve overfull levels, promoting every other item to the next level."""
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # Keep one item behind when the count is odd so the total weight is exact
+                leftover, items = items[: len(items) % 2], items[len(items) % 2:]
+                # Deterministic offset that alternates with the level's size keeps results reproducible
+                offset = (len(items) // 2 + level) % 2
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], items[offset::2]])
+                self.levels[level] = leftover
+            level += 1
+
+    def update(self, values) -> None:
+        """Add numeric values to the sketch."""
+        values = np.asarray(values, dtype="float64")
+        values = values[~np.isnan(values)]
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compact()
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        """Return the sketch of both inputs combined."""
+        size = max(len(self.levels), len(other.levels))
+        levels = []
+        for h in range(size):
+            mine = self.levels[h] if h < len(self.levels) else np.empty(0)
+            theirs = other.levels[h] if h < len(other.levels) else np.empty(0)
+            levels.append(np.concatenate([mine, theirs]))
+        merged = KLLSketch(max(self.k, other.k), levels)
+        merged._compact()
+        return merged
+
+    def quantile(self, q: float) -> float:
+        """Estimated value at quantile q (0 <= q <= 1), using the lower nearest rank."""
+        items = np.concatenate(self.levels)
+        if not len(items):
+            return float("nan")
+        weights = np.concatenate([np.full(len(lvl), 1 << h) for h, lvl in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        cumulative = np.cumsum(weights[order])
+        target = max(1, int(np.ceil(q * cumulative[-1])))
+        return float(items[order][np.searchsorted(cumulative, target)])
+
+    def to_bytes(self) -> bytes:
+        """Serialize as k, level sizes and the float64 items of every level."""
+        sizes = np.array([self.k, len(self.levels)] + [len(lvl) for lvl in self.levels], dtype="<u4")
+        return sizes.tobytes() + np.concatenate(self.levels).astype("<f8").tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "KLLSketch":
+        k, n_levels = (int(n) for n in np.frombuffer(data[:8], dtype="<u4"))
+        sizes = np.frombuffer(data[8: 8 + 4 * n_levels], dtype="<u4")
+        items = np.frombuffer(data[8 + 4 * n_levels:], dtype="<f8")
+        bounds = [0] + np.cumsum(sizes, dtype=np.int64).tolist()
+        levels = [items[bounds[h]:bounds[h + 1]].copy() for h in range(n_levels)]
+        return cls(k, levels)
+
+
+# Sketch class for each sketch metric name
+SKETCH_TYPES: dict = {"hll": HyperLogLog, "kll": KLLSketch}
+
+
+def split_sketch_metrics(metrics: dict) -> tuple:
+    """
+    Split cube metrics into pandas aggregations and sketch metrics.
+
+    Args:
+        metrics (dict): Metrics in create_olap_cube() form, e.g.
+            {"sale_amount_usd": ["sum", "kll"], "customer_id": "hll"}.
+
+    Returns:
+        tuple: (metrics without sketches, {column: [sketch names]}), e.g.
+            ({"sale_amount_usd": ["sum"]}, {"sale_amount_usd": ["kll"], "customer_id": ["hll"]}).
+    """
+    plain_metrics, sketch_metrics = {}, {}
+    for column, agg_funcs in metrics.items():
+        funcs = agg_funcs if isinstance(agg_funcs, list) else [agg_funcs]
+        plain = [func for func in funcs if func not in SKETCH_TYPES]
+        sketches = [func for func in funcs if func in SKETCH_TYPES]
+        if plain:
+            plain_metrics[column] = plain if isinstance(agg_funcs, list) else agg_funcs
+        if sketches:
+            sketch_metrics[column] = sketches
+    return plain_metrics, sketch_metrics
+
+
+def create_sketch_cube(sales_df: pd.DataFrame, dimensions: list, sketch_metrics: dict) -> pd.DataFrame:
+    """
+    Create a cube whose cells hold one sketch per sketch metric.
+
+    Args:
+        sales_df (pd.DataFrame): The sales data.
+        dimensions (list): List of column names to group by.
+        sketch_metrics (dict): {column: "hll" | "kll" or a list of both}, e.g. {"customer_id": "hll"}.
+
+    Returns:
+        pd.DataFrame: Dimensions plus one "<column>_<sketch>" column of sketch objects.
+    """
+    try:
+        grouped = sales_df.groupby(dimensions, sort=True)
+        group = grouped.ngroup().to_numpy()
+        valid = group >= 0
+        cube = grouped.size().reset_index()[dimensions]
+        n_groups = len(cube)
+
+        for column, kinds in sketch_metrics.items():
+            for kind in kinds if isinstance(kinds, list) else [kinds]:
+                if kind not in SKETCH_TYPES:
+                    raise ValueError(f"Unknown sketch {kind!r} for {column}; expected one of {list(SKETCH_TYPES)}")
+                values = sales_df[column].to_numpy()[valid]
+                cells = group[valid]
+                present = ~pd.isna(values)
+                values, cells = values[present], cells[present]
+
+                if kind == "hll":
+                    # Keep the highest rank per (cell, register) without a dense register array per cell
+                    index, rank = hll_positions(hash_values(values), HLL_PRECISION)
+                    keys, rank = max_rank_per_key(cells.astype(np.int64) << HLL_PRECISION | index, rank)
+                    key_cells = keys >> HLL_PRECISION
+                    index = keys & ((1 << HLL_PRECISION) - 1)
+                    bounds = np.searchsorted(key_cells, np.arange(n_groups + 1))
+                    sketches = [
+                        HyperLogLog(
+                            HLL_PRECISION, sparse=(index[bounds[g]:bounds[g + 1]], rank[bounds[g]:bounds[g + 1]])
+                        )
+                        for g in range(n_groups)
+                    ]
+                else:
+                    order = np.argsort(cells, kind="stable")
+                    bounds = np.searchsorted(cells[order], np.arange(n_groups + 1))
+                    sorted_values = values[order].astype("float64")
+                    sketches = [
+                        KLLSketch.from_values(sorted_values[bounds[g]:bounds[g + 1]])
+                        for g in range(n_groups)
+                    ]
+                cube[f"{column}_{kind}"] = sketches
+
+        logger.info(f"Sketch cube created with dimensions: {dimensions} and sketches: {sketch_metrics}")
+        return cube
+    except Exception as e:
+        logger.error(f"Error creating sketch cube: {e}")
+        raise
+
+
+def _sketch_columns(cube: pd.DataFrame) -> list:
+    return [col for col in cube.columns if col.rsplit("_", 1)[-1] in SKETCH_TYPES]
+
+
+def merge_sketches(sketches) -> object:
+    """Merge a sequence of sketches of the same type into one sketch."""
+    sketches = list(sketches)
+    merged = sketches[0]
+    for sketch in sketches[1:]:
+        merged = merged.merge(sketch)
+    return merged
+
+
+def rollup_sketch_cube(cube: pd.DataFrame, dims: list) -> pd.DataFrame:
+    """Roll a sketch cube up to dims by merging the sketches of each group."""
+    columns = _sketch_columns(cube)
+    if not dims:
+        return pd.DataFrame({col: [merge_sketches(cube[col])] for col in columns})
+    return cube.groupby(dims, sort=True)[columns].agg(merge_sketches).reset_index()
+
+
+def merge_sketch_cubes(old_cube: pd.DataFrame, new_cube: pd.DataFrame, dimensions: list) -> pd.DataFrame:
+    """Incremental refresh: merge the sketch cube of new sales into an existing one."""
+    return rollup_sketch_cube(pd.concat([old_cube, new_cube], ignore_index=True), dimensions)
+
+
+def summarize_sketch_cube(cube: pd.DataFrame, quantiles: tuple = (0.5, 0.9)) -> pd.DataFrame:
+    """
+    Replace each sketch column with its estimates.
+
+    HLL columns become "<column>_distinct"; KLL columns become one
+    "<column>_p<percent>" column per requested quantile.
+    """
+    summary = cube.drop(columns=_sketch_columns(cube)).copy()
+    for col in _sketch_columns(cube):
+        column, kind = col.rsplit("_", 1)
+        if kind == "hll":
+            summary[f"{column}_distinct"] = [round(s.estimate()) for s in cube[col]]
+        else:
+            for q in quantiles:
+                summary[f"{column}_p{round(q * 100)}"] = [s.quantile(q) for s in cube[col]]
+    return summary
+
+
+def serialize_sketch_cube(cube: pd.DataFrame) -> pd.DataFrame:
+    """Encode sketch objects as base64 text so the cube can be written to CSV."""
+    encoded = cube.copy()
+    for col in _sketch_columns(cube):
+        encoded[col] = [base64.b64encode(s.to_bytes()).decode("ascii") for s in cube[col]]
+    return encoded
+
+
+def deserialize_sketch_cube(cube: pd.DataFrame) -> pd.DataFrame:
+    """Decode the base64 sketch columns written by serialize_sketch_cube()."""
+    decoded = cube.copy()
+    for col in _sketch_columns(cube):
+        sketch_type = SKETCH_TYPES[col.rsplit("_", 1)[-1]]
+        decoded[col] = [sketch_type.from_bytes(base64.b64decode(text)) for text in cube[col]]
+    return decoded
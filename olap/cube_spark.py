@@ -0,0 +1,242 @@
+"""
+Module 6: Local-Mode Spark Backend for OLAP Cubes
+File: olap/cube_spark.py
+
+requirements.txt installs pyspark, and this script uses it to build the same
+cube definitions as olap_cubing.py, olap_cubing_month.py and
+olap_cubing_region.py on a local Spark session (local[*]), so the largest
+cubes can use every core. The goal scripts do not change: the cubes are
+written to data/olap_cubing_outputs in the same CSV format.
+
+Fact sources:
+
+- "jdbc": read the sale, product and customer tables straight from
+  smart_sales.db through the SQLite JDBC driver (SQLITE_JDBC_PACKAGE).
+  This is the default and reads exactly what the pandas scripts read.
+- "prepared": read data/prepared/*_data_prepared.csv. Use this when the
+  JDBC driver cannot be downloaded; the prepared files are what etl_to_dw.py
+  loads, so they only match the warehouse if the ETL has been run on them.
+
+Matching the pandas engine:
+
+- The cube definitions (dimensions, metrics, file names and joins) are
+  imported from the pandas cubing scripts, so the two engines cannot drift.
+- Dimensions, counts, min and max are identical.
+- Sums are accumulated as DECIMAL, so they do not depend on how Spark
+  partitions the rows; they equal the pandas sums up to float rounding in
+  the last digit (compare_cubes() checks this).
+- Means are that sum as a double divided by the count in double precision,
+  as pandas computes them (a DECIMAL division would round to 10 places).
+  tests/test_cube_spark.py checks the parity when pyspark is installed.
+- sale_ids are collected with the row position of each sale and sorted by
+  it, so every list is in the same order as the pandas groupby.
+- Cells are sorted by the dimensions, as the pandas groupby sorts them.
+
+pyspark is imported only when a session is created, so the rest of the
+project works without it.
+"""
+
+import pathlib
+import sys
+
+import numpy as np
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+from olap import olap_cubing, olap_cubing_month, olap_cubing_region  # noqa: E402
+from olap.cube_sql import POPULATION_JOINS  # noqa: E402
+from olap.olap_cubing import (  # noqa: E402
+    DB_PATH,
+    OLAP_OUTPUT_DIR,
+    generate_column_names,
+    write_cube_to_csv,
+)
+
+# Constants
+SPARK_MASTER: str = "local[*]"
+SPARK_APP_NAME: str = "smart-store-olap"
+SQLITE_JDBC_PACKAGE: str = "org.xerial:sqlite-jdbc:3.46.1.3"
+PREPARED_DATA_DIR: pathlib.Path = pathlib.Path("data").joinpath("prepared")
+FACT_SOURCES: tuple = ("jdbc", "prepared")
+
+# Prepared file for each warehouse table
+PREPARED_FILES: dict = {
+    "sale": "sales_data_prepared.csv",
+    "product": "products_data_prepared.csv",
+    "customer": "customers_data_prepared.csv",
+}
+
+# Decimal type used for exact, order-independent sums
+SUM_DECIMAL_TYPE: str = "decimal(38,10)"
+
+# The cube definitions of the three pandas cubing scripts
+SPARK_CUBES: list = [
+    {
+        "file_name": module.CUBE_FILE_NAME,
+        "dimensions": module.CUBE_DIMENSIONS,
+        "metrics": module.CUBE_METRICS,
+        "joins": POPULATION_JOINS[module.CUBE_POPULATION],
+    }
+    for module in (olap_cubing, olap_cubing_month, olap_cubing_region)
+]
+
+
+def get_spark_session(master: str = SPARK_MASTER, source: str = "jdbc"):
+    """Create (or reuse) a local Spark session, with the SQLite JDBC driver for source="jdbc"."""
+    try:
+        from pyspark.sql import SparkSession
+    except ImportError as e:
+        raise ImportError("The Spark backend needs pyspark: pip install -r requirements.txt") from e
+
+    builder = SparkSession.builder.master(master).appName(SPARK_APP_NAME)
+    if source == "jdbc":
+        builder = builder.config("spark.jars.packages", SQLITE_JDBC_PACKAGE)
+    # Keep dates and day names independent of the machine's time zone
+    builder = builder.config("spark.sql.session.timeZone", "UTC")
+    return builder.getOrCreate()
+
+
+def read_table(spark, table: str, source: str = "jdbc", db_path: pathlib.Path = DB_PATH):
+    """Read one warehouse table as a Spark DataFrame, from SQLite (JDBC) or the prepared CSV file."""
+    if source not in FACT_SOURCES:
+        raise ValueError(f"Unknown fact source {source!r}; expected one of {FACT_SOURCES}")
+    if source == "jdbc":
+        return (
+            spark.read.format("jdbc")
+            .option("url", f"jdbc:sqlite:{pathlib.Path(db_path).resolve()}")
+            .option("driver", "org.sqlite.JDBC")
+            .option("dbtable", table)
+            .load()
+        )
+    return spark.read.csv(str(PREPARED_DATA_DIR.joinpath(PREPARED_FILES[table])), header=True, inferSchema=True)
+
+
+def ingest_sales_data_spark(spark, joins: list = None, source: str = "jdbc", db_path: pathlib.Path = DB_PATH):
+    """
+    Read the sale facts (joined to product and/or customer) and add the time-based dimensions.
+
+    Args:
+        spark (SparkSession): The Spark session.
+        joins (list): Dimension tables to inner-join: "product" adds category, "customer" adds region.
+        source (str): "jdbc" or "prepared".
+        db_path (pathlib.Path): Path to the SQLite data warehouse (for source="jdbc").
+
+    Returns:
+        pyspark.sql.DataFrame: One row per sale with a row_position column for ordering.
+    """
+    from pyspark.sql import functions as F
+
+    # Number rows before any join or shuffle so sale_ids keep the warehouse order
+    sales = read_table(spark, "sale", source, db_path).withColumn("row_position", F.monotonically_increasing_id())
+    sales = sales.withColumn("customer_id", F.col("customer_id").cast("long"))
+    sales = sales.withColumn("product_id", F.col("product_id").cast("long"))
+
+    if "product" in (joins or []):
+        products = read_table(spark, "product", source, db_path).select(
+            F.col("product_id").cast("long").alias("product_id"), "category"
+        )
+        sales = sales.join(products, on="product_id", how="inner")
+    if "customer" in (joins or []):
+        customers = read_table(spark, "customer", source, db_path).select(
+            F.col("customer_id").cast("long").alias("customer_id"), "region"
+        )
+        sales = sales.join(customers, on="customer_id", how="inner")
+
+    sale_date = F.to_date(F.col("sale_date").cast("string"))
+    return (
+        sales.withColumn("DayOfWeek", F.date_format(sale_date, "EEEE"))
+        .withColumn("Month", F.month(sale_date).cast("long"))
+        .withColumn("Year", F.year(sale_date).cast("long"))
+    )
+
+
+def create_olap_cube_spark(spark_df, dimensions: list, metrics: dict) -> pd.DataFrame:
+    """
+    Create an OLAP cube on Spark, in the same format as create_olap_cube().
+
+    Args:
+        spark_df (pyspark.sql.DataFrame): The sales data, with a row_position column.
+        dimensions (list): List of column names to group by.
+        metrics (dict): Dictionary of aggregation functions for metrics
+            (sum, mean, count, min and max).
+
+    Returns:
+        pd.DataFrame: The multidimensional OLAP cube.
+    """
+    from pyspark.sql import functions as F
+
+    try:
+        aggregations = []
+        for column, agg_funcs in metrics.items():
+            funcs = agg_funcs if isinstance(agg_funcs, list) else [agg_funcs]
+            for func in funcs:
+                if func == "sum":
+                    expr = F.sum(F.col(column).cast(SUM_DECIMAL_TYPE)).cast("double")
+                elif func == "mean":
+                    total = F.sum(F.col(column).cast(SUM_DECIMAL_TYPE)).cast("double")
+                    expr = total / F.count(column).cast("double")
+                elif func == "count":
+                    expr = F.count(column)
+                elif func in ("min", "max"):
+                    expr = getattr(F, func)(column)
+                else:
+                    raise ValueError(f"Unsupported aggregation for the Spark backend: {func}")
+                aggregations.append(expr.alias(f"{column}_{func}"))
+
+        # Add a list of sale IDs for traceability, in warehouse row order
+        ordered_ids = F.array_sort(F.collect_list(F.struct("row_position", "sale_id")))
+        aggregations.append(F.transform(ordered_ids, lambda pair: pair["sale_id"]).alias("sale_ids"))
+
+        # pandas groupby drops rows with a missing dimension value
+        grouped = spark_df.dropna(subset=dimensions).groupBy(*dimensions).agg(*aggregations)
+        cube = grouped.orderBy(*dimensions).toPandas()
+
+        cube["sale_ids"] = cube["sale_ids"].map(lambda ids: [int(sale_id) for sale_id in ids])
+        for col in cube.columns:
+            if pd.api.types.is_integer_dtype(cube[col]):
+                cube[col] = cube[col].astype("int64")
+        cube.columns = generate_column_names(dimensions, metrics) + ["sale_ids"]
+
+        logger.info(f"Spark OLAP cube created with dimensions: {dimensions}")
+        return cube
+    except Exception as e:
+        logger.error(f"Error creating Spark OLAP cube: {e}")
+        raise
+
+
+def compare_cubes(spark_cube: pd.DataFrame, pandas_cube: pd.DataFrame, rtol: float = 1e-12) -> bool:
+    """Return True when two cubes have the same cells, counts and sale_ids, and sums equal up to float rounding."""
+    if spark_cube.columns.tolist() != pandas_cube.columns.tolist() or len(spark_cube) != len(pandas_cube):
+        return False
+    for col in pandas_cube.columns:
+        if pd.api.types.is_float_dtype(pandas_cube[col]):
+            if not np.allclose(spark_cube[col], pandas_cube[col], rtol=rtol, atol=0):
+                return False
+        elif spark_cube[col].tolist() != pandas_cube[col].tolist():
+            return False
+    return True
+
+
+def main(source: str = "jdbc"):
+    """Build every standard cube on a local Spark session and save them as CSV files."""
+    logger.info(f"Starting Spark OLAP Cubing process ({SPARK_MASTER}, source={source})...")
+    spark = get_spark_session(source=source)
+    try:
+        for definition in SPARK_CUBES:
+            sales = ingest_sales_data_spark(spark, definition["joins"], source)
+            cube = create_olap_cube_spark(sales, definition["dimensions"], definition["metrics"])
+            write_cube_to_csv(cube, definition["file_name"])
+    finally:
+        spark.stop()
+
+    logger.info("Spark OLAP Cubing process completed successfully.")
+    logger.info(f"Please see outputs in {OLAP_OUTPUT_DIR}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else "jdbc")
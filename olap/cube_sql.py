@@ -0,0 +1,217 @@
+"""
+Module 6: OLAP Cubing with SQL Pushdown
+File: olap/cube_sql.py
+
+The cubing scripts read every fact row into pandas
+(SELECT * FROM sale, or the joined query in the month and region variants)
+and only then group them. This script pushes the aggregation down into
+SQLite instead: it generates one GROUP BY query for the cube, runs it
+inside the data warehouse, and transfers only the aggregated cells to Python.
+
+- Time attributes (DayOfWeek, Month, Year) are computed with strftime().
+- The product and customer tables are joined only when a dimension needs them
+  (category comes from product, region comes from customer), or when they are
+  listed in joins. The month and region cubing scripts inner-join both tables,
+  which drops sales whose customer or product is missing, so pass
+  joins=["product", "customer"] to reproduce their cubes exactly.
+- Metrics map to SQL aggregates: sum -> SUM, mean -> AVG, count -> COUNT,
+  min -> MIN, max -> MAX.
+
+The result has the same columns and row order as create_olap_cube(), e.g.:
+Month,product_id,category,customer_id,sale_amount_usd_sum,sale_amount_usd_mean,sale_id_count,sale_ids
+1,101,Electronics,1001,6344.96,6344.96,1,[582]
+etc.
+
+NOTE: sale_ids is returned as the text "[582, 583]", the same value a
+cube CSV holds after it is saved and reloaded. Pass include_sale_ids=False
+for high-volume cubes that do not need traceability.
+
+SQLite does not guarantee the order in which GROUP_CONCAT() concatenates
+values, so the fact rows are read in an inner query ordered by sale rowid
+(the order SELECT * FROM sale returns them in, which is the order
+create_olap_cube() lists them in), and SQLite 3.44 or later is also given
+ORDER BY inside GROUP_CONCAT().
+
+The cubing scripts can build their cube this way with the "sql" backend
+of cube_engine.py.
+"""
+
+import pathlib
+import sqlite3
+import sys
+
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+
+# Constants
+DW_DIR: pathlib.Path = pathlib.Path("data").joinpath("dw")
+DB_PATH: pathlib.Path = DW_DIR.joinpath("smart_sales.db")
+
+# SQL expression and required dimension table for each cube dimension
+DIMENSION_SQL: dict = {
+    "DayOfWeek": (
+        "CASE strftime('%w', sale.sale_date)"
+        " WHEN '0' THEN 'Sunday' WHEN '1' THEN 'Monday' WHEN '2' THEN 'Tuesday'"
+        " WHEN '3' THEN 'Wednesday' WHEN '4' THEN 'Thursday' WHEN '5' THEN 'Friday'"
+        " WHEN '6' THEN 'Saturday' END",
+        None,
+    ),
+    "Month": ("CAST(strftime('%m', sale.sale_date) AS INTEGER)", None),
+    "Year": ("CAST(strftime('%Y', sale.sale_date) AS INTEGER)", None),
+    "category": ("product.category", "product"),
+    "region": ("customer.region", "customer"),
+}
+
+# Join clause for each dimension table
+DIMENSION_JOINS: dict = {
+    "product": "INNER JOIN product ON sale.product_id = product.product_id",
+    "customer": "INNER JOIN customer ON sale.customer_id = customer.customer_id",
+}
+
+# Fact populations: the sale rows a cube aggregates, named by the tables joined
+# to build it. The same cell can differ between populations, because an inner
+# join drops sales whose product or customer row is missing.
+POPULATION_JOINS: dict = {
+    "sale": [],
+    "sale+product+customer": ["product", "customer"],
+}
+
+# SQLite accepts ORDER BY inside an aggregate call from version 3.44
+ORDERED_AGGREGATES: bool = sqlite3.sqlite_version_info >= (3, 44, 0)
+
+# SQL aggregate for each pandas aggregation name
+SQL_AGGREGATES: dict = {
+    "sum": "SUM",
+    "mean": "AVG",
+    "count": "COUNT",
+    "min": "MIN",
+    "max": "MAX",
+}
+
+
+def dimension_expression(dim: str) -> tuple:
+    """Return the SQL expression and the dimension table (or None) for a cube dimension."""
+    # Any other dimension is read straight from the sale fact table
+    return DIMENSION_SQL.get(dim, (f"sale.{dim}", None))
+
+
+def build_cube_query(
+    dimensions: list,
+    metrics: dict,
+    filters: dict = None,
+    include_sale_ids: bool = True,
+    joins: list = None,
+) -> tuple:
+    """
+    Generate the GROUP BY query for a cube.
+
+    Args:
+        dimensions (list): List of dimension names to group by.
+        metrics (dict): Dictionary of aggregation functions for metrics.
+        filters (dict): Optional {dimension: value or list of values} to keep.
+        include_sale_ids (bool): Add the sale_ids traceability column.
+        joins (list): Dimension tables to inner-join even if no dimension needs them.
+
+    Returns:
+        tuple: The SQL text and its list of parameters.
+    """
+    # The inner query reads the fact rows (in rowid order when sale_ids are listed);
+    # the outer query groups them
+    inner, select, where, params = [], [], [], []
+    tables = list(joins or [])
+
+    for position, dim in enumerate(dimensions):
+        expression, table = dimension_expression(dim)
+        inner.append(f'{expression} AS "d{position}"')
+        select.append(f'"d{position}" AS "{dim}"')
+        # pandas groupby drops missing keys, so the pushed-down cube does too
+        where.append(f"{expression} IS NOT NULL")
+        if table and table not in tables:
+            tables.append(table)
+
+    for column, agg_funcs in metrics.items():
+        funcs = agg_funcs if isinstance(agg_funcs, list) else [agg_funcs]
+        inner.append(f'sale.{column} AS "m_{column}"')
+        for func in funcs:
+            if func not in SQL_AGGREGATES:
+                raise ValueError(f"Aggregation {func!r} for {column} cannot be pushed down to SQL")
+            name = f"{column}_{func}".rstrip("_")
+            select.append(f'{SQL_AGGREGATES[func]}("m_{column}") AS "{name}"')
+
+    if include_sale_ids:
+        inner.append('sale.sale_id AS "fact_sale_id"')
+        inner.append('sale.rowid AS "fact_row"')
+        order = ' ORDER BY "fact_row"' if ORDERED_AGGREGATES else ""
+        select.append(f"'[' || GROUP_CONCAT(\"fact_sale_id\", ', '{order}) || ']' AS \"sale_ids\"")
+
+    for dim, values in (filters or {}).items():
+        expression, table = dimension_expression(dim)
+        if table and table not in tables:
+            tables.append(table)
+        if not isinstance(values, (list, tuple, set)):
+            values = [values]
+        values = list(values)
+        where.append(f"{expression} IN ({', '.join('?' for _ in values)})")
+        params.extend(values)
+
+    facts = "SELECT " + ",\n           ".join(inner) + "\n    FROM sale"
+    for table in tables:
+        facts += "\n    " + DIMENSION_JOINS[table]
+    if where:
+        facts += "\n    WHERE " + "\n      AND ".join(where)
+    if include_sale_ids:
+        facts += "\n    ORDER BY sale.rowid"
+
+    sql = "SELECT " + ",\n       ".join(select) + f"\nFROM (\n    {facts}\n)"
+    if dimensions:
+        positions = ", ".join(str(i + 1) for i in range(len(dimensions)))
+        sql += f"\nGROUP BY {positions}\nORDER BY {positions}"
+    return sql, params
+
+
+def create_olap_cube_sql(
+    dimensions: list,
+    metrics: dict,
+    filters: dict = None,
+    include_sale_ids: bool = True,
+    joins: list = None,
+    db_path: pathlib.Path = DB_PATH,
+    conn: sqlite3.Connection = None,
+) -> pd.DataFrame:
+    """
+    Create an OLAP cube by running the aggregation inside the SQLite data warehouse.
+
+    Args:
+        dimensions (list): List of dimension names to group by.
+        metrics (dict): Dictionary of aggregation functions for metrics.
+        filters (dict): Optional {dimension: value or list of values} to keep.
+        include_sale_ids (bool): Add the sale_ids traceability column.
+        joins (list): Dimension tables to inner-join even if no dimension needs them.
+        db_path (pathlib.Path): Path to the SQLite data warehouse.
+        conn (sqlite3.Connection): Open connection to reuse (db_path is then ignored
+            and the connection is left open).
+
+    Returns:
+        pd.DataFrame: The multidimensional OLAP cube.
+    """
+    try:
+        sql, params = build_cube_query(dimensions, metrics, filters, include_sale_ids, joins)
+        if conn is not None:
+            cube = pd.read_sql_query(sql, conn, params=params)
+        else:
+            conn = sqlite3.connect(db_path)
+            try:
+                cube = pd.read_sql_query(sql, conn, params=params)
+            finally:
+                conn.close()
+        logger.info(f"OLAP cube created in SQLite with dimensions: {dimensions} ({len(cube)} cells)")
+        return cube
+    except Exception as e:
+        logger.error(f"Error creating OLAP cube with SQL pushdown: {e}")
+        raise
@@ -0,0 +1,113 @@
+"""
+Module 6: Time Hierarchy Cubes
+File: olap/cube_time.py
+
+The month cube groups by Month without Year, so January 2023 and
+January 2024 collapse together, and the day cube only knows DayOfWeek.
+This script declares a time hierarchy and computes every level of it in
+one build:
+
+    Year > Quarter > Month > Week > Day
+
+- The fact table is read once and aggregated at the finest level (Day),
+  keeping mergeable accumulators (sum, count, min, max, sale_ids).
+- Each coarser level is derived from the level just below it
+  (Week from Day, Month from Week, and so on), never from the fact table.
+- Every level keeps the full path of its ancestors, so a Week cell is keyed
+  by (Year, Quarter, Month, Week). A calendar week that crosses a month
+  boundary therefore appears once under each month it touches.
+
+Example Month-level cube:
+Year,Quarter,Month,product_id,sale_amount_usd_sum,sale_amount_usd_mean,sale_id_count,sale_ids
+2024,1,1,101,5551.84,2775.92,2,"[555, 557]"
+etc.
+"""
+
+import pathlib
+import sys
+
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+from utils.instrumentation import instrument  # noqa: E402
+from olap.cube_engine import (  # noqa: E402
+    compute_accumulators,
+    merge_accumulators,
+    finalize_accumulators,
+)
+
+# Time hierarchy, from coarsest to finest level
+TIME_HIERARCHY: list = ["Year", "Quarter", "Month", "Week", "Day"]
+
+
+def add_time_hierarchy(sales_df: pd.DataFrame, date_column: str = "sale_date") -> pd.DataFrame:
+    """
+    Add Year, Quarter, Month, Week (ISO week number) and Day columns, vectorized.
+
+    Args:
+        sales_df (pd.DataFrame): The sales data.
+        date_column (str): Column holding the sale date.
+
+    Returns:
+        pd.DataFrame: The sales data with one column per hierarchy level.
+    """
+    dates = pd.to_datetime(sales_df[date_column])
+    return sales_df.assign(
+        Year=dates.dt.year,
+        Quarter=dates.dt.quarter,
+        Month=dates.dt.month,
+        Week=dates.dt.isocalendar().week.astype("int64"),
+        Day=dates.dt.strftime("%Y-%m-%d"),
+    )
+
+
+def hierarchy_dimensions(level: str, dimensions: list = None) -> list:
+    """Return the cube dimensions for one level: its time path plus the other dimensions."""
+    path = TIME_HIERARCHY[: TIME_HIERARCHY.index(level) + 1]
+    return path + list(dimensions or [])
+
+
+@instrument
+def create_time_hierarchy_cubes(
+    sales_df: pd.DataFrame,
+    dimensions: list,
+    metrics: dict,
+    date_column: str = "sale_date",
+) -> dict:
+    """
+    Build one cube per time hierarchy level in a single pass over the facts.
+
+    Args:
+        sales_df (pd.DataFrame): The sales data.
+        dimensions (list): Non-time dimensions kept at every level (e.g. ["product_id"]).
+        metrics (dict): Dictionary of aggregation functions for metrics
+            (sum, mean, count, min and max can be derived level by level).
+
+    Returns:
+        dict: {level name: cube DataFrame}, from "Year" to "Day".
+    """
+    try:
+        facts = add_time_hierarchy(sales_df, date_column)
+
+        # The only pass over the fact table: accumulate at the finest level
+        finest = TIME_HIERARCHY[-1]
+        accumulators = compute_accumulators(facts, hierarchy_dimensions(finest, dimensions), metrics)
+
+        cubes = {}
+        for level in reversed(TIME_HIERARCHY):
+            level_dims = hierarchy_dimensions(level, dimensions)
+            if level != finest:
+                # Derive this level from the finer level's accumulators
+                accumulators = merge_accumulators(accumulators, level_dims)
+            cubes[level] = finalize_accumulators(accumulators, level_dims, metrics)
+            logger.info(f"Time hierarchy cube for {level} has {len(cubes[level])} cells.")
+
+        return {level: cubes[level] for level in TIME_HIERARCHY}
+    except Exception as e:
+        logger.error(f"Error creating time hierarchy cubes: {e}")
+        raise
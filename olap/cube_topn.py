@@ -0,0 +1,146 @@
+"""
+Module 6: Top-N per Group for Cube Results
+File: olap/cube_topn.py
+
+top_n_per_group() answers questions such as "the best-selling product of
+each day" or "the two least profitable regions of each country" on a
+rolled-up cube, without sorting the whole frame by (group, value).
+
+How it works:
+
+- Groups are integer-coded once (codes in sorted group-key order).
+- For small n, the top n rows of every group are picked in n selection
+  rounds. Each round is one grouped maximum over the remaining rows
+  (np.maximum.at on the group codes), so the cost is O(n * rows) with no
+  sort at all. n=1 is a single grouped argmax.
+- For large n, one stable sort by (group, value) is cheaper than many
+  rounds, and the rank inside each group is read from the sorted order.
+
+Only the selected rows are ordered for the result: by group, then by value
+(best first), then by original row position.
+
+Ties:
+- ties=False keeps exactly n rows per group (fewer if the group is
+  smaller), breaking ties by original row position, like
+  sort_values(kind="stable").groupby(...).head(n).
+- ties=True keeps every row whose rank is n or better, where tied rows
+  share the best rank (SQL RANK() <= n), so a group can return more than
+  n rows.
+
+Rows with a missing value or a missing group key are never selected.
+"""
+
+import pathlib
+import sys
+
+import numpy as np
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+# Largest n answered with selection rounds; larger n uses one sort
+TOPN_ROUNDS_MAX: int = 8
+
+
+def group_codes(df: pd.DataFrame, group_cols: list) -> tuple:
+    """Return (codes, n_groups): an integer group code per row (-1 for a missing key), in sorted key order."""
+    codes = df.groupby(group_cols, sort=True, observed=True).ngroup()
+    codes = codes.fillna(-1).to_numpy(dtype=np.int64)
+    return codes, int(codes.max()) + 1 if len(codes) else 0
+
+
+def _select_by_rounds(codes: np.ndarray, values: np.ndarray, valid: np.ndarray, n_groups: int, n: int, ties: bool) -> np.ndarray:
+    """Pick the top n rows of every group with n grouped-maximum passes."""
+    positions = np.arange(len(codes))
+    remaining = valid.copy()
+    selected = np.zeros(len(codes), dtype=bool)
+    taken = np.zeros(n_groups, dtype=np.int64)
+    for _ in range(n):
+        active = remaining & (taken[np.maximum(codes, 0)] < n)
+        if not active.any():
+            break
+        active_codes = codes[active]
+        best = np.full(n_groups, -np.inf)
+        np.maximum.at(best, active_codes, values[active])
+        hits = np.flatnonzero(active)[values[active] == best[active_codes]]
+        if not ties:
+            # Keep the first row (by position) among each group's tied best rows
+            first = np.full(n_groups, len(codes))
+            np.minimum.at(first, codes[hits], positions[hits])
+            hits = first[first < len(codes)]
+        selected[hits] = True
+        remaining[hits] = False
+        taken += np.bincount(codes[hits], minlength=n_groups)
+    return selected
+
+
+def _select_by_sort(codes: np.ndarray, values: np.ndarray, valid: np.ndarray, n: int, ties: bool) -> np.ndarray:
+    """Pick the top n rows of every group from one stable sort by (group, value descending)."""
+    rows = np.flatnonzero(valid)
+    order = rows[np.lexsort((-values[rows], codes[rows]))]
+    sorted_codes = codes[order]
+    sorted_values = values[order]
+    steps = np.arange(len(order))
+
+    new_group = np.ones(len(order), dtype=bool)
+    new_group[1:] = sorted_codes[1:] != sorted_codes[:-1]
+    group_start = np.maximum.accumulate(np.where(new_group, steps, 0))
+    if ties:
+        # Tied rows share the rank of the first row in their run
+        new_run = new_group.copy()
+        new_run[1:] |= sorted_values[1:] != sorted_values[:-1]
+        start = np.maximum.accumulate(np.where(new_run, steps, 0))
+    else:
+        start = steps
+
+    selected = np.zeros(len(codes), dtype=bool)
+    selected[order[start - group_start < n]] = True
+    return selected
+
+
+def top_n_per_group(
+    df: pd.DataFrame,
+    group_cols: list,
+    value_col: str,
+    n: int = 1,
+    ties: bool = False,
+    bottom: bool = False,
+) -> pd.DataFrame:
+    """
+    Return the n rows with the largest (or smallest) value in every group.
+
+    Args:
+        df (pd.DataFrame): Rows to rank, e.g. a cube roll-up.
+        group_cols (list): Columns that define the groups.
+        value_col (str): Numeric column to rank by.
+        n (int): Rows to keep per group.
+        ties (bool): Keep every row tied with the n-th row (SQL RANK() <= n).
+        bottom (bool): Rank smallest first, for "least profitable" questions.
+
+    Returns:
+        pd.DataFrame: Selected rows (original index kept), ordered by group,
+            then best value first.
+    """
+    if n < 1:
+        raise ValueError(f"n must be at least 1, got {n}")
+    if isinstance(group_cols, str):
+        group_cols = [group_cols]
+
+    codes, n_groups = group_codes(df, group_cols)
+    values = df[value_col].to_numpy(dtype="float64")
+    if bottom:
+        values = -values
+    valid = (codes >= 0) & ~np.isnan(values)
+
+    if n <= TOPN_ROUNDS_MAX:
+        selected = _select_by_rounds(codes, values, valid, n_groups, n, ties)
+    else:
+        selected = _select_by_sort(codes, values, valid, n, ties)
+
+    # Order only the selected rows: by group, then best value, then position
+    rows = np.flatnonzero(selected)
+    rows = rows[np.lexsort((rows, -values[rows], codes[rows]))]
+    return df.iloc[rows]
@@ -0,0 +1,437 @@
+"""
+Module 6: Goal Query Planner
+File: olap/goal_planner.py
+
+Goals are declared as queries instead of being tied to one cube file:
+
+    {
+        "measures": ["sale_amount_usd_sum"],
+        "group_by": ["DayOfWeek"],
+        "filters": {"region": ["East", "West"]},   # optional
+        "population": "sale+product+customer",     # optional, default "sale"
+    }
+
+The planner answers a query from the cheapest source that can:
+
+1. Candidates are every cuboid CSV file under data/olap_cubing_outputs
+   (dimensions read from the header only) and every materialized cube table
+   listed in cube_catalog (see cube_materialize.py).
+2. A candidate covers the query when it was built from the query's fact
+   population, its dimensions include every group-by and filter dimension,
+   and it holds every measure. A mean also needs the matching sum and a
+   count, because means are recomputed on roll-up. Cube tables built from
+   an older warehouse version are skipped.
+3. The covering candidate with the fewest rows wins (a cube table wins a
+   tie, because SQLite aggregates it without loading it into pandas).
+4. When nothing covers the query, the aggregation is pushed down to the
+   data warehouse as one GROUP BY (see cube_sql.py).
+
+The warehouse version and the cube_catalog are read on the planner's
+per-thread connection and kept for WAREHOUSE_CHECK_SECONDS, so a long-lived
+planner (the cube server) does not rescan the warehouse on every query;
+refresh() rereads them at once.
+
+plan() returns the choice with a human-readable reason and the rejected
+candidates; answer() runs it. Answers have the group-by columns followed by
+the measures, one row per group, sorted by the group-by columns.
+
+Example reason:
+    csv multidimensional_olap_cube.csv (89 rows): smallest of 1 covering cuboid(s)
+
+Fact populations (POPULATION_JOINS in cube_sql.py) keep answers independent
+of which cube files happen to exist. The month and region cubes inner-join
+product and customer, so they leave out sales whose product or customer row
+is missing, while olap_cubing.py and the time cubes keep every sale. Each
+cubing script records its CUBE_POPULATION; a cube file of unknown
+population, a cube from another population, or an iceberg cube (one with
+an OTHER_LABEL row standing for its pruned cells) is never substituted.
+SQL pushdown joins the tables of the query's population.
+"""
+
+import hashlib
+import pathlib
+import sqlite3
+import sys
+import threading
+import time
+
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+from utils.dw_version import get_warehouse_version  # noqa: E402
+from utils.instrumentation import instrument  # noqa: E402
+from olap.cube_query import CubeQuery, METRIC_SUFFIXES, TRACE_COLUMNS  # noqa: E402
+from olap.cube_materialize import list_cube_tables  # noqa: E402
+from olap.cube_iceberg import OTHER_LABEL  # noqa: E402
+from olap.cube_sql import POPULATION_JOINS, create_olap_cube_sql  # noqa: E402
+from olap.cube_time import TIME_HIERARCHY  # noqa: E402
+from olap.goal_results import cube_file_version  # noqa: E402
+from olap import olap_cubing, olap_cubing_month, olap_cubing_region, olap_cubing_time  # noqa: E402
+
+# Constants
+OLAP_OUTPUT_DIR: pathlib.Path = pathlib.Path("data").joinpath("olap_cubing_outputs")
+DW_DIR: pathlib.Path = pathlib.Path("data").joinpath("dw")
+DB_PATH: pathlib.Path = DW_DIR.joinpath("smart_sales.db")
+CUBE_FILE_PATTERN: str = "multidimensional_olap_*cube.csv"
+
+# Population of a query that does not name one
+DEFAULT_POPULATION: str = "sale"
+
+# Fact population of each cube file the cubing scripts write
+CUBE_POPULATIONS: dict = {
+    **{module.CUBE_FILE_NAME: module.CUBE_POPULATION for module in (olap_cubing, olap_cubing_month, olap_cubing_region)},
+    **{olap_cubing_time.time_cube_filename(level): olap_cubing_time.CUBE_POPULATION for level in TIME_HIERARCHY},
+}
+
+# How long the warehouse version and cube table catalog are reused before they are read again
+WAREHOUSE_CHECK_SECONDS: float = 10.0
+
+# Source preference when two candidates have the same number of rows
+SOURCE_PREFERENCE: dict = {"table": 0, "csv": 1}
+
+# (path, size, mtime_ns) -> (columns, row count, has OTHER_LABEL row), so unchanged files are scanned once per process
+_csv_shapes: dict = {}
+
+
+def _scan_csv(file_path: pathlib.Path) -> tuple:
+    """Return (columns, row count, has an iceberg OTHER_LABEL row) of a cube CSV file without parsing its rows."""
+    stat = file_path.stat()
+    stamp = (str(file_path.resolve()), stat.st_size, stat.st_mtime_ns)
+    shape = _csv_shapes.get(stamp)
+    if shape is None:
+        columns = list(pd.read_csv(file_path, nrows=0).columns)
+        dimensions, _ = split_columns(columns)
+        # The iceberg row holding the pruned cells has OTHER_LABEL in every (leading) dimension column
+        other_prefix = ",".join([OTHER_LABEL] * len(dimensions)).encode() + b","
+        lines, has_other = 0, False
+        with open(file_path, "rb") as f:
+            for line in f:
+                lines += 1
+                has_other = has_other or (bool(dimensions) and line.startswith(other_prefix))
+        shape = (columns, max(lines - 1, 0), has_other)
+        _csv_shapes[stamp] = shape
+    return shape
+
+
+def csv_shape(file_path: pathlib.Path) -> tuple:
+    """Return (columns, row count) of a CSV file without parsing its rows."""
+    return _scan_csv(file_path)[:2]
+
+
+def table_has_other_row(conn: sqlite3.Connection, table_name: str, dimensions: list) -> bool:
+    """Return True if a cube table holds an iceberg OTHER_LABEL row."""
+    if not dimensions:
+        return False
+    where = " AND ".join(f'"{dim}" = ?' for dim in dimensions)
+    row = conn.execute(f'SELECT 1 FROM "{table_name}" WHERE {where} LIMIT 1', [OTHER_LABEL] * len(dimensions))
+    return row.fetchone() is not None
+
+
+def query_population(query: dict) -> str:
+    """Return the fact population a query asks about (DEFAULT_POPULATION if it names none)."""
+    population = query.get("population") or DEFAULT_POPULATION
+    if population not in POPULATION_JOINS:
+        raise ValueError(f"Unknown population {population!r}; choose from {list(POPULATION_JOINS)}")
+    return population
+
+
+def split_columns(columns: list) -> tuple:
+    """Split cube columns into (dimensions, metrics) the same way CubeQuery does."""
+    dimensions = [col for col in columns if not col.endswith(METRIC_SUFFIXES) and col not in TRACE_COLUMNS]
+    metrics = [col for col in columns if col.endswith(METRIC_SUFFIXES)]
+    return dimensions, metrics
+
+
+def missing_for(query: dict, dimensions: list, metrics: list) -> list:
+    """Return what a source lacks to answer the query (empty if it covers it)."""
+    missing = [dim for dim in query_dimensions(query) if dim not in dimensions]
+    has_count = any(col.endswith("_count") for col in metrics)
+    for measure in query["measures"]:
+        if measure not in metrics:
+            missing.append(measure)
+        elif measure.endswith("_mean") and (measure[: -len("_mean")] + "_sum" not in metrics or not has_count):
+            missing.append(f"sum and count for {measure}")
+    return missing
+
+
+def query_dimensions(query: dict) -> list:
+    """Return the group-by dimensions followed by any other filtered dimensions."""
+    group_by = list(query.get("group_by") or [])
+    return group_by + [dim for dim in (query.get("filters") or {}) if dim not in group_by]
+
+
+def _in_clause(column: str, values) -> tuple:
+    """Return a quoted IN clause and its parameters for a scalar or a list of values."""
+    if not isinstance(values, (list, tuple, set)):
+        values = [values]
+    values = list(values)
+    return f'"{column}" IN ({", ".join("?" for _ in values)})', values
+
+
+class GoalPlanner:
+    """Choose and run the cheapest source for goal queries, sharing loaded cube files and connections."""
+
+    def __init__(
+        self,
+        cube_dir: pathlib.Path = OLAP_OUTPUT_DIR,
+        db_path: pathlib.Path = DB_PATH,
+        cube_populations: dict = None,
+        check_seconds: float = WAREHOUSE_CHECK_SECONDS,
+    ):
+        self.cube_dir = pathlib.Path(cube_dir)
+        self.db_path = pathlib.Path(db_path)
+        # cube file name -> fact population (files not listed are never used)
+        self.cube_populations = CUBE_POPULATIONS if cube_populations is None else cube_populations
+        self.check_seconds = check_seconds
+        # (monotonic time read, warehouse version, cube table candidates)
+        self._warehouse = None
+        self._warehouse_lock = threading.Lock()
+        # cube file -> (version, CubeQuery)
+        self._cubes = {}
+        self._load_lock = threading.Lock()
+        self._local = threading.local()
+
+    def candidates(self) -> list:
+        """Return every cuboid CSV file and materialized cube table as a candidate source."""
+        candidates = []
+        for file_path in sorted(self.cube_dir.glob(CUBE_FILE_PATTERN)):
+            columns, rows, has_other = _scan_csv(file_path)
+            dimensions, metrics = split_columns(columns)
+            candidates.append({
+                "source": "csv", "name": file_path.name, "path": file_path,
+                "dimensions": dimensions, "metrics": metrics, "rows": rows,
+                "population": self.cube_populations.get(file_path.name), "iceberg": has_other,
+            })
+
+        _, tables = self.warehouse_state()
+        return candidates + [dict(table) for table in tables]
+
+    def _read_warehouse(self) -> tuple:
+        """Read the warehouse version and the cube table candidates from the catalog."""
+        if not self.db_path.exists():
+            return None, []
+        conn = self.connection()
+        version = get_warehouse_version(self.db_path, conn=conn)
+        tables = []
+        for entry in list_cube_tables(self.db_path, conn=conn).itertuples(index=False):
+            tables.append({
+                "source": "table", "name": entry.table_name, "dimensions": entry.dimensions,
+                "metrics": [col for col in entry.metrics if col.endswith(METRIC_SUFFIXES)],
+                "rows": entry.row_count,
+                "population": entry.population,
+                "iceberg": table_has_other_row(conn, entry.table_name, entry.dimensions),
+                "stale": entry.dw_version != version,
+                "version": f"{entry.dw_version}@{entry.refreshed_at}",
+            })
+        return version, tables
+
+    def warehouse_state(self) -> tuple:
+        """Return (warehouse version, cube table candidates), read again after check_seconds."""
+        state = self._warehouse
+        if state is not None and time.monotonic() - state[0] < self.check_seconds:
+            return state[1], state[2]
+        with self._warehouse_lock:
+            # Another thread may have read the warehouse while we waited
+            state = self._warehouse
+            if state is None or time.monotonic() - state[0] >= self.check_seconds:
+                version, tables = self._read_warehouse()
+                if state is not None and state[1] != version:
+                    logger.info(f"Data warehouse changed (now {version}); cube tables reread.")
+                state = (time.monotonic(), version, tables)
+                self._warehouse = state
+        return state[1], state[2]
+
+    def refresh(self) -> str:
+        """Reread the warehouse version and cube table catalog now; return the version."""
+        with self._warehouse_lock:
+            self._warehouse = None
+        return self.warehouse_state()[0]
+
+    def plan(self, query: dict) -> dict:
+        """
+        Choose the source for a query.
+
+        Args:
+            query (dict): measures, group_by and optional filters.
+
+        Returns:
+            dict: source ("csv", "table" or "sql"), name, rows, version (of the
+                source data), population, reason, and rejected (name -> why it cannot answer).
+
+        Raises:
+            ValueError: If the query names an unknown population.
+        """
+        population = query_population(query)
+        covering, rejected = [], {}
+        for candidate in self.candidates():
+            missing = missing_for(query, candidate["dimensions"], candidate["metrics"])
+            if candidate["population"] is None:
+                rejected[candidate["name"]] = "unknown fact population"
+            elif candidate["population"] != population:
+                rejected[candidate["name"]] = f"built from population {candidate['population']}, not {population}"
+            elif candidate["iceberg"]:
+                rejected[candidate["name"]] = f"iceberg cube (pruned cells are in an {OTHER_LABEL!r} row)"
+            elif missing:
+                rejected[candidate["name"]] = f"missing {', '.join(missing)}"
+            elif candidate.get("stale"):
+                rejected[candidate["name"]] = "built from an older warehouse version"
+            else:
+                covering.append(candidate)
+
+        if covering:
+            best = min(covering, key=lambda c: (c["rows"], SOURCE_PREFERENCE[c["source"]], c["name"]))
+            if best["source"] == "csv":
+                version = cube_file_version(best["path"])
+            else:
+                version = hashlib.sha256(f"{best['name']}@{best['version']}".encode()).hexdigest()[:16]
+            plan = {
+                "source": best["source"],
+                "name": best["name"],
+                "path": best.get("path"),
+                "metrics": best["metrics"],
+                "rows": best["rows"],
+                "version": version,
+                "reason": (
+                    f"{best['source']} {best['name']} ({best['rows']} rows): "
+                    f"smallest of {len(covering)} covering {population} cuboid(s)"
+                ),
+            }
+        else:
+            plan = {
+                "source": "sql",
+                "name": self.db_path.name,
+                "path": self.db_path,
+                "metrics": query["measures"],
+                "rows": None,
+                "version": self.warehouse_state()[0],
+                "reason": (
+                    f"sql {self.db_path.name}: no cuboid covers dimensions {query_dimensions(query)} "
+                    f"with measures {query['measures']} in population {population}; "
+                    f"pushing the GROUP BY down to the warehouse"
+                ),
+            }
+        plan["population"] = population
+        plan["rejected"] = rejected
+        return plan
+
+    def explain(self, query: dict) -> str:
+        """Return the chosen source and why, followed by each rejected candidate."""
+        plan = self.plan(query)
+        lines = [f"Plan for {query['measures']} by {query.get('group_by') or []}: {plan['reason']}"]
+        lines += [f"  rejected {name}: {why}" for name, why in plan["rejected"].items()]
+        return "\n".join(lines)
+
+    def load_cube(self, file_path: pathlib.Path, version: str = None) -> CubeQuery:
+        """
+        Return the shared CubeQuery for a cube file, loading it on first use and
+        reloading it when the file's version changes.
+
+        Args:
+            file_path (pathlib.Path): The cube CSV file.
+            version (str): The file's version if already known (see cube_file_version()).
+        """
+        file_path = pathlib.Path(file_path)
+        version = version or cube_file_version(file_path)
+        entry = self._cubes.get(file_path)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        with self._load_lock:
+            # Another thread may have loaded this version while we waited
+            entry = self._cubes.get(file_path)
+            if entry is None or entry[0] != version:
+                if entry is not None:
+                    logger.info(f"Cube file {file_path.name} changed (now {version}); reloading.")
+                entry = (version, CubeQuery.from_csv(file_path))
+                self._cubes[file_path] = entry
+        return entry[1]
+
+    def connection(self) -> sqlite3.Connection:
+        """Return this thread's open connection to the data warehouse, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        """Close this thread's warehouse connection, if it has one."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _answer_from_table(self, query: dict, plan: dict) -> pd.DataFrame:
+        """Aggregate a materialized cube table inside SQLite."""
+        group_by = list(query.get("group_by") or [])
+        count_col = next((col for col in plan["metrics"] if col.endswith("_count")), None)
+
+        select, where, params = [f'"{dim}"' for dim in group_by], [], []
+        for measure in query["measures"]:
+            if measure.endswith(("_sum", "_count")):
+                select.append(f'SUM("{measure}") AS "{measure}"')
+            elif measure.endswith("_min"):
+                select.append(f'MIN("{measure}") AS "{measure}"')
+            elif measure.endswith("_max"):
+                select.append(f'MAX("{measure}") AS "{measure}"')
+            else:
+                sum_col = measure[: -len("_mean")] + "_sum"
+                select.append(f'1.0 * SUM("{sum_col}") / SUM("{count_col}") AS "{measure}"')
+        for dim in group_by:
+            # pandas roll-ups drop missing keys, so the table answer does too
+            where.append(f'"{dim}" IS NOT NULL')
+        for dim, values in (query.get("filters") or {}).items():
+            clause, values = _in_clause(dim, values)
+            where.append(clause)
+            params.extend(values)
+
+        table_name = plan["name"]
+        sql = f'SELECT {", ".join(select)} FROM "{table_name}"'
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        if group_by:
+            positions = ", ".join(str(i + 1) for i in range(len(group_by)))
+            sql += f" GROUP BY {positions} ORDER BY {positions}"
+        return pd.read_sql_query(sql, self.connection(), params=params)
+
+    @instrument
+    def answer(self, query: dict, plan: dict = None) -> pd.DataFrame:
+        """
+        Answer a query from its planned source.
+
+        Args:
+            query (dict): measures, group_by and optional filters.
+            plan (dict): A plan from plan() (planned now if not given).
+
+        Returns:
+            pd.DataFrame: Group-by columns and measures, one row per group.
+        """
+        plan = plan or self.plan(query)
+        group_by = list(query.get("group_by") or [])
+        filters = query.get("filters") or {}
+        logger.info(f"Answering {query['measures']} by {group_by} from {plan['reason']}.")
+        try:
+            if plan["source"] == "csv":
+                cube = self.load_cube(plan["path"], plan["version"])
+                if filters:
+                    cube = cube.dice(filters)
+                return cube.rollup(group_by)[group_by + query["measures"]]
+            if plan["source"] == "table":
+                return self._answer_from_table(query, plan)
+
+            metrics = {}
+            for measure in query["measures"]:
+                column, func = measure.rsplit("_", 1)
+                metrics.setdefault(column, []).append(func)
+            cube = create_olap_cube_sql(
+                group_by, metrics, filters, include_sale_ids=False,
+                joins=POPULATION_JOINS[plan["population"]], conn=self.connection(),
+            )
+            return cube[group_by + query["measures"]]
+        except Exception as e:
+            logger.error(f"Error answering goal query from {plan['name']}: {e}")
+            raise
@@ -0,0 +1,160 @@
+"""
+Module 6: Goal Results Store
+File: olap/goal_results.py
+
+Goal answers (least profitable day, least profitable region, top product
+per month, ...) depend only on a cube file that changes about once a day,
+but dashboards ask for them far more often. This store memoizes each
+goal's output so a repeated question is served without loading the cube,
+re-running the analysis or re-drawing the chart.
+
+Key:
+
+- The goal id, e.g. "top_product_by_month".
+- A hash of the goal's parameters, e.g. {"n": 3}.
+- The cube version: a content hash of the cube CSV file the goal reads.
+  The hash is remembered per (path, size, modification time), so repeated
+  lookups only stat the file.
+
+Value: the goal's result table and its chart specs (see chart_renderer.py).
+Charts are not stored as images: chart_renderer skips re-drawing a chart
+whose content hash is unchanged, so serving the specs again costs nothing.
+
+Behavior:
+
+- Lookups check an in-process dictionary first, then the on-disk entry
+  under data/olap_cache/goal_results/, so repeats are fast both inside a
+  long-running process and across separate runs.
+- Entries for other cube versions of the same goal are deleted when a new
+  entry is stored, so rebuilt cubes retire old answers.
+- hits and misses count lookups; stats() reports them with the hit rate.
+"""
+
+import hashlib
+import json
+import os
+import pathlib
+import sys
+
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+from olap.cube_cache import CACHE_DIR  # noqa: E402
+
+# Constants
+GOAL_RESULTS_DIR: pathlib.Path = CACHE_DIR.joinpath("goal_results")
+HASH_BLOCK_BYTES: int = 1024 * 1024
+
+# (path, size, mtime_ns) -> content hash, so unchanged files are hashed once per process
+_file_versions: dict = {}
+
+
+def cube_file_version(file_path: pathlib.Path) -> str:
+    """Return a content hash of a cube file (re-hashed only when its size or modification time changes)."""
+    file_path = pathlib.Path(file_path)
+    stat = file_path.stat()
+    stamp = (str(file_path.resolve()), stat.st_size, stat.st_mtime_ns)
+    version = _file_versions.get(stamp)
+    if version is None:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b""):
+                digest.update(block)
+        version = digest.hexdigest()[:16]
+        _file_versions[stamp] = version
+    return version
+
+
+def goal_params_hash(params: dict) -> str:
+    """Return a stable hash of a goal's parameters."""
+    text = json.dumps(params or {}, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+class GoalResultStore:
+    """A two-level (memory, then disk) memo of goal results keyed by goal, parameters and cube version."""
+
+    def __init__(self, store_dir: pathlib.Path = GOAL_RESULTS_DIR):
+        self.store_dir = pathlib.Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self._memory = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_path(self, goal_id: str, params: dict, cube_version: str) -> pathlib.Path:
+        """Return the file that holds one result: <goal>--<cube version>--<params>.pkl"""
+        return self.store_dir.joinpath(f"{goal_id}--{cube_version}--{goal_params_hash(params)}.pkl")
+
+    def invalidate_stale(self, goal_id: str, cube_version: str) -> int:
+        """Delete a goal's entries for any other cube version."""
+        removed = 0
+        prefix = f"{goal_id}--"
+        for entry in self.store_dir.glob(f"{prefix}*.pkl"):
+            if not entry.name.startswith(f"{prefix}{cube_version}--"):
+                entry.unlink(missing_ok=True)
+                removed += 1
+        for key in [key for key in self._memory if key[0] == goal_id and key[2] != cube_version]:
+            del self._memory[key]
+        if removed:
+            logger.info(f"Removed {removed} stale result(s) for goal {goal_id} (cube now at {cube_version}).")
+        return removed
+
+    def get(self, goal_id: str, params: dict, cube_version: str):
+        """Return the stored result, or None on a miss. Counts a hit or a miss."""
+        entry = self._entry_path(goal_id, params, cube_version)
+        key = (goal_id, goal_params_hash(params), cube_version)
+        result = self._memory.get(key)
+        if result is None and entry.exists():
+            result = pd.read_pickle(entry)
+            self._memory[key] = result
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def put(self, goal_id: str, params: dict, cube_version: str, result) -> None:
+        """Store a result in memory and on disk, then drop the goal's stale versions."""
+        entry = self._entry_path(goal_id, params, cube_version)
+        temp = entry.with_suffix(".tmp")
+        pd.to_pickle(result, temp)
+        os.replace(temp, entry)
+        self._memory[(goal_id, goal_params_hash(params), cube_version)] = result
+        self.invalidate_stale(goal_id, cube_version)
+
+    def get_or_compute(self, goal_id: str, params: dict, cube_version: str, compute):
+        """
+        Return the stored result for this goal, parameters and cube version, computing it on a miss.
+
+        Args:
+            goal_id (str): Goal name.
+            params (dict): Goal parameters.
+            cube_version (str): Version of the cube the goal reads (see cube_file_version()).
+            compute (callable): Zero-argument function that answers the goal.
+
+        Returns:
+            The stored or newly computed result.
+        """
+        result = self.get(goal_id, params, cube_version)
+        if result is not None:
+            logger.info(f"Goal result hit for {goal_id} (params {params}, cube {cube_version}).")
+            return result
+
+        logger.info(f"Goal result miss for {goal_id} (params {params}, cube {cube_version}); computing.")
+        result = compute()
+        self.put(goal_id, params, cube_version, result)
+        return result
+
+    def stats(self) -> dict:
+        """Return the hit and miss counters and the hit rate."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
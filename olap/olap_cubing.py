@@ -94,6 +94,12 @@ if str(PROJECT_ROOT) not in sys.path:
     sys.path.append(str(PROJECT_ROOT))
 
 from utils.logger import logger  # noqa: E402
+from utils.instrumentation import instrument, metrics_run  # noqa: E402
+from olap.cube_cache import CubeCache  # noqa: E402
+from olap.cube_engine import CUBE_BUILD_SETTINGS, add_time_dimensions, build_cube  # noqa: E402
+from olap.cube_materialize import materialize_cube  # noqa: E402
+from olap.cube_external import iter_fact_chunks  # noqa: E402
+from olap.cube_sketches import create_sketch_cube, serialize_sketch_cube, split_sketch_metrics  # noqa: E402
 
 # Test log message
 logger.info("Test log message")
@@ -103,15 +109,31 @@ DW_DIR: pathlib.Path = pathlib.Path("data").joinpath("dw")
 DB_PATH: pathlib.Path = DW_DIR.joinpath("smart_sales.db")
 OLAP_OUTPUT_DIR: pathlib.Path = pathlib.Path("data").joinpath("olap_cubing_outputs")
 
+# Cube definition (also used by scripts/fused_pipeline.py)
+CUBE_DIMENSIONS: list = ["DayOfWeek", "product_id", "customer_id"]
+CUBE_METRICS: dict = {
+    "sale_amount_usd": ["sum", "mean"],
+    "sale_id": "count"
+}
+CUBE_FILE_NAME: str = "multidimensional_olap_cube.csv"
+# Fact population (see POPULATION_JOINS in cube_sql.py): every sale row
+CUBE_POPULATION: str = "sale"
+FACT_QUERY: str = "SELECT * FROM sale"
+
+# Build settings (backend, workers, iceberg threshold, memory budget and
+# materialization) are shared by the standard cubing scripts: see
+# CUBE_BUILD_SETTINGS and build_cube() in cube_engine.py
+
 # Create output directory if it does not exist
 OLAP_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
 
+@instrument
 def ingest_sales_data_from_dw() -> pd.DataFrame:
     """Ingest sales data from SQLite data warehouse."""
     try:
         conn = sqlite3.connect(DB_PATH)
-        sales_df = pd.read_sql_query("SELECT * FROM sale", conn)
+        sales_df = pd.read_sql_query(FACT_QUERY, conn)
         conn.close()
         logger.info("Sales data successfully loaded from SQLite data warehouse.")
         return sales_df
@@ -120,6 +142,7 @@ def ingest_sales_data_from_dw() -> pd.DataFrame:
         raise
 
 
+@instrument
 def create_olap_cube(
     sales_df: pd.DataFrame, dimensions: list, metrics: dict
 ) -> pd.DataFrame:
@@ -148,20 +171,33 @@ def create_olap_cube(
         # If we specify only one aggregation function per column, 
         # the resulting column names will not include the suffix.
 
+        # Sketch metrics ("hll", "kll") are not pandas aggregations; they are built separately
+        plain_metrics, sketch_metrics = split_sketch_metrics(metrics)
+
         # Group by the specified dimensions
         grouped = sales_df.groupby(dimensions)
 
         # Perform the aggregations
-        cube = grouped.agg(metrics).reset_index()
+        if plain_metrics:
+            cube = grouped.agg(plain_metrics).reset_index()
+        else:
+            cube = grouped.size().reset_index()[dimensions]
 
         # Add a list of sale IDs for traceability
         cube["sale_ids"] = grouped["sale_id"].apply(list).reset_index(drop=True)
 
         # Generate explicit column names
-        explicit_columns = generate_column_names(dimensions, metrics)
+        explicit_columns = generate_column_names(dimensions, plain_metrics)
         explicit_columns.append("sale_ids")  # Include the traceability column
         cube.columns = explicit_columns
 
+        # Add one column of sketches per sketch metric (same sorted cells as the groupby)
+        if sketch_metrics:
+            sketches = create_sketch_cube(sales_df, dimensions, sketch_metrics)
+            for column in sketches.columns[len(dimensions):]:
+                cube[column] = sketches[column].to_numpy()
+            cube = cube[generate_column_names(dimensions, metrics) + ["sale_ids"]]
+
         logger.info(f"OLAP cube created with dimensions: {dimensions}")
         return cube
     except Exception as e:
@@ -196,11 +232,13 @@ def generate_column_names(dimensions: list, metrics: dict) -> list:
     return column_names
     
 
+@instrument
 def write_cube_to_csv(cube: pd.DataFrame, filename: str) -> None:
     """Write the OLAP cube to a CSV file."""
     try:
         output_path = OLAP_OUTPUT_DIR.joinpath(filename)
-        cube.to_csv(output_path, index=False)
+        # Sketch metrics are written as base64 text (see cube_sketches.py)
+        serialize_sketch_cube(cube).to_csv(output_path, index=False)
         logger.info(f"OLAP cube saved to {output_path}.")
     except Exception as e:
         logger.error(f"Error saving OLAP cube to CSV file: {e}")
@@ -211,31 +249,47 @@ def main():
     """Main function for OLAP cubing."""
     logger.info("Starting OLAP Cubing process...")
 
-    # Step 1: Ingest sales data
-    sales_df = ingest_sales_data_from_dw()
-
-    # Step 2: Add additional columns for time-based dimensions
-    sales_df["sale_date"] = pd.to_datetime(sales_df["sale_date"])
-    sales_df["DayOfWeek"] = sales_df["sale_date"].dt.day_name()
-    sales_df["Month"] = sales_df["sale_date"].dt.month
-    sales_df["Year"] = sales_df["sale_date"].dt.year
-
-    # Step 3: Define dimensions and metrics for the cube
-    dimensions = ["DayOfWeek", "product_id", "customer_id"]
-    metrics = {
-        "sale_amount_usd": ["sum", "mean"],
-        "sale_id": "count"
+    # Step 1: Define dimensions and metrics for the cube
+    dimensions = CUBE_DIMENSIONS
+    metrics = CUBE_METRICS
+
+    # With a memory budget, stream the facts and write the cube without holding it in memory
+    if CUBE_BUILD_SETTINGS["memory_budget_bytes"]:
+        build_cube(
+            dimensions, metrics,
+            fact_chunks=lambda: iter_fact_chunks(DB_PATH, FACT_QUERY),
+            output_path=OLAP_OUTPUT_DIR.joinpath(CUBE_FILE_NAME),
+        )
+        logger.info("OLAP Cubing process completed successfully.")
+        return
+
+    # Step 2: Create the cube, or reuse the cached cube if the data warehouse has not changed
+    definition = {
+        "name": "multidimensional_olap_cube",
+        "dimensions": dimensions,
+        "metrics": metrics,
+        "filters": None,
+        "min_count": CUBE_BUILD_SETTINGS["min_sale_count"],
+        "backend": CUBE_BUILD_SETTINGS["backend"],
+        "population": CUBE_POPULATION,
     }
+    olap_cube = CubeCache().get_or_build(
+        DB_PATH, definition, lambda: build_cube(
+            dimensions, metrics, ingest=ingest_sales_data_from_dw, db_path=DB_PATH, population=CUBE_POPULATION
+        )
+    )
 
-    # Step 4: Create the cube
-    olap_cube = create_olap_cube(sales_df, dimensions, metrics)
+    # Step 3: Save the cube to a CSV file
+    write_cube_to_csv(olap_cube, CUBE_FILE_NAME)
 
-    # Step 5: Save the cube to a CSV file
-    write_cube_to_csv(olap_cube, "multidimensional_olap_cube.csv")
+    # Step 4: Optionally materialize the cube as an indexed warehouse table
+    if CUBE_BUILD_SETTINGS["materialize_in_dw"]:
+        materialize_cube(olap_cube, dimensions, DB_PATH, population=CUBE_POPULATION)
 
     logger.info("OLAP Cubing process completed successfully.")
     logger.info(f"Please see outputs in {OLAP_OUTPUT_DIR}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with metrics_run("olap_cubing"):
+        main()
\ No newline at end of file
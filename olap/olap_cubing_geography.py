@@ -0,0 +1,135 @@
+"""
+Module 6: OLAP Cubing Script for the p7 Geographic Hierarchy
+File: olap/olap_cubing_geography.py
+
+This script builds a HierarchyCube (see cube_hierarchy.py) over the
+geographic hierarchy of the p7 sales
+
+    country > region > state > city > postal_code
+
+in one pass, answering sales, profit and quantity at any level.
+
+Location keys are dictionary-encoded twice over:
+
+- In the warehouse: scripts/p7_etl_to_dw.py stores each distinct location
+  once in p7_geography, and p7_sales keeps only the integer geo_id.
+- In the cube: the level columns are pandas categoricals, so grouping and
+  the per-level sorted arrays work on small integer codes.
+
+top_cities_within_state() reads the city level's per-state sorted array,
+so it is a slice, not a sort.
+
+Each level is also saved as a CSV file, e.g.
+    multidimensional_olap_geo_state_cube.csv
+
+Example state-level cube:
+country,region,state,sales_sum,profit_sum,quantity_sum,line_count
+United States,Central,Illinois,80166.16,-12607.887,1845,492
+etc.
+"""
+
+import pandas as pd
+import sqlite3
+import pathlib
+import sys
+
+# Add project root to sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+from olap.cube_cache import CubeCache  # noqa: E402
+from olap.cube_hierarchy import HierarchyCube  # noqa: E402
+from olap.olap_cubing import OLAP_OUTPUT_DIR, write_cube_to_csv  # noqa: E402
+from olap.olap_cubing_returns import DB_PATH, parse_currency, read_p7_table  # noqa: E402
+
+# Constants
+GEO_HIERARCHY: list = ["country", "region", "state", "city", "postal_code"]
+GEO_MEASURES: list = ["sales", "profit", "quantity"]
+
+
+def ingest_geo_sales_from_dw() -> pd.DataFrame:
+    """Ingest p7 sales lines with their location joined from p7_geography."""
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        sales_df = read_p7_table(conn, "p7_sales", ["geo_id", "quantity", "sales", "profit"])
+        geography_df = read_p7_table(conn, "p7_geography", ["geo_id"] + GEO_HIERARCHY)
+        conn.close()
+
+        sales_df["sales"] = parse_currency(sales_df["sales"])
+        sales_df["profit"] = parse_currency(sales_df["profit"])
+
+        # Encode the small geography table before the join, so the joined
+        # lines carry category codes instead of repeated location strings
+        geography_df = geography_df.astype({level: "category" for level in GEO_HIERARCHY})
+        sales_df = sales_df.merge(geography_df, on="geo_id", how="inner", validate="many_to_one")
+
+        logger.info(f"Geographic sales successfully loaded from {DB_PATH}: {len(sales_df)} lines.")
+        return sales_df
+    except Exception as e:
+        logger.error(f"Error loading geographic sales from data warehouse: {e}")
+        raise
+
+
+def build_geo_hierarchy_cube() -> HierarchyCube:
+    """Ingest the p7 sales and build the geographic hierarchy cube."""
+    sales_df = ingest_geo_sales_from_dw()
+    return HierarchyCube.build(sales_df, GEO_HIERARCHY, GEO_MEASURES)
+
+
+def top_cities_within_state(cube: HierarchyCube, state: str, n: int = 10, measure: str = "sales_sum") -> pd.DataFrame:
+    """
+    Return the top n cities of a state by a measure.
+
+    A state that appears under more than one region has one sorted block per
+    region; the blocks' top n are merged and re-ranked.
+
+    Args:
+        cube (HierarchyCube): The geographic hierarchy cube.
+        state (str): State name, e.g. "Texas".
+        n (int): Number of cities to return.
+        measure (str): Ranking column, e.g. "sales_sum", "profit_sum" or "quantity_sum".
+
+    Returns:
+        pd.DataFrame: City-level cells, largest first.
+    """
+    blocks = [cube.top_n("city", measure, n, parent=path) for path in cube.paths("state", state)]
+    if len(blocks) == 1:
+        return blocks[0]
+    if not blocks:
+        return cube.levels["city"].iloc[0:0]
+    return pd.concat(blocks).sort_values(measure, ascending=False, kind="stable").head(n)
+
+
+def main():
+    """Main function for geographic hierarchy OLAP cubing."""
+    logger.info("Starting geographic hierarchy OLAP Cubing process...")
+
+    # Step 1: Build the cube, or reuse the cached cube if the data warehouse has not changed
+    definition = {
+        "name": "multidimensional_olap_geo_hierarchy",
+        "hierarchy": GEO_HIERARCHY,
+        "measures": GEO_MEASURES,
+        "filters": None,
+    }
+    cube = CubeCache().get_or_build(DB_PATH, definition, build_geo_hierarchy_cube)
+
+    # Step 2: Save one CSV file per level
+    for level in GEO_HIERARCHY:
+        write_cube_to_csv(cube.levels[level], f"multidimensional_olap_geo_{level}_cube.csv")
+
+    # Step 3: Show the top cities of the best-selling state
+    top_state = cube.top_n("state", "sales_sum", 1).iloc[0]["state"]
+    top_cities = top_cities_within_state(cube, top_state, 5)
+    logger.info(
+        f"Top cities by sales in {top_state}:\n"
+        f"{top_cities[['city', 'sales_sum', 'profit_sum']].to_string(index=False)}"
+    )
+
+    logger.info("Geographic hierarchy OLAP Cubing process completed successfully.")
+    logger.info(f"Please see outputs in {OLAP_OUTPUT_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Module 6: OLAP Cubing Script for Fulfillment Lead Time (p7)
+File: olap/olap_cubing_lead_time.py
+
+This script builds a shipping SLA cube from the p7 data warehouse.
+
+Lead time (ship_date - sale_date, in days) is computed once at load time by
+scripts/p7_etl_to_dw.py and stored in p7_sales as the small integer column
+lead_time_days, so this script never parses dates.
+
+Dimensions: segment, region, ship_mode
+
+Metrics:
+- lead_time_days_count, lead_time_days_mean, lead_time_days_max
+- lead_time_days_p50, lead_time_days_p95: nearest-rank percentiles (whole days)
+
+Lead times are small whole numbers, so the percentiles come from one
+day-count histogram per cell (a single np.bincount over all lines),
+not from sorting each cell's lines.
+
+Example cube:
+segment,region,ship_mode,lead_time_days_count,lead_time_days_mean,lead_time_days_max,lead_time_days_p50,lead_time_days_p95
+Consumer,Central,First Class,143,2.300699300699301,3,3,3
+etc.
+"""
+
+import numpy as np
+import pandas as pd
+import sqlite3
+import pathlib
+import sys
+
+# Add project root to sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+from olap.cube_cache import CubeCache  # noqa: E402
+from olap.olap_cubing import OLAP_OUTPUT_DIR, write_cube_to_csv  # noqa: E402
+from olap.olap_cubing_returns import DB_PATH, read_p7_table  # noqa: E402
+
+# Constants
+LEAD_TIME_COLUMN: str = "lead_time_days"
+LEAD_TIME_PERCENTILES: dict = {"p50": 0.50, "p95": 0.95}
+
+
+def ingest_lead_times_from_dw() -> pd.DataFrame:
+    """Ingest p7 sales lines with segment, ship_mode, region and lead_time_days."""
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        sales_df = read_p7_table(conn, "p7_sales", ["segment", "ship_mode", "geo_id", LEAD_TIME_COLUMN])
+        geography_df = read_p7_table(conn, "p7_geography", ["geo_id", "region"])
+        conn.close()
+
+        sales_df = sales_df.merge(geography_df, on="geo_id", how="left", validate="many_to_one")
+        logger.info(f"Lead times successfully loaded from {DB_PATH}: {len(sales_df)} lines.")
+        return sales_df
+    except Exception as e:
+        logger.error(f"Error loading lead times from data warehouse: {e}")
+        raise
+
+
+def histogram_percentiles(cells: np.ndarray, days: np.ndarray, n_cells: int, quantiles: dict) -> dict:
+    """
+    Return nearest-rank percentiles of whole-day values for every cell, from one 2-D histogram.
+
+    Args:
+        cells (np.ndarray): Cell number of each line (0 .. n_cells - 1).
+        days (np.ndarray): Non-negative whole-day value of each line.
+        n_cells (int): Number of cells.
+        quantiles (dict): Output name to quantile, e.g. {"p95": 0.95}.
+
+    Returns:
+        dict: Output name to an array with one percentile per cell.
+    """
+    if len(days) == 0:
+        return {name: np.zeros(n_cells, dtype=np.int64) for name in quantiles}
+    width = int(days.max()) + 1
+    histogram = np.bincount(cells * width + days, minlength=n_cells * width).reshape(n_cells, width)
+    cumulative = histogram.cumsum(axis=1)
+    totals = cumulative[:, -1]
+    result = {}
+    for name, q in quantiles.items():
+        # Nearest rank: the smallest day whose cumulative count reaches ceil(q * n)
+        rank = np.maximum(np.ceil(q * totals), 1)
+        result[name] = (cumulative >= rank[:, None]).argmax(axis=1)
+    return result
+
+
+def create_lead_time_cube(sales_df: pd.DataFrame, dimensions: list) -> pd.DataFrame:
+    """
+    Create the lead-time cube.
+
+    Args:
+        sales_df (pd.DataFrame): Sales lines with a lead_time_days column.
+        dimensions (list): List of column names to group by.
+
+    Returns:
+        pd.DataFrame: The lead-time cube.
+    """
+    try:
+        # Lines without a lead time (unparseable dates) are left out, as pandas would skip NaN
+        facts = sales_df.dropna(subset=[LEAD_TIME_COLUMN] + dimensions)
+
+        # A negative lead time (ship_date before sale_date) is a data error; leave those lines out too
+        negative = facts[LEAD_TIME_COLUMN] < 0
+        if negative.any():
+            logger.warning(f"Skipping {int(negative.sum())} lines with a negative {LEAD_TIME_COLUMN}.")
+            facts = facts[~negative]
+
+        grouped = facts.groupby(dimensions)
+        cube = grouped[LEAD_TIME_COLUMN].agg(["count", "mean", "max"]).add_prefix(f"{LEAD_TIME_COLUMN}_")
+
+        days = facts[LEAD_TIME_COLUMN].to_numpy(dtype=np.int64)
+        percentiles = histogram_percentiles(grouped.ngroup().to_numpy(), days, len(cube), LEAD_TIME_PERCENTILES)
+        for name, values in percentiles.items():
+            cube[f"{LEAD_TIME_COLUMN}_{name}"] = values
+
+        cube = cube.reset_index()
+        logger.info(f"Lead-time cube created with dimensions: {dimensions} ({len(cube)} cells)")
+        return cube
+    except Exception as e:
+        logger.error(f"Error creating lead-time cube: {e}")
+        raise
+
+
+def build_lead_time_cube(dimensions: list) -> pd.DataFrame:
+    """Ingest the p7 lead times and create the lead-time cube."""
+    sales_df = ingest_lead_times_from_dw()
+    return create_lead_time_cube(sales_df, dimensions)
+
+
+def main():
+    """Main function for lead-time OLAP cubing."""
+    logger.info("Starting lead-time OLAP Cubing process...")
+
+    # Step 1: Define dimensions for the cube
+    dimensions = ["segment", "region", "ship_mode"]
+
+    # Step 2: Create the cube, or reuse the cached cube if the data warehouse has not changed
+    definition = {
+        "name": "multidimensional_olap_lead_time_cube",
+        "dimensions": dimensions,
+        "metrics": {LEAD_TIME_COLUMN: ["count", "mean", "max"] + list(LEAD_TIME_PERCENTILES)},
+        "filters": None,
+    }
+    lead_time_cube = CubeCache().get_or_build(
+        DB_PATH, definition, lambda: build_lead_time_cube(dimensions)
+    )
+
+    # Step 3: Save the cube to a CSV file
+    write_cube_to_csv(lead_time_cube, "multidimensional_olap_lead_time_cube.csv")
+
+    logger.info("Lead-time OLAP Cubing process completed successfully.")
+    logger.info(f"Please see outputs in {OLAP_OUTPUT_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -94,6 +94,12 @@ if str(PROJECT_ROOT) not in sys.path:
     sys.path.append(str(PROJECT_ROOT))
 
 from utils.logger import logger  # noqa: E402
+from utils.instrumentation import instrument, metrics_run  # noqa: E402
+from olap.cube_cache import CubeCache  # noqa: E402
+from olap.cube_engine import CUBE_BUILD_SETTINGS, build_cube  # noqa: E402
+from olap.cube_materialize import materialize_cube  # noqa: E402
+from olap.cube_external import iter_fact_chunks  # noqa: E402
+from olap.cube_sketches import serialize_sketch_cube  # noqa: E402
 
 # Test log message
 logger.info("Test log message")
@@ -103,30 +109,45 @@ DW_DIR: pathlib.Path = pathlib.Path("data").joinpath("dw")
 DB_PATH: pathlib.Path = DW_DIR.joinpath("smart_sales.db")
 OLAP_OUTPUT_DIR: pathlib.Path = pathlib.Path("data").joinpath("olap_cubing_outputs")
 
+# Cube definition (also used by scripts/fused_pipeline.py)
+CUBE_DIMENSIONS: list = ["Month", "product_id", "category", "customer_id"]
+CUBE_METRICS: dict = {
+    "sale_amount_usd": ["sum", "mean"],
+    "sale_id": "count"
+}
+CUBE_FILE_NAME: str = "multidimensional_olap_month_cube.csv"
+# Fact population (see POPULATION_JOINS in cube_sql.py): sales inner-joined to product and customer
+CUBE_POPULATION: str = "sale+product+customer"
+# Join sale, product, and customer tables to include category and region
+FACT_QUERY: str = """
+SELECT
+    sale.sale_id,
+    sale.customer_id,
+    sale.product_id,
+    sale.sale_date,
+    sale.sale_amount_usd,
+    product.category,
+    customer.region
+FROM sale
+INNER JOIN product ON sale.product_id = product.product_id
+INNER JOIN customer ON sale.customer_id = customer.customer_id
+"""
+
+# Build settings (backend, workers, iceberg threshold, memory budget and
+# materialization) are shared by the standard cubing scripts: see
+# CUBE_BUILD_SETTINGS and build_cube() in cube_engine.py
+
 # Create output directory if it does not exist
 OLAP_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
 
+@instrument
 def ingest_sales_data_from_dw() -> pd.DataFrame:
     """Ingest sales data from SQLite data warehouse."""
     try:
         conn = sqlite3.connect(DB_PATH)
         
-        # Join sale, product, and customer tables to include category and region
-        query = """
-        SELECT 
-            sale.sale_id,
-            sale.customer_id,
-            sale.product_id,
-            sale.sale_date,
-            sale.sale_amount_usd,
-            product.category,
-            customer.region
-        FROM sale
-        INNER JOIN product ON sale.product_id = product.product_id
-        INNER JOIN customer ON sale.customer_id = customer.customer_id
-        """
-        sales_df = pd.read_sql_query(query, conn)
+        sales_df = pd.read_sql_query(FACT_QUERY, conn)
         conn.close()
         logger.info("Sales data successfully loaded from SQLite data warehouse.")
         return sales_df
@@ -135,6 +156,7 @@ def ingest_sales_data_from_dw() -> pd.DataFrame:
         raise
 
 
+@instrument
 def create_olap_cube(
     sales_df: pd.DataFrame, dimensions: list, metrics: dict
 ) -> pd.DataFrame:
@@ -211,11 +233,13 @@ def generate_column_names(dimensions: list, metrics: dict) -> list:
     return column_names
     
 
+@instrument
 def write_cube_to_csv(cube: pd.DataFrame, filename: str) -> None:
     """Write the OLAP cube to a CSV file."""
     try:
         output_path = OLAP_OUTPUT_DIR.joinpath(filename)
-        cube.to_csv(output_path, index=False)
+        # Sketch metrics are written as base64 text (see cube_sketches.py)
+        serialize_sketch_cube(cube).to_csv(output_path, index=False)
         logger.info(f"OLAP cube saved to {output_path}.")
     except Exception as e:
         logger.error(f"Error saving OLAP cube to CSV file: {e}")
@@ -226,31 +250,47 @@ def main():
     """Main function for OLAP cubing."""
     logger.info("Starting OLAP Cubing process...")
 
-    # Step 1: Ingest sales data
-    sales_df = ingest_sales_data_from_dw()
-
-    # Step 2: Add additional columns for time-based dimensions
-    sales_df["sale_date"] = pd.to_datetime(sales_df["sale_date"])
-    sales_df["DayOfWeek"] = sales_df["sale_date"].dt.day_name()
-    sales_df["Month"] = sales_df["sale_date"].dt.month
-    sales_df["Year"] = sales_df["sale_date"].dt.year
-
-    # Step 3: Define dimensions and metrics for the cube
-    dimensions = ["Month", "product_id", "category", "customer_id"]
-    metrics = {
-        "sale_amount_usd": ["sum", "mean"],
-        "sale_id": "count"
+    # Step 1: Define dimensions and metrics for the cube
+    dimensions = CUBE_DIMENSIONS
+    metrics = CUBE_METRICS
+
+    # With a memory budget, stream the facts and write the cube without holding it in memory
+    if CUBE_BUILD_SETTINGS["memory_budget_bytes"]:
+        build_cube(
+            dimensions, metrics,
+            fact_chunks=lambda: iter_fact_chunks(DB_PATH, FACT_QUERY),
+            output_path=OLAP_OUTPUT_DIR.joinpath(CUBE_FILE_NAME),
+        )
+        logger.info("OLAP Cubing process completed successfully.")
+        return
+
+    # Step 2: Create the cube, or reuse the cached cube if the data warehouse has not changed
+    definition = {
+        "name": "multidimensional_olap_month_cube",
+        "dimensions": dimensions,
+        "metrics": metrics,
+        "filters": None,
+        "min_count": CUBE_BUILD_SETTINGS["min_sale_count"],
+        "backend": CUBE_BUILD_SETTINGS["backend"],
+        "population": CUBE_POPULATION,
     }
+    olap_cube = CubeCache().get_or_build(
+        DB_PATH, definition, lambda: build_cube(
+            dimensions, metrics, ingest=ingest_sales_data_from_dw, db_path=DB_PATH, population=CUBE_POPULATION
+        )
+    )
 
-    # Step 4: Create the cube
-    olap_cube = create_olap_cube(sales_df, dimensions, metrics)
+    # Step 3: Save the cube to a CSV file
+    write_cube_to_csv(olap_cube, CUBE_FILE_NAME)
 
-    # Step 5: Save the cube to a CSV file
-    write_cube_to_csv(olap_cube, "multidimensional_olap_month_cube.csv")
+    # Step 4: Optionally materialize the cube as an indexed warehouse table
+    if CUBE_BUILD_SETTINGS["materialize_in_dw"]:
+        materialize_cube(olap_cube, dimensions, DB_PATH, population=CUBE_POPULATION)
 
     logger.info("OLAP Cubing process completed successfully.")
     logger.info(f"Please see outputs in {OLAP_OUTPUT_DIR}")
 
 
 if __name__ == "__main__":
-    main()
+    with metrics_run("olap_cubing_month"):
+        main()
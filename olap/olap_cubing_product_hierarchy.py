@@ -0,0 +1,112 @@
+"""
+Module 6: OLAP Cubing Script for the p7 Product Hierarchy
+File: olap/olap_cubing_product_hierarchy.py
+
+This script builds a HierarchyCube (see cube_hierarchy.py) over the p7
+product hierarchy
+
+    category > sub_category > product_id
+
+in one pass over p7_sales, so a dashboard can drill from category to
+sub_category to product, and rank products inside any sub_category, from
+precomputed sorted indexes instead of re-aggregating the sales lines.
+
+Measures (summed at every level): sales, profit and quantity.
+
+There is no cost-based margin measure: p7_products.cost is neither a unit
+cost nor a line cost (its median is about 6 times the unit price and about
+twice the line's sales), so sales minus cost does not give a margin. Use
+profit, which the sales file records per line.
+
+The whole cube (all levels and indexes) is cached by CubeCache, and each
+level is also saved as a CSV file:
+
+    multidimensional_olap_product_category_cube.csv
+    multidimensional_olap_product_sub_category_cube.csv
+    multidimensional_olap_product_product_id_cube.csv
+
+Example sub_category-level cube:
+category,sub_category,sales_sum,profit_sum,quantity_sum,line_count
+Furniture,Bookcases,114880.05,-3472.556,868,228
+etc.
+"""
+
+import pandas as pd
+import sqlite3
+import pathlib
+import sys
+
+# Add project root to sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+from olap.cube_cache import CubeCache  # noqa: E402
+from olap.cube_hierarchy import HierarchyCube  # noqa: E402
+from olap.olap_cubing import OLAP_OUTPUT_DIR, write_cube_to_csv  # noqa: E402
+from olap.olap_cubing_returns import DB_PATH, parse_currency, read_p7_table  # noqa: E402
+
+# Constants
+PRODUCT_HIERARCHY: list = ["category", "sub_category", "product_id"]
+PRODUCT_MEASURES: list = ["sales", "profit", "quantity"]
+
+
+def ingest_product_sales_from_dw() -> pd.DataFrame:
+    """Ingest p7 sales lines joined to their product's category and sub_category."""
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        sales_df = read_p7_table(conn, "p7_sales", ["product_id", "quantity", "sales", "profit"])
+        products_df = read_p7_table(conn, "p7_products", ["product_id", "category", "sub_category"])
+        conn.close()
+
+        sales_df["sales"] = parse_currency(sales_df["sales"])
+        sales_df["profit"] = parse_currency(sales_df["profit"])
+
+        # Hash join to the product dimension
+        sales_df = sales_df.merge(products_df, on="product_id", how="inner", validate="many_to_one")
+
+        logger.info(f"Product sales successfully loaded from {DB_PATH}: {len(sales_df)} lines.")
+        return sales_df
+    except Exception as e:
+        logger.error(f"Error loading product sales from data warehouse: {e}")
+        raise
+
+
+def build_product_hierarchy_cube() -> HierarchyCube:
+    """Ingest the p7 product sales and build the product hierarchy cube."""
+    sales_df = ingest_product_sales_from_dw()
+    return HierarchyCube.build(sales_df, PRODUCT_HIERARCHY, PRODUCT_MEASURES)
+
+
+def main():
+    """Main function for product hierarchy OLAP cubing."""
+    logger.info("Starting product hierarchy OLAP Cubing process...")
+
+    # Step 1: Build the cube, or reuse the cached cube if the data warehouse has not changed
+    definition = {
+        "name": "multidimensional_olap_product_hierarchy",
+        "hierarchy": PRODUCT_HIERARCHY,
+        "measures": PRODUCT_MEASURES,
+        "filters": None,
+    }
+    cube = CubeCache().get_or_build(DB_PATH, definition, build_product_hierarchy_cube)
+
+    # Step 2: Save one CSV file per level
+    for level in PRODUCT_HIERARCHY:
+        write_cube_to_csv(cube.levels[level], f"multidimensional_olap_product_{level}_cube.csv")
+
+    # Step 3: Show the kind of drill-down a dashboard gets from the indexes
+    top_category = cube.top_n("category", "profit_sum", 1).iloc[0]["category"]
+    top_sub_categories = cube.top_n("sub_category", "profit_sum", 3, parent=(top_category,))
+    logger.info(
+        f"Top sub_categories by profit in {top_category}:\n"
+        f"{top_sub_categories[['sub_category', 'profit_sum', 'sales_sum']].to_string(index=False)}"
+    )
+
+    logger.info("Product hierarchy OLAP Cubing process completed successfully.")
+    logger.info(f"Please see outputs in {OLAP_OUTPUT_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Module 6: OLAP Cubing Script for Returns (store_returns warehouse)
+File: olap/olap_cubing_returns.py
+
+This script builds a returns-rate cube from the p7 data warehouse
+(store_returns.db), loaded by scripts/p7_etl_to_dw.py.
+
+INPUT TABLES:
+
+p7_sales (fact table, one row per order line)
+   row_id,sale_id,product_id,sale_date,ship_mode,ship_date,customer_id,customer_name,segment,geo_id,quantity,discount,sales,profit
+   1,CA-2016-152156,FUR-BO-10001798,2016-11-08,Second Class,11/11/2016,CG-12520,Claire Gute,Consumer,243,2,0.0,$261.96 ,41.9136
+
+p7_returns (one row per returned order)
+   order_id,returned
+   CA-2014-100762,Yes
+
+p7_geography (region of each geo_id), p7_products (category and sub_category)
+and p7_salesreps (sales rep for each region)
+
+JOINS:
+
+- Return status is attached with a hash semi-join: the returned order IDs
+  are put into one hash set, and every sale line is tested against it in
+  a single vectorized isin() pass (no per-row lookups).
+- Geography, products and sales reps are small dimension tables and are
+  hash-joined (pandas merge) on geo_id, product_id and region.
+
+OUTPUT CUBE:
+
+Dimensions: region, sales_rep, category, sub_category, segment, ship_mode
+
+Metrics:
+- line_count, returned_line_count: order lines (additive, safe to roll up)
+- order_count, returned_order_count: distinct orders in the cell
+  (an order with lines in several cells counts once in each cell)
+- sales_sum, returned_sales_sum, profit_sum, returned_profit_sum
+- order_return_rate (returned_order_count / order_count) and
+  sales_return_rate (returned_sales_sum / sales_sum)
+
+region,sales_rep,category,sub_category,segment,ship_mode,line_count,returned_line_count,order_count,returned_order_count,sales_sum,returned_sales_sum,profit_sum,returned_profit_sum,order_return_rate,sales_return_rate
+Central,Kelly Mcwilliams,Furniture,Bookcases,Consumer,First Class,7,0,7,0,2250.58,0.0,-246.302,0.0,0.0,0.0
+etc.
+
+The cube is cached by CubeCache in the same way as the sales cubes, so it is
+rebuilt only after the p7 ETL loads new data.
+"""
+
+import pandas as pd
+import sqlite3
+import pathlib
+import sys
+
+# Add project root to sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+from olap.cube_cache import CubeCache  # noqa: E402
+from olap.olap_cubing import OLAP_OUTPUT_DIR, write_cube_to_csv  # noqa: E402
+
+# Constants
+DW_DIR: pathlib.Path = pathlib.Path("data").joinpath("dw")
+DB_PATH: pathlib.Path = DW_DIR.joinpath("store_returns.db")
+
+# Columns of p7_sales used by the p7 cubes
+P7_SALES_COLUMNS: list = [
+    "row_id", "sale_id", "product_id", "sale_date", "ship_mode", "ship_date",
+    "segment", "geo_id", "quantity", "discount", "sales", "profit",
+]
+
+
+def parse_currency(values: pd.Series) -> pd.Series:
+    """Convert currency text such as '$1,261.96 ' to floats (numbers pass through unchanged)."""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype("float64")
+    return pd.to_numeric(values.astype(str).str.replace(r"[\$,\s]", "", regex=True), errors="coerce")
+
+
+def read_p7_table(conn: sqlite3.Connection, table: str, columns: list = None) -> pd.DataFrame:
+    """Read selected columns of one p7 warehouse table."""
+    column_list = ", ".join(columns) if columns else "*"
+    return pd.read_sql_query(f"SELECT {column_list} FROM {table}", conn)
+
+
+def ingest_returns_data_from_dw() -> pd.DataFrame:
+    """
+    Ingest p7 sales lines with product, sales rep and return status attached.
+
+    Returns:
+        pd.DataFrame: One row per sale line with category, sub_category,
+            sales_rep and a boolean returned column.
+    """
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        sales_df = read_p7_table(conn, "p7_sales", P7_SALES_COLUMNS)
+        geography_df = read_p7_table(conn, "p7_geography", ["geo_id", "region"])
+        products_df = read_p7_table(conn, "p7_products", ["product_id", "category", "sub_category"])
+        salesreps_df = read_p7_table(conn, "p7_salesreps", ["region", "sales_rep_name"])
+        returns_df = read_p7_table(conn, "p7_returns", ["order_id", "returned"])
+        conn.close()
+
+        sales_df["sales"] = parse_currency(sales_df["sales"])
+        sales_df["profit"] = parse_currency(sales_df["profit"])
+
+        # Hash semi-join: one hash set of returned order IDs, probed once per line
+        returned_orders = returns_df.loc[returns_df["returned"].str.strip().str.lower() == "yes", "order_id"].unique()
+        sales_df["returned"] = sales_df["sale_id"].isin(returned_orders)
+
+        # Hash joins to the small dimension tables
+        sales_df = sales_df.merge(geography_df, on="geo_id", how="left", validate="many_to_one")
+        sales_df = sales_df.merge(products_df, on="product_id", how="left", validate="many_to_one")
+        salesreps_df = salesreps_df.rename(columns={"sales_rep_name": "sales_rep"})
+        sales_df = sales_df.merge(salesreps_df, on="region", how="left", validate="many_to_one")
+
+        logger.info(
+            f"Returns data successfully loaded from {DB_PATH}: "
+            f"{len(sales_df)} lines, {sales_df['returned'].sum()} on returned orders."
+        )
+        return sales_df
+    except Exception as e:
+        logger.error(f"Error loading returns data from data warehouse: {e}")
+        raise
+
+
+def create_returns_cube(sales_df: pd.DataFrame, dimensions: list) -> pd.DataFrame:
+    """
+    Create the returns-rate cube.
+
+    Args:
+        sales_df (pd.DataFrame): Sale lines with a boolean returned column.
+        dimensions (list): List of column names to group by.
+
+    Returns:
+        pd.DataFrame: The returns cube.
+    """
+    try:
+        returned = sales_df["returned"]
+        facts = sales_df.assign(
+            returned_line=returned.astype("int64"),
+            returned_order_id=sales_df["sale_id"].where(returned),
+            returned_sales=sales_df["sales"].where(returned, 0.0),
+            returned_profit=sales_df["profit"].where(returned, 0.0),
+        )
+
+        cube = (
+            facts.groupby(dimensions)
+            .agg(
+                line_count=("row_id", "count"),
+                returned_line_count=("returned_line", "sum"),
+                order_count=("sale_id", "nunique"),
+                returned_order_count=("returned_order_id", "nunique"),
+                sales_sum=("sales", "sum"),
+                returned_sales_sum=("returned_sales", "sum"),
+                profit_sum=("profit", "sum"),
+                returned_profit_sum=("returned_profit", "sum"),
+            )
+            .reset_index()
+        )
+        cube["order_return_rate"] = cube["returned_order_count"] / cube["order_count"]
+        cube["sales_return_rate"] = (cube["returned_sales_sum"] / cube["sales_sum"]).fillna(0.0)
+
+        logger.info(f"Returns cube created with dimensions: {dimensions} ({len(cube)} cells)")
+        return cube
+    except Exception as e:
+        logger.error(f"Error creating returns cube: {e}")
+        raise
+
+
+def build_returns_cube(dimensions: list) -> pd.DataFrame:
+    """Ingest the p7 data and create the returns cube."""
+    sales_df = ingest_returns_data_from_dw()
+    return create_returns_cube(sales_df, dimensions)
+
+
+def main():
+    """Main function for returns OLAP cubing."""
+    logger.info("Starting returns OLAP Cubing process...")
+
+    # Step 1: Define dimensions for the cube
+    dimensions = ["region", "sales_rep", "category", "sub_category", "segment", "ship_mode"]
+
+    # Step 2: Create the cube, or reuse the cached cube if the data warehouse has not changed
+    definition = {
+        "name": "multidimensional_olap_returns_cube",
+        "dimensions": dimensions,
+        "metrics": "returns",
+        "filters": None,
+    }
+    returns_cube = CubeCache().get_or_build(
+        DB_PATH, definition, lambda: build_returns_cube(dimensions)
+    )
+
+    # Step 3: Save the cube to a CSV file
+    write_cube_to_csv(returns_cube, "multidimensional_olap_returns_cube.csv")
+
+    logger.info("Returns OLAP Cubing process completed successfully.")
+    logger.info(f"Please see outputs in {OLAP_OUTPUT_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Module 6: OLAP Cubing Script for the Time Hierarchy
+File: olap/olap_cubing_time.py
+
+This script builds one cube per level of the time hierarchy
+
+    Year > Quarter > Month > Week > Day
+
+in a single pass over the sale fact table (see cube_time.py), and saves
+each level as its own CSV file:
+
+    multidimensional_olap_time_year_cube.csv
+    multidimensional_olap_time_quarter_cube.csv
+    multidimensional_olap_time_month_cube.csv
+    multidimensional_olap_time_week_cube.csv
+    multidimensional_olap_time_day_cube.csv
+
+Unlike multidimensional_olap_month_cube.csv, every level keeps its full
+time path, so January 2023 and January 2024 stay separate.
+Goal scripts can drill from Year down to Day by loading the next level's
+file (or by slicing the Day file with CubeQuery) without touching the
+fact table.
+
+Example Quarter-level cube:
+Year,Quarter,product_id,sale_amount_usd_sum,sale_amount_usd_mean,sale_id_count,sale_ids
+2024,1,101,27759.20,3084.36,9,"[555, 557, ...]"
+etc.
+"""
+
+import pandas as pd
+import pathlib
+import sys
+
+# Add project root to sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+from utils.instrumentation import instrument, metrics_run  # noqa: E402
+from olap.cube_cache import CubeCache  # noqa: E402
+from olap.cube_time import TIME_HIERARCHY, create_time_hierarchy_cubes  # noqa: E402
+from olap.olap_cubing import (  # noqa: E402
+    DB_PATH,
+    OLAP_OUTPUT_DIR,
+    ingest_sales_data_from_dw,
+    write_cube_to_csv,
+)
+
+
+# Non-time dimensions and metrics for every level (also used by scripts/fused_pipeline.py)
+CUBE_DIMENSIONS: list = ["product_id"]
+CUBE_METRICS: dict = {
+    "sale_amount_usd": ["sum", "mean"],
+    "sale_id": "count"
+}
+
+# Fact population (see POPULATION_JOINS in cube_sql.py): every sale row
+CUBE_POPULATION: str = "sale"
+
+
+def time_cube_filename(level: str) -> str:
+    """Return the CSV file name for one time hierarchy level."""
+    return f"multidimensional_olap_time_{level.lower()}_cube.csv"
+
+
+@instrument
+def build_time_cubes(dimensions: list, metrics: dict, sales_df: pd.DataFrame = None) -> dict:
+    """Ingest sales data (unless given) and build every level of the time hierarchy."""
+    if sales_df is None:
+        sales_df = ingest_sales_data_from_dw()
+    return create_time_hierarchy_cubes(sales_df, dimensions, metrics)
+
+
+def main():
+    """Main function for time hierarchy OLAP cubing."""
+    logger.info("Starting time hierarchy OLAP Cubing process...")
+
+    # Step 1: Define the non-time dimensions and the metrics for every level
+    dimensions = CUBE_DIMENSIONS
+    metrics = CUBE_METRICS
+
+    # Step 2: Build all levels, or reuse the cached levels if the data warehouse has not changed
+    definition = {
+        "name": "multidimensional_olap_time_cubes",
+        "hierarchy": TIME_HIERARCHY,
+        "dimensions": dimensions,
+        "metrics": metrics,
+        "filters": None,
+        "population": CUBE_POPULATION,
+    }
+    cubes = CubeCache().get_or_build(
+        DB_PATH, definition, lambda: build_time_cubes(dimensions, metrics)
+    )
+
+    # Step 3: Save one CSV file per level
+    for level, cube in cubes.items():
+        write_cube_to_csv(cube, time_cube_filename(level))
+
+    logger.info("Time hierarchy OLAP Cubing process completed successfully.")
+    logger.info(f"Please see outputs in {OLAP_OUTPUT_DIR}")
+
+
+if __name__ == "__main__":
+    with metrics_run("olap_cubing_time"):
+        main()
@@ -0,0 +1,195 @@
+"""
+Module 6: OLAP Goal Runner (answers every goal in one process)
+File: olap/olap_goal_runner.py
+
+Each olap_goal_*.py script answers one business goal on its own: it starts
+a new interpreter, reloads a cube CSV and blocks on the chart window. This
+runner answers all of them in one pass:
+
+1. Plan every goal's query with the GoalPlanner (goal_planner.py), which
+   picks the smallest cube that covers it, or SQL pushdown.
+2. Look up every goal in the GoalResultStore (goal_results.py) by goal
+   id, parameters and the version of its planned source. A stored answer
+   is reused as is.
+3. Answer the missed goals' queries. The planner loads each cube file once
+   and shares it (two goals answered from multidimensional_olap_cube.csv
+   share one load). When every goal hits, no cube is loaded at all.
+4. Save every result table to data/results/goal_<goal_id>.csv.
+5. Render every goal's charts together with chart_renderer.render_charts():
+   headless, in a process pool, skipping charts whose data is unchanged.
+
+Goals are pluggable: a goal is a query (measures, group_by, filters) and a
+function that takes the query's answer (plus keyword parameters) and
+returns its result table and a list of chart specs. Register it with the
+register_goal() decorator, with its default parameters.
+
+    @register_goal("top_product_by_month", top_month_goal.GOAL_QUERY, n=1)
+    def top_product_by_month_goal(sales: pd.DataFrame, n: int) -> tuple:
+        ...
+        return top_products, [top_month_goal.chart_sales_by_month_and_product(sales)]
+
+Run all goals:
+    python olap/olap_goal_runner.py
+
+Run some goals:
+    python olap/olap_goal_runner.py sales_by_day top_product_by_month
+"""
+
+import pathlib
+import sys
+
+import matplotlib
+
+# The runner never opens chart windows
+matplotlib.use("Agg")
+
+import pandas as pd  # noqa: E402
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+from utils.instrumentation import measure, metrics_run  # noqa: E402
+from olap.chart_renderer import render_charts  # noqa: E402
+from olap.goal_planner import GoalPlanner  # noqa: E402
+from olap.goal_results import GoalResultStore  # noqa: E402
+from olap import olap_goal_sales_by_day as day_goal  # noqa: E402
+from olap import olap_goal_sales_by_region as region_goal  # noqa: E402
+from olap import olap_goal_top_product_by_day as top_day_goal  # noqa: E402
+from olap import olap_goal_top_product_by_month as top_month_goal  # noqa: E402
+
+# Constants
+RESULTS_OUTPUT_DIR: pathlib.Path = pathlib.Path("data").joinpath("results")
+
+# Registered goals: goal_id -> {"query": goal query, "function": goal function, "params": defaults}
+GOALS: dict = {}
+
+
+def register_goal(goal_id: str, query: dict, **params):
+    """
+    Decorator that registers a goal function under goal_id.
+
+    Args:
+        goal_id (str): Unique goal name, used on the command line and in output file names.
+        query (dict): The goal's measures, group_by and optional filters.
+        **params: Default keyword parameters passed to the goal function.
+    """
+    def decorator(function):
+        if goal_id in GOALS:
+            raise ValueError(f"Goal {goal_id!r} is already registered")
+        GOALS[goal_id] = {"query": query, "function": function, "params": params}
+        return function
+    return decorator
+
+
+@register_goal("sales_by_day", day_goal.GOAL_QUERY)
+def sales_by_day_goal(sales: pd.DataFrame) -> tuple:
+    """Total sales by day of the week, lowest first."""
+    sales_by_weekday = day_goal.analyze_sales_by_weekday(sales)
+    day_goal.identify_least_profitable_day(sales_by_weekday)
+    return sales_by_weekday, [day_goal.chart_sales_by_weekday(sales_by_weekday)]
+
+
+@register_goal("sales_by_region", region_goal.GOAL_QUERY)
+def sales_by_region_goal(sales: pd.DataFrame) -> tuple:
+    """Total sales by region, lowest first."""
+    sales_by_region = region_goal.analyze_sales_by_region(sales)
+    region_goal.identify_least_profitable_region(sales_by_region)
+    return sales_by_region, [region_goal.chart_sales_by_region(sales_by_region)]
+
+
+@register_goal("top_product_by_day", top_day_goal.GOAL_QUERY, n=1)
+def top_product_by_day_goal(sales: pd.DataFrame, n: int) -> tuple:
+    """Best-selling n products for each day of the week."""
+    top_products = top_day_goal.analyze_top_product_by_weekday(sales, n=n)
+    return top_products, [top_day_goal.chart_sales_by_weekday_and_product(sales)]
+
+
+@register_goal("top_product_by_month", top_month_goal.GOAL_QUERY, n=1)
+def top_product_by_month_goal(sales: pd.DataFrame, n: int) -> tuple:
+    """Best-selling n products for each month."""
+    top_products = top_month_goal.analyze_top_product_by_month(sales, n=n)
+    return top_products, [top_month_goal.chart_sales_by_month_and_product(sales)]
+
+
+def run_goals(
+    goal_ids: list = None,
+    params: dict = None,
+    store: GoalResultStore = None,
+    planner: GoalPlanner = None,
+    max_workers: int = None,
+) -> dict:
+    """
+    Answer goals from stored results or their planned sources, and save their results and charts.
+
+    Args:
+        goal_ids (list): Goals to run, in order. Defaults to every registered goal.
+        params (dict): goal_id -> parameters that override the goal's defaults.
+        store (GoalResultStore): Memo of goal results. Defaults to the on-disk store.
+        planner (GoalPlanner): Chooses and loads the goals' sources. Defaults to a new planner.
+        max_workers (int): Chart rendering process pool size. Defaults to one per CPU.
+
+    Returns:
+        dict: goal_id -> result DataFrame.
+    """
+    goal_ids = list(GOALS) if goal_ids is None else list(goal_ids)
+    unknown = [goal_id for goal_id in goal_ids if goal_id not in GOALS]
+    if unknown:
+        raise KeyError(f"Unknown goal(s) {unknown}; expected some of {list(GOALS)}")
+    params = params or {}
+    store = store if store is not None else GoalResultStore()
+    planner = planner if planner is not None else GoalPlanner()
+
+    RESULTS_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+
+    results = {}
+    charts = []
+    for goal_id in goal_ids:
+        goal = GOALS[goal_id]
+        goal_params = {**goal["params"], **params.get(goal_id, {})}
+        try:
+            with measure(f"goal.{goal_id}") as record:
+                plan = planner.plan(goal["query"])
+                logger.info(f"Goal {goal_id} planned: {plan['reason']}.")
+                result, goal_charts = store.get_or_compute(
+                    goal_id,
+                    goal_params,
+                    plan["version"],
+                    lambda: goal["function"](planner.answer(goal["query"], plan), **goal_params),
+                )
+                record["rows_out"] = len(result)
+            output_path = RESULTS_OUTPUT_DIR.joinpath(f"goal_{goal_id}.csv")
+            result.to_csv(output_path, index=False)
+            logger.info(f"Goal {goal_id} answered; result saved to {output_path}.")
+            results[goal_id] = result
+            charts.extend(goal_charts)
+        except Exception as e:
+            logger.error(f"Error running goal {goal_id}: {e}")
+            raise
+
+    logger.info(f"Answered {len(goal_ids)} goal(s); results store {store.stats()}.")
+
+    # Render every goal's charts in one pass
+    render_charts(charts, RESULTS_OUTPUT_DIR, max_workers)
+    return results
+
+
+def main():
+    """Main function for running the OLAP goals in one pass."""
+    logger.info("Starting OLAP goal runner...")
+
+    # Step 1: Select the goals (all registered goals unless named on the command line)
+    goal_ids = sys.argv[1:] or None
+
+    # Step 2: Plan and answer every goal (or reuse its stored result), save results and render charts
+    results = run_goals(goal_ids)
+
+    logger.info(f"OLAP goal runner completed {len(results)} goal(s) successfully.")
+    logger.info(f"Please see outputs in {RESULTS_OUTPUT_DIR}")
+
+
+if __name__ == "__main__":
+    with metrics_run("olap_goal_runner"):
+        main()
@@ -16,6 +16,11 @@ Group transactions by the day of the week.
 Sum SaleAmount for each day.
 Identify the day with the lowest total revenue.
 
+The goal is declared as GOAL_QUERY (measures, group-by dimensions,
+filters and fact population). olap/goal_planner.py answers it from the
+smallest cube of that population that covers it, or with a SQL query
+on the data warehouse if none does.
+
 This example assumes a cube data set with the following column names (yours will differ).
 DayOfWeek,product_id,customer_id,sale_amount_usd_sum,sale_amount_usd_mean,sale_id_count,sale_ids
 Friday,101,1001,6344.96,6344.96,1,[582]
@@ -23,7 +28,6 @@ etc.
 """
 
 import pandas as pd
-import matplotlib.pyplot as plt
 import pathlib
 import sys
 
@@ -33,35 +37,28 @@ if str(PROJECT_ROOT) not in sys.path:
     sys.path.append(str(PROJECT_ROOT))
 
 from utils.logger import logger  # noqa: E402
+from olap.goal_planner import GoalPlanner  # noqa: E402
+from olap.chart_renderer import render_charts, show_chart  # noqa: E402
 
 # Constants
-OLAP_OUTPUT_DIR: pathlib.Path = pathlib.Path("data").joinpath("olap_cubing_outputs")
-CUBED_FILE: pathlib.Path = OLAP_OUTPUT_DIR.joinpath("multidimensional_olap_cube.csv")
+# The goal as a query; the planner picks the cube (or SQL) that answers it
+GOAL_QUERY: dict = {
+    "measures": ["sale_amount_usd_sum"],
+    "group_by": ["DayOfWeek"],
+    "filters": None,
+    "population": "sale",
+}
 RESULTS_OUTPUT_DIR: pathlib.Path = pathlib.Path("data").joinpath("results")
 
 # Create output directory for results if it doesn't exist
 RESULTS_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
 
-def load_olap_cube(file_path: pathlib.Path) -> pd.DataFrame:
-    """Load the precomputed OLAP cube data."""
-    try:
-        cube_df = pd.read_csv(file_path)
-        logger.info(f"OLAP cube data successfully loaded from {file_path}.")
-        return cube_df
-    except Exception as e:
-        logger.error(f"Error loading OLAP cube data: {e}")
-        raise
-
-
-def analyze_sales_by_weekday(cube_df: pd.DataFrame) -> pd.DataFrame:
-    """Aggregate total sales by DayOfWeek."""
+def analyze_sales_by_weekday(sales: pd.DataFrame) -> pd.DataFrame:
+    """Total sales by DayOfWeek, from the answer to GOAL_QUERY."""
     try:
-        # Group by DayOfWeek and sum the sales
-        sales_by_weekday = (
-            cube_df.groupby("DayOfWeek")["sale_amount_usd_sum"].sum().reset_index()
-        )
-        sales_by_weekday.rename(columns={"sale_amount_usd_sum": "TotalSales"}, inplace=True)
+        # The planner has already rolled the sales up to DayOfWeek
+        sales_by_weekday = sales[["DayOfWeek", "sale_amount_usd_sum"]].rename(columns={"sale_amount_usd_sum": "TotalSales"})
         sales_by_weekday.sort_values(by="TotalSales", inplace=True)
         logger.info("Sales aggregated by DayOfWeek successfully.")
         return sales_by_weekday
@@ -83,26 +80,29 @@ def identify_least_profitable_day(sales_by_weekday: pd.DataFrame) -> str:
         raise
 
 
-def visualize_sales_by_weekday(sales_by_weekday: pd.DataFrame) -> None:
-    """Visualize total sales by day of the week."""
+def chart_sales_by_weekday(sales_by_weekday: pd.DataFrame) -> dict:
+    """Chart spec for total sales by day of the week."""
+    return {
+        "file_name": "sales_by_day_of_week.png",
+        "kind": "bar",
+        "data": sales_by_weekday[["DayOfWeek", "TotalSales"]],
+        "x": "DayOfWeek",
+        "y": "TotalSales",
+        "title": "Total Sales by Day of the Week",
+        "xlabel": "Day of the Week",
+        "ylabel": "Total Sales (USD)",
+    }
+
+
+def visualize_sales_by_weekday(sales_by_weekday: pd.DataFrame, show: bool = True) -> None:
+    """Visualize total sales by day of the week. Set show=False to save the chart without opening a window."""
     try:
-        plt.figure(figsize=(10, 6))
-        plt.bar(
-            sales_by_weekday["DayOfWeek"],
-            sales_by_weekday["TotalSales"],
-            color="skyblue",
-        )
-        plt.title("Total Sales by Day of the Week", fontsize=16)
-        plt.xlabel("Day of the Week", fontsize=12)
-        plt.ylabel("Total Sales (USD)", fontsize=12)
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-
-        # Save the visualization
-        output_path = RESULTS_OUTPUT_DIR.joinpath("sales_by_day_of_week.png")
-        plt.savefig(output_path)
-        logger.info(f"Visualization saved to {output_path}.")
-        plt.show()
+        # Render headless (skipped if the aggregate is unchanged), then optionally show it
+        chart = chart_sales_by_weekday(sales_by_weekday)
+        render_charts([chart], RESULTS_OUTPUT_DIR)
+        logger.info(f"Visualization saved to {RESULTS_OUTPUT_DIR.joinpath(chart['file_name'])}.")
+        if show:
+            show_chart(chart)
     except Exception as e:
         logger.error(f"Error visualizing sales by day of the week: {e}")
         raise
@@ -112,11 +112,11 @@ def main():
     """Main function for analyzing and visualizing sales data."""
     logger.info("Starting SALES_LOW_REVENUE_DAYOFWEEK analysis...")
 
-    # Step 1: Load the precomputed OLAP cube
-    cube_df = load_olap_cube(CUBED_FILE)
+    # Step 1: Answer the goal query from the smallest cube that covers it
+    sales = GoalPlanner().answer(GOAL_QUERY)
 
     # Step 2: Analyze total sales by DayOfWeek
-    sales_by_weekday = analyze_sales_by_weekday(cube_df)
+    sales_by_weekday = analyze_sales_by_weekday(sales)
 
     # Step 3: Identify the least profitable day
     least_profitable_day = identify_least_profitable_day(sales_by_weekday)
@@ -16,6 +16,11 @@ Group transactions by region.
 Sum SaleAmount for each region.
 Identify the region with the lowest total revenue.
 
+The goal is declared as GOAL_QUERY (measures, group-by dimensions,
+filters and fact population). olap/goal_planner.py answers it from the
+smallest cube of that population that covers it, or with a SQL query
+on the data warehouse if none does.
+
 This example assumes a cube data set with the following column names (yours will differ).
 region,product_id,customer_id,sale_amount_usd_sum,sale_amount_usd_mean,sale_id_count,sale_ids
 East,101,1001,6344.96,6344.96,1,[582]
@@ -23,7 +28,6 @@ etc.
 """
 
 import pandas as pd
-import matplotlib.pyplot as plt
 import pathlib
 import sys
 
@@ -33,35 +37,28 @@ if str(PROJECT_ROOT) not in sys.path:
     sys.path.append(str(PROJECT_ROOT))
 
 from utils.logger import logger  # noqa: E402
+from olap.goal_planner import GoalPlanner  # noqa: E402
+from olap.chart_renderer import render_charts, show_chart  # noqa: E402
 
 # Constants
-OLAP_OUTPUT_DIR: pathlib.Path = pathlib.Path("data").joinpath("olap_cubing_outputs")
-CUBED_FILE: pathlib.Path = OLAP_OUTPUT_DIR.joinpath("multidimensional_olap_region_cube.csv")
+# The goal as a query; the planner picks the cube (or SQL) that answers it
+GOAL_QUERY: dict = {
+    "measures": ["sale_amount_usd_sum"],
+    "group_by": ["region"],
+    "filters": None,
+    "population": "sale+product+customer",
+}
 RESULTS_OUTPUT_DIR: pathlib.Path = pathlib.Path("data").joinpath("results")
 
 # Create output directory for results if it doesn't exist
 RESULTS_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
 
-def load_olap_cube(file_path: pathlib.Path) -> pd.DataFrame:
-    """Load the precomputed OLAP cube data."""
-    try:
-        cube_df = pd.read_csv(file_path)
-        logger.info(f"OLAP cube data successfully loaded from {file_path}.")
-        return cube_df
-    except Exception as e:
-        logger.error(f"Error loading OLAP cube data: {e}")
-        raise
-
-
-def analyze_sales_by_region(cube_df: pd.DataFrame) -> pd.DataFrame:
-    """Aggregate total sales by region."""
+def analyze_sales_by_region(sales: pd.DataFrame) -> pd.DataFrame:
+    """Total sales by region, from the answer to GOAL_QUERY."""
     try:
-        # Group by region and sum the sales
-        sales_by_region = (
-            cube_df.groupby("region")["sale_amount_usd_sum"].sum().reset_index()
-        )
-        sales_by_region.rename(columns={"sale_amount_usd_sum": "TotalSales"}, inplace=True)
+        # The planner has already rolled the sales up to region
+        sales_by_region = sales[["region", "sale_amount_usd_sum"]].rename(columns={"sale_amount_usd_sum": "TotalSales"})
         sales_by_region.sort_values(by="TotalSales", inplace=True)
         logger.info("Sales aggregated by Region successfully.")
         return sales_by_region
@@ -83,26 +80,29 @@ def identify_least_profitable_region(sales_by_region: pd.DataFrame) -> str:
         raise
 
 
-def visualize_sales_by_region(sales_by_region: pd.DataFrame) -> None:
-    """Visualize total sales by region."""
+def chart_sales_by_region(sales_by_region: pd.DataFrame) -> dict:
+    """Chart spec for total sales by region."""
+    return {
+        "file_name": "sales_by_region.png",
+        "kind": "bar",
+        "data": sales_by_region[["region", "TotalSales"]],
+        "x": "region",
+        "y": "TotalSales",
+        "title": "Total Sales by region",
+        "xlabel": "Region",
+        "ylabel": "Total Sales (USD)",
+    }
+
+
+def visualize_sales_by_region(sales_by_region: pd.DataFrame, show: bool = True) -> None:
+    """Visualize total sales by region. Set show=False to save the chart without opening a window."""
     try:
-        plt.figure(figsize=(10, 6))
-        plt.bar(
-            sales_by_region["region"],
-            sales_by_region["TotalSales"],
-            color="skyblue",
-        )
-        plt.title("Total Sales by region", fontsize=16)
-        plt.xlabel("Region", fontsize=12)
-        plt.ylabel("Total Sales (USD)", fontsize=12)
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-
-        # Save the visualization
-        output_path = RESULTS_OUTPUT_DIR.joinpath("sales_by_region.png")
-        plt.savefig(output_path)
-        logger.info(f"Visualization saved to {output_path}.")
-        plt.show()
+        # Render headless (skipped if the aggregate is unchanged), then optionally show it
+        chart = chart_sales_by_region(sales_by_region)
+        render_charts([chart], RESULTS_OUTPUT_DIR)
+        logger.info(f"Visualization saved to {RESULTS_OUTPUT_DIR.joinpath(chart['file_name'])}.")
+        if show:
+            show_chart(chart)
     except Exception as e:
         logger.error(f"Error visualizing sales by region: {e}")
         raise
@@ -112,11 +112,11 @@ def main():
     """Main function for analyzing and visualizing sales data."""
     logger.info("Starting SALES_LOW_REVENUE_REGION analysis...")
 
-    # Step 1: Load the precomputed OLAP cube
-    cube_df = load_olap_cube(CUBED_FILE)
+    # Step 1: Answer the goal query from the smallest cube that covers it
+    sales = GoalPlanner().answer(GOAL_QUERY)
 
     # Step 2: Analyze total sales by region
-    sales_by_region = analyze_sales_by_region(cube_df)
+    sales_by_region = analyze_sales_by_region(sales)
 
     # Step 3: Identify the least profitable region
     least_profitable_region = identify_least_profitable_region(sales_by_region)
@@ -16,12 +16,16 @@ Group transactions by the Month and product.
 Sum SaleAmount for each product each Month.
 Identify the top product for each Month based on total revenue.
 
+The goal is declared as GOAL_QUERY (measures, group-by dimensions,
+filters and fact population). olap/goal_planner.py answers it from the
+smallest cube of that population that covers it, or with a SQL query
+on the data warehouse if none does.
+
 month,product_id,customer_id,sale_amount_usd_sum,sale_amount_usd_mean,sale_id_count,sale_ids
 April,101,1001,6344.96,6344.96,1,[582]
 """
 
 import pandas as pd
-import matplotlib.pyplot as plt
 import pathlib
 import sys
 
@@ -31,36 +35,32 @@ if str(PROJECT_ROOT) not in sys.path:
     sys.path.append(str(PROJECT_ROOT))
 
 from utils.logger import logger  # noqa: E402
+from olap.goal_planner import GoalPlanner  # noqa: E402
+from olap.chart_renderer import render_charts, show_chart  # noqa: E402
+from olap.cube_topn import top_n_per_group  # noqa: E402
 
 # Constants
-OLAP_OUTPUT_DIR: pathlib.Path = pathlib.Path("data").joinpath("olap_cubing_outputs")
-CUBED_FILE: pathlib.Path = OLAP_OUTPUT_DIR.joinpath("multidimensional_olap_month_cube.csv")
+# The goal as a query; the planner picks the cube (or SQL) that answers it
+GOAL_QUERY: dict = {
+    "measures": ["sale_amount_usd_sum"],
+    "group_by": ["Month", "product_id"],
+    "filters": None,
+    "population": "sale+product+customer",
+}
 RESULTS_OUTPUT_DIR: pathlib.Path = pathlib.Path("data").joinpath("results")
 
 # Create output directory for results if it doesn't exist
 RESULTS_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
 
-def load_olap_cube(file_path: pathlib.Path) -> pd.DataFrame:
-    """Load the precomputed OLAP cube data."""
-    try:
-        cube_df = pd.read_csv(file_path)
-        logger.info(f"OLAP cube data successfully loaded from {file_path}.")
-        return cube_df
-    except Exception as e:
-        logger.error(f"Error loading OLAP cube data: {e}")
-        raise
-
-
-def analyze_top_product_by_month(cube_df: pd.DataFrame) -> pd.DataFrame:
-    """Identify the product with the highest revenue for each month."""
+def analyze_top_product_by_month(sales: pd.DataFrame, n: int = 1) -> pd.DataFrame:
+    """Identify the n products with the highest revenue for each month."""
     try:
-        # Group by month and product_id, sum the sales
-        grouped = cube_df.groupby(["Month", "product_id"])["sale_amount_usd_sum"].sum().reset_index()
-        grouped.rename(columns={"sale_amount_usd_sum": "TotalSales"}, inplace=True)
+        # The planner has already rolled the sales up to Month and product_id
+        grouped = sales[["Month", "product_id", "sale_amount_usd_sum"]].rename(columns={"sale_amount_usd_sum": "TotalSales"})
 
-        # Sort within each day to find the top product
-        top_products = grouped.sort_values(["Month", "TotalSales"], ascending=[True, False]).groupby("Month").head(1)
+        # Pick the top n products of each month by grouped selection (no full sort)
+        top_products = top_n_per_group(grouped, ["Month"], "TotalSales", n=n)
         logger.info("Top products identified for each month.")
         return top_products
     except Exception as e:
@@ -68,38 +68,34 @@ def analyze_top_product_by_month(cube_df: pd.DataFrame) -> pd.DataFrame:
         raise
 
 
-def visualize_sales_by_month_and_product(cube_df: pd.DataFrame) -> None:
-    """Visualize total sales by month, broken down by product."""
+def chart_sales_by_month_and_product(sales: pd.DataFrame) -> dict:
+    """Chart spec for total sales by month, stacked by product."""
+    # Pivot the data to organize sales by Month and ProductID
+    sales_pivot = sales.pivot(
+        index="Month",
+        columns="product_id",
+        values="sale_amount_usd_sum",
+    ).fillna(0)
+    return {
+        "file_name": "sales_by_month_and_product.png",
+        "kind": "stacked_bar",
+        "data": sales_pivot,
+        "title": "Total Sales by Month and Product",
+        "xlabel": "Month",
+        "ylabel": "Total Sales (USD)",
+        "legend_title": "Product ID",
+    }
+
+
+def visualize_sales_by_month_and_product(sales: pd.DataFrame, show: bool = True) -> None:
+    """Visualize total sales by month, broken down by product. Set show=False to save the chart without opening a window."""
     try:
-        # Pivot the data to organize sales by Month and ProductID
-        sales_pivot = cube_df.pivot_table(
-            index="Month",
-            columns="product_id",
-            values="sale_amount_usd_sum",
-            aggfunc="sum",
-            fill_value=0
-        )
-
-        # Plot the stacked bar chart
-        sales_pivot.plot(
-            kind="bar",
-            stacked=True,
-            figsize=(12, 8),
-            colormap="tab10"
-        )
-
-        plt.title("Total Sales by Month and Product", fontsize=16)
-        plt.xlabel("Month", fontsize=12)
-        plt.ylabel("Total Sales (USD)", fontsize=12)
-        plt.xticks(rotation=45)
-        plt.legend(title="Product ID", bbox_to_anchor=(1.05, 1), loc="upper left")
-        plt.tight_layout()
-
-        # Save the visualization
-        output_path = RESULTS_OUTPUT_DIR.joinpath("sales_by_month_and_product.png")
-        plt.savefig(output_path)
-        logger.info(f"Stacked bar chart saved to {output_path}.")
-        plt.show()
+        # Render headless (skipped if the aggregate is unchanged), then optionally show it
+        chart = chart_sales_by_month_and_product(sales)
+        render_charts([chart], RESULTS_OUTPUT_DIR)
+        logger.info(f"Stacked bar chart saved to {RESULTS_OUTPUT_DIR.joinpath(chart['file_name'])}.")
+        if show:
+            show_chart(chart)
     except Exception as e:
         logger.error(f"Error visualizing sales by month and product: {e}")
         raise
@@ -109,17 +105,17 @@ def main():
     """Main function for analyzing and visualizing top product sales by month."""
     logger.info("Starting SALES_TOP_PRODUCT_BY_MONTH analysis...")
 
-    # Step 1: Load the precomputed OLAP cube
-    cube_df = load_olap_cube(CUBED_FILE)
+    # Step 1: Answer the goal query from the smallest cube that covers it
+    sales = GoalPlanner().answer(GOAL_QUERY)
 
     # Step 2: Analyze top products by Month
-    top_products = analyze_top_product_by_month(cube_df)
+    top_products = analyze_top_product_by_month(sales)
     logger.info("Top products by month analysis completed.")
     logger.debug("Top products by month:\n%s", top_products)
     print(top_products)
 
     # Step 3: Visualize the results
-    visualize_sales_by_month_and_product(cube_df)
+    visualize_sales_by_month_and_product(sales)
     logger.info("Analysis and visualization completed successfully.")
 
 
@@ -37,23 +37,27 @@ if str(PROJECT_ROOT) not in sys.path:
 # Now we can import local modules
 from utils.logger import logger  # noqa: E402
 from scripts.data_scrubber import DataScrubber  # noqa: E402
+from utils.instrumentation import instrument, metrics_run  # noqa: E402
 
 # Constants
 DATA_DIR: pathlib.Path = PROJECT_ROOT.joinpath("data")
 RAW_DATA_DIR: pathlib.Path = DATA_DIR.joinpath("raw")
 PREPARED_DATA_DIR: pathlib.Path = DATA_DIR.joinpath("prepared")
 
+@instrument
 def read_raw_data(file_name: str) -> pd.DataFrame:
     """Read raw data from CSV."""
     file_path: pathlib.Path = RAW_DATA_DIR.joinpath(file_name)
     return pd.read_csv(file_path)
 
+@instrument
 def save_prepared_data(df: pd.DataFrame, file_name: str) -> None:
     """Save cleaned data to CSV."""
     file_path: pathlib.Path = PREPARED_DATA_DIR.joinpath(file_name)
     df.to_csv(file_path, index=False)
     logger.info(f"Data saved to {file_path}")
 
+@instrument
 def clean_p7_files() -> None:
     """Clean and prepare p7 CSV files."""
     logger.info("========================")
@@ -153,12 +157,9 @@ def clean_p7_files() -> None:
     logger.info("FINISHED P7 data prep")
     logger.info("======================")
 
-def main() -> None:
-    """Main function for pre-processing customer, product, and sales data."""
-    logger.info("======================")
-    logger.info("STARTING data_prep.py")
-    logger.info("======================")
-
+@instrument
+def prepare_customers() -> pd.DataFrame:
+    """Read and clean the raw customer data."""
     logger.info("========================")
     logger.info("Starting CUSTOMERS prep")
     logger.info("========================")
@@ -179,9 +180,11 @@ def main() -> None:
     
     df_customers = scrubber_customers.handle_missing_data(fill_value="N/A")
     scrubber_customers.check_data_consistency_after_cleaning()
+    return df_customers
 
-    save_prepared_data(df_customers, "customers_data_prepared.csv")
-
+@instrument
+def prepare_products() -> pd.DataFrame:
+    """Read and clean the raw product data."""
     logger.info("========================")
     logger.info("Starting PRODUCTS prep")
     logger.info("========================")
@@ -199,8 +202,11 @@ def main() -> None:
     scrubber_products.inspect_data()
 
     scrubber_products.check_data_consistency_after_cleaning()
-    save_prepared_data(df_products, "products_data_prepared.csv")
+    return df_products
 
+@instrument
+def prepare_sales() -> pd.DataFrame:
+    """Read and clean the raw sales data."""
     logger.info("========================")
     logger.info("Starting SALES prep")
     logger.info("========================")
@@ -220,13 +226,23 @@ def main() -> None:
     
     df_sales = scrubber_sales.handle_missing_data(fill_value="Unknown")
     scrubber_sales.check_data_consistency_after_cleaning()
+    return df_sales
+
+def main() -> None:
+    """Main function for pre-processing customer, product, and sales data."""
+    logger.info("======================")
+    logger.info("STARTING data_prep.py")
+    logger.info("======================")
 
-    save_prepared_data(df_sales, "sales_data_prepared.csv")
+    save_prepared_data(prepare_customers(), "customers_data_prepared.csv")
+    save_prepared_data(prepare_products(), "products_data_prepared.csv")
+    save_prepared_data(prepare_sales(), "sales_data_prepared.csv")
 
     logger.info("======================")
     logger.info("FINISHED data_prep.py")
     logger.info("======================")
 
 if __name__ == "__main__":
-    main()
-    clean_p7_files()
\ No newline at end of file
+    with metrics_run("data_prep"):
+        main()
+        clean_p7_files()
\ No newline at end of file
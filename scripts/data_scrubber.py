@@ -15,9 +15,18 @@ See the associated test script in the tests folder.
 """
 
 import io
+import pathlib
+import sys
 import pandas as pd
 from typing import Dict, Tuple, Union, List
 
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.instrumentation import instrument  # noqa: E402
+
 class DataScrubber:
     def __init__(self, df: pd.DataFrame):
         """
@@ -28,6 +37,7 @@ class DataScrubber:
         """
         self.df = df
 
+    @instrument
     def check_data_consistency_before_cleaning(self) -> Dict[str, Union[pd.Series, int]]:
         """
         Check data consistency before cleaning by calculating counts of null and duplicate entries.
@@ -39,6 +49,7 @@ class DataScrubber:
         duplicate_count = self.df.duplicated().sum()
         return {'null_counts': null_counts, 'duplicate_count': duplicate_count}
 
+    @instrument
     def check_data_consistency_after_cleaning(self) -> Dict[str, Union[pd.Series, int]]:
         """
         Check data consistency after cleaning to ensure there are no null or duplicate entries.
@@ -52,6 +63,7 @@ class DataScrubber:
         assert duplicate_count == 0, "Data still contains duplicate records after cleaning."
         return {'null_counts': null_counts, 'duplicate_count': duplicate_count}
 
+    @instrument
     def convert_column_to_new_data_type(self, column: str, new_type: type) -> pd.DataFrame:
         """
         Convert a specified column to a new data type.
@@ -72,6 +84,7 @@ class DataScrubber:
         except KeyError:
             raise ValueError(f"Column name '{column}' not found in the DataFrame.")
 
+    @instrument
     def drop_columns(self, columns: List[str]) -> pd.DataFrame:
         """
         Drop specified columns from the DataFrame.
@@ -91,6 +104,7 @@ class DataScrubber:
         self.df = self.df.drop(columns=columns)
         return self.df
 
+    @instrument
     def filter_column_outliers(self, column: str, lower_bound: Union[float, int], upper_bound: Union[float, int]) -> pd.DataFrame:
         """
         Filter outliers in a specified column based on lower and upper bounds.
@@ -112,6 +126,7 @@ class DataScrubber:
         except KeyError:
             raise ValueError(f"Column name '{column}' not found in the DataFrame.")
 
+    @instrument
     def format_column_strings_to_lower_and_trim(self, column: str) -> pd.DataFrame:
         """
         Format strings in a specified column by converting to lowercase and trimming whitespace.
@@ -131,6 +146,7 @@ class DataScrubber:
         except KeyError:
             raise ValueError(f"Column name '{column}' not found in the DataFrame.")
         
+    @instrument
     def format_column_strings_to_upper_and_trim(self, column: str) -> pd.DataFrame:
         """
         Format strings in a specified column by converting to uppercase and trimming whitespace.
@@ -152,6 +168,7 @@ class DataScrubber:
         except KeyError:
             raise ValueError(f"Column name '{column}' not found in the DataFrame.")
 
+    @instrument
     def handle_missing_data(self, drop: bool = False, fill_value: Union[None, float, int, str] = None) -> pd.DataFrame:
         """
         Handle missing data in the DataFrame.
@@ -169,6 +186,7 @@ class DataScrubber:
             self.df = self.df.fillna(fill_value)
         return self.df
 
+    @instrument
     def inspect_data(self) -> Tuple[str, str]:
         """
         Inspect the data by providing DataFrame information and summary statistics.
@@ -185,6 +203,7 @@ class DataScrubber:
         describe_str = self.df.describe().to_string()  # Convert DataFrame.describe() output to a string
         return info_str, describe_str
 
+    @instrument
     def parse_dates_to_add_standard_datetime(self, column: str) -> pd.DataFrame:
         """
         Parse a specified column as datetime format and add it as a new column named 'StandardDateTime'.
@@ -204,6 +223,7 @@ class DataScrubber:
         except KeyError:
             raise ValueError(f"Column name '{column}' not found in the DataFrame.")
 
+    @instrument
     def remove_duplicate_records(self) -> pd.DataFrame:
         """
         Remove duplicate rows from the DataFrame.
@@ -215,6 +235,7 @@ class DataScrubber:
         self.df = self.df.drop_duplicates()
         return self.df
 
+    @instrument
     def rename_columns(self, column_mapping: Dict[str, str]) -> pd.DataFrame:
         """
         Rename columns in the DataFrame based on a provided mapping.
@@ -236,6 +257,7 @@ class DataScrubber:
         self.df = self.df.rename(columns=column_mapping)
         return self.df
 
+    @instrument
     def reorder_columns(self, columns: List[str]) -> pd.DataFrame:
         """
         Reorder columns in the DataFrame based on the specified order.
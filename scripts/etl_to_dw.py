@@ -8,6 +8,9 @@ PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.append(str(PROJECT_ROOT))
 
+from utils.dw_version import bump_warehouse_version  # noqa: E402
+from utils.instrumentation import instrument, metrics_run  # noqa: E402
+
 # Constants
 DW_DIR = pathlib.Path("data").joinpath("dw")
 DB_PATH = DW_DIR.joinpath("smart_sales.db")
@@ -60,6 +63,7 @@ def delete_existing_records(cursor: sqlite3.Cursor) -> None:
     cursor.execute("DELETE FROM product")
     cursor.execute("DELETE FROM sale")
 
+@instrument
 def insert_customers(customers_df: pd.DataFrame, cursor: sqlite3.Cursor) -> None:
     """Insert customer data into the customer table."""
     # Keep only the columns that match the database schema
@@ -75,10 +79,12 @@ def insert_customers(customers_df: pd.DataFrame, cursor: sqlite3.Cursor) -> None
     # Insert data into the database
     customers_df.to_sql("customer", cursor.connection, if_exists="append", index=False)
 
+@instrument
 def insert_products(products_df: pd.DataFrame, cursor: sqlite3.Cursor) -> None:
     """Insert product data into the product table."""
     products_df.to_sql("product", cursor.connection, if_exists="append", index=False)
 
+@instrument
 def insert_sales(sales_df: pd.DataFrame, cursor: sqlite3.Cursor) -> None:
     """Insert sales data into the sales table."""
     # Normalize and validate payment_method values
@@ -93,20 +99,27 @@ def insert_sales(sales_df: pd.DataFrame, cursor: sqlite3.Cursor) -> None:
     sales_df.to_sql("sale", cursor.connection, if_exists="append", index=False)
 
 def load_data_to_db() -> None:
+    # Load prepared data using pandas
+    customers_df = pd.read_csv(PREPARED_DATA_DIR.joinpath("customers_data_prepared.csv"))
+    products_df = pd.read_csv(PREPARED_DATA_DIR.joinpath("products_data_prepared.csv"))
+    sales_df = pd.read_csv(PREPARED_DATA_DIR.joinpath("sales_data_prepared.csv"))
+    load_frames_to_db(customers_df, products_df, sales_df)
+
+@instrument
+def load_frames_to_db(
+    customers_df: pd.DataFrame, products_df: pd.DataFrame, sales_df: pd.DataFrame, db_path: pathlib.Path = DB_PATH
+) -> None:
+    """Replace the warehouse contents with prepared customer, product, and sales frames."""
+    conn = None
     try:
         # Connect to SQLite – will create the file if it doesn't exist
-        conn = sqlite3.connect(DB_PATH)
+        conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
 
         # Create schema and clear existing records
         create_schema(cursor)
         delete_existing_records(cursor)
 
-        # Load prepared data using pandas
-        customers_df = pd.read_csv(PREPARED_DATA_DIR.joinpath("customers_data_prepared.csv"))
-        products_df = pd.read_csv(PREPARED_DATA_DIR.joinpath("products_data_prepared.csv"))
-        sales_df = pd.read_csv(PREPARED_DATA_DIR.joinpath("sales_data_prepared.csv"))
-
         # Print unique payment methods
         print(sales_df['payment_method'].unique())
 
@@ -123,10 +136,14 @@ def load_data_to_db() -> None:
         insert_products(products_df, cursor)
         insert_sales(sales_df, cursor)
 
+        # Record that the warehouse has new data (invalidates cached cubes)
+        bump_warehouse_version(cursor)
+
         conn.commit()
     finally:
         if conn:
             conn.close()
 
 if __name__ == "__main__":
-    load_data_to_db()
\ No newline at end of file
+    with metrics_run("etl_to_dw"):
+        load_data_to_db()
\ No newline at end of file
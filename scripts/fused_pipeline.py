@@ -0,0 +1,205 @@
+"""
+Fused In-Memory Pipeline
+File: scripts/fused_pipeline.py
+
+Refreshes the smart_sales chain (data_prep -> etl_to_dw -> olap_cubing,
+olap_cubing_region, olap_cubing_month, olap_cubing_time) in one process,
+passing DataFrames between the steps instead of round-tripping through
+CSV files and SQLite:
+
+    raw CSV -> prepared frames ─┬─> warehouse load      (background)
+                                ├─> prepared CSV files  (background)
+                                └─> cubes ─> cube CSV files (background)
+
+- Prep hands its cleaned frames straight to the warehouse loader and to
+  the cube builders; the sale facts are never re-read from disk.
+- Frames are shared, not copied: each consumer gets a shallow copy (see
+  share()), which under pandas copy-on-write reuses the column buffers and
+  only copies a column if a consumer writes to it. The product/customer
+  join needed by the month and region cubes is done once for both.
+- The on-disk artifacts (prepared CSVs, the warehouse tables and the cube
+  CSVs) are still written, for auditability and for the goal scripts, but
+  on background threads while the cubes are being built. Each CSV is
+  written to a temporary file and renamed, so readers never see half a file.
+
+The outputs match the file-based scripts: the warehouse gets the same rows
+(dates are stored as the same text the prepared CSV holds) and the cube
+CSVs are identical. The p7 chain is not part of this mode; use
+scripts/run_pipeline.py for it.
+
+Run:
+    python scripts/fused_pipeline.py
+"""
+
+import os
+import pathlib
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+from utils.instrumentation import measure, metrics_run  # noqa: E402
+from scripts.data_prep import PREPARED_DATA_DIR, prepare_customers, prepare_products, prepare_sales  # noqa: E402
+from scripts.etl_to_dw import DB_PATH, load_frames_to_db  # noqa: E402
+from olap import olap_cubing, olap_cubing_month, olap_cubing_region, olap_cubing_time  # noqa: E402
+
+# Constants
+BACKGROUND_WRITERS: int = 2
+
+
+def share(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Return a frame that shares df's data but can be changed independently.
+
+    With copy-on-write (the default from pandas 3.0) a shallow copy costs no
+    data copy; adding or replacing a column in it leaves df untouched.
+    """
+    return df.copy(deep=False)
+
+
+def warehouse_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Return df with datetime columns as the text the prepared CSV file would hold."""
+    dates = df.select_dtypes("datetime").columns
+    return df.assign(**{col: df[col].astype(str) for col in dates})
+
+
+def joined_facts(sales_df: pd.DataFrame, products_df: pd.DataFrame, customers_df: pd.DataFrame) -> pd.DataFrame:
+    """Return the sale facts with product category and customer region (inner joins, as in the warehouse query)."""
+    facts = sales_df[["sale_id", "customer_id", "product_id", "sale_date", "sale_amount_usd"]]
+    facts = facts.merge(products_df[["product_id", "category"]], on="product_id", how="inner")
+    return facts.merge(customers_df[["customer_id", "region"]], on="customer_id", how="inner")
+
+
+def write_csv_atomic(df: pd.DataFrame, file_path: pathlib.Path) -> pathlib.Path:
+    """Write a CSV file through a temporary file, so it is replaced in one step."""
+    file_path = pathlib.Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    handle, temp = tempfile.mkstemp(dir=file_path.parent, suffix=".tmp")
+    os.close(handle)
+    try:
+        df.to_csv(temp, index=False)
+        os.replace(temp, file_path)
+    except Exception:
+        pathlib.Path(temp).unlink(missing_ok=True)
+        raise
+    return file_path
+
+
+class BackgroundWriter:
+    """Run artifact writes on background threads and wait for them at the end."""
+
+    def __init__(self, workers: int = BACKGROUND_WRITERS):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="artifact-writer")
+        self.pending = []
+
+    def submit(self, description: str, func, *args) -> None:
+        """Queue one write; description names it in the log."""
+        self.pending.append((description, self.pool.submit(func, *args)))
+
+    def write_csv(self, df: pd.DataFrame, file_path: pathlib.Path) -> None:
+        """Queue a CSV file write. df must not be changed afterwards (pass a share())."""
+        self.submit(str(file_path), write_csv_atomic, df, file_path)
+
+    def wait(self) -> None:
+        """
+        Wait for every queued write.
+
+        Raises:
+            Exception: The first write error, after all writes have finished.
+        """
+        errors = []
+        for description, future in self.pending:
+            try:
+                future.result()
+                logger.info(f"Background write finished: {description}")
+            except Exception as e:
+                logger.error(f"Background write failed: {description}: {e}")
+                errors.append(e)
+        self.pending = []
+        self.pool.shutdown(wait=True)
+        if errors:
+            raise errors[0]
+
+
+def run_in_memory(
+    db_path: pathlib.Path = DB_PATH,
+    prepared_dir: pathlib.Path = PREPARED_DATA_DIR,
+    cube_dir: pathlib.Path = olap_cubing.OLAP_OUTPUT_DIR,
+) -> dict:
+    """
+    Prepare the raw data, load the warehouse and build the smart_sales cubes in one process.
+
+    Returns:
+        dict: Cube file name -> cube DataFrame.
+    """
+    start = time.perf_counter()
+    writer = BackgroundWriter()
+    cubes = {}
+    try:
+        # Step 1: Prepare the raw data in memory
+        with measure("fused_pipeline.prepare"):
+            customers_df = prepare_customers()
+            products_df = prepare_products()
+            sales_df = prepare_sales()
+        logger.info(f"Prepared frames ready in {time.perf_counter() - start:.2f}s.")
+
+        # Step 2: Write the prepared files and load the warehouse in the background
+        writer.write_csv(share(customers_df), pathlib.Path(prepared_dir).joinpath("customers_data_prepared.csv"))
+        writer.write_csv(share(products_df), pathlib.Path(prepared_dir).joinpath("products_data_prepared.csv"))
+        writer.write_csv(share(sales_df), pathlib.Path(prepared_dir).joinpath("sales_data_prepared.csv"))
+        writer.submit(
+            f"warehouse {db_path}",
+            load_frames_to_db,
+            share(customers_df),
+            share(products_df),
+            warehouse_frame(sales_df),
+            db_path,
+        )
+
+        # Step 3: Build the cubes from the same frames
+        with measure("fused_pipeline.cubes", rows_in=len(sales_df)):
+            cubes[olap_cubing.CUBE_FILE_NAME] = olap_cubing.build_cube(
+                olap_cubing.CUBE_DIMENSIONS, olap_cubing.CUBE_METRICS, sales_df=share(sales_df)
+            )
+            facts = joined_facts(sales_df, products_df, customers_df)
+            for module in (olap_cubing_region, olap_cubing_month):
+                cubes[module.CUBE_FILE_NAME] = module.build_cube(
+                    module.CUBE_DIMENSIONS, module.CUBE_METRICS, sales_df=share(facts)
+                )
+            time_cubes = olap_cubing_time.build_time_cubes(
+                olap_cubing_time.CUBE_DIMENSIONS, olap_cubing_time.CUBE_METRICS, sales_df=share(sales_df)
+            )
+            for level, cube in time_cubes.items():
+                cubes[olap_cubing_time.time_cube_filename(level)] = cube
+        logger.info(f"{len(cubes)} cubes built in memory after {time.perf_counter() - start:.2f}s.")
+
+        # Step 4: Write the cube files in the background
+        for file_name, cube in cubes.items():
+            writer.write_csv(cube, pathlib.Path(cube_dir).joinpath(file_name))
+    finally:
+        # Step 5: Wait for the background writes before returning
+        with measure("fused_pipeline.wait_for_writes"):
+            writer.wait()
+
+    logger.info(f"Fused pipeline finished in {time.perf_counter() - start:.2f}s (all files written).")
+    return cubes
+
+
+def main() -> None:
+    """Main function for the fused in-memory refresh."""
+    logger.info("Starting fused in-memory pipeline...")
+    run_in_memory()
+    logger.info(f"Please see outputs in {olap_cubing.OLAP_OUTPUT_DIR} and {DB_PATH}")
+
+
+if __name__ == "__main__":
+    with metrics_run("fused_pipeline"):
+        main()
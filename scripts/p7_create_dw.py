@@ -3,7 +3,12 @@ Module 4: Data Warehouse Creation Script
 File: scripts/dw_create.py
 
 This script handles the creation of the SQLite data warehouse. It creates tables
-for returns, salesrep, product, and sale in the 'data/store_returns.db' database.
+for returns, salesrep, product, geography, and sale in the 'data/store_returns.db' database.
+Sale locations (country, region, state, city, postal_code) are stored once in
+p7_geography, and each p7_sales row refers to its location by geo_id.
+CREATE TABLE IF NOT EXISTS keeps a table created by an older version of this
+script, so drop_outdated_p7_tables() drops any p7 table whose columns differ
+from the current DDL before the tables are created.
 Each table creation is handled in a separate function for easier testing and error handling.
 """
 
@@ -27,13 +32,14 @@ DB_PATH: pathlib.Path = DW_DIR.joinpath("store_returns.db")
 # Ensure the 'data/dw' directory exists
 DW_DIR.mkdir(parents=True, exist_ok=True)
 
-# Delete data warehouse file if it exists
-if DB_PATH.exists():
-    try:
-        DB_PATH.unlink()  # Deletes the file
-        logger.info(f"Existing database {DB_PATH} deleted.")
-    except Exception as e:
-        logger.error(f"Error deleting existing database {DB_PATH}: {e}")
+def delete_existing_dw() -> None:
+    """Delete the data warehouse file if it exists (p7_etl_to_dw.py imports this module, so this is not done on import)."""
+    if DB_PATH.exists():
+        try:
+            DB_PATH.unlink()  # Deletes the file
+            logger.info(f"Existing database {DB_PATH} deleted.")
+        except Exception as e:
+            logger.error(f"Error deleting existing database {DB_PATH}: {e}")
 
 def create_p7_product_table(cursor: sqlite3.Cursor) -> None:
     """Create p7_product table in the data warehouse."""
@@ -44,8 +50,7 @@ def create_p7_product_table(cursor: sqlite3.Cursor) -> None:
                 category VARCHAR(50),
                 sub_category VARCHAR(50),
                 name VARCHAR(255),
-                cost DECIMAL(10, 2),
-                FOREIGN KEY (product_id) REFERENCES p7_sales(product_id)       
+                cost DECIMAL(10, 2)
             )
         """)
         logger.info("p7_product table created.")
@@ -63,35 +68,49 @@ def create_p7_sales_table(cursor: sqlite3.Cursor) -> None:
                 sale_date DATE NOT NULL,
                 ship_mode VARCHAR(50),
                 ship_date DATE,
+                lead_time_days SMALLINT,
                 customer_id VARCHAR(20) NOT NULL,
                 customer_name VARCHAR(100),
                 segment VARCHAR(50),
-                country VARCHAR(50),
-                city VARCHAR(50),
-                state VARCHAR(50),
-                postal_code VARCHAR(20),
-                region VARCHAR(50),
+                geo_id INTEGER NOT NULL,
                 quantity INTEGER NOT NULL,
                 discount DECIMAL(5, 2),
                 sales DECIMAL(10, 2),
                 profit DECIMAL(10, 2),
-                FOREIGN KEY (product_id) REFERENCES p7_products(product_id),       
-                FOREIGN KEY (sale_id) REFERENCES p7_returns(order_id),
-                FOREIGN KEY (region) REFERENCES p7_salereps(region)       
+                FOREIGN KEY (product_id) REFERENCES p7_products(product_id),
+                FOREIGN KEY (geo_id) REFERENCES p7_geography(geo_id)
             )
         """)
         logger.info("p7_sales table created.")
     except sqlite3.Error as e:
         logger.error(f"Error creating p7_sales table: {e}")
 
+def create_p7_geography_table(cursor: sqlite3.Cursor) -> None:
+    """Create p7_geography table (one row per distinct sale location) in the data warehouse."""
+    try:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS p7_geography (
+                geo_id INTEGER PRIMARY KEY,
+                country VARCHAR(50),
+                region VARCHAR(50),
+                state VARCHAR(50),
+                city VARCHAR(50),
+                postal_code VARCHAR(20),
+                UNIQUE (country, region, state, city, postal_code),
+                FOREIGN KEY (region) REFERENCES p7_salesreps(region)
+            )
+        """)
+        logger.info("p7_geography table created.")
+    except sqlite3.Error as e:
+        logger.error(f"Error creating p7_geography table: {e}")
+
 def create_p7_returns_table(cursor: sqlite3.Cursor) -> None:
     """Create p7_returns table in the data warehouse."""
     try:
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS p7_returns (
                 order_id VARCHAR(20) PRIMARY KEY NOT NULL,
-                returned VARCHAR(20) NOT NULL,
-                FOREIGN KEY (order_id) REFERENCES p7_sales(sale_id)
+                returned VARCHAR(20) NOT NULL
             )
         """)
         logger.info("p7_returns table created.")
@@ -104,26 +123,65 @@ def create_p7_salesreps_table(cursor: sqlite3.Cursor) -> None:
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS p7_salesreps (
                 region VARCHAR(50) PRIMARY KEY,
-                sales_rep_name VARCHAR(100) NOT NULL,
-                FOREIGN KEY (region) REFERENCES p7_sales(region)
+                sales_rep_name VARCHAR(100) NOT NULL
             )
         """)
         logger.info("p7_salesreps table created.")
     except sqlite3.Error as e:
         logger.error(f"Error creating p7_salesreps table: {e}")
 
+# Table creators in the order the tables are created (referenced tables first)
+P7_TABLE_CREATORS: dict = {
+    "p7_salesreps": create_p7_salesreps_table,
+    "p7_products": create_p7_product_table,
+    "p7_geography": create_p7_geography_table,
+    "p7_sales": create_p7_sales_table,
+    "p7_returns": create_p7_returns_table,
+}
+
+def table_columns(cursor: sqlite3.Cursor, table_name: str) -> list:
+    """Return (name, type, not null, primary key) for each column of a table ([] if it does not exist)."""
+    return [(row[1], row[2], row[3], row[5]) for row in cursor.execute(f"PRAGMA table_info({table_name})")]
+
+def drop_outdated_p7_tables(cursor: sqlite3.Cursor) -> list:
+    """
+    Drop every existing p7 table whose columns differ from the current DDL.
+
+    The ETL reloads every p7 table, so a dropped table loses no data that
+    would have been kept. Returns the names of the dropped tables.
+    """
+    expected = sqlite3.connect(":memory:")
+    try:
+        expected_cursor = expected.cursor()
+        for create in P7_TABLE_CREATORS.values():
+            create(expected_cursor)
+        dropped = []
+        # Drop referencing tables first
+        for table_name in reversed(P7_TABLE_CREATORS):
+            current = table_columns(cursor, table_name)
+            if current and current != table_columns(expected_cursor, table_name):
+                cursor.execute(f"DROP TABLE {table_name}")
+                logger.warning(f"{table_name} table does not match the current schema; dropped so it is recreated.")
+                dropped.append(table_name)
+        return dropped
+    finally:
+        expected.close()
+
+def create_p7_tables(cursor: sqlite3.Cursor) -> None:
+    """Create the p7 tables, first dropping any left over from an older schema."""
+    drop_outdated_p7_tables(cursor)
+    for create in P7_TABLE_CREATORS.values():
+        create(cursor)
+
 def create_dw() -> None:
-    """Create the data warehouse by creating returns, salesreps, product, and sale tables."""
+    """Create the data warehouse by creating returns, salesreps, product, geography, and sale tables."""
     try:
         # Connect to the SQLite database
         conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
 
         # Create tables
-        create_p7_product_table(cursor)
-        create_p7_sales_table(cursor)
-        create_p7_returns_table(cursor)
-        create_p7_salesreps_table(cursor)
+        create_p7_tables(cursor)
 
         # Commit the changes and close the connection
         conn.commit()
@@ -141,6 +199,7 @@ def create_dw() -> None:
 def main() -> None:
     """Main function to create the data warehouse."""
     logger.info("Starting data warehouse creation...")
+    delete_existing_dw()
     create_dw()
     logger.info("Data warehouse creation complete.")
 
@@ -10,22 +10,33 @@ if str(PROJECT_ROOT) not in sys.path:
     sys.path.append(str(PROJECT_ROOT))
 
 from utils.logger import logger
+from utils.dw_version import bump_warehouse_version
+from utils.instrumentation import instrument, metrics_run
+from scripts.p7_create_dw import create_p7_tables
 
 # Constants
 DW_DIR = pathlib.Path("data").joinpath("dw")
 DB_PATH = DW_DIR.joinpath("store_returns.db")
 PREPARED_DATA_DIR = pathlib.Path("data").joinpath("prepared")
 
+# Location columns moved from p7_sales into the p7_geography dimension
+GEOGRAPHY_COLUMNS = ["country", "region", "state", "city", "postal_code"]
+
+# ship_date is recorded as month/day/year in the p7 sales file
+SHIP_DATE_FORMAT = "%m/%d/%Y"
+
 def delete_existing_records(cursor: sqlite3.Cursor) -> None:
     """Delete all existing records from the p7_returns, p7_salesreps, p7_products, and p7_sales tables."""
     try:
         cursor.execute("DELETE FROM p7_returns")
+        cursor.execute("DELETE FROM p7_sales")
         cursor.execute("DELETE FROM p7_products")
+        cursor.execute("DELETE FROM p7_geography")
         cursor.execute("DELETE FROM p7_salesreps")
-        cursor.execute("DELETE FROM p7_sales")
         logger.info("Existing records deleted from all tables.")
     except sqlite3.Error as e:
         logger.error(f"Error deleting existing records: {e}")
+        raise
 
 def validate_csv_columns(df: pd.DataFrame, required_columns: list) -> bool:
     missing_columns = [col for col in required_columns if col not in df.columns]
@@ -88,112 +99,105 @@ def load_p7_salesreps(cursor: sqlite3.Cursor, file_path: str) -> None:
     except Exception as e:
         logger.error(f"Error loading data into p7_salesreps table: {e}")
 
+def insert_frame(df: pd.DataFrame, table_name: str, cursor: sqlite3.Cursor) -> None:
+    """
+    Insert the rows of a DataFrame into a table inside the caller's transaction.
+
+    DataFrame.to_sql() commits on a sqlite3 connection, which would make each
+    table's insert permanent even when a later step of the load fails.
+    """
+    columns = ", ".join(f'"{column}"' for column in df.columns)
+    placeholders = ", ".join("?" for _ in df.columns)
+    rows = df.astype(object).where(df.notna(), None).to_numpy().tolist()
+    cursor.executemany(f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})", rows)
+
+@instrument
 def insert_returns(df: pd.DataFrame, cursor: sqlite3.Cursor) -> None:
     """Insert data into the p7_returns table."""
     try:
-        df.to_sql('p7_returns', cursor.connection, if_exists='append', index=False)
+        insert_frame(df, 'p7_returns', cursor)
         logger.info("Data inserted into p7_returns table.")
     except Exception as e:
         logger.error(f"Error inserting data into p7_returns table: {e}")
+        raise
 
+@instrument
 def insert_products(df: pd.DataFrame, cursor: sqlite3.Cursor) -> None:
     """Insert data into the p7_products table."""
     try:
-        df.to_sql('p7_products', cursor.connection, if_exists='append', index=False)
+        insert_frame(df, 'p7_products', cursor)
         logger.info("Data inserted into p7_products table.")
     except Exception as e:
         logger.error(f"Error inserting data into p7_products table: {e}")
+        raise
 
+@instrument
 def insert_sales(df: pd.DataFrame, cursor: sqlite3.Cursor) -> None:
     """Insert data into the p7_sales table."""
     try:
-        df.to_sql('p7_sales', cursor.connection, if_exists='append', index=False)
+        insert_frame(df, 'p7_sales', cursor)
         logger.info("Data inserted into p7_sales table.")
     except Exception as e:
         logger.error(f"Error inserting data into p7_sales table: {e}")
+        raise
+
+def add_lead_time(sales_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add lead_time_days (ship_date - sale_date, in whole days) to the sales lines.
 
+    Computed once, vectorized, at load time and stored as a small integer
+    (missing when either date cannot be parsed).
+    """
+    sale_date = pd.to_datetime(sales_df["sale_date"], errors="coerce")
+    ship_date = pd.to_datetime(sales_df["ship_date"], format=SHIP_DATE_FORMAT, errors="coerce")
+    lead_time = (ship_date - sale_date).dt.days
+    sales_df = sales_df.assign(lead_time_days=lead_time.astype("Int16"))
+    logger.info(
+        f"Lead time added: mean {lead_time.mean():.2f} days, "
+        f"{lead_time.isna().sum()} lines without a valid sale_date/ship_date."
+    )
+    return sales_df
+
+def normalize_geography(sales_df: pd.DataFrame) -> tuple:
+    """
+    Move the repeated location strings of the sales lines into a geography dimension.
+
+    Each distinct (country, region, state, city, postal_code) gets one geo_id
+    (assigned in sorted order, so ids do not depend on row order), and the
+    sales lines keep only that integer key.
+
+    Returns:
+        tuple: (sales DataFrame with geo_id, geography DataFrame)
+    """
+    locations = sales_df[GEOGRAPHY_COLUMNS].astype({"postal_code": str})
+    codes, uniques = pd.MultiIndex.from_frame(locations).factorize(sort=True)
+    geography_df = uniques.to_frame(index=False, name=GEOGRAPHY_COLUMNS)
+    geography_df.insert(0, "geo_id", range(1, len(geography_df) + 1))
+    sales_df = sales_df.drop(columns=GEOGRAPHY_COLUMNS).assign(geo_id=codes + 1)
+    logger.info(f"Normalized {len(sales_df)} sale locations into {len(geography_df)} geography rows.")
+    return sales_df, geography_df
+
+@instrument
+def insert_geography(df: pd.DataFrame, cursor: sqlite3.Cursor) -> None:
+    """Insert data into the p7_geography table."""
+    try:
+        insert_frame(df, 'p7_geography', cursor)
+        logger.info("Data inserted into p7_geography table.")
+    except Exception as e:
+        logger.error(f"Error inserting data into p7_geography table: {e}")
+        raise
+
+@instrument
 def insert_salesreps(df: pd.DataFrame, cursor: sqlite3.Cursor) -> None:
     """Insert data into the p7_salesreps table."""
     try:
         # Rename the column to match the table schema
         df.rename(columns={"sales_rep": "sales_rep_name"}, inplace=True)
-        df.to_sql('p7_salesreps', cursor.connection, if_exists='append', index=False)
+        insert_frame(df, 'p7_salesreps', cursor)
         logger.info("Data inserted into p7_salesreps table.")
     except Exception as e:
         logger.error(f"Error inserting data into p7_salesreps table: {e}")
-
-def create_p7_product_table(cursor: sqlite3.Cursor) -> None:
-    """Create p7_products table in the data warehouse."""
-    try:
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS p7_products (
-                product_id VARCHAR(20) PRIMARY KEY,
-                category VARCHAR(50),
-                sub_category VARCHAR(50),
-                name VARCHAR(255),
-                cost DECIMAL(10, 2)
-            )
-        """)
-        logger.info("p7_products table created.")
-    except sqlite3.Error as e:
-        logger.error(f"Error creating p7_products table: {e}")
-
-def create_p7_sales_table(cursor: sqlite3.Cursor) -> None:
-    """Create p7_sales table in the data warehouse."""
-    try:
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS p7_sales (
-                row_id INTEGER PRIMARY KEY,
-                sale_id VARCHAR(20) NOT NULL,
-                product_id VARCHAR(20) NOT NULL,
-                sale_date DATE NOT NULL,
-                ship_mode VARCHAR(50),
-                ship_date DATE,
-                customer_id VARCHAR(20) NOT NULL,
-                customer_name VARCHAR(100),
-                segment VARCHAR(50),
-                country VARCHAR(50),
-                city VARCHAR(50),
-                state VARCHAR(50),
-                postal_code VARCHAR(20),
-                region VARCHAR(50),
-                quantity INTEGER NOT NULL,
-                discount DECIMAL(5, 2),
-                sales DECIMAL(10, 2),
-                profit DECIMAL(10, 2),
-                FOREIGN KEY (product_id) REFERENCES p7_products(product_id)
-            )
-        """)
-        logger.info("p7_sales table created.")
-    except sqlite3.Error as e:
-        logger.error(f"Error creating p7_sales table: {e}")
-
-def create_p7_returns_table(cursor: sqlite3.Cursor) -> None:
-    """Create p7_returns table in the data warehouse."""
-    try:
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS p7_returns (
-                order_id VARCHAR(20) PRIMARY KEY NOT NULL,
-                returned VARCHAR(20) NOT NULL,
-                FOREIGN KEY (order_id) REFERENCES p7_sales(sale_id)
-            )
-        """)
-        logger.info("p7_returns table created.")
-    except sqlite3.Error as e:
-        logger.error(f"Error creating p7_returns table: {e}")
-
-def create_p7_salesreps_table(cursor: sqlite3.Cursor) -> None:
-    """Create p7_salesreps table in the data warehouse."""
-    try:
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS p7_salesreps (
-                region VARCHAR(50) PRIMARY KEY,
-                sales_rep VARCHAR(100) NOT NULL
-            )
-        """)
-        logger.info("p7_salesreps table created.")
-    except sqlite3.Error as e:
-        logger.error(f"Error creating p7_salesreps table: {e}")
+        raise
 
 def create_dw() -> None:
     """Create the data warehouse by creating tables and loading data from CSV files."""
@@ -203,10 +207,7 @@ def create_dw() -> None:
         cursor = conn.cursor()
 
         # Create tables
-        create_p7_product_table(cursor)
-        create_p7_sales_table(cursor)
-        create_p7_returns_table(cursor)
-        create_p7_salesreps_table(cursor)
+        create_p7_tables(cursor)
 
         # Check for missing files
         if not os.path.exists("data/raw/p7_products.csv"):
@@ -232,16 +233,21 @@ def create_dw() -> None:
             conn.close()
 
 def load_data_to_db() -> None:
+    """
+    Replace the warehouse contents with the prepared p7 files in one transaction.
+
+    Tables left from an older schema are recreated first. If any step fails,
+    the transaction is rolled back (the previous contents and warehouse version
+    are kept) and the error is raised.
+    """
+    conn = None
     try:
         # Connect to SQLite – will create the file if it doesn't exist
         conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
 
-        # Create schema (create tables)
-        create_p7_product_table(cursor)
-        create_p7_sales_table(cursor)
-        create_p7_returns_table(cursor)
-        create_p7_salesreps_table(cursor)
+        # Create schema (create tables, recreating any with an outdated schema)
+        create_p7_tables(cursor)
 
         # Clear existing records
         delete_existing_records(cursor)
@@ -252,19 +258,33 @@ def load_data_to_db() -> None:
         sales_df = pd.read_csv(PREPARED_DATA_DIR.joinpath("p7_sales_data_prepared.csv"))
         salesreps_df = pd.read_csv(PREPARED_DATA_DIR.joinpath("p7_salesreps_data_prepared.csv"))
 
-        # Insert data into the database
-        insert_returns(returns_df, cursor)
+        # Derive the fulfillment lead time once, at load time
+        sales_df = add_lead_time(sales_df)
+
+        # Store each sale location once and keep only its geo_id on the sales lines
+        sales_df, geography_df = normalize_geography(sales_df)
+
+        # Insert data into the database (referenced tables first, so foreign keys can be enforced)
+        insert_salesreps(salesreps_df, cursor)
         insert_products(products_df, cursor)
+        insert_geography(geography_df, cursor)
         insert_sales(sales_df, cursor)
-        insert_salesreps(salesreps_df, cursor)
+        insert_returns(returns_df, cursor)
+
+        # Record that the warehouse has new data (invalidates cached cubes)
+        bump_warehouse_version(cursor)
 
         conn.commit()
         logger.info("Data loaded into the database successfully.")
     except Exception as e:
-        logger.error(f"Error loading data into the database: {e}")
+        if conn:
+            conn.rollback()
+        logger.error(f"Error loading data into the database (rolled back): {e}")
+        raise
     finally:
         if conn:
             conn.close()
 
 if __name__ == "__main__":
-    load_data_to_db()
\ No newline at end of file
+    with metrics_run("p7_etl_to_dw"):
+        load_data_to_db()
\ No newline at end of file
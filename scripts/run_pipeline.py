@@ -0,0 +1,457 @@
+"""
+Pipeline Orchestrator
+File: scripts/run_pipeline.py
+
+Runs the Smart Sales workflow as a DAG of stages instead of a manual
+sequence of scripts:
+
+    data_prep ──┬── etl_to_dw ──┬── cubes ──────────┐
+    create_dw ──┘               ├── cubes_region ───┤
+                                ├── cubes_month ────┼── goals
+                                └── cubes_time ─────┘
+    data_prep ──┬── p7_etl_to_dw ──┬── cubes_returns
+    p7_create_dw┘                  ├── cubes_geography
+                                   ├── cubes_product_hierarchy
+                                   └── cubes_lead_time
+
+Each stage in STAGES names a script plus the files it reads (inputs), the
+files it writes (outputs) and the stages it must follow (after).
+
+- Parallel: a stage starts as soon as every stage it follows has finished,
+  so the smart_sales and p7 chains, and the cube builds inside each chain,
+  run concurrently (up to --jobs stages at once, each in its own process).
+- Up-to-date checks: a stage's key is a hash of its script and the local
+  modules it imports, the contents of its input files, and the keys of the
+  stages it follows. A stage whose key matches the one recorded by its last
+  successful run, and whose outputs exist, is skipped.
+- Resume: the key of each stage is saved in data/pipeline_state.json as
+  soon as it succeeds. When a stage fails, the stages after it are blocked,
+  independent branches keep going, and the next run picks up from the
+  failed stage.
+- Report: after the run, a table shows each stage's status, start time and
+  duration, followed by the critical path (the chain of stages that set
+  the total run time) compared with the wall-clock and serial times.
+
+Run:
+    python scripts/run_pipeline.py                  # everything that is out of date
+    python scripts/run_pipeline.py goals            # goals and the stages it needs
+    python scripts/run_pipeline.py --force --jobs 2
+    python scripts/run_pipeline.py --force --profile "goal.*" goals   # see utils/profiling.py
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import pathlib
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+from utils.profiling import PROFILE_ENV, PROFILER_ENV, PROFILERS  # noqa: E402
+
+# Constants
+PIPELINE_STATE_FILE: pathlib.Path = PROJECT_ROOT.joinpath("data", "pipeline_state.json")
+PIPELINE_JOBS: int = os.cpu_count() or 1
+HASH_BLOCK_BYTES: int = 1024 * 1024
+STDERR_TAIL_LINES: int = 20
+
+# Local imports a stage's script depends on, e.g. "from olap.cube_cache import ..."
+LOCAL_IMPORT_PATTERN = re.compile(r"^\s*(?:from|import)\s+((?:olap|scripts|utils)\.\w+)", re.MULTILINE)
+
+SMART_SALES_DB: str = "data/dw/smart_sales.db"
+STORE_RETURNS_DB: str = "data/dw/store_returns.db"
+CUBE_DIR: str = "data/olap_cubing_outputs"
+
+# Stage name -> script, input files, output files (glob patterns relative to the
+# project root) and the stages it must run after
+STAGES: dict = {
+    "data_prep": {
+        "script": "scripts/data_prep.py",
+        "inputs": ["data/raw/*.csv"],
+        "outputs": ["data/prepared/*_prepared.csv"],
+        "after": [],
+    },
+    "create_dw": {
+        "script": "scripts/create_dw.py",
+        "inputs": [],
+        "outputs": [SMART_SALES_DB],
+        "after": [],
+    },
+    "etl_to_dw": {
+        "script": "scripts/etl_to_dw.py",
+        "inputs": [
+            "data/prepared/customers_data_prepared.csv",
+            "data/prepared/products_data_prepared.csv",
+            "data/prepared/sales_data_prepared.csv",
+        ],
+        "outputs": [SMART_SALES_DB],
+        "after": ["data_prep", "create_dw"],
+    },
+    "p7_create_dw": {
+        "script": "scripts/p7_create_dw.py",
+        "inputs": [],
+        "outputs": [STORE_RETURNS_DB],
+        "after": [],
+    },
+    "p7_etl_to_dw": {
+        "script": "scripts/p7_etl_to_dw.py",
+        "inputs": ["data/prepared/p7_*_prepared.csv"],
+        "outputs": [STORE_RETURNS_DB],
+        "after": ["data_prep", "p7_create_dw"],
+    },
+    "cubes": {
+        "script": "olap/olap_cubing.py",
+        "inputs": [SMART_SALES_DB],
+        "outputs": [f"{CUBE_DIR}/multidimensional_olap_cube.csv"],
+        "after": ["etl_to_dw"],
+    },
+    "cubes_region": {
+        "script": "olap/olap_cubing_region.py",
+        "inputs": [SMART_SALES_DB],
+        "outputs": [f"{CUBE_DIR}/multidimensional_olap_region_cube.csv"],
+        "after": ["etl_to_dw"],
+    },
+    "cubes_month": {
+        "script": "olap/olap_cubing_month.py",
+        "inputs": [SMART_SALES_DB],
+        "outputs": [f"{CUBE_DIR}/multidimensional_olap_month_cube.csv"],
+        "after": ["etl_to_dw"],
+    },
+    "cubes_time": {
+        "script": "olap/olap_cubing_time.py",
+        "inputs": [SMART_SALES_DB],
+        "outputs": [f"{CUBE_DIR}/multidimensional_olap_time_*_cube.csv"],
+        "after": ["etl_to_dw"],
+    },
+    "cubes_returns": {
+        "script": "olap/olap_cubing_returns.py",
+        "inputs": [STORE_RETURNS_DB],
+        "outputs": [f"{CUBE_DIR}/multidimensional_olap_returns_cube.csv"],
+        "after": ["p7_etl_to_dw"],
+    },
+    "cubes_geography": {
+        "script": "olap/olap_cubing_geography.py",
+        "inputs": [STORE_RETURNS_DB],
+        "outputs": [f"{CUBE_DIR}/multidimensional_olap_geo_*_cube.csv"],
+        "after": ["p7_etl_to_dw"],
+    },
+    "cubes_product_hierarchy": {
+        "script": "olap/olap_cubing_product_hierarchy.py",
+        "inputs": [STORE_RETURNS_DB],
+        "outputs": [f"{CUBE_DIR}/multidimensional_olap_product_*_cube.csv"],
+        "after": ["p7_etl_to_dw"],
+    },
+    "cubes_lead_time": {
+        "script": "olap/olap_cubing_lead_time.py",
+        "inputs": [STORE_RETURNS_DB],
+        "outputs": [f"{CUBE_DIR}/multidimensional_olap_lead_time_cube.csv"],
+        "after": ["p7_etl_to_dw"],
+    },
+    "goals": {
+        "script": "olap/olap_goal_runner.py",
+        "inputs": [
+            SMART_SALES_DB,
+            f"{CUBE_DIR}/multidimensional_olap_cube.csv",
+            f"{CUBE_DIR}/multidimensional_olap_region_cube.csv",
+            f"{CUBE_DIR}/multidimensional_olap_month_cube.csv",
+            f"{CUBE_DIR}/multidimensional_olap_time_*_cube.csv",
+        ],
+        "outputs": ["data/results/goal_*.csv"],
+        "after": ["cubes", "cubes_region", "cubes_month", "cubes_time"],
+    },
+}
+
+
+def file_digest(file_path: pathlib.Path) -> str:
+    """Return the sha256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_files(script: str, root: pathlib.Path = PROJECT_ROOT) -> list:
+    """Return a script and every local module it imports, directly or indirectly."""
+    found = []
+    todo = [root.joinpath(script)]
+    while todo:
+        file_path = todo.pop()
+        if file_path in found or not file_path.exists():
+            continue
+        found.append(file_path)
+        for module in LOCAL_IMPORT_PATTERN.findall(file_path.read_text(encoding="utf-8")):
+            todo.append(root.joinpath(*module.split(".")).with_suffix(".py"))
+    return sorted(found)
+
+
+def resolve_paths(patterns: list, root: pathlib.Path = PROJECT_ROOT) -> list:
+    """Return the files matching a list of glob patterns, sorted."""
+    return sorted({path for pattern in patterns for path in root.glob(pattern) if path.is_file()})
+
+
+def stage_key(name: str, stage: dict, upstream_keys: list, root: pathlib.Path = PROJECT_ROOT) -> str:
+    """Return a hash of a stage's code, input file contents and upstream keys."""
+    digest = hashlib.sha256(name.encode())
+    for file_path in source_files(stage["script"], root) + resolve_paths(stage["inputs"], root):
+        digest.update(f"{file_path.relative_to(root).as_posix()}:{file_digest(file_path)}\n".encode())
+    for key in upstream_keys:
+        digest.update(key.encode())
+    return digest.hexdigest()[:16]
+
+
+def outputs_exist(stage: dict, root: pathlib.Path = PROJECT_ROOT) -> bool:
+    """Return True if every output pattern of a stage matches at least one file."""
+    return all(any(root.glob(pattern)) for pattern in stage["outputs"])
+
+
+def read_state(state_file: pathlib.Path) -> dict:
+    """Return the recorded stage keys, or an empty state if there are none yet."""
+    if not state_file.exists():
+        return {}
+    return json.loads(state_file.read_text(encoding="utf-8"))
+
+
+def write_state(state_file: pathlib.Path, state: dict) -> None:
+    """Save the stage keys (atomically, so a crash never leaves a partial file)."""
+    state_file.parent.mkdir(parents=True, exist_ok=True)
+    temp = state_file.with_suffix(".tmp")
+    temp.write_text(json.dumps(state, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(temp, state_file)
+
+
+def topological_order(stages: dict) -> list:
+    """
+    Return the stage names so that every stage comes after the stages it follows.
+
+    Raises:
+        ValueError: If a stage follows an unknown stage or the stages form a cycle.
+    """
+    order = []
+    visiting = set()
+
+    def visit(name: str, path: list) -> None:
+        if name in order:
+            return
+        if name not in stages:
+            raise ValueError(f"Stage {path[-1]!r} runs after unknown stage {name!r}")
+        if name in visiting:
+            raise ValueError(f"Pipeline stages form a cycle: {' -> '.join(path + [name])}")
+        visiting.add(name)
+        for upstream in stages[name]["after"]:
+            visit(upstream, path + [name])
+        visiting.discard(name)
+        order.append(name)
+
+    for name in stages:
+        visit(name, [])
+    return order
+
+
+def select_stages(stages: dict, targets: list = None) -> list:
+    """Return the target stages and every stage they depend on, in run order."""
+    order = topological_order(stages)
+    if not targets:
+        return order
+    unknown = [name for name in targets if name not in stages]
+    if unknown:
+        raise ValueError(f"Unknown pipeline stage(s): {unknown}. Stages: {order}")
+    needed = set()
+    todo = list(targets)
+    while todo:
+        name = todo.pop()
+        if name not in needed:
+            needed.add(name)
+            todo.extend(stages[name]["after"])
+    return [name for name in order if name in needed]
+
+
+def run_stage(name: str, stage: dict, root: pathlib.Path = PROJECT_ROOT) -> tuple:
+    """
+    Run one stage's script in its own Python process from the project root.
+
+    Returns:
+        tuple: (return code, start time (time.perf_counter()), duration in seconds,
+        last lines of stderr).
+    """
+    logger.info(f"Pipeline stage {name} started ({stage['script']}).")
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, str(root.joinpath(stage["script"]))],
+        cwd=root,
+        capture_output=True,
+        text=True,
+    )
+    seconds = time.perf_counter() - start
+    stderr_tail = "\n".join(completed.stderr.strip().splitlines()[-STDERR_TAIL_LINES:])
+    return completed.returncode, start, seconds, stderr_tail
+
+
+def critical_path(stages: dict, results: dict) -> tuple:
+    """
+    Return the chain of stages with the longest total duration, and that duration.
+
+    The critical path sets the shortest possible run time: with unlimited
+    workers the pipeline cannot finish before it does.
+    """
+    finish = {}
+    previous = {}
+    for name in [name for name in topological_order(stages) if name in results]:
+        upstream = [up for up in stages[name]["after"] if up in finish]
+        slowest = max(upstream, key=finish.get, default=None)
+        previous[name] = slowest
+        finish[name] = (finish[slowest] if slowest else 0.0) + results[name]["seconds"]
+    if not finish:
+        return [], 0.0
+    name = max(finish, key=finish.get)
+    path = []
+    while name is not None:
+        path.append(name)
+        name = previous[name]
+    path.reverse()
+    return path, finish[path[-1]]
+
+
+def format_report(stages: dict, results: dict, wall_seconds: float) -> str:
+    """Return the per-stage timing table and the critical-path summary."""
+    path, path_seconds = critical_path(stages, results)
+    width = max([len(name) for name in results] + [len("Stage")])
+    lines = [f"{'Stage':<{width}}  {'Status':<8}  {'Start':>8}  {'Seconds':>8}"]
+    for name, result in sorted(results.items(), key=lambda item: item[1]["start"]):
+        marker = "  *" if name in path else ""
+        lines.append(
+            f"{name:<{width}}  {result['status']:<8}  {result['start']:>8.2f}  {result['seconds']:>8.2f}{marker}"
+        )
+    serial_seconds = sum(result["seconds"] for result in results.values())
+    lines.append("")
+    lines.append(f"Critical path (*): {' -> '.join(path) or 'none'} = {path_seconds:.2f}s")
+    lines.append(f"Wall time: {wall_seconds:.2f}s; serial time: {serial_seconds:.2f}s")
+    return "\n".join(lines)
+
+
+def run_pipeline(
+    stages: dict = STAGES,
+    targets: list = None,
+    force: bool = False,
+    jobs: int = PIPELINE_JOBS,
+    root: pathlib.Path = PROJECT_ROOT,
+    state_file: pathlib.Path = PIPELINE_STATE_FILE,
+) -> dict:
+    """
+    Run the out-of-date stages of the pipeline, independent stages in parallel.
+
+    Args:
+        stages (dict): Stage definitions (see STAGES).
+        targets (list): Stages to bring up to date (with their dependencies); None for all.
+        force (bool): Run every selected stage even if it is up to date.
+        jobs (int): Maximum number of stages running at once.
+        root (pathlib.Path): Directory the stage paths are relative to.
+        state_file (pathlib.Path): Where stage keys are recorded between runs.
+
+    Returns:
+        dict: Stage name -> {"status": "ran" | "skipped" | "failed" | "blocked",
+        "start": seconds after the run started, "seconds": duration}.
+    """
+    root = pathlib.Path(root)
+    order = select_stages(stages, targets)
+    state = read_state(state_file)
+    results = {}
+    keys = {}
+    pending = list(order)
+    running = {}
+    run_start = time.perf_counter()
+
+    def elapsed() -> float:
+        return time.perf_counter() - run_start
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while pending or running:
+            # Start (or skip, or block) every stage whose upstream stages are done
+            for name in [name for name in pending if all(up in results for up in stages[name]["after"])]:
+                pending.remove(name)
+                stage = stages[name]
+                failed_upstream = [up for up in stage["after"] if results[up]["status"] in ("failed", "blocked")]
+                if failed_upstream:
+                    logger.warning(f"Pipeline stage {name} blocked by failed stage(s) {failed_upstream}.")
+                    results[name] = {"status": "blocked", "start": elapsed(), "seconds": 0.0}
+                    continue
+                keys[name] = stage_key(name, stage, [keys[up] for up in stage["after"]], root)
+                recorded = state.get(name, {}).get("key")
+                if not force and recorded == keys[name] and outputs_exist(stage, root):
+                    logger.info(f"Pipeline stage {name} is up to date; skipping.")
+                    results[name] = {"status": "skipped", "start": elapsed(), "seconds": 0.0}
+                    continue
+                running[pool.submit(run_stage, name, stage, root)] = name
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    returncode, started, seconds, stderr_tail = future.result()
+                    start = started - run_start
+                except Exception as e:
+                    returncode, start, seconds, stderr_tail = -1, elapsed(), 0.0, str(e)
+                if returncode == 0:
+                    logger.info(f"Pipeline stage {name} finished in {seconds:.2f}s.")
+                    results[name] = {"status": "ran", "start": start, "seconds": seconds}
+                    state[name] = {
+                        "key": keys[name],
+                        "seconds": round(seconds, 3),
+                        "finished_at": datetime.datetime.now().isoformat(timespec="seconds"),
+                    }
+                else:
+                    logger.error(f"Pipeline stage {name} failed (exit code {returncode}):\n{stderr_tail}")
+                    results[name] = {"status": "failed", "start": start, "seconds": seconds}
+                    state.pop(name, None)
+                write_state(state_file, state)
+
+    results = {name: results[name] for name in order}
+    logger.info(f"Pipeline run report:\n{format_report(stages, results, elapsed())}")
+    return results
+
+
+def main() -> None:
+    """Main function for running the pipeline DAG."""
+    # Step 1: Read the target stages and options
+    parser = argparse.ArgumentParser(description="Run the Smart Sales pipeline stages that are out of date.")
+    parser.add_argument("stages", nargs="*", help=f"stages to bring up to date (default: all). Stages: {list(STAGES)}")
+    parser.add_argument("--force", action="store_true", help="run the selected stages even if they are up to date")
+    parser.add_argument("--jobs", type=int, default=PIPELINE_JOBS, help="maximum number of stages running at once")
+    parser.add_argument(
+        "--profile",
+        metavar="PATTERNS",
+        help="comma-separated stage names or patterns to profile into logs/profiles, e.g. 'etl_to_dw.insert_sales,goal.*'"
+        " (up-to-date stages are skipped, so combine with --force)",
+    )
+    parser.add_argument("--profiler", choices=PROFILERS, help="profiler for --profile (default: cprofile)")
+    args = parser.parse_args()
+
+    # Step 2: Pass the profiling choice to the stage processes through their environment
+    if args.profile:
+        os.environ[PROFILE_ENV] = args.profile
+    if args.profiler:
+        os.environ[PROFILER_ENV] = args.profiler
+
+    # Step 3: Run the pipeline (the timing report is logged at the end of the run)
+    results = run_pipeline(targets=args.stages, force=args.force, jobs=args.jobs)
+
+    # Step 4: Exit non-zero if any stage did not complete
+    if any(result["status"] in ("failed", "blocked") for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
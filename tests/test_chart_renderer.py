@@ -0,0 +1,81 @@
+r"""
+tests/test_chart_renderer.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_chart_renderer.py
+    python3 tests\test_chart_renderer.py
+
+This test suite verifies that render_charts() writes PNG files headless,
+skips charts whose aggregate is unchanged and renders them again when the
+aggregate changes.
+"""
+
+import unittest
+import pathlib
+import sys
+import tempfile
+from io import StringIO
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from olap.chart_renderer import chart_hash, render_charts  # noqa: E402
+
+# Create a fake goal aggregate using StringIO
+csv_data = StringIO("""
+region,TotalSales
+East,6344.96
+North,2500.00
+West,4100.50
+""")
+
+# Load the fake CSV data into a DataFrame
+sales_by_region = pd.read_csv(csv_data)
+
+
+def region_chart(data: pd.DataFrame) -> dict:
+    return {
+        "file_name": "sales_by_region.png",
+        "kind": "bar",
+        "data": data,
+        "x": "region",
+        "y": "TotalSales",
+        "title": "Total Sales by region",
+        "xlabel": "Region",
+        "ylabel": "Total Sales (USD)",
+    }
+
+
+class TestChartRenderer(unittest.TestCase):
+
+    def test_hash_follows_content(self):
+        self.assertEqual(chart_hash(region_chart(sales_by_region)), chart_hash(region_chart(sales_by_region.copy())))
+        changed = sales_by_region.assign(TotalSales=sales_by_region["TotalSales"] + 1)
+        self.assertNotEqual(chart_hash(region_chart(sales_by_region)), chart_hash(region_chart(changed)))
+
+    def test_render_skips_unchanged_charts(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output_dir = pathlib.Path(tmp)
+            status = render_charts([region_chart(sales_by_region)], output_dir)
+            self.assertEqual(status, {"sales_by_region.png": "rendered"})
+            png = output_dir.joinpath("sales_by_region.png")
+            self.assertEqual(png.read_bytes()[:8], b"\x89PNG\r\n\x1a\n")
+
+            status = render_charts([region_chart(sales_by_region)], output_dir)
+            self.assertEqual(status, {"sales_by_region.png": "unchanged"})
+
+            changed = sales_by_region.assign(TotalSales=sales_by_region["TotalSales"] * 2)
+            status = render_charts([region_chart(changed)], output_dir)
+            self.assertEqual(status, {"sales_by_region.png": "rendered"})
+
+            # No temporary files are left behind
+            self.assertListEqual(sorted(p.name for p in output_dir.iterdir()), ["chart_manifest.json", "sales_by_region.png"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+r"""
+tests/test_cube_cache.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_cube_cache.py
+    python3 tests\test_cube_cache.py
+
+This test suite verifies that the warehouse version changes when a rebuilt
+warehouse is reloaded with different data of the same size, and when rows
+are added or deleted outside the ETL, that
+CubeCache serves hits and rebuilds on a new version, and that eviction
+keeps the cache under budget even when an entry vanishes underneath it.
+"""
+
+import unittest
+import os
+import pathlib
+import sqlite3
+import sys
+import tempfile
+from io import StringIO
+from unittest import mock
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from olap.cube_cache import CubeCache  # noqa: E402
+from utils.dw_version import bump_warehouse_version, get_warehouse_version  # noqa: E402
+
+# Create a fake sale table using StringIO
+csv_data = StringIO("""
+sale_id,product_id,sale_amount_usd
+1,101,100.0
+2,102,50.0
+3,101,25.0
+""")
+
+sales_df = pd.read_csv(csv_data)
+
+
+def load_warehouse(db_path: pathlib.Path, df: pd.DataFrame) -> None:
+    """Rebuild the warehouse from scratch and load df, as create_dw + etl_to_dw do."""
+    db_path.unlink(missing_ok=True)
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("CREATE TABLE sale (sale_id INTEGER PRIMARY KEY, product_id INTEGER, sale_amount_usd REAL)")
+        cursor.executemany("INSERT INTO sale VALUES (?, ?, ?)", df.itertuples(index=False, name=None))
+        bump_warehouse_version(cursor)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def total_by_product(db_path: pathlib.Path) -> pd.DataFrame:
+    conn = sqlite3.connect(db_path)
+    try:
+        df = pd.read_sql_query("SELECT product_id, sale_amount_usd FROM sale", conn)
+    finally:
+        conn.close()
+    return df.groupby("product_id", as_index=False)["sale_amount_usd"].sum()
+
+
+class TestCubeCache(unittest.TestCase):
+
+    def test_same_size_reload_is_a_new_version(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = pathlib.Path(tmp).joinpath("smart_sales.db")
+            load_warehouse(db_path, sales_df)
+            first = get_warehouse_version(db_path)
+            self.assertEqual(first, get_warehouse_version(db_path))
+
+            # Same rows and sale_ids, different amounts; the counter restarts at v1
+            load_warehouse(db_path, sales_df.assign(sale_amount_usd=sales_df["sale_amount_usd"] * 2))
+            second = get_warehouse_version(db_path)
+            self.assertTrue(first.startswith("v1-") and second.startswith("v1-"))
+            self.assertNotEqual(first, second)
+
+    def test_rows_changed_outside_the_etl_are_a_new_version(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = pathlib.Path(tmp).joinpath("smart_sales.db")
+            load_warehouse(db_path, sales_df)
+            versions = [get_warehouse_version(db_path)]
+            conn = sqlite3.connect(db_path)
+            try:
+                conn.execute("INSERT INTO sale VALUES (4, 103, 10.0)")
+                conn.commit()
+                versions.append(get_warehouse_version(db_path, conn))
+                conn.execute("DELETE FROM sale WHERE sale_id = 1")
+                conn.commit()
+                versions.append(get_warehouse_version(db_path, conn))
+                # Materialized cube tables are derived data and do not count
+                conn.execute("CREATE TABLE cube_product (product_id INTEGER)")
+                conn.commit()
+                versions.append(get_warehouse_version(db_path, conn))
+            finally:
+                conn.close()
+            self.assertEqual(len(set(versions[:3])), 3)
+            self.assertEqual(versions[2], versions[3])
+
+    def test_version_table_from_before_the_generation_token(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = pathlib.Path(tmp).joinpath("smart_sales.db")
+            conn = sqlite3.connect(db_path)
+            try:
+                conn.execute("CREATE TABLE dw_version (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL, updated_at TEXT NOT NULL)")
+                conn.execute("INSERT INTO dw_version VALUES (1, 4, '2026-01-01T00:00:00+00:00')")
+                conn.commit()
+                self.assertTrue(get_warehouse_version(db_path, conn).startswith("v4--"))
+                bump_warehouse_version(conn.cursor())
+                conn.commit()
+                self.assertRegex(get_warehouse_version(db_path, conn), r"^v5-[0-9a-f]{8}-")
+            finally:
+                conn.close()
+
+    def test_hit_miss_and_rebuild_on_reload(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = pathlib.Path(tmp).joinpath("smart_sales.db")
+            cache = CubeCache(pathlib.Path(tmp).joinpath("cache"))
+            definition = {"name": "by_product", "dimensions": ["product_id"], "metrics": {"sale_amount_usd": ["sum"]}}
+            builds = []
+
+            def build():
+                builds.append(1)
+                return total_by_product(db_path)
+
+            load_warehouse(db_path, sales_df)
+            cache.get_or_build(db_path, definition, build)
+            cube = cache.get_or_build(db_path, definition, build)
+            self.assertEqual(len(builds), 1)
+            self.assertEqual(cube["sale_amount_usd"].tolist(), [125.0, 50.0])
+
+            load_warehouse(db_path, sales_df.assign(sale_amount_usd=sales_df["sale_amount_usd"] * 2))
+            cube = cache.get_or_build(db_path, definition, build)
+            self.assertEqual(len(builds), 2)
+            self.assertEqual(cube["sale_amount_usd"].tolist(), [250.0, 100.0])
+            # The entry for the old version was retired
+            self.assertEqual(len(list(cache.cache_dir.glob("*.pkl"))), 1)
+
+    def test_evict_least_recently_used_and_vanished_entries(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = CubeCache(pathlib.Path(tmp), max_bytes=10**9)
+            db_path = pathlib.Path(tmp).joinpath("smart_sales.db")
+            entries = []
+            for age, name in enumerate(("a", "b", "c")):
+                cache.put(db_path, {"name": name}, sales_df, version="v1-test")
+                entries.append(cache._entry_path(db_path, "v1-test", {"name": name}))
+                os.utime(entries[-1], (1_000_000 + age, 1_000_000 + age))
+            self.assertIsNotNone(cache.get(db_path, {"name": "a"}, version="v1-test"))  # a is now most recent
+
+            cache.max_bytes = entries[0].stat().st_size
+            vanished = cache.cache_dir.joinpath("deleted-by-another-process.pkl")
+            with mock.patch.object(pathlib.Path, "glob", return_value=[vanished] + entries):
+                removed = cache.evict()
+            self.assertEqual(removed, 2)
+            self.assertIsNotNone(cache.get(db_path, {"name": "a"}, version="v1-test"))
+            self.assertIsNone(cache.get(db_path, {"name": "b"}, version="v1-test"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,284 @@
+r"""
+tests/test_cube_engine.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_cube_engine.py
+    python3 tests\test_cube_engine.py
+
+This test suite verifies that every cube backend produces the same cube
+as the serial pandas groupby in create_olap_cube() (float metrics within a
+small tolerance, missing values included), and that the cubing
+scripts share one build_cube() that builds through the backend choice and
+the shared worker setting. It also verifies the spill-to-disk build, with
+a capped merge fan-in and through the month script's memory budget, and
+that a parallel build of no fact rows gives the empty cube.
+"""
+
+import unittest
+import pathlib
+import sqlite3
+import sys
+import tempfile
+from io import StringIO
+from unittest import mock
+import numpy as np
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from olap import cube_engine, olap_cubing, olap_cubing_month, olap_cubing_region  # noqa: E402
+from olap.olap_cubing import create_olap_cube  # noqa: E402
+from olap.cube_dense import DenseCube  # noqa: E402
+from olap.cube_engine import (  # noqa: E402
+    CUBE_BUILD_SETTINGS,
+    add_time_dimensions,
+    build_cube,
+    build_cuboid,
+    choose_cube_backend,
+    create_olap_cube_parallel,
+)
+from olap.cube_iceberg import create_iceberg_cube, iceberg_row_mask, OTHER_LABEL  # noqa: E402
+from olap import cube_external  # noqa: E402
+from olap.cube_external import create_olap_cube_external  # noqa: E402
+from olap.cube_time import TIME_HIERARCHY, add_time_hierarchy, create_time_hierarchy_cubes  # noqa: E402
+
+# Create a fake sale fact table using StringIO
+csv_data = StringIO("""
+sale_id,customer_id,product_id,DayOfWeek,payment_method,sale_amount_usd
+1,1001,101,Friday,Cash,100.10
+2,1002,101,Friday,Cash,50.25
+3,1001,102,Monday,Credit_Card,20.00
+4,1003,103,Monday,Cash,75.50
+5,1002,102,Sunday,Credit_Card,12.34
+6,1003,101,Friday,Credit_Card,99.99
+7,1001,103,Sunday,Cash,5.00
+""")
+
+# Load the fake CSV data into a DataFrame
+sales_df = pd.read_csv(csv_data)
+
+DIMENSIONS = ["DayOfWeek", "payment_method"]
+METRICS = {"sale_amount_usd": ["sum", "mean", "min", "max"], "sale_id": "count"}
+
+# Relative tolerance for float metrics: the dense backend sums without pandas'
+# compensated summation, so its sums can differ in the last floating-point digit
+RTOL = 1e-9
+
+
+class TestCubeEngine(unittest.TestCase):
+
+    def assertSameCells(self, actual: pd.DataFrame, expected: pd.DataFrame):
+        """Compare two cubes cell by cell (floats within RTOL), ignoring the sale_ids column."""
+        expected = expected.drop(columns="sale_ids", errors="ignore")
+        actual = actual.drop(columns="sale_ids", errors="ignore")
+        self.assertListEqual(actual.columns.tolist(), expected.columns.tolist())
+        for col in expected.columns:
+            if pd.api.types.is_float_dtype(expected[col]):
+                np.testing.assert_allclose(actual[col].to_numpy(), expected[col].to_numpy(), rtol=RTOL)
+            else:
+                self.assertListEqual(actual[col].tolist(), expected[col].tolist())
+
+    def test_dense_cube_matches_groupby(self):
+        dense = DenseCube.build(sales_df, DIMENSIONS, METRICS).to_frame()
+        self.assertSameCells(dense, create_olap_cube(sales_df, DIMENSIONS, METRICS))
+
+    def test_dense_min_max_of_missing_values_is_nan(self):
+        # Every Sunday amount is missing, so the Sunday cells have rows but no values
+        missing = sales_df.assign(sale_amount_usd=sales_df["sale_amount_usd"].where(sales_df["DayOfWeek"] != "Sunday"))
+        dense = DenseCube.build(missing, DIMENSIONS, METRICS)
+        serial = create_olap_cube(missing, DIMENSIONS, METRICS)
+        self.assertSameCells(dense.to_frame(), serial)
+        sunday = dense.to_frame().query("DayOfWeek == 'Sunday'")
+        self.assertTrue(sunday[["sale_amount_usd_min", "sale_amount_usd_max"]].isna().all().all())
+        self.assertSameCells(dense.rollup(["DayOfWeek"]).to_frame(), create_olap_cube(missing, ["DayOfWeek"], METRICS))
+
+    def test_dense_rollup_is_axis_reduction(self):
+        dense = DenseCube.build(sales_df, DIMENSIONS, METRICS)
+        rolled = dense.rollup(["payment_method"]).to_frame()
+        self.assertSameCells(rolled, create_olap_cube(sales_df, ["payment_method"], METRICS))
+
+    def test_dense_rollup_can_reorder_dimensions(self):
+        dense = DenseCube.build(sales_df, DIMENSIONS, METRICS)
+        rolled = dense.rollup(["payment_method", "DayOfWeek"]).to_frame()
+        self.assertSameCells(rolled, create_olap_cube(sales_df, ["payment_method", "DayOfWeek"], METRICS))
+
+    def test_backend_choice_uses_grid_size(self):
+        self.assertEqual(choose_cube_backend(sales_df, DIMENSIONS, METRICS), "dense")
+        self.assertEqual(choose_cube_backend(sales_df, DIMENSIONS, METRICS, max_dense_cells=5), "sparse")
+        self.assertEqual(choose_cube_backend(sales_df, DIMENSIONS, {"sale_id": "nunique"}), "sparse")
+
+    def test_build_cuboid_sparse_keeps_sale_ids(self):
+        cube = build_cuboid(sales_df, DIMENSIONS, METRICS, backend="sparse")
+        self.assertIn("sale_ids", cube.columns)
+
+    def test_build_cuboid_dense_keeps_sale_ids(self):
+        dims = ["DayOfWeek", "product_id"]
+        dense = build_cuboid(sales_df, dims, METRICS, backend="dense")
+        serial = create_olap_cube(sales_df, dims, METRICS)
+        self.assertSameCells(dense, serial)
+        self.assertListEqual(dense["sale_ids"].tolist(), serial["sale_ids"].tolist())
+
+    def test_cubing_scripts_share_one_build(self):
+        for module in (olap_cubing, olap_cubing_month, olap_cubing_region):
+            self.assertIs(module.build_cube, build_cube)
+            self.assertIs(module.CUBE_BUILD_SETTINGS, CUBE_BUILD_SETTINGS)
+        self.assertIs(olap_cubing.add_time_dimensions, add_time_dimensions)
+
+    def test_cubing_script_builds_through_backend_choice(self):
+        dated = sales_df.drop(columns="DayOfWeek").assign(sale_date="2024-01-01")
+        dims = ["DayOfWeek", "payment_method"]
+        with mock.patch.object(cube_engine, "build_cuboid", wraps=build_cuboid) as built:
+            cube = build_cube(dims, METRICS, sales_df=dated.copy())
+        self.assertEqual(built.call_args.kwargs["backend"], CUBE_BUILD_SETTINGS["backend"])
+        serial = create_olap_cube(add_time_dimensions(dated.copy()), dims, METRICS)
+        self.assertSameCells(cube, serial)
+        self.assertListEqual(cube["sale_ids"].tolist(), serial["sale_ids"].tolist())
+
+        # Without sales_df the facts come from ingest()
+        cube = build_cube(dims, METRICS, ingest=lambda: dated.copy())
+        self.assertSameCells(cube, serial)
+
+    def test_parallel_key_build_is_byte_identical(self):
+        dims = ["DayOfWeek", "product_id", "customer_id"]
+        serial = create_olap_cube(sales_df, dims, METRICS).to_csv(index=False)
+        parallel = create_olap_cube_parallel(sales_df, dims, METRICS, max_workers=2, n_partitions=3)
+        self.assertEqual(parallel.to_csv(index=False), serial)
+
+    def test_parallel_date_build_merges_partials(self):
+        dated = sales_df.assign(sale_date=pd.date_range("2024-01-01", periods=len(sales_df), freq="D"))
+        serial = create_olap_cube(dated, DIMENSIONS, METRICS)
+        parallel = create_olap_cube_parallel(dated, DIMENSIONS, METRICS, max_workers=1, n_partitions=3, partition_by="date")
+        self.assertSameCells(parallel, serial)
+        self.assertListEqual(parallel["sale_ids"].tolist(), serial["sale_ids"].tolist())
+
+    def test_parallel_build_of_empty_facts_is_empty_cube(self):
+        empty = sales_df.assign(sale_date=pd.Timestamp("2024-01-01")).iloc[:0]
+        serial = create_olap_cube(empty, DIMENSIONS, METRICS)
+        for partition_by in ("key", "date"):
+            with self.subTest(partition_by=partition_by):
+                parallel = create_olap_cube_parallel(empty, DIMENSIONS, METRICS, max_workers=2, partition_by=partition_by)
+                self.assertTrue(parallel.empty)
+                self.assertListEqual(parallel.columns.tolist(), serial.columns.tolist())
+
+    def test_cubing_script_workers_setting_builds_in_parallel(self):
+        dated = sales_df.drop(columns="DayOfWeek").assign(sale_date="2024-01-01")
+        dims = ["DayOfWeek", "product_id", "customer_id"]
+        serial = create_olap_cube(add_time_dimensions(dated.copy()), dims, METRICS)
+        with mock.patch.dict(CUBE_BUILD_SETTINGS, {"workers": 2, "backend": "sparse"}), \
+                mock.patch.object(cube_engine, "create_olap_cube_parallel", wraps=create_olap_cube_parallel) as parallel:
+            cube = olap_cubing_month.build_cube(dims, METRICS, sales_df=dated.copy())
+        self.assertEqual(parallel.call_args.kwargs["max_workers"], 2)
+        self.assertEqual(cube.to_csv(index=False), serial.to_csv(index=False))
+
+    def test_cubing_script_min_sale_count_setting_builds_an_iceberg_cube(self):
+        dated = sales_df.drop(columns="DayOfWeek").assign(sale_date="2024-01-01")
+        dims = ["product_id"]
+        with mock.patch.dict(CUBE_BUILD_SETTINGS, {"min_sale_count": 3}):
+            cube = olap_cubing_region.build_cube(dims, METRICS, sales_df=dated.copy())
+        self.assertListEqual(cube["product_id"].astype(str).tolist(), ["101", OTHER_LABEL])
+        self.assertEqual(cube["sale_id_count"].sum(), len(sales_df))
+
+    def test_iceberg_cube_matches_filtered_full_cube(self):
+        dims = ["DayOfWeek", "product_id"]
+        full = create_olap_cube(sales_df, dims, METRICS)
+        expected = full[full["sale_id_count"] >= 2].reset_index(drop=True)
+        self.assertSameCells(create_iceberg_cube(sales_df, dims, METRICS, min_count=2), expected)
+
+    def test_iceberg_min_sum_prunes_small_cells(self):
+        cube = create_iceberg_cube(sales_df, ["product_id"], METRICS, min_sum={"sale_amount_usd": 100})
+        self.assertListEqual(cube["product_id"].tolist(), [101])
+
+    def test_iceberg_other_bucket_preserves_totals(self):
+        cube = create_iceberg_cube(sales_df, DIMENSIONS, METRICS, min_count=2, other_bucket=True)
+        self.assertEqual(cube["DayOfWeek"].iloc[-1], OTHER_LABEL)
+        self.assertAlmostEqual(cube["sale_amount_usd_sum"].sum(), sales_df["sale_amount_usd"].sum())
+        self.assertEqual(cube["sale_id_count"].sum(), len(sales_df))
+
+    def test_iceberg_other_bucket_matches_full_cube_with_missing_keys(self):
+        gaps = sales_df.assign(payment_method=sales_df["payment_method"].where(sales_df["sale_id"] != 7))
+        full = create_olap_cube(gaps, DIMENSIONS, METRICS)
+        cube = create_iceberg_cube(gaps, DIMENSIONS, METRICS, min_count=2, other_bucket=True)
+        self.assertAlmostEqual(cube["sale_amount_usd_sum"].sum(), full["sale_amount_usd_sum"].sum())
+        self.assertEqual(cube["sale_id_count"].sum(), full["sale_id_count"].sum())
+        self.assertNotIn(7, sum(cube["sale_ids"], []))
+
+    def test_iceberg_empty_facts(self):
+        empty = sales_df.iloc[0:0]
+        self.assertEqual(len(iceberg_row_mask(empty, DIMENSIONS, min_count=2)), 0)
+        self.assertEqual(len(create_iceberg_cube(empty, DIMENSIONS, METRICS, min_count=2, other_bucket=True)), 0)
+
+    def test_time_hierarchy_levels_match_direct_cubes(self):
+        dated = sales_df.assign(sale_date=pd.date_range("2024-03-27", periods=len(sales_df), freq="D"))
+        cubes = create_time_hierarchy_cubes(dated, ["payment_method"], METRICS)
+        self.assertListEqual(list(cubes), TIME_HIERARCHY)
+        facts = add_time_hierarchy(dated)
+        for depth, level in enumerate(TIME_HIERARCHY, start=1):
+            dims = TIME_HIERARCHY[:depth] + ["payment_method"]
+            expected = create_olap_cube(facts, dims, METRICS)
+            self.assertSameCells(cubes[level], expected)
+            self.assertListEqual(cubes[level]["sale_ids"].tolist(), expected["sale_ids"].tolist())
+
+    def test_external_build_spills_and_matches_csv(self):
+        chunks = [sales_df.iloc[start : start + 2] for start in range(0, len(sales_df), 2)]
+        with tempfile.TemporaryDirectory() as temp:
+            expected_path = pathlib.Path(temp).joinpath("expected.csv")
+            actual_path = pathlib.Path(temp).joinpath("actual.csv")
+            create_olap_cube(sales_df, DIMENSIONS, METRICS).to_csv(expected_path, index=False)
+            cells = create_olap_cube_external(chunks, DIMENSIONS, METRICS, actual_path, memory_budget=1, n_partitions=2)
+            self.assertEqual(actual_path.read_text(), expected_path.read_text())
+        self.assertEqual(cells, 6)
+
+    def test_external_merge_fan_in_is_capped(self):
+        chunks = [sales_df.iloc[[row]] for row in range(len(sales_df))]
+        merge_sizes = []
+
+        def merge(run_dirs, dimensions):
+            merge_sizes.append(len(run_dirs))
+            return merge_runs(run_dirs, dimensions)
+
+        merge_runs = cube_external._merge_sorted_runs
+        with tempfile.TemporaryDirectory() as temp:
+            expected_path = pathlib.Path(temp).joinpath("expected.csv")
+            actual_path = pathlib.Path(temp).joinpath("actual.csv")
+            dims = ["customer_id", "product_id"]
+            create_olap_cube(sales_df, dims, METRICS).to_csv(expected_path, index=False)
+            with mock.patch.object(cube_external, "_merge_sorted_runs", side_effect=merge):
+                create_olap_cube_external(chunks, dims, METRICS, actual_path, memory_budget=1, n_partitions=8, merge_fan_in=2)
+            self.assertEqual(actual_path.read_text(), expected_path.read_text())
+        # More runs than the fan-in, so there were intermediate passes, none wider than 2 runs
+        self.assertGreater(len(merge_sizes), 1)
+        self.assertLessEqual(max(merge_sizes), 2)
+
+    def test_month_script_spills_under_memory_budget(self):
+        dated = sales_df.drop(columns="DayOfWeek").assign(sale_date=pd.date_range("2024-01-01", periods=len(sales_df), freq="D").strftime("%Y-%m-%d"))
+        products = pd.DataFrame({"product_id": [101, 102, 103], "category": ["Electronics", "Clothing", "Electronics"]})
+        customers = pd.DataFrame({"customer_id": [1001, 1002, 1003], "region": ["East", "West", "East"]})
+        with tempfile.TemporaryDirectory() as temp:
+            db_path = pathlib.Path(temp).joinpath("smart_sales.db")
+            conn = sqlite3.connect(db_path)
+            try:
+                dated.to_sql("sale", conn, index=False)
+                products.to_sql("product", conn, index=False)
+                customers.to_sql("customer", conn, index=False)
+            finally:
+                conn.close()
+            with mock.patch.dict(CUBE_BUILD_SETTINGS, {"memory_budget_bytes": 1}), \
+                    mock.patch.object(olap_cubing_month, "DB_PATH", db_path), \
+                    mock.patch.object(olap_cubing_month, "OLAP_OUTPUT_DIR", pathlib.Path(temp)), \
+                    mock.patch.object(cube_engine, "create_olap_cube_external", wraps=create_olap_cube_external) as external:
+                olap_cubing_month.main()
+            written = pathlib.Path(temp).joinpath(olap_cubing_month.CUBE_FILE_NAME).read_text()
+
+        self.assertEqual(external.call_args.kwargs["memory_budget"], 1)
+        facts = add_time_dimensions(dated.merge(products, on="product_id").merge(customers, on="customer_id"))
+        expected = create_olap_cube(facts, olap_cubing_month.CUBE_DIMENSIONS, olap_cubing_month.CUBE_METRICS)
+        self.assertEqual(written, expected.to_csv(index=False))
+
+
+if __name__ == "__main__":
+    unittest.main()
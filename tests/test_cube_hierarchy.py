@@ -0,0 +1,70 @@
+r"""
+tests/test_cube_hierarchy.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_cube_hierarchy.py
+    python3 tests\test_cube_hierarchy.py
+
+This test suite verifies that HierarchyCube levels match a direct groupby
+and that lookups and top-N rankings come back in the right order.
+"""
+
+import unittest
+import pathlib
+import sys
+from io import StringIO
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from olap.cube_hierarchy import HierarchyCube  # noqa: E402
+
+# Create a fake p7 sales table using StringIO
+csv_data = StringIO("""
+category,sub_category,product_id,sales,quantity
+Furniture,Chairs,FUR-CH-1,100.0,2
+Furniture,Chairs,FUR-CH-2,300.0,1
+Furniture,Chairs,FUR-CH-1,50.0,1
+Furniture,Tables,FUR-TA-1,500.0,1
+Technology,Phones,TEC-PH-1,80.0,4
+Technology,Phones,TEC-PH-2,20.0,1
+""")
+
+# Load the fake CSV data into a DataFrame
+sales_df = pd.read_csv(csv_data)
+
+HIERARCHY = ["category", "sub_category", "product_id"]
+cube = HierarchyCube.build(sales_df, HIERARCHY, ["sales", "quantity"])
+
+
+class TestHierarchyCube(unittest.TestCase):
+
+    def test_levels_match_groupby(self):
+        for depth, level in enumerate(HIERARCHY, start=1):
+            expected = sales_df.groupby(HIERARCHY[:depth])["sales"].sum().tolist()
+            self.assertListEqual(cube.levels[level]["sales_sum"].tolist(), expected)
+        self.assertEqual(cube.levels["category"]["line_count"].sum(), len(sales_df))
+
+    def test_lookup_by_path(self):
+        self.assertEqual(cube.lookup("Furniture", "Chairs")["sales_sum"], 450.0)
+        self.assertEqual(cube.lookup("Furniture", "Chairs", "FUR-CH-1")["quantity_sum"], 3)
+
+    def test_top_n_within_parent(self):
+        top = cube.top_n("product_id", "sales_sum", 2, parent=("Furniture", "Chairs"))
+        self.assertListEqual(top["product_id"].tolist(), ["FUR-CH-2", "FUR-CH-1"])
+        bottom = cube.bottom_n("product_id", "sales_sum", 1, parent=("Technology", "Phones"))
+        self.assertListEqual(bottom["product_id"].tolist(), ["TEC-PH-2"])
+
+    def test_top_n_across_level_and_children(self):
+        self.assertListEqual(cube.top_n("sub_category", "sales_sum", 1)["sub_category"].tolist(), ["Tables"])
+        self.assertListEqual(cube.children("Furniture")["sub_category"].tolist(), ["Tables", "Chairs"])
+        self.assertTrue(cube.top_n("product_id", "sales_sum", 3, parent=("Toys", "Balls")).empty)
+
+
+if __name__ == "__main__":
+    unittest.main()
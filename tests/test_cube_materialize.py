@@ -0,0 +1,147 @@
+r"""
+tests/test_cube_materialize.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_cube_materialize.py
+    python3 tests\test_cube_materialize.py
+
+This test suite verifies that materialize_cube() refreshes an existing cube
+table through its staging table (row count, one index per dimension, one
+catalog entry), that query_cube_table() answers point, IN and range queries,
+and that a materialization waits for another writer instead of failing.
+"""
+
+import unittest
+import pathlib
+import sqlite3
+import sys
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from olap import cube_materialize  # noqa: E402
+from olap.olap_cubing import create_olap_cube  # noqa: E402
+from olap.cube_materialize import (  # noqa: E402
+    STAGING_SUFFIX,
+    list_cube_tables,
+    materialize_cube,
+    query_cube_table,
+)
+from utils.dw_version import bump_warehouse_version, get_warehouse_version  # noqa: E402
+
+# Create a fake sale table using StringIO
+csv_data = StringIO("""
+sale_id,Month,product_id,sale_amount_usd
+1,1,101,100.0
+2,1,102,50.0
+3,2,101,25.0
+4,3,103,10.0
+""")
+
+sales_df = pd.read_csv(csv_data)
+
+DIMENSIONS = ["Month", "product_id"]
+METRICS = {"sale_amount_usd": ["sum"], "sale_id": "count"}
+
+
+def load_warehouse(db_path: pathlib.Path, df: pd.DataFrame) -> None:
+    """Load the fact rows and bump the warehouse version, as etl_to_dw does."""
+    conn = sqlite3.connect(db_path)
+    try:
+        df.to_sql("sale", conn, if_exists="replace", index=False)
+        bump_warehouse_version(conn.cursor())
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def table_names(db_path: pathlib.Path) -> list:
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name")]
+    finally:
+        conn.close()
+
+
+def index_columns(db_path: pathlib.Path, table_name: str) -> list:
+    conn = sqlite3.connect(db_path)
+    try:
+        indexes = [row[1] for row in conn.execute(f'PRAGMA index_list("{table_name}")')]
+        return sorted([row[2] for row in conn.execute(f'PRAGMA index_info("{name}")')] for name in indexes)
+    finally:
+        conn.close()
+
+
+class TestCubeMaterialize(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = pathlib.Path(self.tmp.name).joinpath("smart_sales.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_refresh_replaces_rows_indexes_and_catalog_entry(self):
+        load_warehouse(self.db_path, sales_df)
+        table = materialize_cube(create_olap_cube(sales_df, DIMENSIONS, METRICS), DIMENSIONS, self.db_path, population="sale")
+        self.assertEqual(table, "cube_month_product")
+
+        # Reload the warehouse without the March sale and refresh the same table
+        load_warehouse(self.db_path, sales_df[sales_df["Month"] < 3])
+        cube = create_olap_cube(sales_df[sales_df["Month"] < 3], DIMENSIONS, METRICS)
+        materialize_cube(cube, DIMENSIONS, self.db_path, population="sale")
+
+        self.assertEqual(len(query_cube_table(table, self.db_path)), 3)
+        self.assertNotIn(f"{table}{STAGING_SUFFIX}", table_names(self.db_path))
+        self.assertListEqual(index_columns(self.db_path, table), [["Month", "product_id"], ["product_id", "Month"]])
+
+        catalog = list_cube_tables(self.db_path)
+        self.assertEqual(len(catalog), 1)
+        entry = catalog.iloc[0]
+        self.assertEqual(entry["table_name"], table)
+        self.assertListEqual(entry["dimensions"], DIMENSIONS)
+        self.assertListEqual(entry["metrics"], ["sale_amount_usd_sum", "sale_id_count"])
+        self.assertEqual(entry["row_count"], 3)
+        self.assertEqual(entry["population"], "sale")
+        self.assertEqual(entry["dw_version"], get_warehouse_version(self.db_path))
+
+    def test_point_in_and_range_queries(self):
+        load_warehouse(self.db_path, sales_df)
+        table = materialize_cube(create_olap_cube(sales_df, DIMENSIONS, METRICS), DIMENSIONS, self.db_path)
+        point = query_cube_table(table, self.db_path, where={"product_id": 101}, order_by=["Month"])
+        self.assertListEqual(point["Month"].tolist(), [1, 2])
+        self.assertListEqual(point["sale_ids"].tolist(), [[1], [3]])
+        in_list = query_cube_table(table, self.db_path, where={"product_id": [102, 103]}, columns=["product_id"], order_by=["product_id"])
+        self.assertListEqual(in_list["product_id"].tolist(), [102, 103])
+        months = query_cube_table(table, self.db_path, where={"Month": (2, 3)}, order_by=["Month"])
+        self.assertListEqual(months["sale_amount_usd_sum"].tolist(), [25.0, 10.0])
+
+    def test_waits_for_another_writer(self):
+        load_warehouse(self.db_path, sales_df)
+        writer = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        writer.execute("BEGIN IMMEDIATE")
+        # The wait is bounded by MATERIALIZE_TIMEOUT_SECONDS
+        with mock.patch.object(cube_materialize, "MATERIALIZE_TIMEOUT_SECONDS", 0.05):
+            with self.assertRaises(sqlite3.OperationalError):
+                materialize_cube(create_olap_cube(sales_df, DIMENSIONS, METRICS), DIMENSIONS, self.db_path)
+        release = threading.Timer(0.5, lambda: writer.execute("COMMIT"))
+        release.start()
+        try:
+            table = materialize_cube(create_olap_cube(sales_df, DIMENSIONS, METRICS), DIMENSIONS, self.db_path)
+        finally:
+            release.join()
+            writer.close()
+        self.assertEqual(len(query_cube_table(table, self.db_path)), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+r"""
+tests/test_cube_query.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_cube_query.py
+    python3 tests\test_cube_query.py
+
+This test suite verifies that CubeQuery answers slice, dice, roll-up and drill-down
+queries the same way as the equivalent pandas groupby over the cube.
+"""
+
+import unittest
+import pathlib
+import sys
+from io import StringIO
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from olap.cube_query import CubeQuery  # noqa: E402
+
+# Create a fake cube CSV file using StringIO
+csv_data = StringIO("""
+region,product_id,DayOfWeek,sale_amount_usd_sum,sale_amount_usd_mean,sale_id_count,sale_ids
+East,101,Friday,100.0,50.0,2,"[1, 2]"
+East,102,Friday,30.0,30.0,1,[3]
+East,101,Monday,60.0,20.0,3,"[4, 5, 6]"
+West,101,Friday,10.0,10.0,1,[7]
+West,103,Sunday,40.0,20.0,2,"[8, 9]"
+""")
+
+# Load the fake CSV data into a DataFrame
+cube_df = pd.read_csv(csv_data)
+
+
+class TestCubeQuery(unittest.TestCase):
+
+    def setUp(self):
+        """Index a fresh cube before each test."""
+        self.cube = CubeQuery(cube_df)
+
+    def test_dimensions_and_metrics_are_inferred(self):
+        self.assertEqual(self.cube.dimensions, ["region", "product_id", "DayOfWeek"])
+        self.assertNotIn("sale_ids", self.cube.metrics)
+
+    def test_rollup_matches_groupby(self):
+        result = self.cube.rollup(["region"])
+        expected = cube_df.groupby("region")[["sale_amount_usd_sum", "sale_id_count"]].sum().reset_index()
+        self.assertListEqual(result["region"].tolist(), expected["region"].tolist())
+        self.assertListEqual(result["sale_amount_usd_sum"].tolist(), expected["sale_amount_usd_sum"].tolist())
+        self.assertListEqual(result["sale_id_count"].tolist(), expected["sale_id_count"].tolist())
+
+    def test_rollup_recomputes_mean_from_sum_and_count(self):
+        result = self.cube.rollup(["region"]).set_index("region")
+        self.assertAlmostEqual(result.loc["East", "sale_amount_usd_mean"], 190.0 / 6)
+
+    def test_rollup_without_dims_gives_grand_total(self):
+        result = self.cube.rollup([])
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result["sale_amount_usd_sum"].iloc[0], 240.0)
+
+    def test_slice(self):
+        east = self.cube.slice(region="East")
+        self.assertEqual(len(east.row_positions), 3)
+        self.assertEqual(east.rollup([])["sale_id_count"].iloc[0], 6)
+
+    def test_dice(self):
+        diced = self.cube.dice({"product_id": [101, 103], "DayOfWeek": ["Friday", "Sunday"]})
+        self.assertListEqual(diced.row_positions.tolist(), [0, 3, 4])
+
+    def test_slice_of_dice_intersects(self):
+        diced = self.cube.dice({"product_id": [101, 103]}).slice(region="West")
+        self.assertListEqual(diced.row_positions.tolist(), [3, 4])
+
+    def test_drilldown_keeps_slice_context(self):
+        result = self.cube.slice(region="East").drilldown("DayOfWeek")
+        self.assertListEqual(result.columns[:2].tolist(), ["region", "DayOfWeek"])
+        self.assertListEqual(result["sale_amount_usd_sum"].tolist(), [130.0, 60.0])
+
+    def test_unknown_dimension_raises(self):
+        with self.assertRaises(KeyError):
+            self.cube.rollup(["store_id"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+r"""
+tests/test_cube_server.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_cube_server.py
+    python3 tests\test_cube_server.py
+
+This test suite starts the cube query server on a free localhost port and
+verifies roll-up and top-N answers, hot reload of a rewritten cube file,
+error responses, per-endpoint latency stats, that goal queries read the
+warehouse version once per check interval (or on /reload), and the
+localhost-only rule.
+"""
+
+import unittest
+import json
+import pathlib
+import sqlite3
+import sys
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from io import StringIO
+from unittest import mock
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from olap.cube_server import CubeQueryService, create_server  # noqa: E402
+from olap import goal_planner  # noqa: E402
+from olap.goal_planner import GoalPlanner  # noqa: E402
+
+# Create a fake day cube using StringIO
+csv_data = StringIO("""
+DayOfWeek,product_id,sale_amount_usd_sum,sale_id_count
+Monday,101,100.0,1
+Monday,102,50.0,1
+Tuesday,101,25.0,1
+Tuesday,103,40.0,2
+""")
+
+cube_df = pd.read_csv(csv_data)
+CUBE = "multidimensional_olap_cube.csv"
+
+
+class TestCubeServer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cube_dir = pathlib.Path(self.tmp.name)
+        cube_df.to_csv(self.cube_dir.joinpath(CUBE), index=False)
+        service = CubeQueryService(GoalPlanner(self.cube_dir, self.cube_dir.joinpath("smart_sales.db")))
+        self.server = create_server(port=0, workers=2, service=service)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def request(self, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        try:
+            with urllib.request.urlopen(urllib.request.Request(self.url + path, data=data)) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def test_queries_reload_and_stats(self):
+        status, result = self.request("/rollup", {"cube": CUBE, "dims": ["DayOfWeek"]})
+        self.assertEqual(status, 200)
+        self.assertListEqual([row["sale_amount_usd_sum"] for row in result["rows"]], [150.0, 65.0])
+
+        body = {"cube": CUBE, "group_by": ["DayOfWeek"], "by": ["product_id"], "value": "sale_amount_usd_sum"}
+        status, result = self.request("/topn", body)
+        self.assertListEqual([row["product_id"] for row in result["rows"]], [101, 103])
+
+        # A rewritten cube file is picked up by the next request
+        pd.concat([cube_df, cube_df.iloc[[0]].assign(DayOfWeek="Friday")]).to_csv(self.cube_dir.joinpath(CUBE), index=False)
+        status, result = self.request("/slice", {"cube": CUBE, "criteria": {"DayOfWeek": "Friday"}})
+        self.assertEqual(result["rows"], [{"DayOfWeek": "Friday", "sale_amount_usd_sum": 100.0, "sale_id_count": 1}])
+
+        self.assertEqual(self.request("/rollup", {"cube": "missing.csv"})[0], 404)
+        self.assertEqual(self.request("/rollup", {"cube": CUBE, "dims": ["region"]})[0], 400)
+
+        status, stats = self.request("/stats")
+        self.assertEqual(stats["endpoints"]["/rollup"]["count"], 3)
+        self.assertLessEqual(stats["endpoints"]["/rollup"]["p50_ms"], stats["endpoints"]["/rollup"]["p99_ms"])
+
+    def test_warehouse_read_once_per_interval(self):
+        conn = sqlite3.connect(self.cube_dir.joinpath("smart_sales.db"))
+        conn.execute("CREATE TABLE sale (sale_id INTEGER PRIMARY KEY, sale_amount_usd REAL)")
+        conn.commit()
+        conn.close()
+
+        query = {"measures": ["sale_amount_usd_sum"], "group_by": ["DayOfWeek"]}
+        with mock.patch.object(goal_planner, "get_warehouse_version", wraps=goal_planner.get_warehouse_version) as version:
+            for _ in range(5):
+                status, result = self.request("/query", query)
+                self.assertEqual(status, 200)
+            self.assertEqual(version.call_count, 1)
+            self.assertEqual(result["plan"]["name"], CUBE)
+
+            status, result = self.request("/reload", {})
+            self.assertTrue(result["warehouse_version"].startswith("v0-"))
+            self.request("/query", query)
+            self.assertEqual(version.call_count, 2)
+
+    def test_refuses_non_local_host(self):
+        with self.assertRaises(ValueError):
+            create_server(host="0.0.0.0", port=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
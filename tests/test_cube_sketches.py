@@ -0,0 +1,186 @@
+r"""
+tests/test_cube_sketches.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_cube_sketches.py
+    python3 tests\test_cube_sketches.py
+
+This test suite verifies that the HyperLogLog and KLL sketch metrics give
+close estimates and merge correctly on roll-up and incremental refresh,
+that small HLL sketches stay sparse, and that 1001 and 1001.0 are the
+same distinct value. It also verifies that "hll" and "kll" work as cube
+metrics next to sum and count: in create_olap_cube(), in both parallel
+builds, and in a cubing script's build and CSV file.
+"""
+
+import unittest
+import pathlib
+import sys
+import tempfile
+from unittest import mock
+import numpy as np
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from olap import olap_cubing_region  # noqa: E402
+from olap.olap_cubing import create_olap_cube  # noqa: E402
+from olap.cube_engine import choose_cube_backend, create_olap_cube_parallel  # noqa: E402
+from olap.cube_sketches import (  # noqa: E402
+    HLL_PRECISION,
+    HyperLogLog,
+    KLLSketch,
+    create_sketch_cube,
+    merge_sketch_cubes,
+    rollup_sketch_cube,
+    summarize_sketch_cube,
+    serialize_sketch_cube,
+    deserialize_sketch_cube,
+    hash_values,
+)
+
+# Create a fake sale fact table with a fixed random seed
+rng = np.random.default_rng(42)
+sales_df = pd.DataFrame({
+    "region": rng.choice(["East", "North", "South", "West"], 20000),
+    "Month": rng.integers(1, 13, 20000),
+    "customer_id": rng.integers(1000, 3000, 20000),
+    "sale_amount_usd": rng.exponential(100.0, 20000),
+})
+SKETCHES = {"customer_id": "hll", "sale_amount_usd": "kll"}
+
+# Sketch metrics next to the usual cube metrics, on a fact table with sale_id and sale_date
+facts_df = sales_df.assign(
+    sale_id=np.arange(len(sales_df)),
+    sale_date=pd.date_range("2024-01-01", periods=len(sales_df), freq="h"),
+)
+CUBE_METRICS = {"sale_amount_usd": ["sum", "kll"], "customer_id": "hll", "sale_id": "count"}
+
+
+class TestCubeSketches(unittest.TestCase):
+
+    def test_hll_estimate_is_close(self):
+        sketch = HyperLogLog.from_values(np.arange(50000))
+        self.assertAlmostEqual(sketch.estimate(), 50000, delta=50000 * 0.1)
+
+    def test_hll_merge_is_union(self):
+        left = HyperLogLog.from_values(np.arange(0, 3000))
+        right = HyperLogLog.from_values(np.arange(2000, 5000))
+        self.assertAlmostEqual(left.merge(right).estimate(), 5000, delta=500)
+
+    def test_hll_small_cells_stay_sparse(self):
+        cube = create_sketch_cube(sales_df, ["customer_id", "Month"], {"region": "hll"})
+        sizes = [sketch.nbytes for sketch in cube["region_hll"]]
+        self.assertLess(max(sizes), 1 << HLL_PRECISION)
+        # A sparse sketch estimates and serializes like its dense equivalent
+        sketch = cube["region_hll"].iloc[0]
+        dense = HyperLogLog(HLL_PRECISION, sketch.registers.copy())
+        self.assertIsNotNone(sketch.sparse)
+        self.assertAlmostEqual(sketch.estimate(), dense.estimate())
+        self.assertEqual(sketch.to_bytes(), dense.to_bytes())
+
+    def test_hll_sparse_sketch_densifies_and_matches(self):
+        sparse = HyperLogLog()
+        for start in range(0, 5000, 100):
+            sparse.update(np.arange(start, start + 100))
+        self.assertIsNone(sparse.sparse)
+        direct = HyperLogLog(HLL_PRECISION, np.zeros(1 << HLL_PRECISION, dtype=np.uint8))
+        direct.update(np.arange(5000))
+        np.testing.assert_array_equal(sparse.registers, direct.registers)
+
+    def test_hll_integral_floats_hash_like_integers(self):
+        self.assertTrue((hash_values([1001, 1002]) == hash_values([1001.0, 1002.0])).all())
+        self.assertTrue((hash_values(np.array([1001, 1002.5], dtype=object)) == hash_values([1001.0, 1002.5])).all())
+        sketch = HyperLogLog.from_values([1001, 1002])
+        sketch.update([1001.0, 1002.0])
+        self.assertEqual(round(sketch.estimate()), 2)
+
+    def test_kll_is_exact_for_small_inputs(self):
+        sketch = KLLSketch.from_values(np.arange(1, 11))
+        self.assertEqual(sketch.quantile(0.5), 5.0)
+        self.assertEqual(sketch.quantile(1.0), 10.0)
+
+    def test_kll_keeps_total_count(self):
+        sketch = KLLSketch.from_values(rng.normal(size=10000))
+        self.assertEqual(sketch.count, 10000)
+        self.assertAlmostEqual(sketch.quantile(0.5), 0.0, delta=0.1)
+
+    def test_kll_merge_keeps_error_bound(self):
+        values = rng.normal(size=20000)
+        merged = KLLSketch.from_values(values[:7000]).merge(KLLSketch.from_values(values[7000:]))
+        self.assertEqual(merged.count, len(values))
+        for q in (0.1, 0.5, 0.9):
+            # Compare ranks, not values: the merged sketch differs from a direct one but stays within the bound
+            rank = np.mean(values <= merged.quantile(q))
+            self.assertAlmostEqual(rank, q, delta=0.02)
+
+    def test_rollup_matches_direct_sketch(self):
+        fine = create_sketch_cube(sales_df, ["region", "Month"], SKETCHES)
+        rolled = summarize_sketch_cube(rollup_sketch_cube(fine, ["region"]))
+        direct = summarize_sketch_cube(create_sketch_cube(sales_df, ["region"], SKETCHES))
+        # HLL registers merge losslessly, so distinct estimates are identical
+        self.assertListEqual(rolled["customer_id_distinct"].tolist(), direct["customer_id_distinct"].tolist())
+        exact = sales_df.groupby("region")["sale_amount_usd"].median()
+        np.testing.assert_allclose(rolled["sale_amount_usd_p50"], exact.to_numpy(), rtol=0.1)
+
+    def test_incremental_refresh(self):
+        old = create_sketch_cube(sales_df.iloc[:12000], ["region"], SKETCHES)
+        new = create_sketch_cube(sales_df.iloc[12000:], ["region"], SKETCHES)
+        merged = summarize_sketch_cube(merge_sketch_cubes(old, new, ["region"]))
+        full = summarize_sketch_cube(create_sketch_cube(sales_df, ["region"], SKETCHES))
+        self.assertListEqual(merged["customer_id_distinct"].tolist(), full["customer_id_distinct"].tolist())
+
+    def test_serialization_round_trip(self):
+        cube = create_sketch_cube(sales_df, ["region"], SKETCHES)
+        restored = deserialize_sketch_cube(serialize_sketch_cube(cube))
+        pd.testing.assert_frame_equal(summarize_sketch_cube(restored), summarize_sketch_cube(cube))
+
+    def test_sketches_are_cube_metrics(self):
+        cube = create_olap_cube(facts_df, ["region", "Month"], CUBE_METRICS)
+        self.assertListEqual(cube.columns.tolist(), [
+            "region", "Month", "sale_amount_usd_sum", "sale_amount_usd_kll",
+            "customer_id_hll", "sale_id_count", "sale_ids",
+        ])
+        plain = create_olap_cube(facts_df, ["region", "Month"], {"sale_amount_usd": "sum", "sale_id": "count"})
+        pd.testing.assert_frame_equal(cube[plain.columns], plain)
+        sketches = summarize_sketch_cube(create_sketch_cube(facts_df, ["region", "Month"], SKETCHES))
+        summary = summarize_sketch_cube(cube)
+        for col in ("customer_id_distinct", "sale_amount_usd_p50", "sale_amount_usd_p90"):
+            self.assertListEqual(summary[col].tolist(), sketches[col].tolist())
+        # Sketches are built by the sparse backend only
+        self.assertEqual(choose_cube_backend(facts_df, ["region", "Month"], CUBE_METRICS), "sparse")
+
+    def test_parallel_builds_merge_sketch_metrics(self):
+        serial = summarize_sketch_cube(create_olap_cube(facts_df, ["region"], CUBE_METRICS))
+        by_key = create_olap_cube_parallel(facts_df, ["region"], CUBE_METRICS, max_workers=1, n_partitions=3)
+        pd.testing.assert_frame_equal(summarize_sketch_cube(by_key), serial)
+
+        # Date partitions split every cell, so the sketches are merged in the reduce step
+        by_date = summarize_sketch_cube(create_olap_cube_parallel(
+            facts_df, ["region"], CUBE_METRICS, max_workers=1, n_partitions=3, partition_by="date"
+        ))
+        self.assertListEqual(by_date["customer_id_distinct"].tolist(), serial["customer_id_distinct"].tolist())
+        self.assertListEqual(by_date["sale_ids"].tolist(), serial["sale_ids"].tolist())
+        for region, p50 in zip(by_date["region"], by_date["sale_amount_usd_p50"]):
+            amounts = facts_df.loc[facts_df["region"] == region, "sale_amount_usd"]
+            self.assertAlmostEqual(np.mean(amounts <= p50), 0.5, delta=0.02)
+
+    def test_cubing_script_builds_and_writes_sketch_metrics(self):
+        facts = facts_df.drop(columns="Month")
+        cube = olap_cubing_region.build_cube(["region", "Month"], CUBE_METRICS, sales_df=facts.copy())
+        with tempfile.TemporaryDirectory() as temp:
+            with mock.patch.object(olap_cubing_region, "OLAP_OUTPUT_DIR", pathlib.Path(temp)):
+                olap_cubing_region.write_cube_to_csv(cube, "sketch_cube.csv")
+            written = pd.read_csv(pathlib.Path(temp).joinpath("sketch_cube.csv"))
+        restored = deserialize_sketch_cube(written.drop(columns="sale_ids"))
+        expected = summarize_sketch_cube(cube.drop(columns="sale_ids"))
+        pd.testing.assert_frame_equal(summarize_sketch_cube(restored), expected, check_dtype=False)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+r"""
+tests/test_cube_spark.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py -m pytest tests\test_cube_spark.py
+    python3 -m pytest tests/test_cube_spark.py
+
+This test suite verifies that the Spark backend builds each standard cube
+(the definitions of olap_cubing.py, olap_cubing_month.py and
+olap_cubing_region.py) with the same cells, counts and sale_ids as the
+pandas engine, and sums and means within a few units in the last place
+(a mean rounded to 10 decimal places would fail). It is skipped when
+pyspark is not installed.
+"""
+
+import unittest
+import pathlib
+import sys
+import tempfile
+from io import StringIO
+from unittest import mock
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyspark")
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from olap import cube_spark  # noqa: E402
+from olap.olap_cubing import add_time_dimensions, create_olap_cube  # noqa: E402
+
+# Create a fake prepared sale table using StringIO
+# (2024-01-01 is a Monday; customer 1009 has no customer row; cell 101/1001/Monday has mean 100/3)
+csv_data = StringIO("""
+sale_id,sale_date,customer_id,product_id,sale_amount_usd
+1,2024-01-01,1001,101,40.0
+2,2024-01-01,1002,102,50.10
+3,2024-01-02,1001,101,25.0
+4,2024-02-05,1001,101,30.0
+5,2024-01-08,1001,101,30.0
+6,2024-02-06,1009,103,10.30
+7,2024-02-06,1003,103,0.1
+8,2024-02-07,1003,103,0.2
+""")
+
+sales_df = pd.read_csv(csv_data)
+
+products_df = pd.DataFrame({"product_id": [101, 102, 103], "category": ["Electronics", "Clothing", "Clothing"]})
+customers_df = pd.DataFrame({"customer_id": [1001, 1002, 1003], "region": ["East", "West", "East"]})
+
+# Relative tolerance of a few units in the last place of a double
+RTOL = 1e-15
+
+
+def pandas_cube(definition: dict) -> pd.DataFrame:
+    """Build a cube the way the pandas cubing scripts do (inner joins in warehouse order)."""
+    facts = sales_df
+    if "product" in definition["joins"]:
+        facts = facts.merge(products_df, on="product_id", how="inner")
+    if "customer" in definition["joins"]:
+        facts = facts.merge(customers_df, on="customer_id", how="inner")
+    return create_olap_cube(add_time_dimensions(facts.copy()), definition["dimensions"], definition["metrics"])
+
+
+class TestCubeSpark(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        prepared = pathlib.Path(cls.tmp.name)
+        sales_df.to_csv(prepared.joinpath(cube_spark.PREPARED_FILES["sale"]), index=False)
+        products_df.to_csv(prepared.joinpath(cube_spark.PREPARED_FILES["product"]), index=False)
+        customers_df.to_csv(prepared.joinpath(cube_spark.PREPARED_FILES["customer"]), index=False)
+        cls.spark = cube_spark.get_spark_session(master="local[2]", source="prepared")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.spark.stop()
+        cls.tmp.cleanup()
+
+    def test_standard_cubes_match_pandas(self):
+        with mock.patch.object(cube_spark, "PREPARED_DATA_DIR", pathlib.Path(self.tmp.name)):
+            for definition in cube_spark.SPARK_CUBES:
+                with self.subTest(cube=definition["file_name"]):
+                    sales = cube_spark.ingest_sales_data_spark(self.spark, definition["joins"], source="prepared")
+                    spark_cube = cube_spark.create_olap_cube_spark(sales, definition["dimensions"], definition["metrics"])
+                    expected = pandas_cube(definition)
+                    pd.testing.assert_frame_equal(spark_cube, expected, check_dtype=False, rtol=RTOL, atol=0)
+                    self.assertTrue(cube_spark.compare_cubes(spark_cube, expected, rtol=RTOL))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+r"""
+tests/test_cube_sql.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_cube_sql.py
+    python3 tests\test_cube_sql.py
+
+This test suite verifies that the SQL pushdown in create_olap_cube_sql()
+builds the same cube inside a temporary data warehouse as the pandas
+groupby in create_olap_cube(): sums, means, counts and the sale_ids
+traceability column in fact row order, with and without dimension joins.
+It also verifies that build_cube() with the "sql" backend does not read
+the facts into pandas.
+"""
+
+import unittest
+import pathlib
+import sqlite3
+import sys
+import tempfile
+from io import StringIO
+from unittest import mock
+import numpy as np
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from olap import olap_cubing_month  # noqa: E402
+from olap.olap_cubing import create_olap_cube  # noqa: E402
+from olap.cube_engine import CUBE_BUILD_SETTINGS, add_time_dimensions, build_cube, choose_cube_backend  # noqa: E402
+from olap.cube_sql import POPULATION_JOINS, create_olap_cube_sql  # noqa: E402
+
+# Create a fake sale table using StringIO (sale_ids out of order; customer 1009 has no customer row)
+csv_data = StringIO("""
+sale_id,sale_date,product_id,customer_id,sale_amount_usd
+7,2024-01-01,101,1001,100.10
+3,2024-01-01,102,1002,50.25
+9,2024-01-01,101,1001,25.00
+1,2024-02-07,103,1003,10.00
+5,2024-02-08,101,1009,40.40
+2,2024-02-08,101,1003,75.50
+8,2024-02-08,102,1003,12.34
+""")
+
+# Load the fake CSV data into a DataFrame
+sales_df = pd.read_csv(csv_data)
+products_df = pd.DataFrame({"product_id": [101, 102, 103], "category": ["Electronics", "Clothing", "Clothing"]})
+customers_df = pd.DataFrame({"customer_id": [1001, 1002, 1003], "region": ["East", "West", "East"]})
+
+METRICS = {"sale_amount_usd": ["sum", "mean"], "sale_id": "count"}
+
+
+class TestCubeSql(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = pathlib.Path(self.tmp.name).joinpath("smart_sales.db")
+        conn = sqlite3.connect(self.db_path)
+        sales_df.to_sql("sale", conn, index=False)
+        products_df.to_sql("product", conn, index=False)
+        customers_df.to_sql("customer", conn, index=False)
+        conn.close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def assertSameCube(self, sql_cube: pd.DataFrame, expected: pd.DataFrame):
+        """Compare a SQL cube with a pandas cube; sale_ids is text in the SQL cube."""
+        self.assertListEqual(sql_cube.columns.tolist(), expected.columns.tolist())
+        self.assertEqual(len(sql_cube), len(expected))
+        for col in expected.columns:
+            if col == "sale_ids":
+                self.assertListEqual(sql_cube[col].tolist(), [str(ids) for ids in expected[col]])
+            elif pd.api.types.is_float_dtype(expected[col]):
+                np.testing.assert_allclose(sql_cube[col].to_numpy(), expected[col].to_numpy())
+            else:
+                self.assertListEqual(sql_cube[col].tolist(), expected[col].tolist())
+
+    def test_sale_population_matches_pandas(self):
+        dimensions = ["DayOfWeek", "product_id"]
+        expected = create_olap_cube(add_time_dimensions(sales_df.copy()), dimensions, METRICS)
+        sql_cube = create_olap_cube_sql(dimensions, METRICS, db_path=self.db_path)
+        self.assertSameCube(sql_cube, expected)
+
+    def test_joined_population_matches_pandas(self):
+        dimensions = olap_cubing_month.CUBE_DIMENSIONS
+        joined = sales_df.merge(products_df, on="product_id").merge(customers_df, on="customer_id")
+        expected = create_olap_cube(add_time_dimensions(joined), dimensions, METRICS)
+        sql_cube = create_olap_cube_sql(
+            dimensions, METRICS, joins=POPULATION_JOINS[olap_cubing_month.CUBE_POPULATION], db_path=self.db_path
+        )
+        self.assertSameCube(sql_cube, expected)
+        # The sale without a customer row is not in the joined population
+        self.assertNotIn(5, [sale_id for ids in expected["sale_ids"] for sale_id in ids])
+
+    def test_build_cube_with_sql_backend_skips_ingest(self):
+        dimensions = ["DayOfWeek", "product_id"]
+        expected = create_olap_cube(add_time_dimensions(sales_df.copy()), dimensions, METRICS)
+        ingest = mock.Mock()
+        with mock.patch.dict(CUBE_BUILD_SETTINGS, {"backend": "sql"}):
+            cube = build_cube(dimensions, METRICS, ingest=ingest, db_path=self.db_path)
+        ingest.assert_not_called()
+        # sale_ids comes back as lists, like the other backends
+        self.assertListEqual(cube["sale_ids"].tolist(), expected["sale_ids"].tolist())
+        self.assertSameCube(cube.assign(sale_ids=cube["sale_ids"].map(str)), expected)
+
+    def test_unloaded_facts_choose_sql(self):
+        self.assertEqual(choose_cube_backend(None, ["DayOfWeek"], METRICS), "sql")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+r"""
+tests/test_cube_topn.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_cube_topn.py
+    python3 tests\test_cube_topn.py
+
+This test suite verifies that top_n_per_group() returns the same rows as
+sorting the whole frame and taking head(n) per group, for top and bottom
+rankings, with and without ties.
+"""
+
+import unittest
+import pathlib
+import sys
+from io import StringIO
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from olap import cube_topn  # noqa: E402
+from olap.cube_topn import top_n_per_group  # noqa: E402
+
+# Create a fake DayOfWeek x product_id roll-up using StringIO
+csv_data = StringIO("""
+DayOfWeek,product_id,TotalSales
+Monday,101,500.0
+Monday,102,700.0
+Monday,103,700.0
+Monday,104,100.0
+Tuesday,101,300.0
+Tuesday,102,
+Tuesday,103,900.0
+Wednesday,101,50.0
+""")
+
+# Load the fake CSV data into a DataFrame
+grouped = pd.read_csv(csv_data)
+
+
+def products(df: pd.DataFrame) -> list:
+    return list(zip(df["DayOfWeek"], df["product_id"]))
+
+
+class TestTopNPerGroup(unittest.TestCase):
+
+    def test_top_one_matches_sort_and_head(self):
+        expected = grouped.sort_values(["DayOfWeek", "TotalSales"], ascending=[True, False]).groupby("DayOfWeek").head(1)
+        result = top_n_per_group(grouped, ["DayOfWeek"], "TotalSales")
+        self.assertListEqual(products(result), products(expected))
+        self.assertListEqual(result.index.tolist(), expected.index.tolist())
+
+    def test_top_n_with_and_without_ties(self):
+        result = top_n_per_group(grouped, ["DayOfWeek"], "TotalSales", n=2)
+        self.assertListEqual(
+            products(result),
+            [("Monday", 102), ("Monday", 103), ("Tuesday", 103), ("Tuesday", 101), ("Wednesday", 101)],
+        )
+        result = top_n_per_group(grouped, ["DayOfWeek"], "TotalSales", n=1, ties=True)
+        self.assertListEqual(products(result), [("Monday", 102), ("Monday", 103), ("Tuesday", 103), ("Wednesday", 101)])
+
+    def test_bottom_n(self):
+        result = top_n_per_group(grouped, ["DayOfWeek"], "TotalSales", n=1, bottom=True)
+        self.assertListEqual(products(result), [("Monday", 104), ("Tuesday", 101), ("Wednesday", 101)])
+
+    def test_sort_path_matches_rounds(self):
+        for ties in (False, True):
+            rounds = top_n_per_group(grouped, ["DayOfWeek"], "TotalSales", n=3, ties=ties)
+            saved = cube_topn.TOPN_ROUNDS_MAX
+            cube_topn.TOPN_ROUNDS_MAX = 0
+            try:
+                sorted_result = top_n_per_group(grouped, ["DayOfWeek"], "TotalSales", n=3, ties=ties)
+            finally:
+                cube_topn.TOPN_ROUNDS_MAX = saved
+            self.assertTrue(rounds.equals(sorted_result))
+
+
+if __name__ == "__main__":
+    unittest.main()
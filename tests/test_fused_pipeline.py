@@ -0,0 +1,70 @@
+r"""
+tests/test_fused_pipeline.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_fused_pipeline.py
+    python3 tests\test_fused_pipeline.py
+
+This test suite verifies the pieces of the fused in-memory pipeline: shared
+frames stay independent, the warehouse gets dates as CSV text, the joined
+facts match the warehouse's inner joins, and background CSV writes land.
+"""
+
+import unittest
+import pathlib
+import sys
+import tempfile
+from io import StringIO
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from scripts.fused_pipeline import BackgroundWriter, joined_facts, share, warehouse_frame  # noqa: E402
+
+# Create a fake prepared sale table using StringIO (customer 1009 has no customer row)
+csv_data = StringIO("""
+sale_id,sale_date,product_id,customer_id,sale_amount_usd
+1,2024-01-01,101,1001,100.0
+2,2024-01-01,102,1002,50.0
+3,2024-01-02,101,1009,25.0
+""")
+
+sales_df = pd.read_csv(csv_data, parse_dates=["sale_date"])
+products_df = pd.DataFrame({"product_id": [101, 102], "category": ["Electronics", "Clothing"]})
+customers_df = pd.DataFrame({"customer_id": [1001, 1002], "region": ["East", "West"]})
+
+
+class TestFusedPipeline(unittest.TestCase):
+
+    def test_shared_frames_and_warehouse_dates(self):
+        shared = share(sales_df)
+        shared["sale_amount_usd"] = 0.0
+        shared["DayOfWeek"] = "Monday"
+        self.assertEqual(sales_df["sale_amount_usd"].sum(), 175.0)
+        self.assertNotIn("DayOfWeek", sales_df.columns)
+
+        loaded = warehouse_frame(sales_df)
+        self.assertListEqual(loaded["sale_date"].tolist(), ["2024-01-01", "2024-01-01", "2024-01-02"])
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(sales_df["sale_date"]))
+
+        facts = joined_facts(sales_df, products_df, customers_df)
+        self.assertListEqual(facts["sale_id"].tolist(), [1, 2])
+        self.assertListEqual(facts["region"].tolist(), ["East", "West"])
+
+    def test_background_csv_writes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            writer = BackgroundWriter()
+            writer.write_csv(share(sales_df), pathlib.Path(tmp).joinpath("sales.csv"))
+            writer.write_csv(products_df, pathlib.Path(tmp).joinpath("nested", "products.csv"))
+            writer.wait()
+            self.assertEqual(len(pd.read_csv(pathlib.Path(tmp).joinpath("sales.csv"))), 3)
+            self.assertEqual(sorted(p.name for p in pathlib.Path(tmp).rglob("*")), ["nested", "products.csv", "sales.csv"])
+
+
+if __name__ == "__main__":
+    unittest.main()
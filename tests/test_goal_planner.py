@@ -0,0 +1,143 @@
+r"""
+tests/test_goal_planner.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_goal_planner.py
+    python3 tests\test_goal_planner.py
+
+This test suite verifies that GoalPlanner answers a goal query from the
+smallest cuboid that covers it, and pushes the query down to SQL when no
+cuboid does, with the same answer either way. Cubes from another fact
+population or with an iceberg "Other" row are never substituted, so the
+answer does not depend on which cube files exist.
+"""
+
+import unittest
+import pathlib
+import sqlite3
+import sys
+import tempfile
+from io import StringIO
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from olap.cube_iceberg import create_iceberg_cube  # noqa: E402
+from olap.cube_time import create_time_hierarchy_cubes  # noqa: E402
+from olap.goal_planner import GoalPlanner  # noqa: E402
+from olap.olap_cubing import add_time_dimensions, create_olap_cube  # noqa: E402
+from olap.olap_cubing_time import time_cube_filename  # noqa: E402
+
+# Create a fake sale table using StringIO (2024-01-01 is a Monday; customer 1009 has no customer row)
+csv_data = StringIO("""
+sale_id,sale_date,product_id,customer_id,sale_amount_usd
+1,2024-01-01,101,1001,100.0
+2,2024-01-01,102,1002,50.0
+3,2024-01-02,101,1001,25.0
+4,2024-01-03,103,1003,10.0
+5,2024-01-04,101,1009,40.0
+""")
+
+# Load the fake CSV data into a DataFrame
+sales_df = pd.read_csv(csv_data)
+products_df = pd.DataFrame({"product_id": [101, 102, 103], "category": ["Electronics", "Clothing", "Clothing"]})
+customers_df = pd.DataFrame({"customer_id": [1001, 1002, 1003], "region": ["East", "West", "East"]})
+
+METRICS = {"sale_amount_usd": ["sum", "mean"], "sale_id": "count"}
+
+
+class TestGoalPlanner(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = pathlib.Path(self.tmp.name)
+        db_path = root.joinpath("smart_sales.db")
+        conn = sqlite3.connect(db_path)
+        sales_df.to_sql("sale", conn, index=False)
+        products_df.to_sql("product", conn, index=False)
+        customers_df.to_sql("customer", conn, index=False)
+        conn.close()
+
+        facts = add_time_dimensions(sales_df.copy())
+        big = create_olap_cube(facts, ["DayOfWeek", "product_id", "customer_id"], METRICS)
+        small = create_olap_cube(facts, ["DayOfWeek"], METRICS)
+        big.to_csv(root.joinpath("multidimensional_olap_cube.csv"), index=False)
+        small.to_csv(root.joinpath("multidimensional_olap_day_cube.csv"), index=False)
+
+        # The month cube inner-joins product and customer, as olap_cubing_month.py does
+        joined = facts.merge(products_df, on="product_id").merge(customers_df, on="customer_id")
+        month = create_olap_cube(joined, ["Month", "product_id", "category", "customer_id"], METRICS)
+        month.to_csv(root.joinpath("multidimensional_olap_month_cube.csv"), index=False)
+
+        self.root = root
+        self.populations = {
+            "multidimensional_olap_cube.csv": "sale",
+            "multidimensional_olap_day_cube.csv": "sale",
+            "multidimensional_olap_month_cube.csv": "sale+product+customer",
+            time_cube_filename("Month"): "sale",
+            "multidimensional_olap_month_iceberg_cube.csv": "sale+product+customer",
+        }
+        self.planner = GoalPlanner(root, db_path, self.populations)
+
+    def tearDown(self):
+        self.planner.close()
+        self.tmp.cleanup()
+
+    def test_smallest_covering_cuboid_wins(self):
+        query = {"measures": ["sale_amount_usd_sum"], "group_by": ["DayOfWeek"]}
+        plan = self.planner.plan(query)
+        self.assertEqual((plan["source"], plan["name"]), ("csv", "multidimensional_olap_day_cube.csv"))
+
+        query = {"measures": ["sale_amount_usd_sum"], "group_by": ["DayOfWeek"], "filters": {"product_id": 101}}
+        plan = self.planner.plan(query)
+        self.assertEqual(plan["name"], "multidimensional_olap_cube.csv")
+        self.assertIn("missing product_id", plan["rejected"]["multidimensional_olap_day_cube.csv"])
+        answer = self.planner.answer(query, plan)
+        self.assertListEqual(answer["sale_amount_usd_sum"].tolist(), [100.0, 40.0, 25.0])
+
+    def test_sql_pushdown_when_nothing_covers(self):
+        query = {"measures": ["sale_amount_usd_sum", "sale_id_count"], "group_by": ["category"]}
+        plan = self.planner.plan(query)
+        self.assertEqual(plan["source"], "sql")
+        answer = self.planner.answer(query, plan)
+        self.assertListEqual(answer["category"].tolist(), ["Clothing", "Electronics"])
+        self.assertListEqual(answer["sale_amount_usd_sum"].tolist(), [60.0, 165.0])
+        self.assertListEqual(answer["sale_id_count"].tolist(), [2, 3])
+
+    def test_answer_does_not_depend_on_which_cubes_exist(self):
+        query = {"measures": ["sale_amount_usd_sum"], "group_by": ["Month", "product_id"], "population": "sale+product+customer"}
+        before = self.planner.answer(query)
+        self.assertEqual(self.planner.plan(query)["name"], "multidimensional_olap_month_cube.csv")
+
+        # A smaller time cube over every sale, and an iceberg cube of the joined sales
+        time_month = create_time_hierarchy_cubes(sales_df.copy(), ["product_id"], METRICS)["Month"]
+        time_month.to_csv(self.root.joinpath(time_cube_filename("Month")), index=False)
+        joined = add_time_dimensions(sales_df.copy()).merge(products_df, on="product_id").merge(customers_df, on="customer_id")
+        iceberg = create_iceberg_cube(joined, ["Month", "product_id"], METRICS, min_count=2, other_bucket=True)
+        iceberg.to_csv(self.root.joinpath("multidimensional_olap_month_iceberg_cube.csv"), index=False)
+
+        plan = self.planner.plan(query)
+        self.assertEqual(plan["name"], "multidimensional_olap_month_cube.csv")
+        self.assertIn("population sale,", plan["rejected"][time_cube_filename("Month")])
+        self.assertIn("iceberg", plan["rejected"]["multidimensional_olap_month_iceberg_cube.csv"])
+        pd.testing.assert_frame_equal(self.planner.answer(query, plan), before)
+        self.assertListEqual(before["sale_amount_usd_sum"].tolist(), [125.0, 50.0, 10.0])
+
+        # Without any joined cube the warehouse answers with the same joins
+        self.root.joinpath("multidimensional_olap_month_cube.csv").unlink()
+        plan = self.planner.plan(query)
+        self.assertEqual(plan["source"], "sql")
+        pd.testing.assert_frame_equal(self.planner.answer(query, plan), before, check_dtype=False)
+
+        # Over every sale, the time cube is used and sale 5 counts
+        answer = self.planner.answer({**query, "population": "sale"})
+        self.assertListEqual(answer["sale_amount_usd_sum"].tolist(), [165.0, 50.0, 10.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
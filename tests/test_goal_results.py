@@ -0,0 +1,76 @@
+r"""
+tests/test_goal_results.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_goal_results.py
+    python3 tests\test_goal_results.py
+
+This test suite verifies that GoalResultStore serves repeated goals from
+its memo, counts hits and misses, and retires answers when the cube file
+changes.
+"""
+
+import unittest
+import pathlib
+import sys
+import tempfile
+from io import StringIO
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from olap.goal_results import GoalResultStore, cube_file_version  # noqa: E402
+
+# Create a fake region cube using StringIO
+csv_data = StringIO("""
+region,product_id,customer_id,sale_amount_usd_sum
+East,101,1001,6344.96
+West,102,1002,4233.64
+""")
+
+
+class TestGoalResultStore(unittest.TestCase):
+
+    def test_memo_hits_misses_and_invalidation(self):
+        calls = []
+
+        def answer():
+            calls.append(1)
+            return pd.DataFrame({"region": ["West"], "TotalSales": [4233.64]}), []
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cube_file = pathlib.Path(tmp).joinpath("cube.csv")
+            cube_file.write_text(csv_data.getvalue())
+            store = GoalResultStore(pathlib.Path(tmp).joinpath("store"))
+
+            version = cube_file_version(cube_file)
+            store.get_or_compute("sales_by_region", {}, version, answer)
+            table, charts = store.get_or_compute("sales_by_region", {}, version, answer)
+            self.assertEqual(len(calls), 1)
+            self.assertEqual(table["region"].iloc[0], "West")
+
+            # Different parameters are a different answer
+            store.get_or_compute("sales_by_region", {"n": 2}, version, answer)
+            self.assertEqual(len(calls), 2)
+
+            # A new store on the same directory is served from disk
+            self.assertIsNotNone(GoalResultStore(store.store_dir).get("sales_by_region", {}, version))
+
+            # A changed cube file is a new version; the old entries are removed
+            cube_file.write_text(csv_data.getvalue() + "North,103,1003,100.0\n")
+            new_version = cube_file_version(cube_file)
+            self.assertNotEqual(new_version, version)
+            store.get_or_compute("sales_by_region", {}, new_version, answer)
+            self.assertEqual(len(calls), 3)
+            self.assertEqual(len(list(store.store_dir.glob("*.pkl"))), 1)
+
+            self.assertEqual(store.stats(), {"hits": 1, "misses": 3, "hit_rate": 0.25})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+r"""
+tests/test_goal_runner.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_goal_runner.py
+    python3 tests\test_goal_runner.py
+
+This test suite verifies that the batch goal runner gives every goal the
+same answer as its own olap_goal_*.py script, on fixture cubes built with
+the cubing scripts' definitions: in any goal order (the goals share loaded
+cubes), and again when the answers come from the results store.
+"""
+
+import unittest
+import pathlib
+import sqlite3
+import sys
+import tempfile
+from io import StringIO
+from unittest import mock
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from olap import olap_cubing, olap_cubing_month, olap_cubing_region  # noqa: E402
+from olap import olap_goal_runner  # noqa: E402
+from olap import olap_goal_sales_by_day as day_goal  # noqa: E402
+from olap import olap_goal_sales_by_region as region_goal  # noqa: E402
+from olap import olap_goal_top_product_by_day as top_day_goal  # noqa: E402
+from olap import olap_goal_top_product_by_month as top_month_goal  # noqa: E402
+from olap.goal_planner import GoalPlanner  # noqa: E402
+from olap.goal_results import GoalResultStore  # noqa: E402
+
+# Create a fake sale table using StringIO (2024-01-01 is a Monday; customer 1009 has no customer row)
+csv_data = StringIO("""
+sale_id,sale_date,product_id,customer_id,sale_amount_usd
+1,2024-01-01,101,1001,100.0
+2,2024-01-01,102,1002,50.0
+3,2024-01-02,101,1001,25.0
+4,2024-02-07,103,1003,10.0
+5,2024-02-08,101,1009,40.0
+6,2024-02-08,102,1003,75.5
+""")
+
+# Load the fake CSV data into a DataFrame
+sales_df = pd.read_csv(csv_data)
+products_df = pd.DataFrame({"product_id": [101, 102, 103], "category": ["Electronics", "Clothing", "Clothing"]})
+customers_df = pd.DataFrame({"customer_id": [1001, 1002, 1003], "region": ["East", "West", "East"]})
+
+
+def script_answers(planner_factory) -> dict:
+    """Answer each goal the way its olap_goal_*.py script does (steps 1 and 2 of its main())."""
+    return {
+        "sales_by_day": day_goal.analyze_sales_by_weekday(planner_factory().answer(day_goal.GOAL_QUERY)),
+        "sales_by_region": region_goal.analyze_sales_by_region(planner_factory().answer(region_goal.GOAL_QUERY)),
+        "top_product_by_day": top_day_goal.analyze_top_product_by_weekday(planner_factory().answer(top_day_goal.GOAL_QUERY)),
+        "top_product_by_month": top_month_goal.analyze_top_product_by_month(planner_factory().answer(top_month_goal.GOAL_QUERY)),
+    }
+
+
+class TestGoalRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = pathlib.Path(self.tmp.name)
+        self.db_path = root.joinpath("smart_sales.db")
+        conn = sqlite3.connect(self.db_path)
+        sales_df.to_sql("sale", conn, index=False)
+        products_df.to_sql("product", conn, index=False)
+        customers_df.to_sql("customer", conn, index=False)
+        conn.close()
+
+        # The standard cubes, built from the same facts as the cubing scripts read
+        joined = sales_df.merge(products_df, on="product_id").merge(customers_df, on="customer_id")
+        for module, facts in ((olap_cubing, sales_df), (olap_cubing_month, joined), (olap_cubing_region, joined)):
+            cube = module.build_cube(module.CUBE_DIMENSIONS, module.CUBE_METRICS, sales_df=facts.copy())
+            cube.to_csv(root.joinpath(module.CUBE_FILE_NAME), index=False)
+
+        self.cube_dir = root
+        self.results_dir = root.joinpath("results")
+        self.store = GoalResultStore(root.joinpath("goal_results"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def new_planner(self) -> GoalPlanner:
+        return GoalPlanner(self.cube_dir, self.db_path)
+
+    def run_goals(self, goal_ids: list = None) -> dict:
+        planner = self.new_planner()
+        try:
+            with mock.patch.object(olap_goal_runner, "RESULTS_OUTPUT_DIR", self.results_dir), \
+                    mock.patch.object(olap_goal_runner, "render_charts") as render:
+                results = olap_goal_runner.run_goals(goal_ids, store=self.store, planner=planner, max_workers=1)
+            self.assertEqual(len(render.call_args.args[0]), len(results))
+            return results
+        finally:
+            planner.close()
+
+    def assertSameAnswers(self, results: dict, expected: dict):
+        self.assertEqual(set(results), set(expected))
+        for goal_id, answer in expected.items():
+            with self.subTest(goal=goal_id):
+                pd.testing.assert_frame_equal(results[goal_id], answer)
+                saved = pd.read_csv(self.results_dir.joinpath(f"goal_{goal_id}.csv"))
+                pd.testing.assert_frame_equal(saved, answer.reset_index(drop=True), check_dtype=False)
+
+    def test_runner_matches_per_goal_scripts(self):
+        expected = script_answers(self.new_planner)
+        self.assertListEqual(expected["sales_by_region"]["region"].tolist(), ["West", "East"])
+        self.assertSameAnswers(self.run_goals(), expected)
+
+    def test_goal_order_and_stored_answers_do_not_change_results(self):
+        expected = script_answers(self.new_planner)
+        self.assertSameAnswers(self.run_goals(list(reversed(list(olap_goal_runner.GOALS)))), expected)
+
+        # Every goal is now answered from the store
+        results = self.run_goals()
+        self.assertEqual(self.store.stats()["hits"], len(expected))
+        self.assertSameAnswers(results, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
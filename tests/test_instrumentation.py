@@ -0,0 +1,99 @@
+r"""
+tests/test_instrumentation.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_instrumentation.py
+    python3 tests\test_instrumentation.py
+
+This test suite verifies that instrumented functions record time and rows
+only inside a metrics run, that each run writes a JSON report, that a
+stage much slower than in the previous run is flagged, and that profiling
+selects stages by pattern and writes stats, collapsed stacks and a
+tracemalloc report.
+"""
+
+import unittest
+import json
+import pathlib
+import sys
+import tempfile
+from io import StringIO
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.instrumentation import compare_runs, instrument, measure, metrics_run  # noqa: E402
+from utils.profiling import is_profiled, parse_patterns, profile_stage  # noqa: E402
+
+# Create a fake sale table using StringIO
+csv_data = StringIO("""
+sale_id,product_id,sale_amount_usd
+1,101,100.0
+2,102,50.0
+3,101,25.0
+""")
+
+sales_df = pd.read_csv(csv_data)
+
+
+@instrument
+def total_by_product(df: pd.DataFrame) -> pd.DataFrame:
+    return df.groupby("product_id", as_index=False)["sale_amount_usd"].sum()
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def test_records_only_inside_a_run(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            total_by_product(sales_df)
+            self.assertEqual(list(pathlib.Path(tmp).iterdir()), [])
+
+            with metrics_run("sales", metrics_dir=tmp) as records:
+                with measure("sales.step"):
+                    total_by_product(sales_df)
+
+            self.assertEqual([record["stage"] for record in records], ["test_instrumentation.total_by_product", "sales.step"])
+            self.assertEqual((records[0]["rows_in"], records[0]["rows_out"]), (3, 2))
+            self.assertEqual(records[0]["parent"], "sales.step")
+
+            report_files = list(pathlib.Path(tmp).glob("sales-*.json"))
+            self.assertEqual(len(report_files), 1)
+            report = json.loads(report_files[0].read_text())
+            self.assertEqual(report["stages"]["test_instrumentation.total_by_product"]["calls"], 1)
+
+    def test_slower_stage_is_flagged(self):
+        previous = {"started_at": "earlier", "stages": {"load": {"wall_seconds": 0.10}, "cube": {"wall_seconds": 0.10}}}
+        stage = {"calls": 1, "cpu_seconds": 0.0, "rows_in": None, "rows_out": None, "rss_growth_mb": None}
+        current = {"stages": {"load": {**stage, "wall_seconds": 0.50}, "cube": {**stage, "wall_seconds": 0.11}}}
+        lines = compare_runs(current, previous).splitlines()
+        self.assertTrue(lines[1].startswith("load") and lines[1].endswith("SLOWER"))
+        self.assertFalse(lines[2].endswith("SLOWER"))
+
+    def test_profile_selected_stages(self):
+        patterns = parse_patterns(" goal.*, etl_to_dw.insert_sales ,")
+        self.assertTrue(is_profiled("goal.top_product_by_month", patterns))
+        self.assertTrue(is_profiled("etl_to_dw.insert_sales", patterns))
+        self.assertFalse(is_profiled("etl_to_dw.insert_products", patterns))
+        self.assertFalse(is_profiled("goal.top_product_by_month", ()))
+
+        for profiler in ("cprofile", "sampling"):
+            with tempfile.TemporaryDirectory() as tmp:
+                with profile_stage("sales.total", profiler=profiler, profile_dir=tmp):
+                    for _ in range(20):
+                        total_by_product(sales_df)
+                files = sorted(path.name.split("-", 1)[1].split(".", 2)[-1] for path in pathlib.Path(tmp).iterdir())
+                expected = ["collapsed", "prof", "tracemalloc.txt", "txt"] if profiler == "cprofile" else ["collapsed", "tracemalloc.txt", "txt"]
+                self.assertEqual(files, expected)
+                if profiler == "cprofile":
+                    stacks = next(pathlib.Path(tmp).glob("*.collapsed")).read_text().splitlines()
+                    self.assertTrue(any("total_by_product" in line for line in stacks))
+                    self.assertTrue(all(line.rsplit(" ", 1)[1].isdigit() for line in stacks))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+r"""
+tests/test_lead_time_cube.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_lead_time_cube.py
+    python3 tests\test_lead_time_cube.py
+
+This test suite verifies that add_lead_time() computes whole-day lead times
+at load time (missing when a date cannot be parsed), and that the lead-time
+cube leaves out lines with a missing or negative lead time and reports the
+same nearest-rank p50/p95 as np.percentile(..., method="inverted_cdf").
+"""
+
+import unittest
+import pathlib
+import sys
+from io import StringIO
+import numpy as np
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from scripts.p7_etl_to_dw import add_lead_time  # noqa: E402
+from olap.olap_cubing_lead_time import (  # noqa: E402
+    LEAD_TIME_COLUMN,
+    LEAD_TIME_PERCENTILES,
+    create_lead_time_cube,
+    histogram_percentiles,
+)
+
+# Create a fake p7 sales table using StringIO
+# (line 4 has an unparseable ship_date; line 5 ships before it was sold)
+csv_data = StringIO("""
+row_id,sale_date,ship_date,segment,region,ship_mode
+1,2016-11-08,11/11/2016,Consumer,South,Second Class
+2,2016-11-08,11/08/2016,Consumer,South,Second Class
+3,2016-11-09,11/16/2016,Consumer,South,Second Class
+4,2016-11-09,not a date,Consumer,South,Second Class
+5,2016-11-10,11/01/2016,Corporate,West,First Class
+6,2016-11-10,11/12/2016,Corporate,West,First Class
+""")
+
+sales_df = pd.read_csv(csv_data)
+
+DIMENSIONS = ["segment", "region", "ship_mode"]
+
+# A larger random table for comparing the percentiles with NumPy
+rng = np.random.default_rng(7)
+random_df = pd.DataFrame({
+    "segment": rng.choice(["Consumer", "Corporate", "Home Office"], 5000),
+    "ship_mode": rng.choice(["First Class", "Second Class", "Standard Class"], 5000),
+    LEAD_TIME_COLUMN: rng.integers(0, 8, 5000),
+})
+
+
+class TestLeadTimeCube(unittest.TestCase):
+
+    def test_add_lead_time(self):
+        lead_times = add_lead_time(sales_df)[LEAD_TIME_COLUMN]
+        self.assertEqual(str(lead_times.dtype), "Int16")
+        self.assertListEqual(lead_times.tolist(), [3, 0, 7, pd.NA, -9, 2])
+
+    def test_missing_and_negative_lead_times_are_left_out(self):
+        cube = create_lead_time_cube(add_lead_time(sales_df), DIMENSIONS)
+        self.assertListEqual(cube["segment"].tolist(), ["Consumer", "Corporate"])
+        self.assertListEqual(cube[f"{LEAD_TIME_COLUMN}_count"].tolist(), [3, 1])
+        self.assertListEqual(cube[f"{LEAD_TIME_COLUMN}_max"].tolist(), [7, 2])
+        self.assertListEqual(cube[f"{LEAD_TIME_COLUMN}_p50"].tolist(), [3, 2])
+
+    def test_percentiles_match_numpy_nearest_rank(self):
+        dims = ["segment", "ship_mode"]
+        cube = create_lead_time_cube(random_df, dims)
+        for name, q in LEAD_TIME_PERCENTILES.items():
+            expected = random_df.groupby(dims)[LEAD_TIME_COLUMN].agg(
+                lambda days: np.percentile(days, q * 100, method="inverted_cdf")
+            )
+            self.assertListEqual(cube[f"{LEAD_TIME_COLUMN}_{name}"].tolist(), expected.tolist())
+
+    def test_no_lead_times(self):
+        no_lines = np.zeros(0, dtype=np.int64)
+        self.assertEqual(len(histogram_percentiles(no_lines, no_lines, 0, {"p50": 0.5})["p50"]), 0)
+        cube = create_lead_time_cube(random_df.assign(**{LEAD_TIME_COLUMN: np.nan}), ["segment"])
+        self.assertEqual(len(cube), 0)
+        self.assertIn(f"{LEAD_TIME_COLUMN}_p95", cube.columns)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+r"""
+tests/test_p7_warehouse.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_p7_warehouse.py
+    python3 tests\test_p7_warehouse.py
+
+This test suite verifies that the p7 schema from p7_create_dw.py (which
+p7_etl_to_dw.py imports) can be loaded, and reloaded, with SQLite
+foreign keys enforced: every foreign key points at a unique key, and
+the ETL inserts referenced tables first. It also verifies that a warehouse
+with tables from an older schema is recreated and loaded, and that a load
+that fails part way is rolled back instead of committing empty tables.
+"""
+
+import unittest
+import pathlib
+import sqlite3
+import sys
+import tempfile
+from io import StringIO
+from unittest import mock
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from scripts import p7_create_dw, p7_etl_to_dw  # noqa: E402
+from utils.dw_version import get_warehouse_version  # noqa: E402
+
+# Create a fake prepared p7 sales table using StringIO (order CA-1 has two lines)
+csv_data = StringIO("""
+row_id,sale_id,product_id,sale_date,ship_mode,ship_date,customer_id,customer_name,segment,country,city,state,postal_code,region,quantity,discount,sales,profit
+1,CA-1,FUR-1,2016-11-08,Second Class,11/11/2016,CG-1,Claire Gute,Consumer,United States,Henderson,Kentucky,42420,South,2,0.0,$261.96 ,41.91
+2,CA-1,OFF-2,2016-11-08,Second Class,11/11/2016,CG-1,Claire Gute,Consumer,United States,Henderson,Kentucky,42420,South,3,0.0,$731.94 ,219.58
+3,CA-2,FUR-1,2016-06-12,Standard Class,06/16/2016,DV-1,Darrin Van Huff,Corporate,United States,Los Angeles,California,90036,West,2,0.0,$14.62 ,6.87
+""")
+
+sales_df = pd.read_csv(csv_data)
+products_df = pd.DataFrame({
+    "product_id": ["FUR-1", "OFF-2"], "category": ["Furniture", "Office Supplies"],
+    "sub_category": ["Bookcases", "Labels"], "name": ["Bookcase", "Labels"], "cost": ["$91.69", "$5.00"],
+})
+returns_df = pd.DataFrame({"order_id": ["CA-1"], "returned": ["Yes"]})
+salesreps_df = pd.DataFrame({"region": ["South", "West"], "sales_rep": ["Chuck Barkley", "Anna Oakley"]})
+
+# p7_sales as created before the geography dimension and lead time were added
+OLD_SALES_DDL = """
+    CREATE TABLE p7_sales (
+        row_id INTEGER PRIMARY KEY, sale_id VARCHAR(20) NOT NULL, product_id VARCHAR(20) NOT NULL,
+        sale_date DATE NOT NULL, ship_mode VARCHAR(50), ship_date DATE, customer_id VARCHAR(20) NOT NULL,
+        customer_name VARCHAR(100), segment VARCHAR(50), country VARCHAR(50), city VARCHAR(50),
+        state VARCHAR(50), postal_code VARCHAR(20), region VARCHAR(50), quantity INTEGER NOT NULL,
+        discount DECIMAL(5, 2), sales DECIMAL(10, 2), profit DECIMAL(10, 2)
+    )
+"""
+
+
+def write_prepared_files(prepared_dir: pathlib.Path) -> None:
+    """Write the fake frames where load_data_to_db() reads the prepared p7 files."""
+    sales_df.to_csv(prepared_dir.joinpath("p7_sales_data_prepared.csv"), index=False)
+    products_df.to_csv(prepared_dir.joinpath("p7_products_data_prepared.csv"), index=False)
+    returns_df.to_csv(prepared_dir.joinpath("p7_returns_data_prepared.csv"), index=False)
+    salesreps_df.to_csv(prepared_dir.joinpath("p7_salesreps_data_prepared.csv"), index=False)
+
+
+def row_counts(db_path: pathlib.Path) -> dict:
+    conn = sqlite3.connect(db_path)
+    try:
+        return {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in p7_create_dw.P7_TABLE_CREATORS
+        }
+    finally:
+        conn.close()
+
+
+class TestP7Warehouse(unittest.TestCase):
+
+    def test_etl_uses_the_create_dw_schema(self):
+        self.assertIs(p7_etl_to_dw.create_p7_tables, p7_create_dw.create_p7_tables)
+
+    def test_load_twice_with_foreign_keys_enforced(self):
+        conn = sqlite3.connect(":memory:")
+        try:
+            conn.execute("PRAGMA foreign_keys=ON")
+            cursor = conn.cursor()
+            p7_create_dw.create_p7_tables(cursor)
+
+            for _ in range(2):
+                p7_etl_to_dw.delete_existing_records(cursor)
+                sales, geography = p7_etl_to_dw.normalize_geography(p7_etl_to_dw.add_lead_time(sales_df))
+                p7_etl_to_dw.insert_salesreps(salesreps_df.copy(), cursor)
+                p7_etl_to_dw.insert_products(products_df, cursor)
+                p7_etl_to_dw.insert_geography(geography, cursor)
+                p7_etl_to_dw.insert_sales(sales, cursor)
+                p7_etl_to_dw.insert_returns(returns_df, cursor)
+                conn.commit()
+
+            counts = {
+                table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("p7_salesreps", "p7_products", "p7_geography", "p7_sales", "p7_returns")
+            }
+            self.assertEqual(
+                counts, {"p7_salesreps": 2, "p7_products": 2, "p7_geography": 2, "p7_sales": 3, "p7_returns": 1}
+            )
+            self.assertEqual(conn.execute("PRAGMA foreign_key_check").fetchall(), [])
+        finally:
+            conn.close()
+
+    def test_tables_from_an_older_schema_are_recreated(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = pathlib.Path(tmp).joinpath("store_returns.db")
+            conn = sqlite3.connect(db_path)
+            try:
+                conn.execute(OLD_SALES_DDL)
+                conn.execute("INSERT INTO p7_sales (row_id, sale_id, product_id, sale_date, customer_id, quantity) VALUES (1, 'OLD-1', 'FUR-1', '2016-01-01', 'CG-1', 1)")
+                p7_create_dw.create_p7_returns_table(conn.cursor())
+                conn.commit()
+            finally:
+                conn.close()
+
+            write_prepared_files(pathlib.Path(tmp))
+            with mock.patch.object(p7_etl_to_dw, "DB_PATH", db_path), \
+                    mock.patch.object(p7_etl_to_dw, "PREPARED_DATA_DIR", pathlib.Path(tmp)):
+                p7_etl_to_dw.load_data_to_db()
+
+            self.assertEqual(row_counts(db_path), {"p7_salesreps": 2, "p7_products": 2, "p7_geography": 2, "p7_sales": 3, "p7_returns": 1})
+            conn = sqlite3.connect(db_path)
+            try:
+                columns = [column[0] for column in p7_create_dw.table_columns(conn.cursor(), "p7_sales")]
+                self.assertListEqual(p7_create_dw.drop_outdated_p7_tables(conn.cursor()), [])
+            finally:
+                conn.close()
+            self.assertIn("geo_id", columns)
+            self.assertIn("lead_time_days", columns)
+
+    def test_failed_load_is_rolled_back(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = pathlib.Path(tmp).joinpath("store_returns.db")
+            write_prepared_files(pathlib.Path(tmp))
+            with mock.patch.object(p7_etl_to_dw, "DB_PATH", db_path), \
+                    mock.patch.object(p7_etl_to_dw, "PREPARED_DATA_DIR", pathlib.Path(tmp)):
+                p7_etl_to_dw.load_data_to_db()
+                counts, version = row_counts(db_path), get_warehouse_version(db_path)
+
+                # A returns file the table cannot take fails the load after sales were inserted
+                returns_df.assign(reason="damaged").to_csv(
+                    pathlib.Path(tmp).joinpath("p7_returns_data_prepared.csv"), index=False
+                )
+                with self.assertRaises(sqlite3.Error):
+                    p7_etl_to_dw.load_data_to_db()
+
+            self.assertEqual(row_counts(db_path), counts)
+            self.assertEqual(get_warehouse_version(db_path), version)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+r"""
+tests/test_returns_cube.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_returns_cube.py
+    python3 tests\test_returns_cube.py
+
+This test suite verifies the returns cube on a small hand-built set of order
+lines: line counts are additive, an order counts once in every cell it has
+lines in (so order counts do not add up across cells), and only orders
+marked "Yes" are returned. It also covers the currency parsing edge cases.
+"""
+
+import unittest
+import pathlib
+import sqlite3
+import sys
+import tempfile
+from io import StringIO
+from unittest import mock
+import numpy as np
+import pandas as pd
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from olap import olap_cubing_returns  # noqa: E402
+from olap.olap_cubing_returns import create_returns_cube, parse_currency  # noqa: E402
+
+# Create fake p7 sale lines using StringIO
+# (order A has lines in both categories and was returned; order C has two Furniture lines)
+csv_data = StringIO("""
+row_id,sale_id,product_id,geo_id,segment,ship_mode,sales,profit
+1,A,FUR-1,1,Consumer,First Class,$100.00 ,10.0
+2,A,OFF-1,1,Consumer,First Class,"$1,000.00 ",-50.0
+3,B,FUR-1,1,Consumer,First Class,$40.00 ,4.0
+4,C,FUR-2,1,Consumer,First Class,$25.00 ,2.5
+5,C,FUR-1,1,Consumer,First Class,$35.00 ,3.5
+""")
+
+sales_df = pd.read_csv(csv_data)
+returns_df = pd.DataFrame({"order_id": ["A", "B", "C"], "returned": ["Yes", "No", " yes "]})
+products_df = pd.DataFrame({
+    "product_id": ["FUR-1", "FUR-2", "OFF-1"],
+    "category": ["Furniture", "Furniture", "Office Supplies"],
+    "sub_category": ["Chairs", "Tables", "Labels"],
+})
+geography_df = pd.DataFrame({"geo_id": [1], "region": ["East"]})
+salesreps_df = pd.DataFrame({"region": ["East"], "sales_rep_name": ["Chuck Barkley"]})
+
+
+def returned_lines() -> pd.DataFrame:
+    """The sale lines as ingest_returns_data_from_dw() returns them (orders A and C returned)."""
+    facts = sales_df.merge(products_df, on="product_id")
+    return facts.assign(
+        sales=parse_currency(facts["sales"]),
+        returned=facts["sale_id"].isin(["A", "C"]),
+    )
+
+
+class TestReturnsCube(unittest.TestCase):
+
+    def test_order_counts_are_distinct_per_cell(self):
+        cube = create_returns_cube(returned_lines(), ["category"])
+        self.assertListEqual(cube["category"].tolist(), ["Furniture", "Office Supplies"])
+        self.assertListEqual(cube["line_count"].tolist(), [4, 1])
+        self.assertListEqual(cube["returned_line_count"].tolist(), [3, 1])
+        # Furniture has lines of orders A, B and C; order A is also counted under Office Supplies
+        self.assertListEqual(cube["order_count"].tolist(), [3, 1])
+        self.assertListEqual(cube["returned_order_count"].tolist(), [2, 1])
+        self.assertListEqual(cube["order_return_rate"].tolist(), [2 / 3, 1.0])
+        self.assertListEqual(cube["returned_sales_sum"].tolist(), [160.0, 1000.0])
+        self.assertAlmostEqual(cube["sales_return_rate"].iloc[0], 160.0 / 200.0)
+
+    def test_line_counts_roll_up_but_order_counts_do_not(self):
+        by_category = create_returns_cube(returned_lines(), ["category"])
+        overall = create_returns_cube(returned_lines(), ["segment"])
+        self.assertEqual(by_category["line_count"].sum(), overall["line_count"].iloc[0])
+        self.assertEqual(by_category["order_count"].sum(), 4)
+        self.assertEqual(overall["order_count"].iloc[0], 3)
+        self.assertEqual(overall["returned_order_count"].iloc[0], 2)
+
+    def test_cell_without_sales_has_zero_sales_return_rate(self):
+        lines = returned_lines().assign(sales=0.0)
+        cube = create_returns_cube(lines, ["category"])
+        self.assertListEqual(cube["sales_return_rate"].tolist(), [0.0, 0.0])
+
+    def test_parse_currency(self):
+        values = pd.Series(["$1,261.96 ", "$0.50", " 12 ", "-$5.00", "", "N/A", None])
+        parsed = parse_currency(values)
+        np.testing.assert_array_equal(parsed.to_numpy()[:4], [1261.96, 0.5, 12.0, -5.0])
+        self.assertTrue(parsed.iloc[4:].isna().all())
+        numbers = parse_currency(pd.Series([3, 4]))
+        self.assertEqual(numbers.dtype, "float64")
+        self.assertListEqual(numbers.tolist(), [3.0, 4.0])
+
+    def test_ingest_marks_returned_orders(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = pathlib.Path(tmp).joinpath("store_returns.db")
+            conn = sqlite3.connect(db_path)
+            try:
+                p7_sales = sales_df.assign(sale_date="2016-11-08", ship_date="11/11/2016", quantity=1, discount=0.0)
+                p7_sales.to_sql("p7_sales", conn, index=False)
+                geography_df.to_sql("p7_geography", conn, index=False)
+                products_df.to_sql("p7_products", conn, index=False)
+                salesreps_df.to_sql("p7_salesreps", conn, index=False)
+                returns_df.to_sql("p7_returns", conn, index=False)
+                conn.commit()
+            finally:
+                conn.close()
+            with mock.patch.object(olap_cubing_returns, "DB_PATH", db_path):
+                lines = olap_cubing_returns.ingest_returns_data_from_dw()
+
+        self.assertListEqual(lines["returned"].tolist(), [True, True, False, True, True])
+        self.assertListEqual(lines["sales"].tolist(), [100.0, 1000.0, 40.0, 25.0, 35.0])
+        self.assertListEqual(lines["sales_rep"].unique().tolist(), ["Chuck Barkley"])
+
+
+if __name__ == "__main__":
+    unittest.main()
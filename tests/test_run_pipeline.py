@@ -0,0 +1,102 @@
+r"""
+tests/test_run_pipeline.py
+
+To run, open a terminal in the root project folder.
+Activate your virtual environment if needed, and run one of the following commands:
+
+    py tests\test_run_pipeline.py
+    python3 tests\test_run_pipeline.py
+
+This test suite runs a small pipeline of throwaway scripts and verifies
+that up-to-date stages are skipped, changed inputs re-run only the stages
+downstream of them, a failure blocks its dependents but not independent
+stages, and the next run resumes from the failed stage.
+"""
+
+import unittest
+import pathlib
+import sys
+import tempfile
+
+# For local imports, temporarily add project root to Python sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from scripts.run_pipeline import critical_path, run_pipeline, topological_order  # noqa: E402
+
+# Each script copies its input to its output, upper-casing it
+COPY_SCRIPT = """
+import pathlib
+pathlib.Path("{output}").write_text(pathlib.Path("{input}").read_text().upper())
+"""
+
+STAGES = {
+    "prep": {"script": "prep.py", "inputs": ["raw.txt"], "outputs": ["prepared.txt"], "after": []},
+    "load": {"script": "load.py", "inputs": ["prepared.txt"], "outputs": ["loaded.txt"], "after": ["prep"]},
+    "side": {"script": "side.py", "inputs": ["other.txt"], "outputs": ["side.txt"], "after": []},
+    "report": {"script": "report.py", "inputs": ["loaded.txt"], "outputs": ["report.txt"], "after": ["load"]},
+}
+
+
+class TestRunPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.tmp.name)
+        self.state_file = self.root.joinpath("state.json")
+        for name, stage in STAGES.items():
+            script = COPY_SCRIPT.format(input=stage["inputs"][0], output=stage["outputs"][0])
+            self.root.joinpath(stage["script"]).write_text(script)
+        self.root.joinpath("raw.txt").write_text("east")
+        self.root.joinpath("other.txt").write_text("west")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_stages(self, **kwargs):
+        results = run_pipeline(STAGES, root=self.root, state_file=self.state_file, jobs=2, **kwargs)
+        return {name: result["status"] for name, result in results.items()}
+
+    def test_skip_rerun_and_resume(self):
+        self.assertEqual(set(self.run_stages().values()), {"ran"})
+        self.assertEqual(self.root.joinpath("report.txt").read_text(), "EAST")
+        self.assertEqual(set(self.run_stages().values()), {"skipped"})
+
+        # A changed input re-runs its stage and everything downstream of it
+        self.root.joinpath("raw.txt").write_text("north")
+        statuses = self.run_stages()
+        self.assertEqual(statuses, {"prep": "ran", "side": "skipped", "load": "ran", "report": "ran"})
+
+        # A failure blocks the stages after it; the independent stage still runs
+        self.root.joinpath("raw.txt").write_text("south")
+        self.root.joinpath("other.txt").write_text("up")
+        self.root.joinpath("load.py").write_text("raise SystemExit(3)")
+        statuses = self.run_stages()
+        self.assertEqual(statuses, {"prep": "ran", "side": "ran", "load": "failed", "report": "blocked"})
+
+        # The next run resumes at the failed stage
+        self.root.joinpath("load.py").write_text(COPY_SCRIPT.format(input="prepared.txt", output="loaded.txt"))
+        statuses = self.run_stages()
+        self.assertEqual(statuses, {"prep": "skipped", "side": "skipped", "load": "ran", "report": "ran"})
+        self.assertEqual(self.root.joinpath("report.txt").read_text(), "SOUTH")
+
+        # Targets only run the stages they need
+        self.assertEqual(self.run_stages(targets=["load"], force=True), {"prep": "ran", "load": "ran"})
+
+    def test_order_and_critical_path(self):
+        self.assertLess(topological_order(STAGES).index("prep"), topological_order(STAGES).index("report"))
+        results = {
+            "prep": {"seconds": 1.0},
+            "load": {"seconds": 2.0},
+            "side": {"seconds": 2.5},
+            "report": {"seconds": 0.5},
+        }
+        self.assertEqual(critical_path(STAGES, results), (["prep", "load", "report"], 3.5))
+
+        with self.assertRaises(ValueError):
+            topological_order({"a": {"after": ["b"]}, "b": {"after": ["a"]}})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+"""
+Data Warehouse Version Script
+File: utils/dw_version.py
+
+This script keeps a data version for each SQLite data warehouse so that
+downstream consumers (such as the OLAP cube cache) can tell when the
+warehouse contents have changed.
+
+- The ETL scripts call bump_warehouse_version() in the same transaction
+  that loads new data, which increments the counter in the dw_version table
+  and stores a new random generation token next to it.
+- get_warehouse_version() combines the counter and the generation token with
+  a fingerprint of each table's COUNT(*) and MAX(rowid). The counter lives in
+  the warehouse file, so it starts again at 1 when create_dw rebuilds the
+  database; the generation token is what makes every ETL load (even a reload
+  of different data with the same row count and row ids) a new version.
+- The row-count fingerprint catches rows inserted or deleted outside the ETL.
+  It does not read the table contents, so a version check stays cheap on
+  large tables; an in-place UPDATE made outside the ETL must be followed by
+  bump_warehouse_version() to be seen.
+- Materialized cube tables (named cube_*) are derived from the warehouse,
+  so they are left out of the fingerprint.
+"""
+
+# Imports from Python Standard Library
+import datetime
+import hashlib
+import pathlib
+import sqlite3
+import sys
+import uuid
+
+# Add project root to sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+
+VERSION_TABLE = "dw_version"
+CUBE_TABLE_PREFIX = "cube_"
+
+
+def ensure_version_table(cursor: sqlite3.Cursor) -> None:
+    """Create the single-row dw_version table if it does not exist."""
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL,
+            updated_at TEXT NOT NULL,
+            generation TEXT NOT NULL DEFAULT ''
+        )
+    """)
+    # Warehouses created before the generation token was added
+    columns = [row[1] for row in cursor.execute(f"PRAGMA table_info({VERSION_TABLE})")]
+    if "generation" not in columns:
+        cursor.execute(f"ALTER TABLE {VERSION_TABLE} ADD COLUMN generation TEXT NOT NULL DEFAULT ''")
+
+
+def bump_warehouse_version(cursor: sqlite3.Cursor) -> int:
+    """
+    Increment the warehouse data version and start a new generation.
+    Call this after the ETL writes new data.
+
+    Returns:
+        int: The new version number.
+    """
+    ensure_version_table(cursor)
+    now = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")
+    cursor.execute(
+        f"""
+        INSERT INTO {VERSION_TABLE} (id, version, updated_at, generation) VALUES (1, 1, ?, ?)
+        ON CONFLICT(id) DO UPDATE SET
+            version = version + 1, updated_at = excluded.updated_at, generation = excluded.generation
+        """,
+        (now, uuid.uuid4().hex),
+    )
+    version = cursor.execute(f"SELECT version FROM {VERSION_TABLE} WHERE id = 1").fetchone()[0]
+    logger.info(f"Data warehouse version bumped to {version}.")
+    return version
+
+
+def get_warehouse_version(db_path: pathlib.Path, conn: sqlite3.Connection = None) -> str:
+    """
+    Return a short version string that changes whenever the warehouse data changes.
+
+    Args:
+        db_path (pathlib.Path): Path to the SQLite data warehouse.
+        conn (sqlite3.Connection): Open connection to reuse (db_path is then ignored
+            and the connection is left open).
+
+    Returns:
+        str: The ETL version counter and generation token plus a fingerprint of
+            every source table's row count and largest rowid.
+    """
+    own_conn = conn is None
+    conn = sqlite3.connect(db_path) if own_conn else conn
+    try:
+        cursor = conn.cursor()
+        tables = [
+            row[0]
+            for row in cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+            )
+        ]
+        counter, generation = 0, ""
+        fingerprint = hashlib.sha256()
+        for table in tables:
+            if table.startswith(CUBE_TABLE_PREFIX):
+                continue
+            if table == VERSION_TABLE:
+                row = cursor.execute(f"SELECT * FROM {VERSION_TABLE} WHERE id = 1").fetchone()
+                if row:
+                    names = [column[0] for column in cursor.description]
+                    counter = row[names.index("version")]
+                    generation = row[names.index("generation")] if "generation" in names else ""
+                continue
+            try:
+                count, max_rowid = cursor.execute(f'SELECT COUNT(*), MAX(rowid) FROM "{table}"').fetchone()
+            except sqlite3.OperationalError:
+                # WITHOUT ROWID tables have no rowid to read
+                count, max_rowid = cursor.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0], None
+            fingerprint.update(f"{table}:{count}:{max_rowid};".encode())
+        return f"v{counter}-{generation[:8]}-{fingerprint.hexdigest()[:12]}"
+    finally:
+        if own_conn:
+            conn.close()
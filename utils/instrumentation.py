@@ -0,0 +1,296 @@
+"""
+Performance Instrumentation Script
+File: utils/instrumentation.py
+
+This script records how long each pipeline step takes and how much memory
+it uses, so slow or memory-hungry steps show up in numbers, not just in
+log messages.
+
+- @instrument wraps a function; measure("name") wraps a block of code.
+  Each call records a stage name, wall time, CPU time (of the calling
+  thread), rows in and out, the growth of the process's peak RSS, and the
+  change in traced memory when tracemalloc is running (for example under
+  python -X tracemalloc).
+- Rows in is the length of the first DataFrame argument, or of the .df a
+  method's object holds (DataScrubber); rows out is the length of the
+  returned DataFrame (or the sum over a returned dict/tuple of frames).
+- metrics_run("name") wraps a script's main(). When the run ends it writes
+  logs/metrics/<name>-<timestamp>.json with every call and per-stage
+  totals, and logs a table comparing each stage with the previous run of
+  the same script. Stages more than REGRESSION_THRESHOLD slower (and at
+  least REGRESSION_MIN_SECONDS) are marked SLOWER.
+
+Calls are recorded only inside a metrics_run, so importing an instrumented
+module (for example in tests) writes nothing. Worker processes (such as
+chart rendering in a process pool) are measured as part of the calling step.
+
+The same stage names select stages for profiling (see utils/profiling.py):
+a stage matching SMART_SALES_PROFILE is also run under a profiler, whether
+or not a metrics_run is active.
+
+Example:
+    from utils.instrumentation import instrument, measure, metrics_run
+
+    @instrument
+    def read_raw_data(file_name: str) -> pd.DataFrame: ...
+
+    if __name__ == "__main__":
+        with metrics_run("data_prep"):
+            main()
+"""
+
+# Imports from Python Standard Library
+import contextlib
+import datetime
+import functools
+import inspect
+import json
+import pathlib
+import sys
+import threading
+import time
+import tracemalloc
+
+# Add project root to sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+from utils import profiling  # noqa: E402
+
+try:
+    import resource  # Not available on Windows; peak RSS is then not recorded
+except ImportError:
+    resource = None
+
+METRICS_DIR = pathlib.Path("logs").joinpath("metrics")
+REGRESSION_THRESHOLD = 0.20
+REGRESSION_MIN_SECONDS = 0.05
+
+# Records of the current metrics_run (None when no run is active)
+_records = None
+_records_lock = threading.Lock()
+_stack = threading.local()
+
+
+def peak_rss_mb() -> float:
+    """Return the process's peak resident set size so far in MB, or None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def count_rows(value) -> int:
+    """Return the number of rows in a DataFrame (or frames in a dict/tuple/list), or None."""
+    if hasattr(value, "shape") and hasattr(value, "columns"):
+        return len(value)
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, (list, tuple)):
+        counts = [count_rows(item) for item in value]
+        counts = [count for count in counts if count is not None]
+        return sum(counts) if counts else None
+    return None
+
+
+def rows_in_of(args: tuple, kwargs: dict) -> int:
+    """Return the row count of the first DataFrame argument (or of a method object's .df)."""
+    for value in list(args) + list(kwargs.values()):
+        rows = count_rows(value) if not isinstance(value, (dict, list, tuple)) else None
+        if rows is None and hasattr(value, "df"):
+            rows = count_rows(value.df)
+        if rows is not None:
+            return rows
+    return None
+
+
+def stage_name(func) -> str:
+    """Return the default stage name of a function: <file stem>.<qualified name>."""
+    try:
+        module = pathlib.Path(inspect.getfile(func)).stem
+    except TypeError:
+        module = func.__module__
+    return f"{module}.{func.__qualname__}"
+
+
+def measure(stage: str, rows_in: int = None):
+    """
+    Record the wall time, CPU time and memory growth of a block of code,
+    and profile it if the stage is selected for profiling.
+
+    Yields:
+        dict: The record; set record["rows_out"] (and "rows_in") inside the block if known.
+    """
+    if profiling.PROFILE_PATTERNS and profiling.is_profiled(stage):
+        return _profiled_measure(stage, rows_in)
+    return _measure(stage, rows_in)
+
+
+@contextlib.contextmanager
+def _profiled_measure(stage: str, rows_in: int = None):
+    with profiling.profile_stage(stage), _measure(stage, rows_in) as record:
+        yield record
+
+
+@contextlib.contextmanager
+def _measure(stage: str, rows_in: int = None):
+    if _records is None:
+        yield {}
+        return
+
+    parents = getattr(_stack, "names", [])
+    record = {"stage": stage, "parent": parents[-1] if parents else None, "rows_in": rows_in, "rows_out": None}
+    _stack.names = parents + [stage]
+    rss_before = peak_rss_mb()
+    traced_before = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+    cpu_start = time.thread_time()
+    wall_start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["wall_seconds"] = time.perf_counter() - wall_start
+        record["cpu_seconds"] = time.thread_time() - cpu_start
+        rss_after = peak_rss_mb()
+        record["peak_rss_mb"] = rss_after
+        record["rss_growth_mb"] = rss_after - rss_before if rss_after is not None else None
+        if traced_before is not None and tracemalloc.is_tracing():
+            record["tracemalloc_delta_mb"] = (tracemalloc.get_traced_memory()[0] - traced_before) / (1024 * 1024)
+        _stack.names = parents
+        with _records_lock:
+            if _records is not None:
+                _records.append(record)
+
+
+def instrument(func=None, *, stage: str = None):
+    """
+    Decorate a function so each call is measured (see measure()).
+
+    Use as @instrument or @instrument(stage="etl.insert_sales").
+    """
+    if func is None:
+        return functools.partial(instrument, stage=stage)
+    name = stage or stage_name(func)
+    # Chosen once here, so stages that are not profiled pay nothing per call
+    target = profiling.profiled(func, name) if profiling.is_profiled(name) else func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _records is None:
+            return target(*args, **kwargs)
+        with _measure(name, rows_in_of(args, kwargs)) as record:
+            result = target(*args, **kwargs)
+            record["rows_out"] = count_rows(result)
+            return result
+
+    return wrapper
+
+
+def summarize(records: list) -> dict:
+    """Return per-stage totals: calls, wall and CPU seconds, rows and the largest memory growth."""
+    stages = {}
+    for record in records:
+        total = stages.setdefault(
+            record["stage"],
+            {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0, "rows_in": None, "rows_out": None, "rss_growth_mb": None},
+        )
+        total["calls"] += 1
+        total["wall_seconds"] += record["wall_seconds"]
+        total["cpu_seconds"] += record["cpu_seconds"]
+        for key in ("rows_in", "rows_out"):
+            if record.get(key) is not None:
+                total[key] = (total[key] or 0) + record[key]
+        if record.get("rss_growth_mb") is not None:
+            total["rss_growth_mb"] = max(total["rss_growth_mb"] or 0.0, record["rss_growth_mb"])
+    return stages
+
+
+def previous_metrics(run_name: str, metrics_dir: pathlib.Path = METRICS_DIR) -> dict:
+    """Return the most recent metrics report of a run, or None if there is none."""
+    reports = sorted(pathlib.Path(metrics_dir).glob(f"{run_name}-*.json"))
+    if not reports:
+        return None
+    try:
+        return json.loads(reports[-1].read_text(encoding="utf-8"))
+    except ValueError:
+        logger.warning(f"Ignoring unreadable metrics report {reports[-1]}.")
+        return None
+
+
+def compare_runs(current: dict, previous: dict = None) -> str:
+    """Return a table of each stage's wall time in this run against the previous run."""
+    previous_stages = (previous or {}).get("stages", {})
+    width = max([len(name) for name in current["stages"]] + [len("Stage")])
+    lines = [
+        f"{'Stage':<{width}}  {'Calls':>5}  {'Wall s':>8}  {'Prev s':>8}  {'Change':>7}  "
+        f"{'CPU s':>8}  {'Rows in':>9}  {'Rows out':>9}  {'RSS +MB':>7}"
+    ]
+    ordered = sorted(current["stages"].items(), key=lambda item: item[1]["wall_seconds"], reverse=True)
+    for name, stage in ordered:
+        before = previous_stages.get(name, {}).get("wall_seconds")
+        change, flag = "", ""
+        if before:
+            ratio = stage["wall_seconds"] / before - 1
+            change = f"{ratio:+.0%}"
+            if ratio > REGRESSION_THRESHOLD and stage["wall_seconds"] - before >= REGRESSION_MIN_SECONDS:
+                flag = "  SLOWER"
+        rows_in = "" if stage["rows_in"] is None else stage["rows_in"]
+        rows_out = "" if stage["rows_out"] is None else stage["rows_out"]
+        rss = "" if stage["rss_growth_mb"] is None else f"{stage['rss_growth_mb']:.1f}"
+        lines.append(
+            f"{name:<{width}}  {stage['calls']:>5}  {stage['wall_seconds']:>8.3f}  "
+            f"{'' if before is None else f'{before:.3f}':>8}  {change:>7}  "
+            f"{stage['cpu_seconds']:>8.3f}  {rows_in:>9}  {rows_out:>9}  {rss:>7}{flag}"
+        )
+    if previous:
+        lines.append(f"Compared with the run at {previous['started_at']}.")
+    else:
+        lines.append("No previous run to compare with.")
+    return "\n".join(lines)
+
+
+def write_metrics_report(report: dict, metrics_dir: pathlib.Path = METRICS_DIR) -> pathlib.Path:
+    """Write a run's metrics report as JSON and return its path."""
+    metrics_dir = pathlib.Path(metrics_dir)
+    metrics_dir.mkdir(parents=True, exist_ok=True)
+    stamp = report["started_at"].replace(":", "").replace("-", "")
+    report_path = metrics_dir.joinpath(f"{report['run']}-{stamp}.json")
+    report_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return report_path
+
+
+@contextlib.contextmanager
+def metrics_run(run_name: str, metrics_dir: pathlib.Path = METRICS_DIR):
+    """
+    Record every instrumented call inside the block, then write the JSON
+    report and log the comparison with the previous run.
+
+    Yields:
+        list: The records collected so far.
+    """
+    global _records
+    started_at = datetime.datetime.now()
+    wall_start = time.perf_counter()
+    _records = []
+    records = _records
+    try:
+        yield records
+    finally:
+        _records = None
+        report = {
+            "run": run_name,
+            "started_at": started_at.isoformat(timespec="microseconds"),
+            "wall_seconds": time.perf_counter() - wall_start,
+            "peak_rss_mb": peak_rss_mb(),
+            "python": sys.version.split()[0],
+            "stages": summarize(records),
+            "records": records,
+        }
+        try:
+            previous = previous_metrics(run_name, metrics_dir)
+            report_path = write_metrics_report(report, metrics_dir)
+            logger.info(f"Metrics for {run_name} saved to {report_path}:\n{compare_runs(report, previous)}")
+        except Exception as e:
+            logger.error(f"Error writing metrics report for {run_name}: {e}")
@@ -0,0 +1,275 @@
+"""
+Stage Profiling Script
+File: utils/profiling.py
+
+This script profiles chosen pipeline stages on request, without editing
+the scripts. Stages are the names used by utils/instrumentation.py, for
+example:
+
+    data_prep.prepare_sales              (prep of one table)
+    etl_to_dw.insert_sales               (ETL of one table)
+    cube_engine.build_cube               (one standard cube)
+    goal.top_product_by_month            (one goal)
+
+Choose stages with the SMART_SALES_PROFILE environment variable, a
+comma-separated list of names or wildcard patterns, or with the --profile
+option of scripts/run_pipeline.py, which sets it for every stage it runs:
+
+    SMART_SALES_PROFILE="goal.*,*.insert_sales" python olap/olap_goal_runner.py
+    python scripts/run_pipeline.py --force --profile "cube_engine.build_cube" cubes
+
+SMART_SALES_PROFILER picks the profiler:
+
+- cprofile (default): deterministic; every function call is counted.
+- sampling: a background thread records the stage's call stack every
+  SAMPLE_INTERVAL_SECONDS; much lower overhead on long stages.
+
+Each profiled call writes these files to logs/profiles/ (named
+<stage>-<timestamp>):
+
+- .prof: cProfile statistics, for pstats, snakeviz and similar tools (cprofile only).
+- .txt: the top functions by cumulative time (cprofile) or by samples (sampling).
+- .collapsed: collapsed stacks ("outer;inner;leaf count", one stack per
+  line), the input format of flamegraph.pl, speedscope and inferno. With
+  cprofile the stacks are rebuilt from the caller graph and weighted in
+  microseconds, so they are approximate.
+- .tracemalloc.txt: the lines that allocated the most memory still held at
+  the end of the stage, and the peak traced memory.
+
+When SMART_SALES_PROFILE is not set, instrument() leaves functions exactly
+as they were, so profiling costs nothing.
+"""
+
+# Imports from Python Standard Library
+import cProfile
+import collections
+import contextlib
+import datetime
+import fnmatch
+import io
+import os
+import pathlib
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+# Add project root to sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.logger import logger  # noqa: E402
+
+PROFILE_ENV = "SMART_SALES_PROFILE"
+PROFILER_ENV = "SMART_SALES_PROFILER"
+PROFILE_DIR = pathlib.Path("logs").joinpath("profiles")
+PROFILERS = ("cprofile", "sampling")
+SAMPLE_INTERVAL_SECONDS = 0.005
+TRACEMALLOC_FRAMES = 10
+TOP_LINES = 30
+MAX_STACK_DEPTH = 64
+
+
+def parse_patterns(value: str) -> tuple:
+    """Return the stage patterns in a comma-separated list (empty when value is empty or None)."""
+    return tuple(pattern.strip() for pattern in (value or "").split(",") if pattern.strip())
+
+
+# Read once at import: profiling is chosen per process, before any stage runs
+PROFILE_PATTERNS = parse_patterns(os.environ.get(PROFILE_ENV))
+PROFILER = os.environ.get(PROFILER_ENV, "cprofile").strip().lower()
+
+# Only one profiler can run at a time; nested profiled stages are part of the outer profile
+_active = threading.Lock()
+
+
+def is_profiled(stage: str, patterns: tuple = None) -> bool:
+    """Return True if a stage name matches one of the profiling patterns."""
+    patterns = PROFILE_PATTERNS if patterns is None else patterns
+    return any(fnmatch.fnmatchcase(stage, pattern) for pattern in patterns)
+
+
+def frame_label(code) -> str:
+    """Return a stack frame label: function (file:line)."""
+    return f"{code.co_name} ({pathlib.Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Sample one thread's call stack at a fixed interval from a background thread."""
+
+    def __init__(self, thread_id: int = None, interval: float = SAMPLE_INTERVAL_SECONDS):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stage-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> list:
+        """Return collapsed stack lines weighted by sample count."""
+        return [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+
+    def summary(self) -> str:
+        """Return the top functions by own samples and by total samples."""
+        own = collections.Counter()
+        total = collections.Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for label in set(frames):
+                total[label] += count
+        samples = sum(self.stacks.values())
+        lines = [f"{samples} samples every {self.interval * 1000:.1f} ms", "", "Own samples:"]
+        lines += [f"{count:>8}  {count / samples:>6.1%}  {label}" for label, count in own.most_common(TOP_LINES)]
+        lines += ["", "Total samples (including callees):"]
+        lines += [f"{count:>8}  {count / samples:>6.1%}  {label}" for label, count in total.most_common(TOP_LINES)]
+        return "\n".join(lines)
+
+
+def pstats_label(func: tuple) -> str:
+    """Return a stack frame label for a pstats function key (file, line, name)."""
+    file_name, line, name = func
+    if file_name == "~":
+        return name  # Built-in functions, e.g. <method 'join' of 'str' objects>
+    return f"{name} ({pathlib.Path(file_name).name}:{line})"
+
+
+def pstats_to_collapsed(stats: pstats.Stats) -> list:
+    """
+    Return approximate collapsed stacks (weights in microseconds) from cProfile statistics.
+
+    cProfile records caller -> callee totals, not whole stacks, so each
+    function's time is split across its callers in proportion to the time
+    each caller spent in it.
+    """
+    callees = collections.defaultdict(list)
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        for caller, edge in callers.items():
+            callees[caller].append((func, edge[3]))
+    roots = [func for func, (_, _, _, _, callers) in stats.stats.items() if not callers]
+    weights = collections.Counter()
+
+    def walk(func: tuple, path: list, share: float) -> None:
+        own_time = stats.stats[func][2]
+        labels = path + [pstats_label(func)]
+        weights[";".join(labels)] += own_time * share
+        if len(labels) >= MAX_STACK_DEPTH:
+            return
+        for callee, edge_time in callees[func]:
+            callee_total = stats.stats[callee][3]
+            # Skip recursion and paths worth less than a microsecond
+            if callee_total <= 0 or share * edge_time < 1e-6 or pstats_label(callee) in labels:
+                continue
+            # The callee's time spent under func, scaled to this path's share of func
+            walk(callee, labels, share * edge_time / callee_total)
+
+    for root in roots:
+        walk(root, [], 1.0)
+    return [f"{stack} {round(weight * 1_000_000)}" for stack, weight in weights.most_common() if weight * 1_000_000 >= 1]
+
+
+def tracemalloc_report(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, peak: int) -> str:
+    """Return the lines holding the most new memory between two snapshots."""
+    lines = [f"Peak traced memory during the stage: {peak / (1024 * 1024):.1f} MB", "", "Largest increases by line:"]
+    for stat in after.compare_to(before, "lineno")[:TOP_LINES]:
+        lines.append(str(stat))
+    return "\n".join(lines)
+
+
+def write_text(file_path: pathlib.Path, text: str) -> None:
+    file_path.write_text(text + "\n", encoding="utf-8")
+
+
+@contextlib.contextmanager
+def profile_stage(stage: str, profiler: str = None, profile_dir: pathlib.Path = PROFILE_DIR):
+    """
+    Profile a block of code and save its statistics, collapsed stacks and
+    tracemalloc report under profile_dir.
+    """
+    profiler = profiler or PROFILER
+    if profiler not in PROFILERS:
+        logger.warning(f"Unknown {PROFILER_ENV}={profiler!r}; using cprofile (choose from {PROFILERS}).")
+        profiler = "cprofile"
+    if not _active.acquire(blocking=False):
+        # Another stage is being profiled; this one is already inside that profile
+        yield
+        return
+
+    started_tracemalloc = not tracemalloc.is_tracing()
+    try:
+        if started_tracemalloc:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        sampler = SamplingProfiler() if profiler == "sampling" else None
+        profile = cProfile.Profile() if profiler == "cprofile" else None
+        wall_start = time.perf_counter()
+        if sampler:
+            sampler.start()
+        else:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if sampler:
+                sampler.stop()
+            else:
+                profile.disable()
+            wall_seconds = time.perf_counter() - wall_start
+            peak = tracemalloc.get_traced_memory()[1]
+            after = tracemalloc.take_snapshot()
+            if started_tracemalloc:
+                # Stop tracing before writing the reports, which would otherwise be traced too
+                tracemalloc.stop()
+                started_tracemalloc = False
+            try:
+                profile_dir = pathlib.Path(profile_dir)
+                profile_dir.mkdir(parents=True, exist_ok=True)
+                stamp = datetime.datetime.now().strftime("%Y%m%dT%H%M%S.%f")
+                base = profile_dir.joinpath(f"{stage}-{stamp}")
+                if sampler:
+                    write_text(base.with_name(base.name + ".txt"), sampler.summary())
+                    write_text(base.with_name(base.name + ".collapsed"), "\n".join(sampler.collapsed()))
+                else:
+                    profile.dump_stats(base.with_name(base.name + ".prof"))
+                    text = io.StringIO()
+                    stats = pstats.Stats(profile, stream=text)
+                    stats.sort_stats("cumulative").print_stats(TOP_LINES)
+                    write_text(base.with_name(base.name + ".txt"), text.getvalue())
+                    write_text(base.with_name(base.name + ".collapsed"), "\n".join(pstats_to_collapsed(stats)))
+                write_text(base.with_name(base.name + ".tracemalloc.txt"), tracemalloc_report(before, after, peak))
+                logger.info(f"Profiled {stage} with {profiler} ({wall_seconds:.3f}s); see {base}.*")
+            except Exception as e:
+                logger.error(f"Error saving profile for {stage}: {e}")
+    finally:
+        if started_tracemalloc:
+            tracemalloc.stop()
+        _active.release()
+
+
+def profiled(func, stage: str, profiler: str = None):
+    """Return func wrapped so every call is profiled as stage."""
+
+    def wrapper(*args, **kwargs):
+        with profile_stage(stage, profiler):
+            return func(*args, **kwargs)
+
+    return wrapper